@@ -0,0 +1,338 @@
+"""
+GARUDA Passive ARP Listener
+Watches ARP on the wire instead of polling the neighbour table:
+  • AF_PACKET socket bound to ETH_P_ARP — the kernel drops everything else
+  • per-IP binding state machine: NEW → BOUND → CONFLICT / REBOUND
+  • flapping (A→B→A inside a window) and gratuitous-ARP floods
+  • pcap replay for tests: python arp_listener.py --replay capture.pcap
+Alerts are raised while the packet is parsed and delivered on a separate
+thread. Repeated identical packets take an O(1) fast path and alerts have
+per-(ip, kind) cooldowns, so a flood costs bounded CPU and no DB storm.
+"""
+
+import sys
+import time
+import queue
+import socket
+import struct
+import argparse
+import threading
+import collections
+
+ETH_P_ARP = 0x0806
+ETH_P_8021Q = 0x8100
+LINKTYPE_ETHERNET, LINKTYPE_LINUX_SLL = 1, 113
+ARP_REQUEST, ARP_REPLY = 1, 2
+ARP_HDR = struct.Struct('!HHBBH6s4s6s4s')
+
+BINDING_STALE = 300       # seconds unseen before a new MAC is a rebind, not a conflict
+FLAP_WINDOW = 60          # seconds
+FLAP_CHANGES = 3          # MAC changes inside the window that count as flapping
+GARP_FLOOD_PPS = 20       # gratuitous ARPs per second from one sender
+ALERT_COOLDOWN = 30       # seconds between alerts of one kind for one IP
+MAX_TRACKED = 65536       # bindings kept; least recently seen are evicted
+ALERT_QUEUE = 1000
+
+
+def _mac(raw):
+    return ':'.join(f'{b:02X}' for b in raw)
+
+
+def _mac_bytes(mac):
+    return bytes(int(x, 16) for x in mac.split(':'))
+
+
+def parse_frame(frame, linktype=LINKTYPE_ETHERNET):
+    """(op, sender_mac, sender_ip, target_mac, target_ip) for an Ethernet/IPv4 ARP frame, else None."""
+    if linktype == LINKTYPE_LINUX_SLL:
+        if len(frame) < 16:
+            return None
+        ethertype, offset = struct.unpack_from('!H', frame, 14)[0], 16
+    else:
+        if len(frame) < 14:
+            return None
+        ethertype, offset = struct.unpack_from('!H', frame, 12)[0], 14
+    if ethertype == ETH_P_8021Q and len(frame) >= offset + 4:
+        ethertype, offset = struct.unpack_from('!H', frame, offset + 2)[0], offset + 4
+    if ethertype != ETH_P_ARP or len(frame) < offset + ARP_HDR.size:
+        return None
+    htype, ptype, hlen, plen, op, sha, spa, tha, tpa = ARP_HDR.unpack_from(frame, offset)
+    if htype != 1 or ptype != 0x0800 or hlen != 6 or plen != 4:
+        return None
+    return op, _mac(sha), socket.inet_ntoa(spa), _mac(tha), socket.inet_ntoa(tpa)
+
+
+def build_arp(op, sender_mac, sender_ip, target_ip, target_mac='00:00:00:00:00:00',
+              dst='FF:FF:FF:FF:FF:FF'):
+    """An Ethernet ARP frame — for pcap fixtures and benchmarks."""
+    return (_mac_bytes(dst) + _mac_bytes(sender_mac) + struct.pack('!H', ETH_P_ARP) +
+            ARP_HDR.pack(1, 0x0800, 6, 4, op, _mac_bytes(sender_mac), socket.inet_aton(sender_ip),
+                         _mac_bytes(target_mac), socket.inet_aton(target_ip)))
+
+
+# ─────────────────────────────────────────────
+#  PCAP
+# ─────────────────────────────────────────────
+PCAP_MAGIC = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1e6), b'\xa1\xb2\xc3\xd4': ('>', 1e6),
+    b'\x4d\x3c\xb2\xa1': ('<', 1e9), b'\xa1\xb2\x3c\x4d': ('>', 1e9),   # nanosecond
+}
+
+
+def read_pcap(path):
+    """Yield (timestamp, frame, linktype) from a classic libpcap file."""
+    with open(path, 'rb') as f:
+        header = f.read(24)
+        if header[:4] not in PCAP_MAGIC:
+            raise ValueError(f'{path}: not a pcap file')
+        endian, scale = PCAP_MAGIC[header[:4]]
+        linktype = struct.unpack(endian + 'I', header[20:24])[0]
+        record = struct.Struct(endian + 'IIII')
+        while True:
+            head = f.read(record.size)
+            if len(head) < record.size:
+                return
+            sec, frac, incl, _ = record.unpack(head)
+            yield sec + frac / scale, f.read(incl), linktype
+
+
+def write_pcap(path, packets):
+    """Write [(timestamp, frame)] as an Ethernet pcap file."""
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, LINKTYPE_ETHERNET))
+        for ts, frame in packets:
+            sec = int(ts)
+            f.write(struct.pack('<IIII', sec, int((ts - sec) * 1e6), len(frame), len(frame)))
+            f.write(frame)
+
+
+# ─────────────────────────────────────────────
+#  DETECTOR
+# ─────────────────────────────────────────────
+class Binding:
+    __slots__ = ('mac', 'state', 'first_seen', 'last_seen', 'changes')
+
+    def __init__(self, mac, ts, state='NEW'):
+        self.mac = mac
+        self.state = state
+        self.first_seen = ts
+        self.last_seen = ts
+        self.changes = collections.deque(maxlen=FLAP_CHANGES)
+
+
+class ArpSpoofDetector:
+    """
+    Feed parsed ARP packets in arrival order; `on_alert(alert)` receives
+    ARP_SPOOF alert dicts whose extra['kind'] is mac_change, flapping or
+    garp_flood. `gateway` may be an IP or a callable returning one.
+    """
+
+    def __init__(self, on_alert=None, gateway=None):
+        self.on_alert = on_alert
+        self.gateway = gateway
+        self.bindings = collections.OrderedDict()   # ip → Binding, least recently seen first
+        self._garp = {}                              # sender MAC → [second, count]
+        self._cooldown = {}                          # (ip, kind) → last alert ts
+        self.stats = collections.Counter()
+
+    def _gateway(self):
+        return self.gateway() if callable(self.gateway) else self.gateway
+
+    def seed(self, table, ts=None):
+        """Start from known bindings (e.g. the kernel neighbour table)."""
+        ts = ts or time.time()
+        for ip, mac in table.items():
+            self.bindings[ip] = Binding(mac, ts, 'BOUND')
+
+    def feed(self, ts, packet):
+        op, sha, spa, tha, tpa = packet
+        stats = self.stats
+        stats['packets'] += 1
+        if spa == '0.0.0.0':
+            stats['probes'] += 1          # RFC 5227 probe — claims nothing
+            return
+        if spa == tpa:
+            self._count_garp(ts, sha, spa)
+
+        b = self.bindings.get(spa)
+        if b is not None and b.mac == sha:
+            # fast path: the binding we already hold
+            b.last_seen = ts
+            if b.state == 'NEW' and ts - b.first_seen > 1:
+                b.state = 'BOUND'
+            self.bindings.move_to_end(spa)
+            return
+
+        if b is None:
+            stats['new'] += 1
+            self.bindings[spa] = Binding(sha, ts)
+            if len(self.bindings) > MAX_TRACKED:
+                self.bindings.popitem(last=False)
+            return
+
+        old_mac, quiet = b.mac, ts - b.last_seen
+        b.mac, b.last_seen = sha, ts
+        self.bindings.move_to_end(spa)
+        if quiet > BINDING_STALE:
+            stats['rebinds'] += 1
+            b.state = 'REBOUND'           # old owner long gone — DHCP reuse, new NIC
+            b.changes.clear()
+            return
+
+        stats['conflicts'] += 1
+        b.state = 'CONFLICT'
+        b.changes.append(ts)
+        is_gw = spa == self._gateway()
+        self._alert(ts, spa, sha, 'mac_change', 'CRITICAL' if is_gw else 'HIGH',
+                    f'⚠ ARP SPOOFING DETECTED — {"GATEWAY" if is_gw else spa}',
+                    f'IP {spa} changed MAC from {old_mac} to {sha} on the wire. '
+                    f'{"This is your GATEWAY — possible MITM attack!" if is_gw else "Possible ARP cache poisoning."}',
+                    old_mac=old_mac, new_mac=sha, is_gateway=is_gw, op=op)
+        if len(b.changes) == FLAP_CHANGES and ts - b.changes[0] <= FLAP_WINDOW:
+            self._alert(ts, spa, sha, 'flapping', 'CRITICAL',
+                        f'⚠ ARP BINDING FLAPPING — {spa}',
+                        f'IP {spa} switched MAC {FLAP_CHANGES} times in {ts - b.changes[0]:.1f}s '
+                        f'(now {sha}). Two hosts are answering for it.',
+                        new_mac=sha, old_mac=old_mac, is_gateway=is_gw)
+
+    def _count_garp(self, ts, mac, ip):
+        second = int(ts)
+        slot = self._garp.get(mac)
+        if slot is None or slot[0] != second:
+            if len(self._garp) > MAX_TRACKED:
+                self._garp.clear()
+            self._garp[mac] = [second, 1]
+            return
+        slot[1] += 1
+        self.stats['garp'] += 1
+        if slot[1] == GARP_FLOOD_PPS:
+            self._alert(ts, ip, mac, 'garp_flood', 'HIGH',
+                        f'⚠ GRATUITOUS ARP FLOOD — {mac}',
+                        f'{mac} sent {GARP_FLOOD_PPS}+ gratuitous ARPs within a second (claiming {ip}).',
+                        new_mac=mac, rate=GARP_FLOOD_PPS)
+
+    def _alert(self, ts, ip, mac, kind, severity, title, description, **extra):
+        key = (ip, kind)
+        if ts - self._cooldown.get(key, float('-inf')) < ALERT_COOLDOWN:
+            self.stats['suppressed'] += 1
+            return
+        self._cooldown[key] = ts
+        self.stats['alerts'] += 1
+        alert = {'type': 'ARP_SPOOF', 'severity': severity, 'title': title,
+                 'description': description, 'ip': ip, 'mac': mac,
+                 'extra': {'kind': kind, 'detected_at': ts, 'source': 'arp_listener', **extra}}
+        if self.on_alert:
+            self.on_alert(alert)
+
+
+# ─────────────────────────────────────────────
+#  LISTENER
+# ─────────────────────────────────────────────
+class ArpListener:
+    """
+    Captures ARP from an AF_PACKET socket (CAP_NET_RAW, Linux) into an
+    ArpSpoofDetector. `on_alert` runs on a delivery thread, never the
+    capture thread, so slow sinks (DB, notifications) can't drop packets.
+    """
+
+    def __init__(self, on_alert=None, gateway=None, iface=None):
+        self.sink = on_alert
+        self.iface = iface
+        self.detector = ArpSpoofDetector(self._enqueue, gateway)
+        self._alerts = queue.Queue(maxsize=ALERT_QUEUE)
+        self._sock = None
+        self._threads = []
+
+    def _enqueue(self, alert):
+        try:
+            self._alerts.put_nowait(alert)
+        except queue.Full:
+            self.detector.stats['alerts_dropped'] += 1
+
+    def _deliver(self):
+        while True:
+            alert = self._alerts.get()
+            if self.sink:
+                try:
+                    self.sink(alert)
+                except Exception as e:
+                    print(f"[ARP LISTENER] Alert sink error: {e}")
+
+    def open(self):
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+        if self.iface:
+            sock.bind((self.iface, ETH_P_ARP))
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        return sock
+
+    def start(self):
+        """Start capturing in the background. Returns False without AF_PACKET / CAP_NET_RAW."""
+        if self._threads:
+            return True
+        if not hasattr(socket, 'AF_PACKET'):
+            return False
+        try:
+            self._sock = self.open()
+        except OSError as e:
+            print(f"[ARP LISTENER] Unavailable: {e}")
+            return False
+        for target, name in ((self._capture, 'arp-capture'), (self._deliver, 'arp-alerts')):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return True
+
+    def _capture(self):
+        feed, recv = self.detector.feed, self._sock.recv
+        while True:
+            try:
+                frame = recv(2048)
+            except OSError as e:
+                print(f"[ARP LISTENER] Capture error: {e}")
+                time.sleep(1)
+                continue
+            packet = parse_frame(frame)
+            if packet:
+                feed(time.time(), packet)
+
+    def replay(self, path):
+        """Run a pcap through the detector synchronously; returns the alerts raised."""
+        alerts = []
+        detector = ArpSpoofDetector(alerts.append, self.detector.gateway)
+        for ts, frame, linktype in read_pcap(path):
+            packet = parse_frame(frame, linktype)
+            if packet:
+                detector.feed(ts, packet)
+        return alerts, detector.stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='GARUDA passive ARP spoof listener')
+    parser.add_argument('--iface', help='capture interface (default: all)')
+    parser.add_argument('--gateway', help='gateway IP to treat as critical')
+    parser.add_argument('--replay', help='run a pcap file through the detector and exit')
+    args = parser.parse_args(argv)
+
+    def show(alert):
+        print(f"[{alert['severity']}] {alert['title']} — {alert['description']}")
+
+    listener = ArpListener(show, args.gateway, args.iface)
+    if args.replay:
+        alerts, stats = listener.replay(args.replay)
+        for alert in alerts:
+            show(alert)
+        print(dict(stats))
+        return 0
+    if not listener.start():
+        return 1
+    print("[ARP LISTENER] Capturing — Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(60)
+            print(dict(listener.detector.stats))
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,746 @@
+"""
+GARUDA Benchmarks
+Standalone timing harness for the scanning and persistence engines.
+Run: python bench.py <name> [options]
+
+Sweeps default to 127.0.0.0/24, which the Linux loopback answers in full.
+For a realistic L2 segment run inside a network namespace, e.g.
+    ip netns add garuda && ip netns exec garuda python bench.py sweep --cidr 10.99.0.0/24
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import ipaddress
+import tracemalloc
+import collections
+from datetime import datetime
+
+
+# ─────────────────────────────────────────────
+#  ICMP SWEEP  (socket engine vs thread + subprocess)
+# ─────────────────────────────────────────────
+
+def bench_sweep(args):
+    from icmp_sweep import ICMPSweeper
+
+    ips = [str(ip) for ip in ipaddress.IPv4Network(args.cidr, strict=False).hosts()]
+    sweeper = ICMPSweeper(rate=args.rate, timeout=args.timeout, fallback_workers=args.workers)
+    print(f"[BENCH] sweep {args.cidr} — {len(ips)} hosts, rate={args.rate}/s, timeout={args.timeout}s")
+
+    t = time.perf_counter()
+    alive = sweeper.sweep(ips)
+    dt = time.perf_counter() - t
+    print(f"  socket ({sweeper.mode:<10}) {len(alive):>5} alive  {dt:7.3f}s")
+
+    if args.skip_legacy:
+        return
+    legacy = ICMPSweeper(timeout=args.timeout, fallback_workers=args.workers)
+    legacy.open_socket = lambda: (None, 'subprocess')
+    t = time.perf_counter()
+    alive = legacy.sweep(ips)
+    dt = time.perf_counter() - t
+    print(f"  thread+subprocess    {len(alive):>5} alive  {dt:7.3f}s")
+
+
+# ─────────────────────────────────────────────
+#  ADAPTIVE SWEEP  (learned subnet profile vs the old size table)
+# ─────────────────────────────────────────────
+
+# (hosts above, timeout, rate) — what get_connected_devices used to pick
+STATIC_TABLE = [(500, 0.2, 2000), (100, 0.3, 1500), (0, 0.4, 1000)]
+
+
+def bench_adaptive(args):
+    from icmp_sweep import ICMPSweeper
+    from scan_profile import ProfileStore, SweepController
+
+    network = ipaddress.IPv4Network(args.cidr, strict=False)
+    ips = [str(ip) for ip in network.hosts()]
+    timeout, rate = next((t, r) for floor, t, r in STATIC_TABLE if len(ips) > floor)
+    sweeper = ICMPSweeper()
+    print(f"[BENCH] adaptive sweep {args.cidr} — {len(ips)} hosts")
+
+    t = time.perf_counter()
+    alive = sweeper.sweep(ips, timeout=timeout, rate=rate)
+    dt = time.perf_counter() - t
+    print(f"  static  {rate:>5} pps {timeout * 1000:5.0f} ms  {len(alive):>5} alive  {dt:7.3f}s")
+
+    store = ProfileStore()
+    for run in range(1, args.runs + 1):
+        profile = store.get(str(network))
+        controller = SweepController(profile, canaries=[args.gateway or ips[0]] + profile.responders)
+        t = time.perf_counter()
+        alive = sweeper.sweep(ips, controller=controller)
+        dt = time.perf_counter() - t
+        store.save(controller.finish(alive))
+        s = controller.stats()
+        print(f"  run {run}   {s['rate']:>5} pps {s['timeout_ms']:5} ms  {len(alive):>5} alive  {dt:7.3f}s   "
+              f"canaries {s['canaries']} loss {s['canary_loss']:.1%} backoffs {s['backoffs']}")
+
+
+# ─────────────────────────────────────────────
+#  SAVE_SCAN  (batched writer vs the original row-at-a-time path)
+# ─────────────────────────────────────────────
+
+def synthetic_scan(n_devices, port_hosts=None):
+    """A scan_result dict shaped like full_scan() output with n devices."""
+    rnd = random.Random(n_devices)
+    devices = []
+    for i in range(n_devices):
+        ip = f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+        mac = ':'.join(f'{rnd.randrange(256):02X}' for _ in range(6))
+        devices.append({'ip': ip, 'mac': mac, 'vendor': 'Unknown Vendor', 'hostname': None,
+                        'status': 'ACTIVE', 'detection_method': 'PING+ARP', 'type': 'NODE'})
+    port_hosts = n_devices // 4 if port_hosts is None else port_hosts
+    port_scan = {d['ip']: [22, 80, 443] for d in devices[:port_hosts]}
+    return {
+        'scan_duration': '1.0s',
+        'connected_network': {'ssid': 'bench', 'encryption': 'WPA2'},
+        'connected_devices': devices,
+        'port_scan': port_scan,
+        'security_summary': {'total_devices': n_devices},
+        'attack_prediction': {'risk_score': 10, 'risk_label': 'LOW'},
+        'network_traffic': {'bytes_sent_raw': 1, 'bytes_recv_raw': 1},
+    }
+
+
+def save_scan_rowwise(get_conn, scan_result):
+    """The original save_scan: one execute per row, linear MAC lookup."""
+    conn = get_conn()
+    c = conn.cursor()
+    now = datetime.now().isoformat()
+    net = scan_result.get('connected_network', {})
+    pred = scan_result.get('attack_prediction', {})
+    summary = scan_result.get('security_summary', {})
+    devices = scan_result.get('connected_devices', [])
+    c.execute("""
+    INSERT INTO scans (timestamp, duration, ssid, bssid, encryption, signal,
+        gateway_ip, local_ip, device_count, active_count, unknown_count,
+        risk_score, risk_label, threat_level)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+    """, (now, 1.0, net.get('ssid'), net.get('bssid'), net.get('encryption'), net.get('signal'),
+          None, None, summary.get('total_devices', len(devices)), 0, 0,
+          pred.get('risk_score', 0), pred.get('risk_label', 'UNKNOWN'), 'UNKNOWN'))
+    scan_id = c.lastrowid
+    port_data = scan_result.get('port_scan', {})
+    for d in devices:
+        ip = d.get('ip', '')
+        c.execute("""
+        INSERT INTO devices (scan_id, timestamp, ip, mac, vendor, hostname,
+            status, detection_method, open_ports, device_type)
+        VALUES (?,?,?,?,?,?,?,?,?,?)
+        """, (scan_id, now, ip, d.get('mac'), d.get('vendor'), d.get('hostname'), d.get('status'),
+              d.get('detection_method'), json.dumps(port_data.get(ip, [])), d.get('type', 'NODE')))
+        mac = d.get('mac', '')
+        if mac and mac not in ('Unknown', '<INCOMPLETE>'):
+            c.execute("""
+            INSERT INTO known_devices (mac, vendor, hostname, first_seen, last_seen, last_ip, times_seen)
+            VALUES (?,?,?,?,?,?,1)
+            ON CONFLICT(mac) DO UPDATE SET
+                last_seen=excluded.last_seen, last_ip=excluded.last_ip, times_seen=times_seen+1,
+                vendor=COALESCE(excluded.vendor, vendor), hostname=COALESCE(excluded.hostname, hostname)
+            """, (mac, d.get('vendor'), d.get('hostname'), now, now, ip))
+    for d in devices:
+        ip, mac = d.get('ip', ''), d.get('mac', '')
+        if ip and mac and mac != 'Unknown':
+            c.execute("INSERT INTO arp_snapshots (timestamp, ip, mac) VALUES (?,?,?)", (now, ip, mac))
+    for ip, ports in port_data.items():
+        mac = next((d.get('mac') for d in devices if d.get('ip') == ip), None)
+        c.execute("INSERT INTO port_history (timestamp, ip, mac, ports) VALUES (?,?,?,?)",
+                  (now, ip, mac, json.dumps(ports)))
+    conn.commit()
+    conn.close()
+    return scan_id
+
+
+def bench_save_scan(args):
+    import database
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'bench.db')
+        database.init_db()
+        for n in args.devices:
+            scan = synthetic_scan(n)
+            t = time.perf_counter()
+            save_scan_rowwise(database.get_conn, scan)
+            old = time.perf_counter() - t
+
+            stats = {}
+            t = time.perf_counter()
+            database.save_scan(scan, stats=stats)
+            new = time.perf_counter() - t
+
+            # second save under tracemalloc — tracing skews the timing above
+            tracemalloc.start()
+            database.save_scan(scan)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(f"[BENCH] save_scan {n:>6} devices   rowwise {old*1000:9.1f} ms   "
+                  f"batched {new*1000:9.1f} ms   x{old / max(new, 1e-9):.1f}   peak {peak / 1024:7.1f} KiB")
+            for table, st in stats.items():
+                print(f"          {table:<14} {st['rows']:>7} rows  {st['ms']:9.3f} ms")
+
+
+# ─────────────────────────────────────────────
+#  TIME-SERIES STORE  (typed ring buffers vs a deque of sample dicts)
+# ─────────────────────────────────────────────
+
+def _synthetic_counters(nics, seconds):
+    """Yield (ts, {nic: counters dict}) once per second with cumulative counters."""
+    from timeseries import COUNTERS
+    rnd = random.Random(seconds)
+    cum = {n: dict.fromkeys(COUNTERS, 0) for n in nics}
+    t0 = time.time() - seconds
+    for s in range(seconds):
+        for n in nics:
+            c = cum[n]
+            c['bytes_sent'] += rnd.randrange(10_000, 5_000_000)
+            c['bytes_recv'] += rnd.randrange(10_000, 50_000_000)
+            c['packets_sent'] += rnd.randrange(10, 5_000)
+            c['packets_recv'] += rnd.randrange(10, 40_000)
+            c['dropin'] += rnd.random() < 0.01
+        yield t0 + s, {n: dict(c) for n, c in cum.items()}
+
+
+def bench_timeseries(args):
+    from timeseries import TimeSeriesStore
+
+    nics = [f'eth{i}' for i in range(args.nics)]
+    seconds = args.hours * 3600
+    print(f"[BENCH] timeseries — {args.nics} NICs, {args.hours}h at 1s")
+    samples = list(_synthetic_counters(nics, seconds))
+
+    tracemalloc.start()
+    store = TimeSeriesStore(capacity=seconds)
+    t = time.perf_counter()
+    for ts, counters in samples:
+        store.record(ts, counters)
+    dt = time.perf_counter() - t
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per_nic_hour = store.nbytes / (len(store.nics) * args.hours)
+    print(f"  ring buffers   {store.nbytes / 1024:9.1f} KiB   "
+          f"{per_nic_hour / 1024:7.1f} KiB per NIC-hour (incl. total series)   "
+          f"record {dt / len(samples) * 1e6:6.1f} µs/tick")
+
+    # the alternative: keep every sample dict, as the first live feed did
+    tracemalloc.start()
+    ring = collections.deque(maxlen=seconds)
+    for ts, counters in samples:
+        ring.append({'ts': ts, 'nics': {n: dict(c) for n, c in counters.items()}})
+    ring_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  deque of dicts {ring_bytes / 1024:9.1f} KiB   "
+          f"{ring_bytes / (args.nics * args.hours) / 1024:7.1f} KiB per NIC-hour")
+    del ring
+
+    for window in (60, 900, 3600):
+        t = time.perf_counter()
+        store.stats(window, now=samples[-1][0])
+        print(f"  stats/percentiles over {window:>5}s   {(time.perf_counter() - t) * 1000:7.2f} ms")
+    t = time.perf_counter()
+    minutes = {}
+    store.flush(minutes.update, now=samples[-1][0] + 60)
+    print(f"  downsample to {len(minutes)} minutes     {(time.perf_counter() - t) * 1000:7.2f} ms")
+
+
+# ─────────────────────────────────────────────
+#  ARP DETECTOR  (per-packet cost under a spoofing flood)
+# ─────────────────────────────────────────────
+
+def bench_arp(args):
+    from arp_listener import ArpSpoofDetector, build_arp, parse_frame, write_pcap, ARP_REPLY
+
+    rnd = random.Random(args.packets)
+    gateway, gw_mac, attacker = '10.0.0.1', '02:00:00:00:00:01', '02:66:66:66:66:66'
+    hosts = [(f'10.0.{i >> 8}.{i & 255}', ':'.join(f'{rnd.randrange(256):02X}' for _ in range(6)))
+             for i in range(2, 2 + args.hosts)]
+    frames = []
+    for n in range(args.packets):
+        r = rnd.random()
+        if r < args.spoof:
+            frames.append(build_arp(ARP_REPLY, attacker, gateway, gateway))       # spoofed GARP
+        elif r < args.spoof * 2:
+            frames.append(build_arp(ARP_REPLY, gw_mac, gateway, gateway))         # real gateway
+        else:
+            ip, mac = hosts[n % len(hosts)]
+            frames.append(build_arp(ARP_REPLY, mac, ip, gateway))
+    alerts = []
+    detector = ArpSpoofDetector(alerts.append, gateway)
+    detector.seed({gateway: gw_mac}, ts=0)
+
+    print(f"[BENCH] arp — {args.packets} frames, {args.hosts} hosts, {args.spoof:.0%} spoofed")
+    t0, span = 1_000_000.0, args.packets / args.rate
+    t = time.perf_counter()
+    for n, frame in enumerate(frames):
+        detector.feed(t0 + n * span / args.packets, parse_frame(frame))
+    dt = time.perf_counter() - t
+    print(f"  parse+detect  {dt / args.packets * 1e6:6.2f} µs/packet   {args.packets / dt:10,.0f} packets/s")
+    print(f"  alerts {len(alerts)} (suppressed {detector.stats['suppressed']:,}) over {span:.1f}s of traffic "
+          f"at {args.rate:,} pps")
+    if args.pcap:
+        write_pcap(args.pcap, [(t0 + n * span / args.packets, f) for n, f in enumerate(frames)])
+        print(f"  wrote {args.pcap} — replay with: python arp_listener.py --replay {args.pcap} --gateway {gateway}")
+
+
+# ─────────────────────────────────────────────
+#  OUI INDEX  (startup cost and lookup throughput)
+# ─────────────────────────────────────────────
+
+def _synthetic_registry(path, counts, rnd):
+    """Write IEEE-format CSVs with counts[bits] random assignments each. Returns the paths."""
+    import csv
+    registries = {24: ('MA-L', 'oui.csv'), 28: ('MA-M', 'mam.csv'), 36: ('MA-S', 'oui36.csv')}
+    paths = []
+    for bits, n in counts.items():
+        registry, name = registries[bits]
+        out = os.path.join(path, name)
+        with open(out, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['Registry', 'Assignment', 'Organization Name', 'Organization Address'])
+            for _ in range(n):
+                # keep the U/L bit clear, as IEEE assignments do
+                prefix = rnd.getrandbits(bits) & ~(0x2 << (bits - 8))
+                w.writerow([registry, f'{prefix:0{bits // 4}X}', f'Vendor {rnd.randrange(n // 2 or 1)} Inc.',
+                            'Somewhere'])
+        paths.append(out)
+    return paths
+
+
+def bench_oui(args):
+    from oui import VendorLookup, parse_registry, build
+
+    rnd = random.Random(args.lookups)
+    counts = {24: args.ma_l, 28: args.ma_m, 36: args.ma_s}
+    print(f"[BENCH] oui — {sum(counts.values()):,} assignments "
+          f"({args.ma_l:,} MA-L, {args.ma_m:,} MA-M, {args.ma_s:,} MA-S), {args.lookups:,} lookups")
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = _synthetic_registry(tmp, counts, rnd)
+        index = os.path.join(tmp, 'oui.idx')
+        t = time.perf_counter()
+        build(sources, index)
+        print(f"  compile        {(time.perf_counter() - t) * 1000:8.1f} ms   "
+              f"index {os.path.getsize(index) / 1024:7.1f} KiB")
+
+        lookup = VendorLookup(index_path=index, data_dir=os.path.join(tmp, 'none'))
+        t = time.perf_counter()
+        lookup.vendor('00:00:00:00:00:00')
+        print(f"  cold start     {(time.perf_counter() - t) * 1000:8.3f} ms   (mmap + first lookup)")
+
+        # the alternative: parse the registry into a dict at startup
+        t = time.perf_counter()
+        parse_registry(sources)
+        dt = time.perf_counter() - t
+        tracemalloc.start()
+        table = parse_registry(sources)
+        dict_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  dict startup   {dt * 1000:8.1f} ms   heap  {dict_bytes / 1024:7.1f} KiB")
+        del table
+
+        entries = list(parse_registry(sources))
+        macs = []
+        for n in range(args.lookups):
+            if n % 2:
+                bits, prefix = entries[rnd.randrange(len(entries))]
+                value = (prefix << (48 - bits)) | rnd.getrandbits(48 - bits)
+            else:
+                value = rnd.getrandbits(48)
+            macs.append(':'.join(f'{(value >> s) & 0xFF:02X}' for s in range(40, -8, -8)))
+        t = time.perf_counter()
+        found = sum(1 for mac in macs if lookup.vendor(mac))
+        dt = time.perf_counter() - t
+        print(f"  lookup         {dt / args.lookups * 1e6:8.2f} µs   {args.lookups / dt:10,.0f} lookups/s   "
+              f"({found:,} named incl. randomized)")
+
+
+# ─────────────────────────────────────────────
+#  DASHBOARD SUMMARY  (write-through cache vs six queries per poll)
+# ─────────────────────────────────────────────
+
+def _seed_history(database, scans, known, alerts):
+    """`scans` rows one every 90 s back from now, plus known devices and alerts."""
+    now = time.time()
+    with database.session() as conn:
+        conn.executemany("""
+            INSERT INTO scans (timestamp, duration, device_count, active_count, unknown_count,
+                risk_score, risk_label, threat_level)
+            VALUES (?, 1.0, 20, 18, 2, ?, 'LOW', 'SECURE')
+        """, ((datetime.fromtimestamp(now - 90 * i).isoformat(), i % 40) for i in range(scans, 0, -1)))
+        conn.executemany("""
+            INSERT INTO known_devices (mac, first_seen, last_seen, last_ip, times_seen)
+            VALUES (?, ?, ?, ?, 1)
+        """, ((f'02:00:00:{i >> 16 & 0xFF:02X}:{i >> 8 & 0xFF:02X}:{i & 0xFF:02X}',
+               datetime.now().isoformat(), datetime.now().isoformat(), f'10.0.{i >> 8 & 0xFF}.{i & 0xFF}')
+              for i in range(known)))
+        conn.executemany("""
+            INSERT INTO alerts (timestamp, type, severity, title, acknowledged) VALUES (?, 'NEW_DEVICE', 'LOW', ?, ?)
+        """, ((datetime.fromtimestamp(now - 600 * i).isoformat(), f'alert {i}', int(i % 10 != 0))
+              for i in range(alerts, 0, -1)))
+
+
+def _time_calls(fn, calls):
+    samples = []
+    for _ in range(calls):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    samples.sort()
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+
+def bench_dashboard(args):
+    import database
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'bench.db')
+        database.init_db()
+        t = time.perf_counter()
+        _seed_history(database, args.scans, args.known, args.alerts)
+        print(f"[BENCH] dashboard — {args.scans:,} scans, {args.known:,} known devices, {args.alerts:,} alerts "
+              f"(seeded in {time.perf_counter() - t:.1f}s), {args.calls:,} calls each")
+
+        def report(label, fn):
+            p50, p99 = _time_calls(fn, args.calls)
+            print(f"  {label:<26} p50 {p50 * 1e6:9.1f} µs   p99 {p99 * 1e6:9.1f} µs")
+
+        report('uncached (six queries)', database.query_dashboard_summary)
+
+        cache = database.DashboardCache()
+        cache.snapshot()
+        _, etag = cache.snapshot()
+        report('cached poll', cache.snapshot)
+        report('304 check', lambda: cache.snapshot()[1] == etag)
+
+        cache.recheck = 0      # every poll checks dashboard_state for foreign writes
+        report('cached poll, revalidated', cache.snapshot)
+
+        # write-through: each save patches the cache instead of forcing a rebuild
+        database.dashboard = cache
+        rebuilds = cache.stats['rebuilds']
+        t = time.perf_counter()
+        for i in range(args.writes):
+            database.save_alert('NEW_DEVICE', 'LOW', f'bench {i}')
+            cache.snapshot()
+        dt = time.perf_counter() - t
+        print(f"  save_alert + poll          {dt / args.writes * 1e6:9.1f} µs   "
+              f"{cache.stats['rebuilds'] - rebuilds} rebuilds over {args.writes} writes")
+        fresh = database.query_dashboard_summary()
+        cached = cache.snapshot()[0]
+        print(f"  cache matches tables       {fresh == cached}")
+
+
+# ─────────────────────────────────────────────
+#  HTTP RESPONSES  (jsonify vs the wire.py pipeline)
+# ─────────────────────────────────────────────
+
+def _jsonify(payload):
+    """What flask.jsonify emits outside debug mode: sorted keys, compact, ASCII."""
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str).encode('ascii')
+
+
+def _timed(fn, repeat):
+    best, out = float('inf'), None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t)
+    return out, best
+
+
+def bench_http(args):
+    import database
+    import wire
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'bench.db')
+        database.init_db()
+        _seed_history(database, args.scans, args.known, 200)
+        scan = synthetic_scan(args.devices)
+        scan['devices'] = [{**d, 'open_ports': scan['port_scan'].get(d['ip'], []), 'threat_level': 'MONITORING'}
+                           for d in scan['connected_devices']]
+        slim = {k: v for k, v in scan.items() if k != 'devices'}
+        slim['connected_devices'] = scan['devices']
+        endpoints = [
+            ('/api/history/scans?limit=200', database.get_scan_history(200), database.get_scan_history(200), True),
+            ('/api/history/devices', database.get_known_devices(), database.get_known_devices(), True),
+            (f'/api/scan/full ({args.devices} dev)', scan, slim, False),
+        ]
+
+    print(f"[BENCH] http — orjson {'yes' if wire.orjson else 'no'}, brotli {'yes' if wire.brotli else 'no'}, "
+          f"msgpack {'yes' if wire.msgpack else 'no'}; best of {args.repeat}")
+    for name, before, after, rows in endpoints:
+        print(f"  {name}")
+        body, dt = _timed(lambda: _jsonify(before), args.repeat)
+        print(f"    {'jsonify':<10} {len(body):>10,} B   encode {dt * 1000:7.2f} ms")
+        for fmt in ('json', 'columnar', 'msgpack') if rows else ('json', 'msgpack'):
+            if fmt == 'msgpack' and wire.msgpack is None:
+                continue
+            (body, _), dt = _timed(lambda: wire.encode(after, fmt), args.repeat)
+            line = f"    {fmt:<10} {len(body):>10,} B   encode {dt * 1000:7.2f} ms"
+            for coding in ('gzip', 'br') if wire.brotli else ('gzip',):
+                packed, ct = _timed(lambda: wire.compress(body, coding), args.repeat)
+                line += f"   {coding} {len(packed):>9,} B {ct * 1000:6.2f} ms"
+            print(line)
+
+    cache = wire.BodyCache()
+    payload = endpoints[1][2]
+    cache.render(lambda: payload, 'json', 'gzip', etag='bench')
+    _, dt = _timed(lambda: cache.render(lambda: payload, 'json', 'gzip', etag='bench'), args.repeat)
+    print(f"  cached body (same ETag)   {dt * 1e6:7.2f} µs")
+
+
+# ─────────────────────────────────────────────
+#  RISK RE-SCORING  (batch columns vs predict() per scan)
+# ─────────────────────────────────────────────
+
+def bench_rescore(args):
+    import predictor
+
+    rnd = random.Random(args.scans)
+    n = args.scans
+    devices = [rnd.randrange(0, 120) for _ in range(n)]
+    open_ports = [rnd.randrange(0, 30) for _ in range(n)]
+    features = {
+        'scan_id': list(range(1, n + 1)),
+        'timestamp': [datetime.now().isoformat()] * n,
+        'encryption': [rnd.choice(('WPA2-Personal', 'WPA3', 'Open', 'WPA2-Enterprise', 'WEP')) for _ in range(n)],
+        'risk_score': [0.0] * n,
+        'risk_label': ['LOW'] * n,
+        'devices': devices,
+        'unknown': [rnd.randrange(0, d + 1) for d in devices],
+        'arp_only': [rnd.randrange(0, d + 1) for d in devices],
+        'open_ports': open_ports,
+        'risky_open': [rnd.randrange(0, p + 1) for p in open_ports],
+        'errin': [rnd.randrange(0, 20) for _ in range(n)],
+        'dropin': [rnd.randrange(0, 20) for _ in range(n)],
+        'packets_recv': [rnd.randrange(1, 10 ** 6) for _ in range(n)],
+    }
+    model = predictor.AttackPredictor()
+    scans = [predictor.scan_from_features(features, i) for i in range(n)]
+    print(f"[BENCH] rescore — {n:,} scans")
+
+    t = time.perf_counter()
+    scalar = [model.predict(s) for s in scans]
+    dt_scalar = time.perf_counter() - t
+    print(f"  predict() per scan   {dt_scalar * 1000:9.1f} ms")
+
+    numpy = predictor.np
+    predictor.np = None
+    t = time.perf_counter()
+    rows = model.score_batch(features)
+    print(f"  batch, pure Python   {(time.perf_counter() - t) * 1000:9.1f} ms")
+    predictor.np = numpy
+    if numpy is not None:
+        t = time.perf_counter()
+        batch = model.score_batch(features)
+        dt = time.perf_counter() - t
+        print(f"  batch, numpy         {dt * 1000:9.1f} ms   x{dt_scalar / dt:.0f}")
+        assert batch == rows
+
+    same = all(s['risk_score'] == rows['risk_score'][i] and s['risk_label'] == rows['risk_label'][i] and
+               all(v == rows['component_scores'][k][i] for k, v in s['component_scores'].items())
+               for i, s in enumerate(scalar))
+    print(f"  identical to predict()  {same}")
+
+
+# ─────────────────────────────────────────────
+#  RULE ENGINE  (indexed candidates vs every rule, as the rule count grows)
+# ─────────────────────────────────────────────
+
+def bench_rules(args):
+    import rules as rule_engine
+
+    with open(rule_engine.RULES_PATH, encoding='utf-8') as f:
+        shipped = json.load(f)
+    rnd = random.Random(7)
+    scan = {
+        'scores': {'encryption': 0.45, 'unknown_devices': 0.35, 'arp_anomalies': 0.1, 'open_ports': 0.6,
+                   'device_density': 0.5, 'traffic_anomaly': 0.0},
+        'enc': 'wpa2-personal',
+        'devices': [{}] * 15,
+        'port_data': {f'192.168.1.{i}': rnd.sample([22, 80, 139, 443, 445, 3389, 8080], 3) for i in range(2, 17)},
+    }
+    print(f"[BENCH] rules — one scan, {len(scan['port_data'])} hosts with open ports, {args.rounds:,} evaluations")
+    print(f"  {'rules':>7} {'compile':>10} {'indexed':>11} {'every rule':>12} {'candidates':>11}")
+    for n in args.sizes:
+        extra = []
+        for i in range(max(0, n - len(shipped['rules']))):
+            # synthetic rules on things this scan does not have, the bulk of a large rule set
+            pick = i % 3
+            rule = {'id': f'gen-{i}', 'kind': 'attack', 'type': f'Generated {i}', 'severity': 'Low',
+                    'probability': 10.0, 'description': 'synthetic'}
+            if pick == 0:
+                rule['ports'] = [rnd.randrange(10000, 60000)]
+            elif pick == 1:
+                rule['encryption'] = {'all': [f'tok{i}x']}
+            else:
+                rule['score'] = {rnd.choice(list(scan['scores'])): rnd.uniform(0.7, 0.99)}
+            extra.append(rule)
+        t = time.perf_counter()
+        ruleset = rule_engine.RuleSet(shipped['rules'] + extra, shipped.get('defaults'))
+        dt_compile = time.perf_counter() - t
+
+        args_ = (scan['scores'], scan['enc'], scan['devices'], scan['port_data'])
+        t = time.perf_counter()
+        for _ in range(args.rounds):
+            ruleset.attacks(*args_)
+        indexed = (time.perf_counter() - t) / args.rounds
+
+        ports = {p for ps in scan['port_data'].values() for p in ps}
+        attack_rules = [r for r in ruleset.rules if 'attack' in r.kinds]
+        t = time.perf_counter()
+        for _ in range(args.rounds):
+            [r for r in attack_rules if r.matches(scan['enc'], ports, scan['scores'])]
+        linear = (time.perf_counter() - t) / args.rounds
+        candidates = len(ruleset.candidates('attack', scan['enc'], ports, scan['scores']))
+        print(f"  {len(ruleset):>7,} {dt_compile * 1000:>8.1f}ms {indexed * 1e6:>9.1f}µs {linear * 1e6:>10.1f}µs "
+              f"{candidates:>11}")
+
+
+# ─────────────────────────────────────────────
+#  SCAN WORKERS  (request latency beside a CPU-bound scan, thread vs process)
+# ─────────────────────────────────────────────
+
+ARP_LINE = '  192.168.{}.{:<3}         3c-5a-b4-{:02x}-{:02x}-{:02x}     dynamic'
+
+
+def _cpu_scan(progress=None, seconds=2.0):
+    """Stand-in for a large scan's pure-Python work: `arp -a` parsing and JSON building."""
+    import re
+    line = re.compile(r'(\d+\.\d+\.\d+\.\d+)\s+([0-9a-f-]{17})')
+    table = '\n'.join(ARP_LINE.format(i // 254, i % 254 + 1, i % 256, i // 256 % 256, i % 7) for i in range(4096))
+    end = time.perf_counter() + seconds
+    rounds, devices = 0, []
+    while time.perf_counter() < end:
+        devices = [{'ip': ip, 'mac': mac.replace('-', ':')} for ip, mac in line.findall(table)]
+        json.dumps(devices)
+        rounds += 1
+        if progress:
+            progress('sweep' if rounds == 1 else None, rounds=rounds)
+    return {'status': 'success', 'rounds': rounds, 'devices': len(devices)}
+
+
+def bench_workers(args):
+    import threading
+    import scan_workers
+
+    payload = {'devices': [{'ip': f'10.0.0.{i}', 'vendor': 'Apple', 'open_ports': [22, 80]} for i in range(40)]}
+
+    def request():
+        # a small API response: encode + a blocking wait, like a handler doing I/O
+        json.dumps(payload)
+        time.sleep(0.001)
+
+    def measure(start_scan):
+        done = threading.Event()
+        thread = threading.Thread(target=lambda: (start_scan(), done.set()))
+        thread.start()
+        samples = []
+        while not done.is_set():
+            t = time.perf_counter()
+            request()
+            samples.append(time.perf_counter() - t)
+        thread.join()
+        samples.sort()
+        return len(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+    print(f"[BENCH] workers — API-sized requests while a {args.seconds:.0f}s CPU-bound scan runs")
+    idle = _time_calls(request, 200)
+    print(f"  {'idle':<22} p50 {idle[0] * 1000:7.2f} ms   p99 {idle[1] * 1000:7.2f} ms")
+    n, p50, p99 = measure(lambda: _cpu_scan(seconds=args.seconds))
+    print(f"  {'scan on a thread':<22} p50 {p50 * 1000:7.2f} ms   p99 {p99 * 1000:7.2f} ms   {n:>6,} requests")
+    pool = scan_workers.ScanWorkerPool('bench:_cpu_scan', workers=1)
+    pool.run(lambda *a, **kw: None, seconds=0)      # spawn + import outside the measurement
+    n, p50, p99 = measure(lambda: pool.run(lambda *a, **kw: None, seconds=args.seconds))
+    print(f"  {'scan in a worker':<22} p50 {p50 * 1000:7.2f} ms   p99 {p99 * 1000:7.2f} ms   {n:>6,} requests")
+    pool.shutdown()
+
+
+# ─────────────────────────────────────────────
+#  CLI
+# ─────────────────────────────────────────────
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='GARUDA benchmarks')
+    sub = parser.add_subparsers(dest='name', required=True)
+
+    p = sub.add_parser('sweep', help='ICMP sweep engine vs per-host ping')
+    p.add_argument('--cidr', default='127.0.0.0/24')
+    p.add_argument('--rate', type=int, default=1000)
+    p.add_argument('--timeout', type=float, default=0.5)
+    p.add_argument('--workers', type=int, default=100)
+    p.add_argument('--skip-legacy', action='store_true')
+    p.set_defaults(func=bench_sweep)
+
+    p = sub.add_parser('adaptive', help='learned AIMD sweep profile vs the static size table')
+    p.add_argument('--cidr', default='127.0.0.0/24')
+    p.add_argument('--gateway', help='canary target (default: first host)')
+    p.add_argument('--runs', type=int, default=3)
+    p.set_defaults(func=bench_adaptive)
+
+    p = sub.add_parser('save_scan', help='batched save_scan vs row-at-a-time writer')
+    p.add_argument('--devices', type=lambda v: [int(x) for x in v.split(',')],
+                   default=[1000, 5000, 10000])
+    p.set_defaults(func=bench_save_scan)
+
+    p = sub.add_parser('timeseries', help='ring-buffer store memory per NIC-hour and query cost')
+    p.add_argument('--nics', type=int, default=4)
+    p.add_argument('--hours', type=int, default=1)
+    p.set_defaults(func=bench_timeseries)
+
+    p = sub.add_parser('arp', help='ARP spoof detector cost per packet under a flood')
+    p.add_argument('--packets', type=int, default=200_000)
+    p.add_argument('--hosts', type=int, default=500)
+    p.add_argument('--rate', type=int, default=20_000, help='simulated packets/s on the wire')
+    p.add_argument('--spoof', type=float, default=0.05, help='fraction of spoofed gateway replies')
+    p.add_argument('--pcap', help='also write the frames to this pcap file')
+    p.set_defaults(func=bench_arp)
+
+    p = sub.add_parser('oui', help='vendor index startup cost and lookup throughput')
+    p.add_argument('--ma-l', type=int, default=38_000)
+    p.add_argument('--ma-m', type=int, default=6_000)
+    p.add_argument('--ma-s', type=int, default=6_500)
+    p.add_argument('--lookups', type=int, default=200_000)
+    p.set_defaults(func=bench_oui)
+
+    p = sub.add_parser('dashboard', help='dashboard summary: write-through cache vs per-poll queries')
+    p.add_argument('--scans', type=int, default=100_000)
+    p.add_argument('--known', type=int, default=2_000)
+    p.add_argument('--alerts', type=int, default=5_000)
+    p.add_argument('--calls', type=int, default=2_000)
+    p.add_argument('--writes', type=int, default=200)
+    p.set_defaults(func=bench_dashboard)
+
+    p = sub.add_parser('http', help='response bytes and encode time per endpoint and format')
+    p.add_argument('--scans', type=int, default=5_000)
+    p.add_argument('--known', type=int, default=2_000)
+    p.add_argument('--devices', type=int, default=1_000)
+    p.add_argument('--repeat', type=int, default=5)
+    p.set_defaults(func=bench_http)
+
+    p = sub.add_parser('rescore', help='batch risk re-scoring vs scalar predict()')
+    p.add_argument('--scans', type=int, default=100_000)
+    p.set_defaults(func=bench_rescore)
+
+    p = sub.add_parser('rules', help='rule engine cost per scan as the rule count grows')
+    p.add_argument('--sizes', type=lambda v: [int(x) for x in v.split(',')], default=[21, 1000, 5000, 20000])
+    p.add_argument('--rounds', type=int, default=2000)
+    p.set_defaults(func=bench_rules)
+
+    p = sub.add_parser('workers', help='API latency beside a scan on a thread vs in a worker process')
+    p.add_argument('--seconds', type=float, default=3.0)
+    p.set_defaults(func=bench_workers)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,19 +6,134 @@ SQLite schema + helper functions for all persistence
 import sqlite3
 import json
 import os
-from datetime import datetime
+import sys
+import time
+import atexit
+import threading
+import itertools
+import collections
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 
 DB_PATH = os.path.join(os.path.dirname(__file__), 'garuda.db')
 
 
+POOL_SIZE = 8   # idle connections kept open for reuse
+
+# Applied once per connection when it is opened, not on every helper call
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",        # faster concurrent writes
+    "PRAGMA synchronous=NORMAL",      # safe with WAL, far fewer fsyncs
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-16000",       # 16 MB page cache
+    "PRAGMA mmap_size=268435456",     # 256 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+)
+
+
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
+    """Open a standalone, fully configured connection (caller closes it)."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")  # faster concurrent writes
-    conn.execute("PRAGMA foreign_keys=ON")
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
+# ─────────────────────────────────────────────
+#  CONNECTION POOL + SESSIONS
+# ─────────────────────────────────────────────
+
+class ConnectionPool:
+    """
+    Small LIFO pool of configured connections shared by Flask request
+    threads and monitor threads. A thread holds at most one connection at
+    a time; nested sessions on the same thread reuse it.
+    """
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self._idle = []
+        self._path = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+    def _acquire(self):
+        with self._lock:
+            if self._path != DB_PATH:
+                # DB_PATH was repointed (tests / benchmarks) — drop stale connections
+                for conn in self._idle:
+                    conn.close()
+                self._idle = []
+                self._path = DB_PATH
+            if self._idle:
+                return self._idle.pop()
+        return get_conn()
+
+    def _release(self, conn):
+        with self._lock:
+            if not self._closed and self._path == DB_PATH and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def session(self):
+        """Yield a connection; commit when the outermost session exits cleanly."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.conn, self._local.depth = conn, 1
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    def close_all(self):
+        """Close every idle connection and stop pooling (shutdown)."""
+        with self._lock:
+            self._closed = True
+            for conn in self._idle:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._idle = []
+
+    def stats(self):
+        with self._lock:
+            return {'idle': len(self._idle), 'size': self.size, 'closed': self._closed}
+
+
+_pool = ConnectionPool()
+
+
+def session():
+    """Context-managed DB session from the shared pool."""
+    return _pool.session()
+
+
+def close_all():
+    _pool.close_all()
+
+
+atexit.register(close_all)
+
+
 def init_db():
     """Create all tables if they don't exist"""
     conn = get_conn()
@@ -130,82 +245,319 @@ def init_db():
     )""")
 
     conn.commit()
+    migrate(conn)
     conn.close()
     print(f"[DB] Initialized at {DB_PATH}")
 
 
+# ─────────────────────────────────────────────
+#  MIGRATIONS
+# ─────────────────────────────────────────────
+# Applied in order by init_db(); PRAGMA user_version records the last
+# one applied. Append new versions — never edit or reorder shipped ones.
+
+MIGRATIONS = [
+    (1, 'secondary indexes for history queries', [
+        # get_scan_history / dashboard latest + risk trend / 24h count
+        "CREATE INDEX IF NOT EXISTS idx_scans_timestamp ON scans(timestamp)",
+        # get_device_timeline (mac + timestamp DESC)
+        "CREATE INDEX IF NOT EXISTS idx_devices_mac_ts ON devices(mac, timestamp)",
+        # get_recent_device_state (scan_id IN last N scans) + FK lookups
+        "CREATE INDEX IF NOT EXISTS idx_devices_scan ON devices(scan_id)",
+        # get_arp_history — covering: ip + timestamp range, mac read from index
+        "CREATE INDEX IF NOT EXISTS idx_arp_ip_ts ON arp_snapshots(ip, timestamp, mac)",
+        # get_port_changes (timestamp window, grouped by ip)
+        "CREATE INDEX IF NOT EXISTS idx_ports_ts_ip ON port_history(timestamp, ip)",
+        # get_traffic_history (timestamp range)
+        "CREATE INDEX IF NOT EXISTS idx_traffic_ts ON traffic(timestamp)",
+        # get_recent_alerts / dashboard recent alerts
+        "CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts(timestamp)",
+        # unacked count + unacked_only listing
+        "CREATE INDEX IF NOT EXISTS idx_alerts_unacked ON alerts(timestamp) WHERE acknowledged=0",
+        # get_known_devices ORDER BY last_seen DESC
+        "CREATE INDEX IF NOT EXISTS idx_known_last_seen ON known_devices(last_seen)",
+    ]),
+    (2, 'traffic rollup tiers, ARP intervals, retention state', [
+        *[f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            bucket          TEXT PRIMARY KEY,   -- bucket start, truncated ISO time
+            bytes_sent      INTEGER DEFAULT 0,  -- deltas over the bucket
+            bytes_recv      INTEGER DEFAULT 0,
+            packets_sent    INTEGER DEFAULT 0,
+            packets_recv    INTEGER DEFAULT 0,
+            errin           INTEGER DEFAULT 0,
+            errout          INTEGER DEFAULT 0,
+            dropin          INTEGER DEFAULT 0,
+            dropout         INTEGER DEFAULT 0,
+            max_sent_rate   REAL DEFAULT 0,     -- bytes/s
+            max_recv_rate   REAL DEFAULT 0,
+            samples         INTEGER DEFAULT 0
+        )""" for table in ('traffic_1m', 'traffic_1h', 'traffic_1d')],
+        """
+        CREATE TABLE IF NOT EXISTS arp_intervals (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            ip          TEXT NOT NULL,
+            mac         TEXT NOT NULL,
+            first_seen  TEXT NOT NULL,
+            last_seen   TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_arp_intervals_ip ON arp_intervals(ip, last_seen)",
+        "CREATE INDEX IF NOT EXISTS idx_arp_intervals_last ON arp_intervals(last_seen)",
+        "CREATE INDEX IF NOT EXISTS idx_ports_ip_ts ON port_history(ip, timestamp)",
+        """
+        CREATE TABLE IF NOT EXISTS retention_state (
+            key     TEXT PRIMARY KEY,
+            value   TEXT
+        )""",
+    ]),
+    (3, 'change-only ARP bindings', [
+        # NULL while the binding is current; set when it changes or expires
+        "ALTER TABLE arp_intervals ADD COLUMN ended TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_arp_intervals_open ON arp_intervals(ip) WHERE ended IS NULL",
+    ]),
+    (4, 'per-minute traffic flushed from the live store', [
+        # 'live' minutes come from 1s samples and win over scan-derived deltas
+        "ALTER TABLE traffic_1m ADD COLUMN source TEXT DEFAULT 'scan'",
+    ]),
+    (5, 'persisted reverse-DNS answers', [
+        # hostname '' = looked up, no PTR record; checked drives the cache TTL
+        "ALTER TABLE known_devices ADD COLUMN hostname_checked TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_known_last_ip ON known_devices(last_ip)",
+    ]),
+    (6, 'learned sweep profiles per subnet', [
+        """
+        CREATE TABLE IF NOT EXISTS scan_profiles (
+            subnet      TEXT PRIMARY KEY,   -- CIDR
+            profile     TEXT NOT NULL,      -- JSON: rate, srtt, rttvar, loss, runs, responders
+            updated     TEXT NOT NULL
+        )""",
+    ]),
+    (7, 'interface and subnet labels for multi-target scans', [
+        "ALTER TABLE devices ADD COLUMN interface TEXT",
+        "ALTER TABLE devices ADD COLUMN subnet TEXT",
+        # JSON: [{iface, subnet, local_ip, gateway, devices, ...}] swept by the scan
+        "ALTER TABLE scans ADD COLUMN targets TEXT",
+    ]),
+    (8, 'materialized dashboard counters', [
+        # Single row kept current by triggers, so every writer (backend,
+        # monitor, retention) moves it; DashboardCache revalidates against it
+        """
+        CREATE TABLE IF NOT EXISTS dashboard_state (
+            id              INTEGER PRIMARY KEY CHECK (id = 1),
+            version         INTEGER NOT NULL,   -- bumped by every scan / alert change
+            known_devices   INTEGER NOT NULL,
+            unacked_alerts  INTEGER NOT NULL
+        )""",
+        """
+        INSERT OR IGNORE INTO dashboard_state (id, version, known_devices, unacked_alerts)
+        SELECT 1, 0, (SELECT COUNT(*) FROM known_devices),
+               (SELECT COUNT(*) FROM alerts WHERE acknowledged=0)""",
+        """
+        CREATE TRIGGER IF NOT EXISTS dash_scan_insert AFTER INSERT ON scans BEGIN
+            UPDATE dashboard_state SET version=version+1 WHERE id=1;
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS dash_scan_delete AFTER DELETE ON scans BEGIN
+            UPDATE dashboard_state SET version=version+1 WHERE id=1;
+        END""",
+        # fires for new MACs only — the upsert's update path is not an insert
+        """
+        CREATE TRIGGER IF NOT EXISTS dash_known_insert AFTER INSERT ON known_devices BEGIN
+            UPDATE dashboard_state SET known_devices=known_devices+1 WHERE id=1;
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS dash_known_delete AFTER DELETE ON known_devices BEGIN
+            UPDATE dashboard_state SET known_devices=known_devices-1 WHERE id=1;
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS dash_alert_insert AFTER INSERT ON alerts BEGIN
+            UPDATE dashboard_state SET version=version+1,
+                unacked_alerts=unacked_alerts+(COALESCE(NEW.acknowledged, 0)=0) WHERE id=1;
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS dash_alert_ack AFTER UPDATE OF acknowledged ON alerts
+        WHEN OLD.acknowledged IS NOT NEW.acknowledged BEGIN
+            UPDATE dashboard_state SET version=version+1,
+                unacked_alerts=unacked_alerts+(COALESCE(NEW.acknowledged, 0)=0)-(COALESCE(OLD.acknowledged, 0)=0)
+            WHERE id=1;
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS dash_alert_delete AFTER DELETE ON alerts BEGIN
+            UPDATE dashboard_state SET version=version+1,
+                unacked_alerts=unacked_alerts-(COALESCE(OLD.acknowledged, 0)=0) WHERE id=1;
+        END""",
+    ]),
+    (9, 'change counters for HTTP validators', [
+        # One counter per resource, moved by triggers on every writer. Only
+        # low-rate row changes fire them: known_devices' per-scan upserts
+        # land together with a scans insert, so the ETag for the device list
+        # combines both counters instead of paying a trigger per device.
+        """
+        CREATE TABLE IF NOT EXISTS change_counters (
+            name        TEXT PRIMARY KEY,
+            version     INTEGER NOT NULL DEFAULT 0
+        )""",
+        "INSERT OR IGNORE INTO change_counters (name) VALUES ('scans'), ('alerts'), ('known_devices')",
+        """
+        CREATE TRIGGER IF NOT EXISTS chg_scans_insert AFTER INSERT ON scans BEGIN
+            UPDATE change_counters SET version=version+1 WHERE name='scans';
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS chg_scans_delete AFTER DELETE ON scans BEGIN
+            UPDATE change_counters SET version=version+1 WHERE name='scans';
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS chg_alerts_insert AFTER INSERT ON alerts BEGIN
+            UPDATE change_counters SET version=version+1 WHERE name='alerts';
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS chg_alerts_update AFTER UPDATE ON alerts BEGIN
+            UPDATE change_counters SET version=version+1 WHERE name='alerts';
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS chg_alerts_delete AFTER DELETE ON alerts BEGIN
+            UPDATE change_counters SET version=version+1 WHERE name='alerts';
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS chg_known_insert AFTER INSERT ON known_devices BEGIN
+            UPDATE change_counters SET version=version+1 WHERE name='known_devices';
+        END""",
+        """
+        CREATE TRIGGER IF NOT EXISTS chg_known_delete AFTER DELETE ON known_devices BEGIN
+            UPDATE change_counters SET version=version+1 WHERE name='known_devices';
+        END""",
+        # save_hostnames — the one writer that touches known_devices without a scan
+        """
+        CREATE TRIGGER IF NOT EXISTS chg_known_hostname AFTER UPDATE OF hostname_checked ON known_devices BEGIN
+            UPDATE change_counters SET version=version+1 WHERE name='known_devices';
+        END""",
+    ]),
+    (10, 'risk model inputs stored with each scan', [
+        # JSON from AttackPredictor.predict()['inputs']: counts, {port: hosts},
+        # traffic errors — re-scoring must not depend on rows retention deletes
+        "ALTER TABLE scans ADD COLUMN model_inputs TEXT",
+    ]),
+]
+
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Apply every pending migration, each in its own transaction."""
+    current = schema_version(conn)
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            conn.execute("BEGIN")
+            for sql in statements:
+                conn.execute(sql)
+            conn.execute(f"PRAGMA user_version={int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"[DB] Migrated to v{version}: {description}")
+        current = version
+    return current
+
+
 # ─────────────────────────────────────────────
 #  WRITE HELPERS
 # ─────────────────────────────────────────────
 
-def save_scan(scan_result: dict) -> int:
-    """Save a full scan result. Returns scan_id."""
-    conn = get_conn()
-    c = conn.cursor()
+# Prepared once, reused by every save — sqlite3 caches the compiled
+# statement per connection, so executemany only rebinds parameters
+SQL_INSERT_SCAN = """
+    INSERT INTO scans (timestamp, duration, ssid, bssid, encryption, signal,
+        gateway_ip, local_ip, device_count, active_count, unknown_count,
+        risk_score, risk_label, threat_level, targets, model_inputs)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+"""
+SQL_INSERT_DEVICE = """
+    INSERT INTO devices (scan_id, timestamp, ip, mac, vendor, hostname,
+        status, detection_method, open_ports, device_type, interface, subnet)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+"""
+SQL_UPSERT_KNOWN = """
+    INSERT INTO known_devices (mac, vendor, hostname, first_seen, last_seen, last_ip, times_seen)
+    VALUES (?,?,?,?,?,?,1)
+    ON CONFLICT(mac) DO UPDATE SET
+        last_seen=excluded.last_seen,
+        last_ip=excluded.last_ip,
+        times_seen=times_seen+1,
+        vendor=COALESCE(excluded.vendor, vendor),
+        hostname=COALESCE(excluded.hostname, hostname)
+"""
+SQL_INSERT_TRAFFIC = """
+    INSERT INTO traffic (timestamp, bytes_sent, bytes_recv, packets_sent,
+        packets_recv, errin, errout, dropin, dropout)
+    VALUES (?,?,?,?,?,?,?,?,?)
+"""
+SQL_INSERT_PORTS = "INSERT INTO port_history (timestamp, ip, mac, ports) VALUES (?,?,?,?)"
+
+
+SAVE_CHUNK = 500   # rows per executemany — bounds memory on very large scans
+
+
+def _chunks(rows, size=None):
+    size = size or SAVE_CHUNK
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def save_scan(scan_result: dict, stats: dict = None) -> int:
+    """
+    Save a full scan result in one transaction. Returns scan_id.
+    Rows are generated per table and written SAVE_CHUNK at a time with
+    executemany, so memory stays flat however many devices a scan finds.
+    Pass `stats={}` to get back {table: {'rows': n, 'ms': t}}.
+    """
     now = datetime.now().isoformat()
 
     net = scan_result.get('connected_network', {})
     pred = scan_result.get('attack_prediction', {})
     summary = scan_result.get('security_summary', {})
     devices = scan_result.get('connected_devices', [])
-
-    # Insert scan row
-    c.execute("""
-    INSERT INTO scans (timestamp, duration, ssid, bssid, encryption, signal,
-        gateway_ip, local_ip, device_count, active_count, unknown_count,
-        risk_score, risk_label, threat_level)
-    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-    """, (
-        now,
-        float(scan_result.get('scan_duration', '0').replace('s', '') or 0),
-        net.get('ssid'), net.get('bssid'), net.get('encryption'), net.get('signal'),
-        scan_result.get('gateway'), scan_result.get('local_ip'),
-        summary.get('total_devices', len(devices)),
-        summary.get('active_devices', 0),
-        summary.get('unknown_vendors', 0),
-        pred.get('risk_score', 0),
-        pred.get('risk_label', 'UNKNOWN'),
-        summary.get('threat_level', 'UNKNOWN')
-    ))
-    scan_id = c.lastrowid
-
-    # Insert devices
     port_data = scan_result.get('port_scan', {})
+
+    arp_table = {}
+    ip_to_mac = {}
     for d in devices:
-        ip = d.get('ip', '')
-        ports = port_data.get(ip, [])
-        c.execute("""
-        INSERT INTO devices (scan_id, timestamp, ip, mac, vendor, hostname,
-            status, detection_method, open_ports, device_type)
-        VALUES (?,?,?,?,?,?,?,?,?,?)
-        """, (
-            scan_id, now, ip, d.get('mac'), d.get('vendor'),
-            d.get('hostname'), d.get('status'), d.get('detection_method'),
-            json.dumps(ports), d.get('type', 'NODE')
-        ))
+        ip, mac = d.get('ip', ''), d.get('mac', '')
+        ip_to_mac.setdefault(ip, d.get('mac'))
+        if ip and mac and mac not in ('Unknown', '<INCOMPLETE>'):
+            arp_table[ip] = mac
+
+    # ── Row generators ────────────────────────────────────
+    def device_rows(scan_id):
+        for d in devices:
+            ip = d.get('ip', '')
+            yield (scan_id, now, ip, d.get('mac'), d.get('vendor'),
+                   d.get('hostname'), d.get('status'), d.get('detection_method'),
+                   json.dumps(port_data.get(ip, [])), d.get('type', 'NODE'),
+                   d.get('interface'), d.get('subnet'))
+
+    def known_rows():
+        for d in devices:
+            mac = d.get('mac', '')
+            if mac and mac not in ('Unknown', '<INCOMPLETE>'):
+                yield (mac, d.get('vendor'), d.get('hostname'), now, now, d.get('ip', ''))
+
+    def port_rows():
+        for ip, ports in port_data.items():
+            yield (now, ip, ip_to_mac.get(ip), json.dumps(ports))
 
-        # Update known_devices
-        mac = d.get('mac', '')
-        if mac and mac not in ('Unknown', '<INCOMPLETE>'):
-            c.execute("""
-            INSERT INTO known_devices (mac, vendor, hostname, first_seen, last_seen, last_ip, times_seen)
-            VALUES (?,?,?,?,?,?,1)
-            ON CONFLICT(mac) DO UPDATE SET
-                last_seen=excluded.last_seen,
-                last_ip=excluded.last_ip,
-                times_seen=times_seen+1,
-                vendor=COALESCE(excluded.vendor, vendor),
-                hostname=COALESCE(excluded.hostname, hostname)
-            """, (mac, d.get('vendor'), d.get('hostname'), now, now, ip))
-
-    # Save traffic snapshot
     t = scan_result.get('network_traffic', {})
+    traffic_rows = []
     if t and 'bytes_sent_raw' in t:
-        c.execute("""
-        INSERT INTO traffic (timestamp, bytes_sent, bytes_recv, packets_sent,
-            packets_recv, errin, errout, dropin, dropout)
-        VALUES (?,?,?,?,?,?,?,?,?)
-        """, (
+        traffic_rows.append((
             now,
             t.get('bytes_sent_raw', 0), t.get('bytes_recv_raw', 0),
             t.get('packets_sent_raw', 0), t.get('packets_recv_raw', 0),
@@ -213,42 +565,247 @@ def save_scan(scan_result: dict) -> int:
             t.get('dropin', 0), t.get('dropout', 0)
         ))
 
-    # Save ARP snapshot
-    for d in devices:
-        ip = d.get('ip', '')
-        mac = d.get('mac', '')
-        if ip and mac and mac != 'Unknown':
-            c.execute(
-                "INSERT INTO arp_snapshots (timestamp, ip, mac) VALUES (?,?,?)",
-                (now, ip, mac)
-            )
+    # ── Write everything in one transaction ───────────────
+    timings = {}
+    with session() as conn:
+        start = time.perf_counter()
+        c = conn.execute(SQL_INSERT_SCAN, (
+            now,
+            float(scan_result.get('scan_duration', '0').replace('s', '') or 0),
+            net.get('ssid'), net.get('bssid'), net.get('encryption'), net.get('signal'),
+            scan_result.get('gateway'), scan_result.get('local_ip'),
+            summary.get('total_devices', len(devices)),
+            summary.get('active_devices', 0),
+            summary.get('unknown_vendors', 0),
+            pred.get('risk_score', 0),
+            pred.get('risk_label', 'UNKNOWN'),
+            summary.get('threat_level', 'UNKNOWN'),
+            json.dumps(scan_result['targets']) if scan_result.get('targets') else None,
+            json.dumps(pred['inputs']) if pred.get('inputs') else None
+        ))
+        scan_id = c.lastrowid
+        timings['scans'] = (1, time.perf_counter() - start)
 
-    # Save port history
-    for ip, ports in port_data.items():
-        mac = next((d.get('mac') for d in devices if d.get('ip') == ip), None)
-        c.execute(
-            "INSERT INTO port_history (timestamp, ip, mac, ports) VALUES (?,?,?,?)",
-            (now, ip, mac, json.dumps(ports))
-        )
+        for table, sql, rows in (
+            ('devices', SQL_INSERT_DEVICE, device_rows(scan_id)),
+            ('known_devices', SQL_UPSERT_KNOWN, known_rows()),
+            ('traffic', SQL_INSERT_TRAFFIC, traffic_rows),
+            ('port_history', SQL_INSERT_PORTS, port_rows()),
+        ):
+            start = time.perf_counter()
+            written = 0
+            for chunk in _chunks(rows):
+                conn.executemany(sql, chunk)
+                written += len(chunk)
+            timings[table] = (written, time.perf_counter() - start)
 
-    conn.commit()
-    conn.close()
+        # ARP state is change-only: rows are written only when a binding
+        # appears, changes or expires
+        start = time.perf_counter()
+        written = arp_bindings.observe(conn, arp_table, now)
+        timings['arp_intervals'] = (written, time.perf_counter() - start)
+
+        scan_row = conn.execute("SELECT * FROM scans WHERE id=?", (scan_id,)).fetchone()
+        state = _dashboard_state(conn)
+    dashboard.scan_saved(dict(scan_row), state)
+
+    if stats is not None:
+        stats.update({k: {'rows': n, 'ms': round(dt * 1000, 3)} for k, (n, dt) in timings.items()})
     return scan_id
 
 
 def save_alert(type_: str, severity: str, title: str, description: str = None,
                ip: str = None, mac: str = None, extra: dict = None):
     """Save an alert to the database."""
-    conn = get_conn()
-    conn.execute("""
-    INSERT INTO alerts (timestamp, type, severity, title, description, ip, mac, extra)
-    VALUES (?,?,?,?,?,?,?,?)
-    """, (
-        datetime.now().isoformat(), type_, severity, title,
-        description, ip, mac, json.dumps(extra or {})
-    ))
-    conn.commit()
-    conn.close()
+    with session() as conn:
+        c = conn.execute("""
+        INSERT INTO alerts (timestamp, type, severity, title, description, ip, mac, extra)
+        VALUES (?,?,?,?,?,?,?,?)
+        """, (
+            datetime.now().isoformat(), type_, severity, title,
+            description, ip, mac, json.dumps(extra or {})
+        ))
+        alert_row = conn.execute("SELECT * FROM alerts WHERE id=?", (c.lastrowid,)).fetchone()
+        state = _dashboard_state(conn)
+    dashboard.alert_saved(dict(alert_row), state)
+
+
+def save_hostnames(names: dict, macs: dict = None):
+    """
+    Persist reverse-DNS answers {ip: hostname or ''}. With the MAC behind an
+    IP ({ip: mac}) the device row is upserted, so a host in its first scan
+    is stored before save_scan creates it (times_seen 0 — the scan's upsert
+    counts the sighting); without one, the device last seen at the IP is updated.
+    """
+    now = datetime.now().isoformat()
+    macs = {ip: mac for ip, mac in (macs or {}).items() if mac and mac not in ('Unknown', '<INCOMPLETE>')}
+    with session() as conn:
+        conn.executemany("""
+            INSERT INTO known_devices (mac, hostname, hostname_checked, first_seen, last_seen, last_ip, times_seen)
+            VALUES (?,?,?,?,?,?,0)
+            ON CONFLICT(mac) DO UPDATE SET
+                hostname=excluded.hostname,
+                hostname_checked=excluded.hostname_checked,
+                last_ip=COALESCE(last_ip, excluded.last_ip)
+        """, [(macs[ip], name, now, now, now, ip) for ip, name in names.items() if ip in macs])
+        conn.executemany("""
+            UPDATE known_devices SET hostname=?, hostname_checked=? WHERE last_ip=?
+        """, [(name, now, ip) for ip, name in names.items() if ip not in macs])
+
+
+def load_hostnames():
+    """[(ip, hostname, checked_epoch)] for every device with a recorded lookup."""
+    with session() as conn:
+        rows = conn.execute("""
+            SELECT last_ip, hostname, hostname_checked FROM known_devices
+            WHERE hostname_checked IS NOT NULL
+        """).fetchall()
+    return [(r['last_ip'], r['hostname'] or '', datetime.fromisoformat(r['hostname_checked']).timestamp())
+            for r in rows]
+
+
+def save_scan_profile(subnet: str, profile: dict):
+    """Persist the sweep profile learned for `subnet` (see scan_profile.py)."""
+    with session() as conn:
+        conn.execute("""
+            INSERT INTO scan_profiles (subnet, profile, updated) VALUES (?, ?, ?)
+            ON CONFLICT(subnet) DO UPDATE SET profile=excluded.profile, updated=excluded.updated
+        """, (subnet, json.dumps(profile), datetime.now().isoformat()))
+
+
+def load_scan_profile(subnet: str):
+    """The stored profile dict for `subnet`, or None."""
+    with session() as conn:
+        row = conn.execute("SELECT profile FROM scan_profiles WHERE subnet=?", (subnet,)).fetchone()
+    return json.loads(row['profile']) if row else None
+
+
+# ─────────────────────────────────────────────
+#  ARP BINDINGS
+# ─────────────────────────────────────────────
+
+ARP_BINDING_EXPIRY_MINUTES = 30     # unseen this long → binding ends
+ARP_CHECKPOINT_MINUTES = 60         # persist last_seen of live bindings this often
+ARP_SPOOF_WINDOW_HOURS = 24
+
+
+class ArpBindingStore:
+    """
+    IP→MAC bindings kept as intervals in arp_intervals, with the open
+    ones mirrored in memory. Observing an unchanged table costs no DB
+    work; a row is written only when a binding appears, changes or
+    expires (plus an occasional last_seen checkpoint). Spoof checks read
+    the intervals themselves (analyze_arp_spoofing).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._path = None
+        self._current = {}    # ip → {'id', 'mac', 'first_seen', 'last_seen', 'saved'}
+
+    # ── loading ───────────────────────────────────────────
+    def _ensure_loaded(self, conn):
+        if self._path == DB_PATH:
+            return
+        self._current = {}
+        for row in conn.execute("""
+            SELECT id, ip, mac, first_seen, last_seen FROM arp_intervals
+            WHERE ended IS NULL ORDER BY id
+        """):
+            self._current[row['ip']] = {'id': row['id'], 'mac': row['mac'], 'first_seen': row['first_seen'],
+                                        'last_seen': row['last_seen'], 'saved': row['last_seen']}
+        self._path = DB_PATH
+
+    # ── writes ────────────────────────────────────────────
+    def _open(self, conn, changed, now):
+        """Open intervals for [(ip, mac)] whose binding changed. Returns rows written."""
+        ips = json.dumps([ip for ip, _ in changed])
+        # Another process may already have recorded some of these changes
+        latest = {row['ip']: row for row in conn.execute("""
+            SELECT id, ip, mac, first_seen, last_seen FROM arp_intervals
+            WHERE ended IS NULL AND ip IN (SELECT value FROM json_each(?)) ORDER BY id
+        """, (ips,))}
+        ends, opens = [], []
+        for ip, mac in changed:
+            row = latest.get(ip)
+            if row and row['mac'] == mac:
+                self._current[ip] = {'id': row['id'], 'mac': mac, 'first_seen': row['first_seen'],
+                                     'last_seen': now, 'saved': row['last_seen']}
+                continue
+            if row:
+                ends.append((now, row['id']))
+            opens.append((ip, mac, now, now))
+        conn.executemany("UPDATE arp_intervals SET ended=? WHERE id=? AND ended IS NULL", ends)
+        conn.executemany("""
+            INSERT INTO arp_intervals (ip, mac, first_seen, last_seen) VALUES (?,?,?,?)
+        """, opens)
+        if opens:
+            # this transaction holds the write lock, so AUTOINCREMENT handed
+            # out consecutive ids ending at the last one inserted
+            first = conn.execute("SELECT last_insert_rowid()").fetchone()[0] - len(opens) + 1
+            for rowid, (ip, mac, _, _) in enumerate(opens, first):
+                self._current[ip] = {'id': rowid, 'mac': mac, 'first_seen': now, 'last_seen': now, 'saved': now}
+        return len(ends) + len(opens)
+
+    def observe(self, conn, table: dict, now: str = None) -> int:
+        """Apply a full or partial ip → mac table. Returns rows written."""
+        now = now or datetime.now().isoformat()
+        with self._lock:
+            self._ensure_loaded(conn)
+            closes, changed = [], []
+            for ip, mac in table.items():
+                cur = self._current.get(ip)
+                if cur and cur['mac'] == mac:
+                    cur['last_seen'] = now
+                    continue
+                if cur:
+                    del self._current[ip]
+                    closes.append((cur['last_seen'], now, cur['id']))
+                changed.append((ip, mac))
+
+            checkpoint = _since(minutes=ARP_CHECKPOINT_MINUTES)
+            expiry = _since(minutes=ARP_BINDING_EXPIRY_MINUTES)
+            saves = []
+            for ip, cur in list(self._current.items()):
+                if cur['last_seen'] < expiry:
+                    del self._current[ip]
+                    closes.append((cur['last_seen'], cur['last_seen'], cur['id']))
+                elif cur['saved'] < checkpoint:
+                    saves.append((cur['last_seen'], cur['id']))
+                    cur['saved'] = cur['last_seen']
+
+            # closes go first so the open-interval lookup below no longer sees them.
+            # Other processes keep their own _current: only touch intervals that
+            # are still open, and never move last_seen backwards
+            conn.executemany("""
+                UPDATE arp_intervals SET last_seen=MAX(last_seen, ?), ended=MAX(last_seen, ?) WHERE id=? AND ended IS NULL
+            """, closes)
+            conn.executemany("""
+                UPDATE arp_intervals SET last_seen=MAX(last_seen, ?) WHERE id=? AND ended IS NULL
+            """, saves)
+            written = len(closes) + len(saves)
+            if changed:
+                written += self._open(conn, changed, now)
+        return written
+
+    def invalidate(self):
+        """Another process recorded bindings — reload the open intervals on next use."""
+        with self._lock:
+            self._path = None
+
+    # ── lookups ───────────────────────────────────────────
+    def current(self, ip):
+        cur = self._current.get(ip)
+        return cur['mac'] if cur else None
+
+
+arp_bindings = ArpBindingStore()
+
+
+def observe_arp_table(table: dict) -> int:
+    """Feed a live ARP table (e.g. from the 30s watcher) into the binding store."""
+    with session() as conn:
+        return arp_bindings.observe(conn, table)
 
 
 # ─────────────────────────────────────────────
@@ -256,22 +813,70 @@ def save_alert(type_: str, severity: str, title: str, description: str = None,
 # ─────────────────────────────────────────────
 
 def get_scan_history(limit=50):
-    conn = get_conn()
-    rows = conn.execute("""
-        SELECT * FROM scans ORDER BY timestamp DESC LIMIT ?
-    """, (limit,)).fetchall()
-    conn.close()
+    with session() as conn:
+        rows = conn.execute("""
+            SELECT * FROM scans ORDER BY timestamp DESC LIMIT ?
+        """, (limit,)).fetchall()
     return [dict(r) for r in rows]
 
 
+def get_scan_devices(scan_id=None, after_id=0, limit=100):
+    """
+    One keyset page of a scan's devices, in the order the scan listed them.
+    `scan_id` None = latest scan; `after_id` is the previous page's
+    next_cursor. Returns None when there is no such scan.
+    """
+    with session() as conn:
+        scan = conn.execute(
+            "SELECT id, device_count FROM scans WHERE id=?" if scan_id else
+            "SELECT id, device_count FROM scans ORDER BY id DESC LIMIT 1",
+            (scan_id,) if scan_id else ()).fetchone()
+        if not scan:
+            return None
+        rows = conn.execute("""
+            SELECT id, ip, mac, vendor, hostname, status, detection_method, open_ports, device_type,
+                   interface, subnet
+            FROM devices WHERE scan_id=? AND id>? ORDER BY id LIMIT ?
+        """, (scan['id'], after_id, limit + 1)).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'scan_id': scan['id'],
+        'total': scan['device_count'],
+        'devices': [{
+            'ip': r['ip'], 'mac': r['mac'], 'vendor': r['vendor'], 'hostname': r['hostname'],
+            'status': r['status'], 'detection_method': r['detection_method'],
+            'open_ports': json.loads(r['open_ports'] or '[]'), 'type': r['device_type'],
+            'interface': r['interface'], 'subnet': r['subnet'],
+        } for r in rows],
+        'next_cursor': rows[-1]['id'] if more else None,
+    }
+
+
 def get_recent_alerts(limit=50, unacked_only=False):
-    conn = get_conn()
-    q = "SELECT * FROM alerts"
-    if unacked_only:
-        q += " WHERE acknowledged=0"
-    q += " ORDER BY timestamp DESC LIMIT ?"
-    rows = conn.execute(q, (limit,)).fetchall()
-    conn.close()
+    with session() as conn:
+        q = "SELECT * FROM alerts"
+        if unacked_only:
+            q += " WHERE acknowledged=0"
+        q += " ORDER BY timestamp DESC LIMIT ?"
+        rows = conn.execute(q, (limit,)).fetchall()
+    result = []
+    for r in rows:
+        d = dict(r)
+        if d.get('extra'):
+            try:
+                d['extra'] = json.loads(d['extra'])
+            except:
+                pass
+        result.append(d)
+    return result
+
+
+def get_alerts_since(after_id=0, limit=100):
+    """Alerts with id > after_id, oldest first — a rowid range, so cheap to poll."""
+    with session() as conn:
+        rows = conn.execute("SELECT * FROM alerts WHERE id > ? ORDER BY id LIMIT ?",
+                            (after_id, limit)).fetchall()
     result = []
     for r in rows:
         d = dict(r)
@@ -285,38 +890,59 @@ def get_recent_alerts(limit=50, unacked_only=False):
 
 
 def get_known_devices(trusted_only=False):
-    conn = get_conn()
-    q = "SELECT * FROM known_devices"
-    if trusted_only:
-        q += " WHERE is_trusted=1"
-    q += " ORDER BY last_seen DESC"
-    rows = conn.execute(q).fetchall()
-    conn.close()
+    with session() as conn:
+        q = "SELECT * FROM known_devices"
+        if trusted_only:
+            q += " WHERE is_trusted=1"
+        q += " ORDER BY last_seen DESC"
+        rows = conn.execute(q).fetchall()
     return [dict(r) for r in rows]
 
 
 def get_traffic_history(hours=24):
-    conn = get_conn()
-    rows = conn.execute("""
-        SELECT * FROM traffic
-        WHERE timestamp >= datetime('now', ?)
-        ORDER BY timestamp ASC
-    """, (f'-{hours} hours',)).fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+    """
+    Traffic for the last `hours`, read from the finest tier that still
+    covers the whole range: raw samples, then per-minute, per-hour and
+    per-day buckets. Every tier has the same shape — counter deltas over
+    the row's interval plus peak rates — and every row carries its `tier`.
+    """
+    tier = traffic_tier_for(hours)
+    with session() as conn:
+        if tier == 'raw':
+            since = _since(hours=hours)
+            # the sample just before the range is the baseline for the first delta
+            prev = conn.execute("""
+                SELECT * FROM traffic WHERE timestamp < ?
+                ORDER BY timestamp DESC LIMIT 1
+            """, (since,)).fetchone()
+            rows = conn.execute("""
+                SELECT * FROM traffic
+                WHERE timestamp >= ?
+                ORDER BY timestamp ASC
+            """, (since,)).fetchall()
+            rows = [{'timestamp': r['timestamp'], **delta,
+                     'max_sent_rate': delta['bytes_sent'] / dt, 'max_recv_rate': delta['bytes_recv'] / dt,
+                     'samples': 1}
+                    for r, delta, dt in _counter_deltas(prev and dict(prev), rows)]
+        else:
+            rows = conn.execute(f"""
+                SELECT bucket AS timestamp, * FROM {TRAFFIC_TIERS[tier]['table']}
+                WHERE bucket >= ?
+                ORDER BY bucket ASC
+            """, (_since(hours=hours)[:TRAFFIC_TIERS[tier]['width']],)).fetchall()
+    return [{**dict(r), 'tier': tier} for r in rows]
 
 
 def get_device_timeline(mac: str):
     """Full history for a specific device by MAC."""
-    conn = get_conn()
-    rows = conn.execute("""
-        SELECT d.timestamp, d.ip, d.status, d.open_ports, d.detection_method
-        FROM devices d
-        WHERE d.mac = ?
-        ORDER BY d.timestamp DESC
-        LIMIT 100
-    """, (mac,)).fetchall()
-    conn.close()
+    with session() as conn:
+        rows = conn.execute("""
+            SELECT d.timestamp, d.ip, d.status, d.open_ports, d.detection_method
+            FROM devices d
+            WHERE d.mac = ?
+            ORDER BY d.timestamp DESC
+            LIMIT 100
+        """, (mac,)).fetchall()
     result = []
     for r in rows:
         d = dict(r)
@@ -330,31 +956,171 @@ def get_device_timeline(mac: str):
 
 
 def get_arp_history(ip: str, hours: int = 24):
-    """Get MAC history for an IP — detect if it changed (ARP spoofing)."""
-    conn = get_conn()
-    rows = conn.execute("""
-        SELECT timestamp, ip, mac FROM arp_snapshots
-        WHERE ip = ? AND timestamp >= datetime('now', ?)
-        ORDER BY timestamp DESC
-    """, (ip, f'-{hours} hours')).fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+    """
+    Get MAC history for an IP — detect if it changed (ARP spoofing).
+    One row per binding interval (ip, mac, first_seen, last_seen/timestamp)
+    overlapping the range, plus any legacy per-scan snapshots.
+    """
+    since = _since(hours=hours)
+    with session() as conn:
+        rows = [dict(r) for r in conn.execute("""
+            SELECT last_seen AS timestamp, ip, mac, first_seen, ended FROM arp_intervals
+            WHERE ip = ? AND (last_seen >= ? OR ended IS NULL)
+            ORDER BY last_seen DESC
+        """, (ip, since)).fetchall()]
+        rows += [dict(r) for r in conn.execute("""
+            SELECT timestamp, ip, mac FROM arp_snapshots
+            WHERE ip = ? AND timestamp >= ?
+            ORDER BY timestamp DESC
+        """, (ip, since)).fetchall()]
+    rows.sort(key=lambda r: r['timestamp'], reverse=True)
+    return rows
 
 
-def get_dashboard_summary():
-    """Single call to get everything needed for dashboard."""
-    conn = get_conn()
+def analyze_arp_spoofing(current_table: dict, hours: int = ARP_SPOOF_WINDOW_HOURS):
+    """
+    Bulk spoof check for a whole ARP table in one grouped query.
+    Returns {ip: {current_mac, macs, changes}} for every IP bound to more
+    than one MAC within `hours` (the live binding counts). `changes` lists
+    each binding with the time it started and, if over, ended.
+    """
+    if not current_table:
+        return {}
+    since = _since(hours=hours)
+    with session() as conn:
+        rows = conn.execute("""
+            WITH cur(ip, mac) AS (SELECT key, value FROM json_each(?)),
+            bindings(ip, mac, first_seen, last_seen, ended) AS (
+                SELECT i.ip, i.mac, i.first_seen, i.last_seen, i.ended
+                FROM cur JOIN arp_intervals i ON i.ip = cur.ip
+                WHERE i.last_seen >= ? OR i.ended IS NULL
+                UNION ALL
+                SELECT s.ip, s.mac, MIN(s.timestamp), MAX(s.timestamp), NULL
+                FROM cur JOIN arp_snapshots s ON s.ip = cur.ip
+                WHERE s.timestamp >= ?
+                GROUP BY s.ip, s.mac
+            )
+            SELECT b.ip, cur.mac AS current_mac,
+                   json_group_array(json_object(
+                       'mac', b.mac, 'first_seen', b.first_seen,
+                       'last_seen', b.last_seen, 'ended', b.ended)) AS changes
+            FROM bindings b JOIN cur ON cur.ip = b.ip
+            GROUP BY b.ip
+            HAVING COUNT(DISTINCT b.mac) > 1 OR MAX(b.mac != cur.mac) = 1
+        """, (json.dumps(current_table), since, since)).fetchall()
+
+    result = {}
+    for r in rows:
+        changes = sorted(json.loads(r['changes']), key=lambda c: c['first_seen'])
+        macs = sorted({c['mac'] for c in changes} | {r['current_mac']})
+        result[r['ip']] = {'current_mac': r['current_mac'], 'macs': macs, 'changes': changes}
+    return result
+
+
+FEATURE_COLUMNS = ('scan_id', 'timestamp', 'encryption', 'risk_score', 'risk_label', 'devices', 'unknown',
+                   'arp_only', 'open_ports', 'risky_open', 'errin', 'dropin', 'packets_recv')
+
 
+def get_scan_features(since=None, until=None, limit=None, risky_ports=()):
+    """
+    Per-scan inputs of the risk model as columns {name: [values]}, oldest
+    scan first (the latest `limit` scans when given). Counts come from the
+    model_inputs saved with each scan. Scans saved before that column
+    existed fall back to aggregating the devices table and the traffic
+    row written with the scan (absent → 0 / 1).
+    """
+    where, params = [], []
+    if since:
+        where.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        where.append("timestamp < ?")
+        params.append(until)
+    columns = {name: [] for name in FEATURE_COLUMNS}
+    with session() as conn:
+        scans = conn.execute(f"""
+            SELECT id, timestamp, encryption, risk_score, risk_label, model_inputs,
+                (SELECT errin FROM traffic WHERE timestamp = s.timestamp AND s.model_inputs IS NULL
+                 LIMIT 1) AS errin,
+                (SELECT dropin FROM traffic WHERE timestamp = s.timestamp AND s.model_inputs IS NULL
+                 LIMIT 1) AS dropin,
+                (SELECT packets_recv FROM traffic WHERE timestamp = s.timestamp AND s.model_inputs IS NULL
+                 LIMIT 1) AS packets_recv
+            FROM scans s {'WHERE ' + ' AND '.join(where) if where else ''}
+            ORDER BY id DESC {'LIMIT ?' if limit else ''}
+        """, params + ([limit] if limit else [])).fetchall()[::-1]
+        if not scans:
+            return columns
+        legacy = [s['id'] for s in scans if s['model_inputs'] is None]
+        counts = {}
+        if legacy:
+            risky = ','.join(str(int(p)) for p in risky_ports) or 'NULL'
+            counts = {r['scan_id']: r for r in conn.execute(f"""
+                SELECT scan_id, COUNT(*) AS devices,
+                    SUM(vendor IN ('Unknown', 'Unknown Vendor')) AS unknown,
+                    SUM(detection_method = 'ARP_ONLY') AS arp_only,
+                    SUM(json_array_length(open_ports)) AS open_ports,
+                    SUM((SELECT COUNT(*) FROM json_each(open_ports) WHERE value IN ({risky}))) AS risky_open
+                FROM devices WHERE scan_id BETWEEN ? AND ? GROUP BY scan_id
+            """, (legacy[0], legacy[-1]))}
+
+    risky_ports = {int(p) for p in risky_ports}
+    for s in scans:
+        if s['model_inputs'] is not None:
+            inputs = json.loads(s['model_inputs'])
+            ports = inputs.get('ports', {})
+            row = {'devices': inputs['devices'], 'unknown': inputs['unknown'], 'arp_only': inputs['arp_only'],
+                   'open_ports': sum(ports.values()),
+                   'risky_open': sum(n for port, n in ports.items() if int(port) in risky_ports),
+                   'errin': inputs['errin'], 'dropin': inputs['dropin'], 'packets_recv': inputs['packets_recv'] or 1}
+        else:
+            c = counts.get(s['id'])
+            row = {'devices': c['devices'] if c else 0, 'unknown': (c['unknown'] or 0) if c else 0,
+                   'arp_only': (c['arp_only'] or 0) if c else 0, 'open_ports': (c['open_ports'] or 0) if c else 0,
+                   'risky_open': (c['risky_open'] or 0) if c else 0,
+                   'errin': s['errin'] or 0, 'dropin': s['dropin'] or 0, 'packets_recv': s['packets_recv'] or 1}
+        for name, value in (
+            ('scan_id', s['id']), ('timestamp', s['timestamp']), ('encryption', s['encryption'] or ''),
+            ('risk_score', s['risk_score']), ('risk_label', s['risk_label']), *row.items(),
+        ):
+            columns[name].append(value)
+    return columns
+
+
+def get_recent_device_state(scans: int = 3):
+    """
+    Latest known state per IP across the last few scans:
+    ip → {mac, open_ports, timestamp}. Seeds incremental rescans.
+    """
+    with session() as conn:
+        rows = conn.execute("""
+            SELECT ip, mac, open_ports, timestamp FROM devices
+            WHERE scan_id IN (SELECT id FROM scans ORDER BY id DESC LIMIT ?)
+            ORDER BY scan_id DESC
+        """, (scans,)).fetchall()
+    state = {}
+    for r in rows:
+        if not r['ip'] or r['ip'] in state:
+            continue
+        try:
+            ports = json.loads(r['open_ports'] or '[]')
+        except:
+            ports = []
+        state[r['ip']] = {'mac': r['mac'], 'open_ports': ports, 'timestamp': r['timestamp']}
+    return state
+
+
+def _query_dashboard(conn):
+    """The six dashboard queries. Returns (summary, timestamps of the last 24h's scans)."""
     # Latest scan
     latest = conn.execute(
         "SELECT * FROM scans ORDER BY timestamp DESC LIMIT 1"
     ).fetchone()
 
-    # Scan count last 24h
-    scan_count_24h = conn.execute("""
-        SELECT COUNT(*) as cnt FROM scans
-        WHERE timestamp >= datetime('now', '-24 hours')
-    """).fetchone()['cnt']
+    # Scans in the last 24h — kept as timestamps so the count can age without a query
+    window = [r['timestamp'] for r in conn.execute("""
+        SELECT timestamp FROM scans WHERE timestamp >= ? ORDER BY timestamp
+    """, (_since(hours=24),))]
 
     # Total unique devices ever seen
     total_known = conn.execute(
@@ -367,8 +1133,8 @@ def get_dashboard_summary():
     ).fetchone()['cnt']
 
     # Risk trend (last 10 scans)
-    risk_trend = conn.execute("""
-        SELECT timestamp, risk_score, risk_label, device_count, threat_level
+    risk_trend = conn.execute(f"""
+        SELECT {', '.join(RISK_TREND_COLUMNS)}
         FROM scans ORDER BY timestamp DESC LIMIT 10
     """).fetchall()
 
@@ -377,34 +1143,178 @@ def get_dashboard_summary():
         SELECT * FROM alerts ORDER BY timestamp DESC LIMIT 10
     """).fetchall()
 
-    conn.close()
-
     return {
         'latest_scan': dict(latest) if latest else None,
-        'scans_last_24h': scan_count_24h,
+        'scans_last_24h': len(window),
         'total_known_devices': total_known,
         'unacked_alerts': unacked,
         'risk_trend': [dict(r) for r in risk_trend],
         'recent_alerts': [dict(r) for r in recent_alerts],
-    }
+    }, window
+
+
+def query_dashboard_summary():
+    """Dashboard summary straight from the tables, bypassing the cache."""
+    with session() as conn:
+        return _query_dashboard(conn)[0]
+
+
+def _dashboard_state(conn):
+    return conn.execute("""
+        SELECT version, known_devices, unacked_alerts FROM dashboard_state WHERE id=1
+    """).fetchone()
+
+
+DASHBOARD_RECHECK = 1.0    # seconds between checks for other processes' writes
+RISK_TREND_COLUMNS = ('timestamp', 'risk_score', 'risk_label', 'device_count', 'threat_level')
+
+
+class DashboardCache:
+    """
+    The dashboard summary, materialized in memory. save_scan, save_alert
+    and acknowledge_alert patch it in place after they commit; writes
+    from other processes (monitor.py) show up as a new dashboard_state
+    version, checked at most every DASHBOARD_RECHECK seconds. Between
+    writes a poll costs no DB work, and the ETag only changes with the
+    summary, so unchanged polls can be answered 304.
+    """
+
+    def __init__(self, recheck=DASHBOARD_RECHECK):
+        self.recheck = recheck
+        self._lock = threading.Lock()
+        self._path = None
+        self._summary = None
+        self._version = None
+        self._window = collections.deque()   # last 24h's scan timestamps, oldest first
+        self._checked = 0.0
+        self._epoch = os.urandom(4).hex()     # ETags from an earlier process never match
+        self.stats = collections.Counter()
+
+    def _load(self, conn):
+        state = _dashboard_state(conn)
+        summary, window = _query_dashboard(conn)
+        self._summary, self._window = summary, collections.deque(window)
+        self._version = state['version'] if state else None
+        self._path = DB_PATH
+        self.stats['rebuilds'] += 1
+
+    def snapshot(self):
+        """(summary, etag). Rebuilds only when the database moved on."""
+        with self._lock:
+            now = time.monotonic()
+            if self._summary is None or self._path != DB_PATH:
+                with session() as conn:
+                    self._load(conn)
+                self._checked = now
+            elif now - self._checked >= self.recheck:
+                with session() as conn:
+                    state = _dashboard_state(conn)
+                    if state is None or state['version'] != self._version or \
+                            state['known_devices'] != self._summary['total_known_devices']:
+                        self._load(conn)
+                    else:
+                        self.stats['revalidated'] += 1
+                self._checked = now
+            else:
+                self.stats['hits'] += 1
+
+            cutoff = _since(hours=24)
+            while self._window and self._window[0] < cutoff:
+                self._window.popleft()
+            if len(self._window) != self._summary['scans_last_24h']:
+                self._summary = {**self._summary, 'scans_last_24h': len(self._window)}
+            etag = f"dash-{self._epoch}-{self._version}-{self._summary['total_known_devices']}-{len(self._window)}"
+            return self._summary, etag
+
+    def invalidate(self):
+        """Another process wrote — revalidate against dashboard_state on the next read."""
+        with self._lock:
+            self._checked = 0.0
+
+    # ── write-through ─────────────────────────────────────
+    def _advance(self, state):
+        """Move to `state` if it is exactly one write past the cached
+        version; otherwise another writer got in between — rebuild on next read."""
+        if self._summary is None or self._path != DB_PATH or state is None:
+            return False
+        if state['version'] != self._version + 1:
+            if state['version'] != self._version:
+                self._summary = None
+            return False
+        self._version = state['version']
+        self._summary = {**self._summary, 'total_known_devices': state['known_devices'],
+                         'unacked_alerts': state['unacked_alerts']}
+        return True
+
+    def scan_saved(self, row, state):
+        with self._lock:
+            if self._advance(state):
+                trend = {k: row.get(k) for k in RISK_TREND_COLUMNS}
+                self._window.append(row['timestamp'])
+                self._summary = {**self._summary, 'latest_scan': row,
+                                 'scans_last_24h': len(self._window),
+                                 'risk_trend': [trend] + self._summary['risk_trend'][:9]}
+
+    def alert_saved(self, row, state):
+        with self._lock:
+            if self._advance(state):
+                self._summary = {**self._summary, 'recent_alerts': [row] + self._summary['recent_alerts'][:9]}
+
+    def alert_acknowledged(self, alert_id, state):
+        with self._lock:
+            if self._advance(state):
+                self._summary = {**self._summary, 'recent_alerts': [
+                    {**a, 'acknowledged': 1} if a['id'] == alert_id else a
+                    for a in self._summary['recent_alerts']]}
+
+
+dashboard = DashboardCache()
+
+
+def invalidate_caches():
+    """
+    Drop this process's in-memory copies after another process (a scan
+    worker) wrote to the database: the dashboard revalidates on its next
+    read and the ARP binding store reloads its open intervals.
+    """
+    dashboard.invalidate()
+    arp_bindings.invalidate()
+
+
+def get_dashboard_summary():
+    """Single call to get everything needed for dashboard."""
+    return dashboard.snapshot()[0]
+
+
+def get_dashboard_snapshot():
+    """(summary, etag) — the ETag changes exactly when the summary does."""
+    return dashboard.snapshot()
+
+
+def get_change_versions(*names):
+    """{name: version} from change_counters — 'scans', 'alerts', 'known_devices'."""
+    with session() as conn:
+        rows = conn.execute(f"""
+            SELECT name, version FROM change_counters WHERE name IN ({','.join('?' * len(names))})
+        """, names).fetchall()
+    return {r['name']: r['version'] for r in rows}
 
 
 def acknowledge_alert(alert_id: int):
-    conn = get_conn()
-    conn.execute("UPDATE alerts SET acknowledged=1 WHERE id=?", (alert_id,))
-    conn.commit()
-    conn.close()
+    with session() as conn:
+        conn.execute("UPDATE alerts SET acknowledged=1 WHERE id=?", (alert_id,))
+        state = _dashboard_state(conn)
+    dashboard.alert_acknowledged(alert_id, state)
 
 
 def get_port_changes():
     """Detect devices whose open ports changed between last two scans."""
-    conn = get_conn()
-    rows = conn.execute("""
-        SELECT ip, ports, timestamp FROM port_history
-        WHERE timestamp >= datetime('now', '-2 hours')
-        ORDER BY ip, timestamp DESC
-    """).fetchall()
-    conn.close()
+    with session() as conn:
+        rows = conn.execute("""
+            SELECT ip, ports, timestamp FROM port_history
+            WHERE timestamp >= datetime('now', '-2 hours')
+            ORDER BY ip, timestamp DESC
+        """).fetchall()
 
     # Group by IP, compare latest vs previous
     by_ip = {}
@@ -431,7 +1341,326 @@ def get_port_changes():
     return changes
 
 
+# ─────────────────────────────────────────────
+#  RETENTION & ROLLUPS
+# ─────────────────────────────────────────────
+# Raw rows are kept for a window, then folded into coarser tiers:
+#   traffic        → traffic_1m → traffic_1h → traffic_1d
+#   arp_snapshots  → arp_intervals (legacy per-scan rows; new ARP state is
+#                    written straight to intervals by ArpBindingStore)
+#   port_history   → only rows where a host's port set changed
+
+RETENTION = {
+    'traffic_raw_hours': 48,
+    'traffic_1m_days': 7,
+    'traffic_1h_days': 90,
+    'traffic_1d_days': 0,          # 0 = keep forever
+    'arp_raw_hours': 24,
+    'arp_interval_gap_minutes': 30,  # longer silence starts a new interval
+    'arp_interval_days': 365,        # ended bindings older than this are dropped
+    'port_raw_days': 7,
+}
+
+TRAFFIC_COUNTERS = ('bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv',
+                    'errin', 'errout', 'dropin', 'dropout')
+
+# width = length of the ISO-timestamp prefix that identifies a bucket
+TRAFFIC_TIERS = {
+    '1m': {'table': 'traffic_1m', 'width': 16, 'keep_days': 'traffic_1m_days'},
+    '1h': {'table': 'traffic_1h', 'width': 13, 'keep_days': 'traffic_1h_days'},
+    '1d': {'table': 'traffic_1d', 'width': 10, 'keep_days': 'traffic_1d_days'},
+}
+
+
+def _since(**delta) -> str:
+    """ISO cutoff in the same local-time format the rows are written in."""
+    return (datetime.now() - timedelta(**delta)).isoformat()
+
+
+def traffic_tier_for(hours, retention=None) -> str:
+    cfg = retention or RETENTION
+    if hours <= cfg['traffic_raw_hours']:
+        return 'raw'
+    for tier in ('1m', '1h'):
+        if hours <= cfg[TRAFFIC_TIERS[tier]['keep_days']] * 24:
+            return tier
+    return '1d'
+
+
+def _state_get(conn, key, default=None):
+    row = conn.execute("SELECT value FROM retention_state WHERE key=?", (key,)).fetchone()
+    return json.loads(row['value']) if row else default
+
+
+def _state_set(conn, key, value):
+    conn.execute("""
+        INSERT INTO retention_state (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value=excluded.value
+    """, (key, json.dumps(value)))
+
+
+def _upsert_traffic_buckets(conn, table, buckets):
+    """Add per-bucket deltas into a tier table (rates take the max).
+    Minutes already written by the live store are left alone."""
+    cols = TRAFFIC_COUNTERS + ('max_sent_rate', 'max_recv_rate', 'samples')
+    sums = ', '.join(f'{c}={c}+excluded.{c}' for c in TRAFFIC_COUNTERS + ('samples',))
+    conn.executemany(f"""
+        INSERT INTO {table} (bucket, {', '.join(cols)})
+        VALUES (?{', ?' * len(cols)})
+        ON CONFLICT(bucket) DO UPDATE SET {sums},
+            max_sent_rate=MAX(max_sent_rate, excluded.max_sent_rate),
+            max_recv_rate=MAX(max_recv_rate, excluded.max_recv_rate)
+        WHERE source IS NOT 'live'
+    """, [(b, *(agg[c] for c in cols)) for b, agg in buckets.items()])
+
+
+def _rebuild_traffic_tier(conn, src, dst, width, prefixes):
+    """Recompute the `dst` buckets named in `prefixes` from the finer `src` tier."""
+    sums = ', '.join(f'SUM({c})' for c in TRAFFIC_COUNTERS)
+    cols = ', '.join(TRAFFIC_COUNTERS)
+    for prefix in prefixes:
+        conn.execute(f"""
+            INSERT OR REPLACE INTO {dst} (bucket, {cols}, max_sent_rate, max_recv_rate, samples)
+            SELECT substr(bucket, 1, {int(width)}), {sums}, MAX(max_sent_rate), MAX(max_recv_rate), SUM(samples)
+            FROM {src} WHERE bucket >= ? AND bucket < ?
+            GROUP BY substr(bucket, 1, {int(width)})
+        """, (prefix, prefix + '\uffff'))
+
+
+def _counter_deltas(prev, rows):
+    """(row, deltas, seconds) for each raw cumulative row after `prev`;
+    a counter that went backwards (reset) counts from zero."""
+    for r in rows:
+        r = dict(r)
+        if prev is not None:
+            dt = max((datetime.fromisoformat(r['timestamp']) -
+                      datetime.fromisoformat(prev['timestamp'])).total_seconds(), 1e-3)
+            yield r, {c: (r[c] or 0) - (prev[c] or 0) if (r[c] or 0) >= (prev[c] or 0) else (r[c] or 0)
+                      for c in TRAFFIC_COUNTERS}, dt
+        prev = r
+
+
+def rollup_traffic(conn, retention=None):
+    """
+    Fold raw cumulative counters newer than the watermark into per-minute
+    deltas (counter resets are treated as a fresh start), then refresh
+    the hour and day buckets they touch. Returns raw rows consumed.
+    """
+    wm = _state_get(conn, 'traffic_watermark')
+    rows = conn.execute("SELECT * FROM traffic WHERE id > ? ORDER BY id",
+                        (wm['id'] if wm else 0,)).fetchall()
+    if not rows:
+        return 0
+
+    minutes = {}
+    for r, delta, dt in _counter_deltas(wm, rows):
+        agg = minutes.setdefault(r['timestamp'][:16], dict.fromkeys(
+            TRAFFIC_COUNTERS + ('max_sent_rate', 'max_recv_rate', 'samples'), 0))
+        for c in TRAFFIC_COUNTERS:
+            agg[c] += delta[c]
+        agg['max_sent_rate'] = max(agg['max_sent_rate'], delta['bytes_sent'] / dt)
+        agg['max_recv_rate'] = max(agg['max_recv_rate'], delta['bytes_recv'] / dt)
+        agg['samples'] += 1
+    prev = dict(rows[-1])
+
+    _upsert_traffic_buckets(conn, 'traffic_1m', minutes)
+    hours = {b[:13] for b in minutes}
+    _rebuild_traffic_tier(conn, 'traffic_1m', 'traffic_1h', 13, hours)
+    _rebuild_traffic_tier(conn, 'traffic_1h', 'traffic_1d', 10, {h[:10] for h in hours})
+    _state_set(conn, 'traffic_watermark', {k: prev[k] for k in ('id', 'timestamp') + TRAFFIC_COUNTERS})
+    return len(rows)
+
+
+def save_live_traffic(minutes: dict) -> int:
+    """
+    Store complete minutes from the in-process time-series store
+    ({'YYYY-MM-DDTHH:MM': agg}) in traffic_1m, replacing any coarser
+    scan-derived bucket, then refresh the hour and day buckets they touch.
+    """
+    cols = TRAFFIC_COUNTERS + ('max_sent_rate', 'max_recv_rate', 'samples')
+    with session() as conn:
+        conn.executemany(f"""
+            INSERT OR REPLACE INTO traffic_1m (bucket, {', '.join(cols)}, source)
+            VALUES (?{', ?' * len(cols)}, 'live')
+        """, [(b, *(agg[c] for c in cols)) for b, agg in minutes.items()])
+        hours = {b[:13] for b in minutes}
+        _rebuild_traffic_tier(conn, 'traffic_1m', 'traffic_1h', 13, hours)
+        _rebuild_traffic_tier(conn, 'traffic_1h', 'traffic_1d', 10, {h[:10] for h in hours})
+    return len(minutes)
+
+
+def compact_arp_snapshots(conn, retention=None):
+    """Merge snapshots older than the raw window into binding intervals."""
+    cfg = retention or RETENTION
+    cutoff = _since(hours=cfg['arp_raw_hours'])
+    gap = timedelta(minutes=cfg['arp_interval_gap_minutes'])
+    rows = conn.execute("""
+        SELECT ip, mac, timestamp FROM arp_snapshots
+        WHERE timestamp < ? ORDER BY ip, timestamp
+    """, (cutoff,)).fetchall()
+
+    open_iv = {}    # ip → [id, mac, last_seen]
+    for r in rows:
+        ip, mac, ts = r['ip'], r['mac'], r['timestamp']
+        if ip not in open_iv:
+            last = conn.execute("""
+                SELECT id, mac, last_seen FROM arp_intervals
+                WHERE ip = ? ORDER BY last_seen DESC LIMIT 1
+            """, (ip,)).fetchone()
+            open_iv[ip] = list(last) if last else None
+        cur = open_iv[ip]
+        if cur and cur[1] == mac and \
+                datetime.fromisoformat(ts) - datetime.fromisoformat(cur[2]) <= gap:
+            if ts > cur[2]:
+                cur[2] = ts
+                conn.execute("UPDATE arp_intervals SET last_seen=?, ended=? WHERE id=?", (ts, ts, cur[0]))
+        else:
+            c = conn.execute("""
+                INSERT INTO arp_intervals (ip, mac, first_seen, last_seen, ended) VALUES (?,?,?,?,?)
+            """, (ip, mac, ts, ts, ts))
+            open_iv[ip] = [c.lastrowid, mac, ts]
+
+    conn.execute("DELETE FROM arp_snapshots WHERE timestamp < ?", (cutoff,))
+    return len(rows)
+
+
+def compact_port_history(conn, retention=None):
+    """Past the raw window, keep only rows where a host's port set changed."""
+    cfg = retention or RETENTION
+    cutoff = _since(days=cfg['port_raw_days'])
+    rows = conn.execute("""
+        SELECT id, ip, ports FROM port_history
+        WHERE timestamp < ? ORDER BY ip, timestamp
+    """, (cutoff,)).fetchall()
+    redundant, last = [], {}
+    for r in rows:
+        ports = sorted(json.loads(r['ports'] or '[]'))
+        if last.get(r['ip']) == ports:
+            redundant.append((r['id'],))
+        last[r['ip']] = ports
+    conn.executemany("DELETE FROM port_history WHERE id=?", redundant)
+    return len(redundant)
+
+
+def run_retention(retention=None) -> dict:
+    """
+    One retention pass: roll traffic up, compact ARP and port history,
+    then expire whatever has aged out of every tier. Safe to run often.
+    """
+    cfg = {**RETENTION, **(retention or {})}
+    stats = {}
+    with session() as conn:
+        stats['traffic_rolled_up'] = rollup_traffic(conn, cfg)
+        wm = _state_get(conn, 'traffic_watermark')
+        if wm:
+            stats['traffic_expired'] = conn.execute("""
+                DELETE FROM traffic WHERE timestamp < ? AND id < ?
+            """, (_since(hours=cfg['traffic_raw_hours']), wm['id'])).rowcount
+        for tier in TRAFFIC_TIERS.values():
+            days = cfg[tier['keep_days']]
+            if days:
+                stats[f"{tier['table']}_expired"] = conn.execute(
+                    f"DELETE FROM {tier['table']} WHERE bucket < ?",
+                    (_since(days=days)[:tier['width']],)).rowcount
+        stats['arp_compacted'] = compact_arp_snapshots(conn, cfg)
+        if cfg['arp_interval_days']:
+            stats['arp_intervals_expired'] = conn.execute("""
+                DELETE FROM arp_intervals WHERE ended IS NOT NULL AND last_seen < ?
+            """, (_since(days=cfg['arp_interval_days']),)).rowcount
+        stats['ports_compacted'] = compact_port_history(conn, cfg)
+    return stats
+
+
+# ─────────────────────────────────────────────
+#  QUERY PLAN AUDIT
+# ─────────────────────────────────────────────
+
+AUDIT_THRESHOLD = 1000   # rows — smaller tables may be scanned freely
+
+# (helper, args, tables it may legitimately walk in full)
+# get_recent_device_state and get_scan_devices (latest scan) walk scans
+# by rowid DESC under a LIMIT.
+AUDIT_CALLS = [
+    (get_scan_history, (50,), ()),
+    (get_scan_devices, (None, 0, 100), ('scans',)),
+    (get_scan_devices, (1, 0, 100), ()),
+    (get_recent_alerts, (50, False), ()),
+    (get_recent_alerts, (50, True), ()),
+    (get_alerts_since, (0,), ()),
+    (get_known_devices, (False,), ()),
+    (get_traffic_history, (24,), ()),
+    (get_traffic_history, (24 * 30,), ()),
+    (get_traffic_history, (24 * 365,), ()),
+    (get_device_timeline, ('00:00:00:00:00:00',), ()),
+    (get_arp_history, ('0.0.0.0', 24), ()),
+    (get_arp_history, ('0.0.0.0', 24 * 7), ()),
+    (get_recent_device_state, (3,), ('scans',)),
+    # json_each() is the caller's table, scanned by design
+    (analyze_arp_spoofing, ({'0.0.0.0': '00:00:00:00:00:00'},), ('json_each',)),
+    (query_dashboard_summary, (), ()),
+    (get_port_changes, (), ()),
+    (load_scan_profile, ('0.0.0.0/0',), ()),
+    (get_change_versions, ('scans', 'known_devices'), ()),
+    # re-scoring reads every scan in the window and its devices by design
+    (get_scan_features, (None, None, 1000, (21, 23)), ('scans', 'json_each')),
+]
+
+
+def audit_query_plans(threshold=AUDIT_THRESHOLD):
+    """
+    Run every read helper, capture the SQL it issues and EXPLAIN QUERY PLAN
+    each statement. Returns a list of findings; any finding is a full table
+    scan (no index) on a table holding more than `threshold` rows.
+    """
+    findings = []
+    with session() as conn:
+        sizes = {r['name']: conn.execute(f"SELECT COUNT(*) FROM \"{r['name']}\"").fetchone()[0]
+                 for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table' "
+                                       "AND name NOT LIKE 'sqlite_%'")}
+        for fn, args, allowed in AUDIT_CALLS:
+            captured = []
+            conn.set_trace_callback(captured.append)
+            try:
+                fn(*args)
+            finally:
+                conn.set_trace_callback(None)
+            for sql in captured:
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                for row in conn.execute("EXPLAIN QUERY PLAN " + sql):
+                    detail = row['detail']
+                    parts = detail.split()
+                    if len(parts) < 2 or parts[0] != 'SCAN' or 'INDEX' in detail:
+                        continue
+                    table = parts[1]
+                    if table in allowed or sizes.get(table, 0) <= threshold:
+                        continue
+                    findings.append({
+                        'helper': fn.__name__,
+                        'table': table,
+                        'rows': sizes.get(table, 0),
+                        'plan': detail,
+                        'sql': ' '.join(sql.split()),
+                    })
+    return findings
+
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'audit':
+        threshold = int(sys.argv[2]) if len(sys.argv) > 2 else AUDIT_THRESHOLD
+        init_db()
+        problems = audit_query_plans(threshold)
+        for p in problems:
+            print(f"[AUDIT] {p['helper']}: full scan of {p['table']} ({p['rows']} rows) — {p['plan']}")
+            print(f"        {p['sql']}")
+        print(f"[AUDIT] {len(problems)} full-scan finding(s) above {threshold} rows")
+        sys.exit(1 if problems else 0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'retention':
+        init_db()
+        print(f"[DB] Retention pass: {run_retention()}")
+        sys.exit(0)
+
     init_db()
     print("[DB] Schema created successfully")
     print(f"[DB] Location: {DB_PATH}")
\ No newline at end of file
@@ -4,12 +4,27 @@ GARUDA Network Defense System - Backend v3.0
 + History & Dashboard endpoints backed by SQLite
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
-import subprocess, re, platform, socket, time, concurrent.futures
+import subprocess, re, platform, socket, time, json, math, concurrent.futures
 from datetime import datetime
 import ipaddress
 import psutil
+from icmp_sweep import ICMPSweeper, ping_subprocess
+from port_scanner import ConnectScanner
+from incremental import IncrementalScanner
+from scan_jobs import ScanJobManager, MAX_CONCURRENT_SCANS
+from scan_workers import ScanWorkerPool, WorkerUnavailable
+from live import EventHub, TrafficSampler, AlertTail
+from netprobe import ProbeCache, read_default_gateway, read_gateways
+from neighbors import neighbors
+from resolver import HostnameResolver
+from oui import vendors
+from scan_profile import ProfileStore, SweepController
+from scan_plan import plan_targets, MergedProgress, MAX_PARALLEL
+from predictor import AttackPredictor, RISKY_PORTS, rescore, parse_weights, parse_labels
+from rules import rules
+from wire import BodyCache, negotiate_coding, negotiate_format, make_etag
 
 app = Flask(__name__)
 CORS(app)
@@ -17,6 +32,14 @@ CORS(app)
 OS = platform.system()
 COMMON_PORTS = [21,22,23,25,53,80,110,135,139,143,443,445,993,995,
                 1433,1521,3000,3306,3389,5432,5900,6379,8080,8443,8888,27017]
+PORT_SCAN_CONCURRENCY = 256   # global cap on in-flight connect() probes
+DEVICE_PAGE = 100             # devices per page in scan results and /api/devices
+MAX_DEVICE_PAGE = 1000
+RESCORE_LIMIT = 50_000        # stored scans one what-if re-score may cover
+SCAN_IN_WORKERS = True        # scans run in worker processes (scan_workers.py), off the web process GIL
+
+# Gateway / local IP / Wi-Fi answers, cached per TTL and dropped on netlink events
+probes = ProbeCache()
 
 
 # ─────────────────────────────────────────────
@@ -27,8 +50,12 @@ try:
         init_db, save_scan, save_alert,
         get_scan_history, get_recent_alerts,
         get_known_devices, get_traffic_history,
-        get_dashboard_summary, acknowledge_alert,
-        get_port_changes, get_device_timeline
+        get_dashboard_snapshot, acknowledge_alert,
+        get_port_changes, get_device_timeline,
+        get_alerts_since, save_live_traffic,
+        save_hostnames, load_hostnames,
+        save_scan_profile, load_scan_profile, get_scan_devices,
+        get_change_versions, get_scan_features, invalidate_caches
     )
     init_db()
     DB_AVAILABLE = True
@@ -70,6 +97,8 @@ def get_real_traffic():
 # ─────────────────────────────────────────────
 #  REAL PORT SCANNER
 # ─────────────────────────────────────────────
+port_scanner = ConnectScanner(concurrency=PORT_SCAN_CONCURRENCY)
+
 def scan_port(ip, port):
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -81,11 +110,19 @@ def scan_port(ip, port):
         return None
 
 def scan_device_ports(ip, ports=None):
+    return scan_ports_bulk([ip], ports).get(ip, [])
+
+def scan_ports_bulk(ips, ports=None, on_result=None):
+    """Probe every (ip, port) pair under one global concurrency budget.
+    Returns {ip: [open ports]} for hosts with at least one open port."""
     if ports is None:
         ports = COMMON_PORTS
-    with concurrent.futures.ThreadPoolExecutor(max_workers=len(ports)) as ex:
-        results = list(ex.map(lambda p: scan_port(ip, p), ports))
-    return [p for p in results if p is not None]
+    return port_scanner.scan_hosts(list(dict.fromkeys(ips)), ports, on_result)
+
+def scan_port_plan(plan, on_result=None):
+    """Probe a per-host port plan {ip: [ports]} in one pass."""
+    targets = [(ip, p) for ip, ports in plan.items() for p in ports]
+    return port_scanner.scan(targets, on_result)
 
 
 # ─────────────────────────────────────────────
@@ -93,6 +130,10 @@ def scan_device_ports(ip, ports=None):
 # ─────────────────────────────────────────────
 class WiFiScanner:
     def get_connected_network(self):
+        # copy — callers annotate the result
+        return dict(probes.get('connected_network', self._probe_connected_network))
+
+    def _probe_connected_network(self):
         try:
             if OS == "Windows":
                 result = subprocess.check_output(
@@ -153,50 +194,30 @@ class WiFiScanner:
             return {"error": str(e)}
 
     def assess_security(self, encryption_type):
-        enc = encryption_type.lower()
-        if any(x in enc for x in ['open', 'none', 'wep']):
-            return {'threat_level': 'CRITICAL', 'mitm_risk': 'VERY HIGH',
-                    'vulnerability': 'Unencrypted / WEP',
-                    'description': 'No encryption. All traffic visible to anyone on network.',
-                    'recommendation': 'Do not use. Connect via VPN only if unavoidable.',
-                    'exploit_risk': '99.9%'}
-        elif 'wpa3' in enc:
-            return {'threat_level': 'SECURE', 'mitm_risk': 'VERY LOW',
-                    'vulnerability': 'WPA3',
-                    'description': 'WPA3 SAE prevents offline dictionary attacks and provides forward secrecy.',
-                    'recommendation': 'Keep firmware updated. Monitor for rogue APs.',
-                    'exploit_risk': '3.7%'}
-        elif 'wpa2' in enc and 'enterprise' in enc:
-            return {'threat_level': 'LOW', 'mitm_risk': 'LOW',
-                    'vulnerability': 'WPA2-Enterprise (802.1X)',
-                    'description': 'Per-user authentication prevents shared-key attacks.',
-                    'recommendation': 'Validate server certificates. Deploy RADIUS.',
-                    'exploit_risk': '12.3%'}
-        elif 'wpa2' in enc:
-            return {'threat_level': 'MEDIUM', 'mitm_risk': 'MODERATE',
-                    'vulnerability': 'WPA2-PSK',
-                    'description': 'KRACK vulnerability and 4-way handshake capture enable offline brute-force.',
-                    'recommendation': 'Use passphrase 20+ characters. Upgrade to WPA3.',
-                    'exploit_risk': '45.2%'}
-        elif 'wpa' in enc:
-            return {'threat_level': 'HIGH', 'mitm_risk': 'HIGH',
-                    'vulnerability': 'WPA-TKIP (Deprecated)',
-                    'description': 'TKIP is cryptographically broken. Subject to KRACK attacks.',
-                    'recommendation': 'Upgrade router firmware to WPA2/WPA3 immediately.',
-                    'exploit_risk': '85.4%'}
-        else:
-            return {'threat_level': 'UNKNOWN', 'mitm_risk': 'UNKNOWN',
-                    'vulnerability': 'Unknown encryption',
-                    'description': 'Cannot determine encryption type. Treat as untrusted.',
-                    'recommendation': 'Investigate network security settings before using.',
-                    'exploit_risk': 'N/A'}
+        # first matching security rule in data/rules.json
+        return rules.current.assess(encryption_type)
 
 
 # ─────────────────────────────────────────────
 #  NETWORK SCANNER
 # ─────────────────────────────────────────────
 class NetworkScanner:
+    def __init__(self):
+        self.resolver = HostnameResolver(loader=load_hostnames if DB_AVAILABLE else None,
+                                         saver=save_hostnames if DB_AVAILABLE else None)
+        self.profiles = ProfileStore(loader=load_scan_profile if DB_AVAILABLE else None,
+                                     saver=save_scan_profile if DB_AVAILABLE else None)
+
     def get_local_ip(self):
+        return probes.get('local_ip', self._probe_local_ip)
+
+    def get_gateway(self):
+        return probes.get('gateway', self._probe_gateway)
+
+    def get_network_range(self):
+        return probes.get('network_range', self._probe_network_range)
+
+    def _probe_local_ip(self):
         try:
             s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             s.connect(("8.8.8.8", 80))
@@ -206,8 +227,12 @@ class NetworkScanner:
         except:
             return "Unable to determine"
 
-    def get_gateway(self):
+    def _probe_gateway(self):
         try:
+            if OS == "Linux":
+                gw = read_default_gateway()
+                if gw:
+                    return gw
             if OS == "Windows":
                 result = subprocess.check_output(["ipconfig"], encoding='utf-8', errors='ignore')
                 for line in result.split('\n'):
@@ -226,7 +251,7 @@ class NetworkScanner:
             pass
         return "192.168.1.1"
 
-    def get_network_range(self):
+    def _probe_network_range(self):
         try:
             local_ip = self.get_local_ip()
             if local_ip == "Unable to determine":
@@ -255,15 +280,18 @@ class NetworkScanner:
             return 'small'
 
     def _ping_ip(self, ip, timeout=0.5):
-        try:
-            cmd = ["ping", "-n", "1", "-w", str(int(timeout*1000)), ip] if OS == "Windows" \
-                  else ["ping", "-c", "1", "-W", str(max(1, int(timeout))), ip]
-            r = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout+1)
-            return r.returncode == 0
-        except:
-            return False
+        return ping_subprocess(ip, timeout)
 
     def get_arp_table(self):
+        # Linux: live kernel neighbour table (netlink / /proc), no fork
+        if OS == "Linux":
+            neighbors.watch()
+            table = neighbors.table()
+            if table is not None:
+                return table
+        return self._arp_command()
+
+    def _arp_command(self):
         devices = {}
         try:
             result = subprocess.check_output(["arp", "-a"], encoding='utf-8', errors='ignore')
@@ -290,104 +318,163 @@ class NetworkScanner:
     def _get_vendor(self, mac):
         if not mac or mac in ('Unknown', '<INCOMPLETE>'):
             return 'Unknown'
-        oui = {
-            '00:50:56':'VMware','00:0C:29':'VMware','08:00:27':'VirtualBox',
-            '52:54:00':'QEMU/KVM','DC:A6:32':'Raspberry Pi','B8:27:EB':'Raspberry Pi',
-            '00:1B:44':'Cisco','00:26:99':'Cisco','84:D6:D0':'TP-Link',
-            'F0:9F:C2':'TP-Link','50:C7:BF':'TP-Link','3C:5A:B4':'Google',
-            'B4:2E:99':'Google Home','28:CF:E9':'Apple','A4:5E:60':'Apple',
-            '98:01:A7':'Apple','20:C9:D0':'Amazon','2C:F0:5D':'Amazon Echo',
-            '00:12:FB':'Samsung','34:AA:8B':'Samsung','00:15:5D':'Microsoft',
-            '18:31:BF':'Xiaomi','28:6C:07':'Xiaomi','00:17:C8':'D-Link',
-            'C0:4A:00':'Huawei','00:46:4B':'Huawei',
-        }
-        return oui.get(':'.join(mac.split(':')[:3]), 'Unknown Vendor')
+        return vendors.vendor(mac) or 'Unknown Vendor'
 
     def get_hostname(self, ip):
-        try:
-            return socket.gethostbyaddr(ip)[0]
-        except:
-            return None
+        return self.resolver.resolve(ip)
 
-    def get_connected_devices(self, max_devices=50):
+    def _primary_target(self):
         network_range = self.get_network_range()
         if not network_range:
-            return []
+            return None
+        return {'iface': None, 'subnet': network_range, 'local_ip': self.get_local_ip(),
+                'gateway': self.get_gateway(), 'rate_limit': None, 'narrowed': False}
+
+    def plan_targets(self, cidrs=None, scope='all'):
+        """Sweep targets for one scan: every interface subnet (scope='all'),
+        only the routed one (scope='primary'), or exactly `cidrs`."""
+        primary = self._primary_target()
+        if scope == 'primary' and not cidrs:
+            return [primary] if primary else []
         try:
+            gateways = read_gateways() if OS == "Linux" else {}
+            targets = plan_targets(psutil.net_if_addrs(), psutil.net_if_stats(), gateways,
+                                   cidrs=cidrs, primary_ip=self.get_local_ip())
+        except Exception as e:
+            print(f"[PLAN] Interface enumeration failed: {e}")
+            targets = []
+        if primary and not cidrs:
+            # the routed subnet is always swept, with the probed gateway as fallback
+            first = next((t for t in targets if t['local_ip'] == primary['local_ip']), None)
+            if first is None:
+                targets.insert(0, primary)
+            elif not first['gateway']:
+                first['gateway'] = primary['gateway']
+        return targets
+
+    def scan_targets(self, targets, ip_lists=None, progress=None):
+        """
+        Sweep every target in parallel (MAX_PARALLEL at a time) and merge
+        the results. `ip_lists` = {subnet: [ips]} from incremental plans.
+        Returns (devices, total_found, net_size, per-target summaries).
+        """
+        if not targets:
+            return [], 0, 'unknown', []
+        merged = MergedProgress(progress, [t['subnet'] for t in targets]) if progress else None
+        def run(t):
+            return self.get_connected_devices(ip_list=(ip_lists or {}).get(t['subnet']), target=t,
+                                              progress=merged.target(t['subnet']) if merged else None)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_PARALLEL, len(targets)),
+                                                   thread_name_prefix='sweep') as ex:
+            results = list(ex.map(run, targets))
+
+        devices, seen, summaries = [], set(), []
+        for t, (found, total, size) in zip(targets, results):
+            for d in found:
+                if d['ip'] not in seen:
+                    seen.add(d['ip'])
+                    devices.append(d)
+            summaries.append({'iface': t['iface'], 'subnet': t['subnet'], 'local_ip': t['local_ip'],
+                              'gateway': t['gateway'], 'narrowed': t['narrowed'], 'devices': len(found),
+                              'network_size': size})
+        total_found = sum(r[1] for r in results)
+        net_size = results[0][2] if len(results) == 1 else 'multi'
+        if progress:
+            progress('devices', devices=devices, devices_total=total_found)
+        return devices, total_found, net_size, summaries
+
+    def get_connected_devices(self, max_devices=None, ip_list=None, progress=None, target=None):
+        """Sweep one target (default: the routed subnet), or only `ip_list` when an
+        incremental plan gives one. `progress(phase=..., devices=..., **counters)`
+        is called as each phase advances."""
+        report = progress or (lambda *a, **kw: None)
+        target = target or self._primary_target()
+        if not target:
+            return [], 0, 'unknown'
+        try:
+            network_range = target['subnet']
             net_size = self.detect_network_size(network_range)
             network = ipaddress.IPv4Network(network_range, strict=False)
-            ip_list = [str(ip) for ip in network.hosts()]
-            local_ip = self.get_local_ip()
-            gateway_ip = self.get_gateway()
-
-            # Tune settings based on network size
-            if net_size == 'enterprise':
-                ping_timeout = 0.2
-                workers = 200
-                arp_wait = 0.5
-                print(f"[SCAN] Enterprise network detected ({len(ip_list)} hosts) — fast mode")
-            elif net_size == 'large':
-                ping_timeout = 0.3
-                workers = 150
-                arp_wait = 1.0
-                print(f"[SCAN] Large network detected ({len(ip_list)} hosts) — optimized mode")
-            else:
-                ping_timeout = 0.4
-                workers = 100
-                arp_wait = 1.5
-                print(f"[SCAN] Home network detected ({len(ip_list)} hosts) — normal mode")
-
-            # Phase 1: Parallel ping sweep
-            active_ips = set()
-            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as ex:
-                future_to_ip = {ex.submit(self._ping_ip, ip, ping_timeout): ip for ip in ip_list}
-                for future in concurrent.futures.as_completed(future_to_ip):
-                    ip = future_to_ip[future]
-                    try:
-                        if future.result():
-                            active_ips.add(ip)
-                    except:
-                        pass
-
-            # Phase 2: ARP refresh (skip for enterprise — too slow)
-            if net_size != 'enterprise':
+            if ip_list is None:
+                ip_list = [str(ip) for ip in network.hosts()]
+            local_ip = target['local_ip']
+            gateway_ip = target['gateway']
+            sweeper = ICMPSweeper(fallback=self._ping_ip)
+
+            # Sweep tuning learned for this subnet; canaries go to the gateway
+            # and last run's first responders, then adapt as the sweep runs
+            profile = self.profiles.get(str(network))
+            controller = SweepController(profile, canaries=[gateway_ip] + profile.responders,
+                                         max_rate=target['rate_limit'])
+            print(f"[SCAN] {network}{' on ' + target['iface'] if target['iface'] else ''}: "
+                  f"{net_size} network ({len(ip_list)} hosts) — "
+                  f"{'learned' if profile.runs else 'initial'} profile: {round(profile.rate)} pps, "
+                  f"timeout {profile.timeout * 1000:.0f} ms")
+
+            # Phase 1: ICMP sweep — one socket, rate-limited (subprocess fallback)
+            sweeper.fallback_workers = int(min(200, max(50, profile.rate / 10)))
+            report('sweep', hosts_total=len(ip_list), hosts_alive=0)
+            alive = []
+            def on_reply(ip, rtt):
+                alive.append(ip)
+                report(hosts_alive=len(alive))
+            replies = sweeper.sweep(ip_list, on_reply=on_reply if progress else None, controller=controller)
+            active_ips = set(replies)
+            self.profiles.save(controller.finish(active_ips, swept=ip_list))
+            report('arp', hosts_swept=len(ip_list), hosts_alive=len(active_ips), sweep=controller.stats())
+            print(f"[SCAN] Sweep mode: {sweeper.mode} — {len(active_ips)} hosts replied, {controller.stats()}")
+
+            # Phase 2: ARP refresh. The socket sweep already made the kernel
+            # resolve every address, so only the subprocess path needs a
+            # second pass; the settle time follows the measured RTT.
+            if sweeper.mode == 'subprocess':
                 remaining = [ip for ip in ip_list if ip not in active_ips]
-                with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as ex:
-                    list(ex.map(lambda ip: self._ping_ip(ip, 0.3), remaining))
-                time.sleep(arp_wait)
+                with concurrent.futures.ThreadPoolExecutor(max_workers=sweeper.fallback_workers) as ex:
+                    list(ex.map(lambda ip: self._ping_ip(ip, controller.timeout), remaining))
+            time.sleep(profile.arp_wait)
 
             # Phase 3: Read ARP table
             arp = self.get_arp_table()
-            all_ips = active_ips.union(set(arp.keys()))
+            all_ips = active_ips.union(ip for ip in arp if ipaddress.IPv4Address(ip) in network)
 
             # Build device list — always include gateway and local IP first
+            # only the network and broadcast addresses are skipped — on a /22
+            # or wider, x.x.x.0 and x.x.x.255 inside the range are real hosts
+            reserved = {str(network.network_address), str(network.broadcast_address)}
             priority_ips = {gateway_ip, local_ip}
             other_ips = sorted(
-                [ip for ip in all_ips if ip not in priority_ips
-                 and not ip.endswith('.255') and not ip.endswith('.0')],
+                [ip for ip in all_ips if ip not in priority_ips and ip not in reserved],
                 key=lambda x: list(map(int, x.split('.')))
             )
 
-            # Cap at max_devices — always keep gateway + local
-            capped = list(priority_ips.intersection(all_ips)) + other_ips
-            total_found = len(capped)
-            capped = capped[:max_devices]
+            # Every device is kept; max_devices only trims when a caller asks
+            ordered = list(priority_ips.intersection(all_ips)) + other_ips
+            total_found = len(ordered)
+            if max_devices:
+                ordered = ordered[:max_devices]
+
+            # Reverse DNS for every device at once, bounded by one deadline
+            report('names')
+            names = self.resolver.resolve_many(ordered, macs=arp)
 
             devices = []
-            for ip in capped:
-                if ip.endswith('.255') or ip.endswith('.0'):
+            for ip in ordered:
+                if ip in reserved:
                     continue
                 mac = arp.get(ip, 'Unknown')
                 devices.append({
                     'ip': ip,
                     'mac': mac,
                     'vendor': self._get_vendor(mac),
-                    'hostname': self.get_hostname(ip),
+                    'hostname': names.get(ip),
                     'status': 'ACTIVE' if ip in active_ips else 'DETECTED',
                     'detection_method': 'PING+ARP' if ip in active_ips else 'ARP_ONLY',
+                    'interface': target['iface'],
+                    'subnet': network_range,
                 })
 
-            print(f"[SCAN] Found {total_found} devices — showing {len(devices)} (capped at {max_devices})")
+            report('devices', devices=devices, devices_total=total_found)
+            print(f"[SCAN] Found {total_found} devices on {network_range}")
             return devices, total_found, net_size
 
         except Exception as e:
@@ -417,108 +504,21 @@ class NetworkScanner:
             return {}
 
 
-# ─────────────────────────────────────────────
-#  ATTACK PREDICTOR
-# ─────────────────────────────────────────────
-class AttackPredictor:
-    WEIGHTS = {
-        'encryption': 0.28,
-        'unknown_devices': 0.18,
-        'arp_anomalies': 0.15,
-        'open_ports': 0.15,
-        'device_density': 0.12,
-        'traffic_anomaly': 0.12,
-    }
-
-    def predict(self, scan_data):
-        enc = scan_data.get('connected_network', {}).get('encryption', '').lower()
-        devices = scan_data.get('connected_devices', [])
-        traffic = scan_data.get('network_traffic', {})
-        port_data = scan_data.get('port_scan', {})
-        scores = {}
-
-        if any(x in enc for x in ['open', 'none', 'wep']):
-            scores['encryption'] = 1.0
-        elif 'wpa3' in enc:
-            scores['encryption'] = 0.05
-        elif 'wpa2' in enc and 'enterprise' in enc:
-            scores['encryption'] = 0.12
-        elif 'wpa2' in enc:
-            scores['encryption'] = 0.45
-        elif 'wpa' in enc:
-            scores['encryption'] = 0.82
-        else:
-            scores['encryption'] = 0.55
-
-        total = max(len(devices), 1)
-        unknown = [d for d in devices if d.get('vendor', 'Unknown') in ('Unknown', 'Unknown Vendor')]
-        scores['unknown_devices'] = min(len(unknown) / total, 1.0)
-
-        arp_only = [d for d in devices if d.get('detection_method') == 'ARP_ONLY']
-        scores['arp_anomalies'] = min(len(arp_only) / total * 1.3, 1.0)
-
-        total_open = sum(len(v) for v in port_data.values())
-        risky_ports = {21, 23, 135, 139, 445, 3389, 5900}
-        risky_open = sum(1 for ports in port_data.values() for p in ports if p in risky_ports)
-        scores['open_ports'] = min((total_open / 10 + risky_open * 0.2), 1.0)
-
-        scores['device_density'] = min(total / 30, 1.0)
-
-        errin = traffic.get('errin', 0) or 0
-        dropin = traffic.get('dropin', 0) or 0
-        pkts = max(traffic.get('packets_recv_raw', 1) or 1, 1)
-        scores['traffic_anomaly'] = min((errin + dropin) / pkts * 100, 1.0)
-
-        total_risk = sum(scores[k] * self.WEIGHTS[k] for k in scores)
-        risk_pct = round(total_risk * 100, 1)
-
-        if risk_pct >= 70: label, color = 'CRITICAL', '#ef4444'
-        elif risk_pct >= 45: label, color = 'HIGH', '#f97316'
-        elif risk_pct >= 25: label, color = 'MEDIUM', '#f59e0b'
-        else: label, color = 'LOW', '#10b981'
-
-        return {
-            'risk_score': risk_pct,
-            'risk_label': label,
-            'risk_color': color,
-            'component_scores': {k: round(v*100, 1) for k, v in scores.items()},
-            'attack_predictions': self._attacks(scores, enc, devices, port_data),
-            'scan_timestamp': datetime.now().isoformat()
-        }
-
-    def _attacks(self, scores, enc, devices, port_data):
-        attacks = []
-        risky_ports = {21:'FTP',23:'Telnet',445:'SMB',3389:'RDP',5900:'VNC',135:'RPC',139:'NetBIOS'}
-
-        if scores['encryption'] > 0.6:
-            attacks.append({'type':'Man-in-the-Middle (MITM)','probability':round(scores['encryption']*85,1),'severity':'Critical','description':'Weak/no encryption allows full traffic interception'})
-        if scores['unknown_devices'] > 0.3:
-            cnt = round(scores['unknown_devices']*len(devices))
-            attacks.append({'type':'Rogue Device / Unauthorized Access','probability':round(scores['unknown_devices']*78,1),'severity':'High','description':f'{cnt} unidentified devices on network'})
-        if scores['arp_anomalies'] > 0.25:
-            attacks.append({'type':'ARP Spoofing / Cache Poisoning','probability':round(scores['arp_anomalies']*82,1),'severity':'High','description':'ARP-only devices detected — possible cache poisoning'})
-
-        found_risky = {}
-        for ip, ports in port_data.items():
-            for p in ports:
-                if p in risky_ports:
-                    found_risky.setdefault(risky_ports[p], []).append(ip)
-        for svc, ips in found_risky.items():
-            attacks.append({'type':f'{svc} Service Exposure','probability':72.0,'severity':'High','description':f'{svc} open on {len(ips)} device(s) — commonly exploited'})
-
-        if 'wpa2' in enc and 'enterprise' not in enc:
-            attacks.append({'type':'WPA2 KRACK / Handshake Capture','probability':45.2,'severity':'Medium','description':'WPA2-PSK susceptible to 4-way handshake capture (CVE-2017-13077)'})
-
-        attacks.sort(key=lambda x: x['probability'], reverse=True)
-        return attacks[:5]
-
-
 # ─────────────────────────────────────────────
 #  INIT
 # ─────────────────────────────────────────────
 wifi_sc = WiFiScanner()
 net_sc = NetworkScanner()
 predictor = AttackPredictor()
+incremental = IncrementalScanner()
+
+# One sampler + one hub shared by every live client
+hub = EventHub()
+sampler = TrafficSampler(
+    hub,
+    alerts=AlertTail(hub, get_alerts_since, lambda: get_recent_alerts(1)) if DB_AVAILABLE else None,
+    flush=save_live_traffic if DB_AVAILABLE else None,
+)
 
 
 # ─────────────────────────────────────────────
@@ -532,17 +532,38 @@ def health():
         'system': OS,
         'version': '3.0',
         'db_available': DB_AVAILABLE,
-        'features': ['real-traffic-psutil', 'real-port-scan', 'real-arp-ping', 'attack-prediction', 'history-db']
+        'features': ['real-traffic-psutil', 'real-port-scan', 'real-arp-ping', 'attack-prediction', 'history-db', 'scan-jobs', 'live-stream', 'probe-cache', 'adaptive-sweep', 'multi-interface', 'compressed-responses', 'rule-engine', 'scan-workers'],
+        'live_subscribers': hub.subscribers,
+        'probe_cache': probes.stats(),
+        'scan_profiles': _scan_profiles(),
+        'scan_workers': scan_workers.health(),
+        'rules': rules.summary(),
     })
 
 
-@app.route('/api/scan/full', methods=['GET', 'POST'])
-def full_scan():
+def _scan_profiles():
+    """Subnet profiles as the scanning processes know them — the freshest per subnet."""
+    if not SCAN_IN_WORKERS:
+        return net_sc.profiles.summaries()
+    best = {}
+    for w in scan_workers.health()['workers']:
+        for p in (w['info'] or {}).get('scan_profiles', ()):
+            if p['subnet'] not in best or p['runs'] > best[p['subnet']]['runs']:
+                best[p['subnet']] = p
+    return list(best.values()) or net_sc.profiles.summaries()
+
+
+def perform_full_scan(mode='full', progress=None, cidrs=None, scope='all'):
+    """Run one complete scan and return the result dict (no request context needed).
+    Every interface subnet is swept (scope='primary': only the routed one),
+    or exactly `cidrs` when given; all of it lands in one scan record."""
+    report = progress or (lambda *a, **kw: None)
     t_start = time.time()
 
+    report('network')
     connected = wifi_sc.get_connected_network()
     if 'error' in connected:
-        return jsonify({'status': 'error', 'message': connected['error']}), 400
+        return {'status': 'error', 'message': connected['error']}
 
     security = wifi_sc.assess_security(connected.get('encryption', ''))
     connected['security_assessment'] = security
@@ -551,28 +572,48 @@ def full_scan():
     local_ip = net_sc.get_local_ip()
     gateway_ip = net_sc.get_gateway()
 
-    # Smart scan — returns (devices, total_found, net_size)
-    scan_result = net_sc.get_connected_devices(max_devices=50)
-    all_devices, total_found, net_size = scan_result if isinstance(scan_result, tuple) else (scan_result, len(scan_result), 'small')
-
-    scan_targets = [gateway_ip, local_ip] + \
-                   [d['ip'] for d in all_devices if d['ip'] not in (gateway_ip, local_ip)][:8]
-    port_data = {}
-    with concurrent.futures.ThreadPoolExecutor(max_workers=len(scan_targets)) as ex:
-        fm = {ex.submit(scan_device_ports, ip): ip for ip in scan_targets}
-        for future in concurrent.futures.as_completed(fm):
-            ip = fm[future]
-            try:
-                ports = future.result()
-                if ports:
-                    port_data[ip] = ports
-            except:
-                pass
+    # Sweep targets — one per interface subnet, or the requested CIDRs
+    targets = net_sc.plan_targets(cidrs, scope)
+    gateways = {t['gateway'] for t in targets if t['gateway']} | {gateway_ip}
+    local_ips = {t['local_ip'] for t in targets if t['local_ip']} | {local_ip}
+
+    # mode='incremental' re-checks known hosts + one rotating slice, per subnet
+    plans = {}
+    if mode == 'incremental' and DB_AVAILABLE:
+        plans = {t['subnet']: incremental.plan(t['subnet'], always=(t['gateway'], t['local_ip'])) for t in targets}
+
+    # Parallel sweeps, merged — returns (devices, total_found, net_size, per-target summaries)
+    all_devices, total_found, net_size, target_summaries = net_sc.scan_targets(
+        targets, ip_lists={subnet: p['sweep_ips'] for subnet, p in plans.items()}, progress=progress)
+
+    # Port scan every discovered device under one global socket budget
+    changes = None
+    probed = [0, 0]   # probes done, open found
+    def on_port(ip, port, state, rtt):
+        probed[0] += 1
+        if state == 'open':
+            probed[1] += 1
+        if probed[0] % 50 == 0:
+            report(ports_probed=probed[0], ports_open=probed[1])
+    try:
+        if plans:
+            port_plan, changes = incremental.port_targets_for(plans, all_devices, COMMON_PORTS)
+            report('ports', ports_total=sum(len(p) for p in port_plan.values()), ports_probed=0, ports_open=0)
+            port_data = scan_port_plan(port_plan, on_result=on_port)
+        else:
+            port_targets = [gateway_ip, local_ip] + [d['ip'] for d in all_devices]
+            port_targets = [ip for ip in dict.fromkeys(port_targets) if ip]
+            report('ports', ports_total=len(port_targets) * len(COMMON_PORTS), ports_probed=0, ports_open=0)
+            port_data = scan_ports_bulk(port_targets, on_result=on_port)
+        report(ports_probed=probed[0], ports_open=probed[1])
+    except Exception as e:
+        print(f"[PORTS] Scan error: {e}")
+        port_data = {}
 
     devices = []
     for d in all_devices:
         ip = d['ip']
-        dtype = 'GATEWAY' if ip == gateway_ip else 'THIS_DEVICE' if ip == local_ip else 'NODE'
+        dtype = 'GATEWAY' if ip in gateways else 'THIS_DEVICE' if ip in local_ips else 'NODE'
         devices.append({
             **d,
             'type': dtype,
@@ -586,12 +627,14 @@ def full_scan():
         'total_devices': len(devices),
         'total_found': total_found,
         'showing': len(devices),
-        'capped': total_found > len(devices),
+        'capped': False,
         'network_size': net_size,
         'active_devices': len([d for d in devices if d.get('status') == 'ACTIVE']),
+        'arp_only_devices': len([d for d in devices if d.get('detection_method') == 'ARP_ONLY']),
         'unknown_vendors': len([d for d in devices if d.get('vendor') in ('Unknown', 'Unknown Vendor')]),
     }
 
+    report('prediction', devices=devices)
     prediction = predictor.predict({
         'connected_network': connected,
         'connected_devices': all_devices,
@@ -608,7 +651,11 @@ def full_scan():
         'local_ip': local_ip,
         'gateway': gateway_ip,
         'nodes_detected': len(devices),
-        'addresses_scanned': 254,
+        'addresses_scanned': sum(len(p['sweep_ips']) for p in plans.values()) if plans else
+                             sum(max(ipaddress.IPv4Network(t['subnet']).num_addresses - 2, 1) for t in targets),
+        'scan_mode': 'incremental' if any(p['mode'] == 'incremental' for p in plans.values()) else 'full',
+        'host_changes': changes,
+        'targets': target_summaries,
         'devices': devices,
         'network_traffic': traffic,
         'interface_stats': net_sc.get_interface_stats(),
@@ -620,12 +667,171 @@ def full_scan():
 
     # Auto-save to DB if available
     if DB_AVAILABLE:
+        report('saving')
         try:
-            save_scan(result)
+            result['scan_id'] = save_scan(result)
+            _page_devices(result)
         except Exception as e:
             print(f"[DB] Save error: {e}")
 
-    return jsonify(result)
+    return result
+
+
+def _page_devices(result):
+    """Keep only the first page of devices in a saved result; clients fetch
+    the rest from /api/devices (cursor pages) or /api/devices/stream (NDJSON)."""
+    page = get_scan_devices(result['scan_id'], 0, DEVICE_PAGE)
+    result['devices_page'] = {
+        'scan_id': result['scan_id'],
+        'total': len(result['devices']),
+        'limit': DEVICE_PAGE,
+        'next_cursor': page['next_cursor'] if page else None,
+    }
+    result['devices'] = result['devices'][:DEVICE_PAGE]
+    result['connected_devices'] = result['connected_devices'][:DEVICE_PAGE]
+    result['security_summary']['showing'] = len(result['devices'])
+    result['security_summary']['capped'] = page is not None and page['next_cursor'] is not None
+
+
+def scan_worker_status():
+    """Heartbeat payload of a scan worker process (see /api/health)."""
+    return {'scan_profiles': net_sc.profiles.summaries(), 'probe_cache': probes.stats()}
+
+
+# Same number of processes as job threads, so a started job always finds a worker
+scan_workers = ScanWorkerPool('garuda_backend:perform_full_scan', workers=MAX_CONCURRENT_SCANS,
+                              status='garuda_backend:scan_worker_status')
+
+
+def _run_scan_job(job, mode='full', cidrs=None, scope='all'):
+    result = None
+    if SCAN_IN_WORKERS:
+        try:
+            result = scan_workers.run(job.update, key=job.key, mode=mode, cidrs=cidrs, scope=scope)
+            if DB_AVAILABLE:
+                # the worker saved the scan (and its hostnames) in its own
+                # process — this one's write-through copies are now behind
+                invalidate_caches()
+                net_sc.resolver.invalidate()
+        except WorkerUnavailable as e:
+            print(f"[WORKERS] {e} — scanning in-process")
+    if result is None:
+        result = perform_full_scan(mode, progress=job.update, cidrs=cidrs, scope=scope)
+    if result.get('status') == 'error':
+        raise RuntimeError(result['message'])
+    return result
+
+
+_scan_event_at = {}
+
+def _publish_scan_event(job):
+    """Forward job progress to the live feed, at most 4/s per job plus every phase change."""
+    now = time.time()
+    last = _scan_event_at.get(job.id)
+    if job.active and last and last[0] == job.phase and now - last[1] < 0.25:
+        return
+    if job.active:
+        _scan_event_at[job.id] = (job.phase, now)
+    else:
+        _scan_event_at.pop(job.id, None)
+    hub.publish('scan', job.snapshot(include_result=False, include_devices=False))
+
+
+scan_jobs = ScanJobManager(_run_scan_job, listener=_publish_scan_event)
+
+
+def _scan_cidrs(value):
+    """`cidrs` from a JSON list or a comma-separated query string → normalised
+    subnets, or None for "every interface". Raises ValueError on a bad CIDR."""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    cidrs = [str(ipaddress.IPv4Network(c.strip(), strict=False)) for c in value if c and c.strip()]
+    return sorted(set(cidrs)) or None
+
+
+def _submit_scan(mode, cidrs=None, scope='all'):
+    """Start a scan job, or join the one already running for these subnets + mode."""
+    mode = 'incremental' if mode == 'incremental' else 'full'
+    scope = 'primary' if scope == 'primary' else 'all'
+    subnets = cidrs or sorted(t['subnet'] for t in net_sc.plan_targets(scope=scope))
+    key = f"{','.join(subnets) or 'unknown'}:{mode}"
+    return scan_jobs.submit(key, mode=mode, cidrs=cidrs, scope=scope)
+
+
+def _job_accepted(job, joined):
+    return jsonify({
+        'status': 'accepted',
+        'job_id': job.id,
+        'joined': joined,
+        'poll': f'/api/scan/jobs/{job.id}',
+        'stream': f'/api/scan/jobs/{job.id}/stream',
+    }), 202
+
+
+@app.route('/api/scan/full', methods=['GET', 'POST'])
+def full_scan():
+    # ?async=1 returns a job id at once; otherwise wait on the (shared) job
+    body = request.get_json(silent=True) or {}
+    try:
+        cidrs = _scan_cidrs(body.get('cidrs') or request.args.get('cidrs'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': f'Invalid CIDR: {e}'}), 400
+    job, joined = _submit_scan(request.args.get('mode'), cidrs, body.get('scope') or request.args.get('scope'))
+    if request.args.get('async') in ('1', 'true'):
+        return _job_accepted(job, joined)
+    job.wait()
+    if job.status == 'error':
+        return jsonify({'status': 'error', 'message': job.error}), 400
+    # a finished job's result never changes — its id is the version
+    return _send(lambda: _scan_payload(job.result), version=job.id)
+
+
+@app.route('/api/scan/jobs', methods=['POST'])
+def start_scan_job():
+    body = request.get_json(silent=True) or {}
+    try:
+        cidrs = _scan_cidrs(body.get('cidrs') or request.args.get('cidrs'))
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': f'Invalid CIDR: {e}'}), 400
+    job, joined = _submit_scan(body.get('mode') or request.args.get('mode'), cidrs,
+                               body.get('scope') or request.args.get('scope'))
+    return _job_accepted(job, joined)
+
+
+@app.route('/api/scan/jobs', methods=['GET'])
+def list_scan_jobs():
+    return jsonify(scan_jobs.list())
+
+
+@app.route('/api/scan/jobs/<job_id>', methods=['GET'])
+def scan_job_status(job_id):
+    job = scan_jobs.get(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Unknown job'}), 404
+    snap = job.snapshot()
+    if 'result' in snap:
+        snap['result'] = _scan_payload(snap['result'])
+    return _send(lambda: snap)
+
+
+@app.route('/api/scan/jobs/<job_id>/stream', methods=['GET'])
+def scan_job_stream(job_id):
+    job = scan_jobs.get(job_id)
+    if not job:
+        return jsonify({'status': 'error', 'message': 'Unknown job'}), 404
+
+    def events():
+        for snap in scan_jobs.stream(job):
+            if snap is None:
+                yield ': keep-alive\n\n'
+            else:
+                event = 'progress' if snap['status'] in ('queued', 'running') else snap['status']
+                yield f"event: {event}\ndata: {json.dumps(snap)}\n\n"
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 @app.route('/api/scan/connected', methods=['GET'])
@@ -638,21 +844,119 @@ def scan_connected():
     return jsonify({'status': 'success', 'timestamp': datetime.now().isoformat(), 'connected_network': connected})
 
 
+@app.route('/api/devices', methods=['GET'])
+def scan_devices():
+    # ?scan_id= (default: latest scan) &cursor= (next_cursor of the last page) &limit=
+    if not DB_AVAILABLE:
+        return jsonify({'error': 'Database not available'}), 503
+    limit = min(max(request.args.get('limit', DEVICE_PAGE, type=int), 1), MAX_DEVICE_PAGE)
+    page = get_scan_devices(request.args.get('scan_id', type=int), request.args.get('cursor', 0, type=int), limit)
+    if page is None:
+        return jsonify({'status': 'error', 'message': 'Unknown scan'}), 404
+    return _send(lambda: {'status': 'success', **page})
+
+
+@app.route('/api/devices/stream', methods=['GET'])
+def stream_devices():
+    # Every device of a scan as NDJSON, one object per line, read in keyset pages
+    if not DB_AVAILABLE:
+        return jsonify({'error': 'Database not available'}), 503
+    first = get_scan_devices(request.args.get('scan_id', type=int), 0, MAX_DEVICE_PAGE)
+    if first is None:
+        return jsonify({'status': 'error', 'message': 'Unknown scan'}), 404
+
+    def lines():
+        page = first
+        while True:
+            for d in page['devices']:
+                yield json.dumps(d) + '\n'
+            if page['next_cursor'] is None:
+                return
+            page = get_scan_devices(page['scan_id'], page['next_cursor'], MAX_DEVICE_PAGE)
+
+    return Response(lines(), mimetype='application/x-ndjson',
+                    headers={'X-Scan-Id': str(first['scan_id']), 'X-Total-Count': str(first['total'])})
+
+
 @app.route('/api/traffic/live', methods=['GET'])
 def live_traffic():
-    t1 = get_real_traffic()
-    time.sleep(1)
-    t2 = get_real_traffic()
+    # Rates come from the shared sampler — no per-request sleep
+    sampler.start()
+    sample = sampler.latest(wait=2 * sampler.interval) or {}
+    total = sample.get('total', {})
+    window = int(request.args.get('window', 60))
     return jsonify({
-        'current': t2,
+        'current': get_real_traffic(),
         'rate': {
-            'bytes_sent_per_sec': max(0, (t2.get('bytes_sent_raw', 0) or 0) - (t1.get('bytes_sent_raw', 0) or 0)),
-            'bytes_recv_per_sec': max(0, (t2.get('bytes_recv_raw', 0) or 0) - (t1.get('bytes_recv_raw', 0) or 0)),
+            'bytes_sent_per_sec': total.get('bytes_sent_per_sec', 0),
+            'bytes_recv_per_sec': total.get('bytes_recv_per_sec', 0),
         },
+        'sampled_at': sample.get('ts'),
+        'nics': sample.get('nics', {}),
+        'window_stats': sampler.stats(window),
         'interfaces': net_sc.get_interface_stats()
     })
 
 
+@app.route('/api/stream', methods=['GET'])
+def live_stream():
+    """SSE push channel: ?topics=traffic,alert,scan (default all)."""
+    sampler.start()
+    topics = {t for t in request.args.get('topics', '').split(',') if t} or None
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        last_id = None
+    return Response(hub.listen(topics, last_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# ─────────────────────────────────────────────
+#  RESPONSES — negotiated encoding, compression, ETags
+# ─────────────────────────────────────────────
+bodies = BodyCache()
+
+
+def _send(load, version=None, rows=False):
+    """
+    Encode `load()` for this request (see wire.py): ?format=columnar|msgpack,
+    gzip/brotli by Accept-Encoding. With a `version` (e.g. DB change
+    counters) the response gets a strong ETag, a matching If-None-Match is
+    answered 304 and the encoded body is reused — `load` is not called.
+    """
+    fmt = negotiate_format(request.args.get('format'), request.headers.get('Accept'), rows)
+    coding = negotiate_coding(request.headers.get('Accept-Encoding'))
+    etag = None
+    if version is not None:
+        etag = make_etag(request.path, sorted(request.args.items(multi=True)), version, fmt, coding)
+    if etag and request.if_none_match.contains(etag):
+        resp = app.response_class(status=304)
+    else:
+        body, mimetype, used = bodies.render(load, fmt, coding, etag)
+        resp = app.response_class(body, mimetype=mimetype)
+        if used:
+            resp.headers['Content-Encoding'] = used
+    if etag:
+        resp.set_etag(etag)
+        resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['Vary'] = 'Accept, Accept-Encoding'
+    return resp
+
+
+def _scan_payload(result):
+    """A scan result as sent to clients: the device list goes out once, as
+    connected_devices with type / open_ports / threat_level filled in.
+    ?include=devices also sends the old `devices` copy."""
+    if not result or 'devices' not in result:
+        return result
+    payload = {k: v for k, v in result.items() if k != 'devices'}
+    payload['connected_devices'] = result['devices']
+    if request.args.get('include') == 'devices':
+        payload['devices'] = result['devices']
+    return payload
+
+
 # ─────────────────────────────────────────────
 #  HISTORY & DASHBOARD ENDPOINTS
 # ─────────────────────────────────────────────
@@ -660,7 +964,9 @@ def live_traffic():
 def dashboard():
     if not DB_AVAILABLE:
         return jsonify({'error': 'Database not available — run database.py first'}), 503
-    return jsonify(get_dashboard_summary())
+    # Served from the write-through cache; an unchanged poll is a bare 304
+    summary, etag = get_dashboard_snapshot()
+    return _send(lambda: summary, version=etag)
 
 
 @app.route('/api/history/scans', methods=['GET'])
@@ -668,7 +974,7 @@ def scan_history():
     if not DB_AVAILABLE:
         return jsonify({'error': 'Database not available'}), 503
     limit = int(request.args.get('limit', 50))
-    return jsonify(get_scan_history(limit))
+    return _send(lambda: get_scan_history(limit), version=get_change_versions('scans'), rows=True)
 
 
 @app.route('/api/history/alerts', methods=['GET'])
@@ -677,22 +983,62 @@ def alert_history():
         return jsonify({'error': 'Database not available'}), 503
     limit = int(request.args.get('limit', 50))
     unacked = request.args.get('unacked', 'false').lower() == 'true'
-    return jsonify(get_recent_alerts(limit, unacked))
+    return _send(lambda: get_recent_alerts(limit, unacked), version=get_change_versions('alerts'), rows=True)
 
 
 @app.route('/api/history/traffic', methods=['GET'])
 def traffic_history():
+    hours = float(request.args.get('hours', 24))
+    # Ranges the in-memory store still covers come from it at 1s+ resolution
+    seconds = hours * 3600
+    if sampler.store.span() >= seconds - sampler.interval:
+        step = max(1, math.ceil(seconds / 900))   # at most ~900 points
+        return _send(lambda: [{**row, 'tier': f'{step}s'} for row in sampler.history(seconds, step=step)],
+                     rows=True)
     if not DB_AVAILABLE:
         return jsonify({'error': 'Database not available'}), 503
-    hours = int(request.args.get('hours', 24))
-    return jsonify(get_traffic_history(hours))
+    return _send(lambda: get_traffic_history(hours), rows=True)
 
 
 @app.route('/api/history/devices', methods=['GET'])
 def device_history():
     if not DB_AVAILABLE:
         return jsonify({'error': 'Database not available'}), 503
-    return jsonify(get_known_devices())
+    # per-scan upserts move 'scans'; new MACs and hostname updates move 'known_devices'
+    return _send(get_known_devices, version=get_change_versions('scans', 'known_devices'), rows=True)
+
+
+@app.route('/api/predict/rescore', methods=['GET', 'POST'])
+def rescore_history():
+    # What-if over stored scans, e.g. POST {"weights": {"encryption": 0.35},
+    # "labels": {"HIGH": 40}, "since": "2025-01-01"} or ?weight=encryption=0.35&label=HIGH=40
+    if not DB_AVAILABLE:
+        return jsonify({'error': 'Database not available'}), 503
+    body = request.get_json(silent=True) or {}
+    try:
+        weights = parse_weights([f'{k}={v}' for k, v in (body.get('weights') or {}).items()] +
+                                request.args.getlist('weight'))
+        labels = parse_labels([f'{k}={v}' for k, v in (body.get('labels') or {}).items()] +
+                              request.args.getlist('label'))
+        limit = min(int(body.get('limit') or request.args.get('limit', RESCORE_LIMIT)), RESCORE_LIMIT)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    features = get_scan_features(body.get('since') or request.args.get('since'),
+                                 body.get('until') or request.args.get('until'), limit, risky_ports=RISKY_PORTS)
+    return _send(lambda: {'status': 'success', **rescore(features, weights, labels, predictor)})
+
+
+@app.route('/api/rules', methods=['GET'])
+def rules_status():
+    return jsonify({'status': 'success', **rules.summary()})
+
+
+@app.route('/api/rules/reload', methods=['POST'])
+def rules_reload():
+    # the file is also picked up on its own within RELOAD_CHECK seconds of an edit
+    rules.reload(force=True)
+    info = rules.summary()
+    return jsonify({'status': 'error' if info['error'] else 'success', **info}), 400 if info['error'] else 200
 
 
 @app.route('/api/arp/status', methods=['GET'])
@@ -705,18 +1051,18 @@ def arp_status():
     # Check for spoofing using DB history if available
     spoofing_detected = False
     suspicious_ips = []
+    conflicts = {}
+    analysis_ms = None
 
     if DB_AVAILABLE:
         try:
-            from database import get_arp_history
-            for ip, mac in current_arp.items():
-                history = get_arp_history(ip, hours=24)
-                # Get unique MACs seen for this IP in last 24h
-                past_macs = set(h['mac'] for h in history if h.get('mac'))
-                if len(past_macs) > 1 and mac not in past_macs:
-                    suspicious_ips.append(ip)
-                    if ip == gateway_ip:
-                        spoofing_detected = True
+            from database import analyze_arp_spoofing
+            # Whole table in one grouped query: IPs bound to >1 MAC in 24h
+            t0 = time.perf_counter()
+            conflicts = analyze_arp_spoofing(current_arp, hours=24)
+            analysis_ms = round((time.perf_counter() - t0) * 1000, 3)
+            suspicious_ips = sorted(conflicts, key=lambda x: list(map(int, x.split('.'))))
+            spoofing_detected = gateway_ip in conflicts
         except Exception as e:
             print(f"[ARP] History check error: {e}")
 
@@ -726,6 +1072,8 @@ def arp_status():
         'gateway_mac': gateway_mac,
         'spoofing_detected': spoofing_detected,
         'suspicious_ips': suspicious_ips,
+        'conflicts': conflicts,
+        'analysis_ms': analysis_ms,
         'total_entries': len(current_arp),
         'last_checked': datetime.now().isoformat(),
     })
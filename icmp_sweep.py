@@ -0,0 +1,285 @@
+"""
+GARUDA ICMP Sweep Engine
+One socket for the whole sweep: echo requests go out at a fixed rate,
+replies are matched back to targets by identifier + sequence number.
+Raw socket when privileged, unprivileged SOCK_DGRAM ICMP when
+net.ipv4.ping_group_range allows it, `ping` subprocesses otherwise.
+"""
+
+import os
+import errno
+import socket
+import struct
+import time
+import select
+import random
+import platform
+import subprocess
+import concurrent.futures
+
+OS = platform.system()
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+DEFAULT_RATE = 1000        # echo requests per second
+DEFAULT_TIMEOUT = 1.0      # seconds to wait after the last send
+FALLBACK_WORKERS = 100     # thread pool size for the subprocess path
+
+
+# ─────────────────────────────────────────────
+#  PACKET HELPERS
+# ─────────────────────────────────────────────
+
+def checksum(data: bytes) -> int:
+    """RFC 1071 internet checksum."""
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo(ident: int, seq: int, payload: bytes = b'GARUDA') -> bytes:
+    header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    csum = checksum(header + payload)
+    return struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, csum, ident, seq) + payload
+
+
+def parse_reply(packet: bytes, has_ip_header: bool):
+    """Return (type, ident, seq) or None if the packet is too short."""
+    offset = 0
+    if has_ip_header:
+        if not packet:
+            return None
+        offset = (packet[0] & 0x0F) * 4
+    if len(packet) < offset + 8:
+        return None
+    icmp_type, _code, _csum, ident, seq = struct.unpack('!BBHHH', packet[offset:offset + 8])
+    return icmp_type, ident, seq
+
+
+def ping_subprocess(ip, timeout=0.5):
+    """Single `ping` fork — the portable fallback path."""
+    try:
+        cmd = ["ping", "-n", "1", "-w", str(int(timeout*1000)), ip] if OS == "Windows" \
+              else ["ping", "-c", "1", "-W", str(max(1, int(timeout))), ip]
+        r = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout+1)
+        return r.returncode == 0
+    except:
+        return False
+
+
+# ─────────────────────────────────────────────
+#  SWEEPER
+# ─────────────────────────────────────────────
+
+class ICMPSweeper:
+    """
+    Rate-limited ICMP echo sweep over a single socket.
+
+    Sweep time is roughly len(ips) / rate + timeout regardless of host count,
+    instead of one fork/exec per address.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, timeout=DEFAULT_TIMEOUT, fallback=None,
+                 fallback_workers=FALLBACK_WORKERS):
+        self.rate = max(1, rate)
+        self.timeout = timeout
+        self.fallback = fallback or ping_subprocess
+        self.fallback_workers = fallback_workers
+        self._mode = None
+
+    def open_socket(self):
+        """Return (sock, mode) with mode in 'raw' / 'dgram', or (None, 'subprocess')."""
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            return sock, 'raw'
+        except (PermissionError, OSError):
+            pass
+        if OS != "Windows":
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+                return sock, 'dgram'
+            except (PermissionError, OSError):
+                pass
+        return None, 'subprocess'
+
+    @property
+    def mode(self):
+        """Which send path this host supports (probed once)."""
+        if self._mode is None:
+            sock, self._mode = self.open_socket()
+            if sock:
+                sock.close()
+        return self._mode
+
+    def sweep(self, ips, timeout=None, rate=None, on_reply=None, controller=None):
+        """
+        Ping every address in `ips`.
+        Returns {ip: rtt_seconds} for hosts that answered.
+        `on_reply(ip, rtt)` is called as replies arrive.
+        With a `controller` (scan_profile.SweepController) the rate and
+        timeout adapt while the sweep runs, canaries measure loss, and
+        silent hosts get the retry rounds the controller asks for.
+        """
+        ips = list(ips)
+        timeout = self.timeout if timeout is None else timeout
+        rate = rate or self.rate
+        if not ips:
+            return {}
+
+        sock, mode = self.open_socket()
+        self._mode = mode
+        if sock is None:
+            return self._sweep_subprocess(ips, controller.timeout if controller else timeout, on_reply)
+        try:
+            return self._sweep_socket(sock, mode, ips, timeout, rate, on_reply, controller)
+        finally:
+            sock.close()
+
+    def _sweep_socket(self, sock, mode, ips, timeout, rate, on_reply, controller=None):
+        sock.setblocking(False)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        except OSError:
+            pass
+
+        if mode == 'dgram':
+            # Linux ping sockets rewrite the identifier to the bound port
+            sock.bind(('', 0))
+            ident = sock.getsockname()[1] & 0xFFFF
+        else:
+            ident = (os.getpid() ^ random.getrandbits(16)) & 0xFFFF
+
+        alive = {}
+        seq = self._round(sock, mode, ident, 0, ips, alive, timeout, rate, on_reply, controller)
+        if controller:
+            for _ in range(controller.retries):
+                retry = controller.retry_targets(ips, alive)
+                if not retry:
+                    break
+                seq = self._round(sock, mode, ident, seq, retry, alive, timeout, rate, on_reply, controller)
+        return alive
+
+    def _round(self, sock, mode, ident, next_seq, ips, alive, timeout, rate, on_reply, controller):
+        """One pass over `ips`; replies land in `alive`. Returns the next free sequence number."""
+        has_ip_header = (mode == 'raw')
+        # seq → (ip, send time); seq space wraps at 65536 so large sweeps
+        # reuse numbers only after the earlier probe has long been sent
+        pending = {}
+        canaries = {}     # seq → (ip, send time)
+        interval = 1.0 / (controller.rate if controller else rate)
+        next_send = time.monotonic()
+        idx = 0
+        deadline = None
+
+        while True:
+            now = time.monotonic()
+
+            # Canary to the gateway / an early responder, then expire old ones
+            if controller and deadline is None:
+                target = controller.canary_due(now)
+                if target:
+                    seq = next_seq & 0xFFFF
+                    try:
+                        sock.sendto(build_echo(ident, seq), (target, 0))
+                        canaries[seq] = (target, now)
+                        next_seq += 1
+                    except OSError:
+                        pass
+                for seq, (ip, sent_at) in list(canaries.items()):
+                    if now - sent_at > controller.canary_timeout:
+                        del canaries[seq]
+                        controller.on_canary(ip, None, now)
+                interval = 1.0 / controller.rate
+
+            # Send everything that is due
+            while idx < len(ips) and now >= next_send:
+                ip = ips[idx]
+                seq = next_seq & 0xFFFF
+                try:
+                    sock.sendto(build_echo(ident, seq), (ip, 0))
+                    pending[seq] = (ip, time.monotonic())
+                    idx += 1
+                    next_seq += 1
+                    next_send += interval
+                except BlockingIOError:
+                    break
+                except OSError as e:
+                    if e.errno == errno.ENOBUFS:   # back off and retry
+                        if controller:
+                            controller.on_congestion(now)
+                            interval = 1.0 / controller.rate
+                        next_send = now + interval * 10
+                        break
+                    idx += 1             # unreachable / bad address — skip
+                    next_seq += 1
+                    next_send += interval
+                now = time.monotonic()
+
+            if idx >= len(ips) and deadline is None:
+                deadline = time.monotonic() + (controller.timeout if controller else timeout)
+            if deadline is not None and (now >= deadline or not pending):
+                break
+
+            wait = (deadline - now) if deadline is not None else max(0.0, next_send - now)
+            r, _, _ = select.select([sock], [], [], max(0.0, min(wait, 0.05)))
+            if not r:
+                continue
+
+            # Drain every reply that is waiting
+            while True:
+                try:
+                    packet, addr = sock.recvfrom(2048)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    break
+                parsed = parse_reply(packet, has_ip_header)
+                if not parsed:
+                    continue
+                icmp_type, r_ident, r_seq = parsed
+                if icmp_type != ICMP_ECHO_REPLY or r_ident != ident:
+                    continue
+                canary = canaries.pop(r_seq, None)
+                if canary:
+                    if canary[0] == addr[0]:
+                        controller.on_canary(canary[0], time.monotonic() - canary[1])
+                    else:
+                        canaries[r_seq] = canary
+                    continue
+                entry = pending.get(r_seq)
+                if not entry or entry[0] != addr[0]:
+                    continue
+                ip, sent_at = entry
+                del pending[r_seq]
+                rtt = time.monotonic() - sent_at
+                alive[ip] = rtt
+                if controller:
+                    controller.on_reply(ip, rtt)
+                if on_reply:
+                    on_reply(ip, rtt)
+
+        return next_seq
+
+    def _sweep_subprocess(self, ips, timeout, on_reply):
+        alive = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.fallback_workers) as ex:
+            started = {}
+            future_to_ip = {}
+            for ip in ips:
+                started[ip] = time.monotonic()
+                future_to_ip[ex.submit(self.fallback, ip, timeout)] = ip
+            for future in concurrent.futures.as_completed(future_to_ip):
+                ip = future_to_ip[future]
+                try:
+                    if future.result():
+                        rtt = time.monotonic() - started[ip]
+                        alive[ip] = rtt
+                        if on_reply:
+                            on_reply(ip, rtt)
+                except:
+                    pass
+        return alive
@@ -0,0 +1,105 @@
+"""
+GARUDA Incremental Rescans
+Uses what the last scans already found to keep each tick cheap:
+  • previously live hosts are re-checked every tick
+  • the rest of the address space is swept in rotating slices
+  • only new / changed hosts (and the current slice) get a full port probe,
+    steady hosts are re-checked on their known-open ports only
+A host that appears anywhere is therefore caught within `slices` ticks,
+or immediately if it shows up in the ARP table.
+"""
+
+import ipaddress
+
+DEFAULT_SLICES = 12       # ticks to cover the whole address space once
+DEFAULT_FULL_EVERY = 0    # force a full sweep every N ticks (0 = never)
+
+
+class IncrementalScanner:
+    def __init__(self, slices=DEFAULT_SLICES, full_every=DEFAULT_FULL_EVERY, state_loader=None):
+        self.slices = max(1, slices)
+        self.full_every = full_every
+        self.state_loader = state_loader
+        self._ticks = {}     # network_range → ticks run so far
+
+    def _load_state(self):
+        if self.state_loader is None:
+            from database import get_recent_device_state
+            self.state_loader = get_recent_device_state
+        try:
+            return self.state_loader()
+        except Exception as e:
+            print(f"[INCREMENTAL] Could not load prior state: {e}")
+            return {}
+
+    def plan(self, network_range, always=()):
+        """
+        Decide what this tick sweeps. Returns a plan dict:
+          mode       'full' or 'incremental'
+          sweep_ips  addresses to ping this tick
+          prior      ip → {mac, open_ports} from the database
+          slice      index of the rotating slice swept this tick
+        `always` adds addresses (gateway, local IP) to every sweep.
+        """
+        network = ipaddress.IPv4Network(network_range, strict=False)
+        all_ips = [str(ip) for ip in network.hosts()]
+        tick = self._ticks.get(network_range, 0)
+        self._ticks[network_range] = tick + 1
+        slice_idx = tick % self.slices
+
+        prior = {ip: s for ip, s in self._load_state().items()
+                 if ipaddress.IPv4Address(ip) in network}
+
+        forced = self.full_every and tick % self.full_every == 0
+        if not prior or forced:
+            return {'mode': 'full', 'tick': tick, 'slice': slice_idx,
+                    'sweep_ips': all_ips, 'prior': prior, 'slice_ips': set(all_ips)}
+
+        # Interleaved slices spread each tick's probes across the subnet
+        slice_ips = {ip for i, ip in enumerate(all_ips) if i % self.slices == slice_idx}
+        sweep = set(prior) | slice_ips | {ip for ip in always if ip}
+        sweep_ips = [ip for ip in all_ips if ip in sweep]
+        return {'mode': 'incremental', 'tick': tick, 'slice': slice_idx,
+                'sweep_ips': sweep_ips, 'prior': prior, 'slice_ips': slice_ips}
+
+    def port_targets(self, plan, devices, ports):
+        """
+        Build ip → [ports to probe] for the devices found this tick.
+        New hosts, hosts whose MAC changed and hosts in the current slice
+        get every port; steady hosts only their previously open ones.
+        """
+        prior = plan['prior']
+        targets = {}
+        changes = {'new': [], 'mac_changed': [], 'gone': []}
+        seen = set()
+        for d in devices:
+            ip = d['ip']
+            seen.add(ip)
+            before = prior.get(ip)
+            mac = d.get('mac')
+            if plan['mode'] == 'full' or before is None:
+                if before is None:
+                    changes['new'].append(ip)
+                targets[ip] = list(ports)
+            elif mac and before.get('mac') and mac not in ('Unknown', before['mac']):
+                changes['mac_changed'].append(ip)
+                targets[ip] = list(ports)
+            elif ip in plan['slice_ips']:
+                targets[ip] = list(ports)
+            elif before.get('open_ports'):
+                targets[ip] = list(before['open_ports'])
+        swept = set(plan['sweep_ips'])
+        changes['gone'] = [ip for ip in prior if ip not in seen and ip in swept]
+        return targets, changes
+
+    def port_targets_for(self, plans, devices, ports):
+        """port_targets() over several subnets at once; `plans` is {subnet: plan}
+        and each device is matched to its plan by its 'subnet' label."""
+        targets = {}
+        changes = {'new': [], 'mac_changed': [], 'gone': []}
+        for subnet, plan in plans.items():
+            t, c = self.port_targets(plan, [d for d in devices if d.get('subnet') == subnet], ports)
+            targets.update(t)
+            for key in changes:
+                changes[key] += c[key]
+        return targets, changes
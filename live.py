@@ -0,0 +1,201 @@
+"""
+GARUDA Live Feed
+One sampler thread reads per-NIC counters at a fixed cadence into the
+time-series ring buffers, and one event hub fans traffic samples, new
+alerts and scan progress out to every connected client — N dashboards
+cost one sampler, not N sleeping request threads.
+"""
+
+import json
+import time
+import threading
+import itertools
+import collections
+
+import psutil
+
+from timeseries import TimeSeriesStore, COUNTERS, TOTAL
+
+SAMPLE_INTERVAL = 1.0     # seconds between counter reads
+SAMPLE_HISTORY = 3600     # slots per NIC in the ring buffers (1 hour at 1s)
+FLUSH_EVERY = 60          # sampler ticks between flushes of complete minutes
+EVENT_BACKLOG = 512       # events kept for slow / reconnecting clients
+ALERT_POLL_EVERY = 5      # sampler ticks between alert table polls
+HEARTBEAT = 15            # seconds of silence before a keep-alive comment
+
+
+# ─────────────────────────────────────────────
+#  EVENT HUB
+# ─────────────────────────────────────────────
+class EventHub:
+    """
+    A single numbered event log shared by every subscriber. Publishing is
+    O(1) and serialises the payload once; each client just remembers the
+    last id it sent, so a slow client never holds up the others (it skips
+    ahead once its events fall out of the backlog).
+    """
+
+    def __init__(self, backlog=EVENT_BACKLOG):
+        self._events = collections.deque(maxlen=backlog)   # (id, event, json)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self.subscribers = 0
+
+    def publish(self, event, data):
+        payload = json.dumps(data, default=str)
+        with self._cond:
+            self._seq += 1
+            self._events.append((self._seq, event, payload))
+            self._cond.notify_all()
+        return self._seq
+
+    def _after(self, seq):
+        if not self._events:
+            return []
+        start = max(0, seq - self._events[0][0] + 1)
+        return list(itertools.islice(self._events, start, None))
+
+    def listen(self, topics=None, last_id=None, heartbeat=HEARTBEAT):
+        """
+        Generator of SSE-formatted chunks for one client. `last_id`
+        (the Last-Event-ID header) resumes from the backlog after a reconnect.
+        """
+        with self._cond:
+            seq = self._seq if last_id is None else min(last_id, self._seq)
+            self.subscribers += 1
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq > seq, heartbeat)
+                    pending = self._after(seq)
+                if not pending:
+                    yield ': keep-alive\n\n'
+                    continue
+                for event_id, event, payload in pending:
+                    seq = event_id
+                    if topics and event not in topics:
+                        continue
+                    yield f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+
+# ─────────────────────────────────────────────
+#  ALERT TAIL
+# ─────────────────────────────────────────────
+class AlertTail:
+    """Publishes alerts written by any process (monitor.py included) as they appear."""
+
+    def __init__(self, hub, fetch_since, fetch_latest):
+        self.hub = hub
+        self.fetch_since = fetch_since      # after_id → [alert dicts], oldest first
+        self.fetch_latest = fetch_latest    # () → [newest alert] or []
+        self.last_id = None
+
+    def poll(self):
+        try:
+            if self.last_id is None:
+                latest = self.fetch_latest()
+                self.last_id = latest[0]['id'] if latest else 0
+                return 0
+            alerts = self.fetch_since(self.last_id)
+        except Exception as e:
+            print(f"[LIVE] Alert poll failed: {e}")
+            return 0
+        for alert in alerts:
+            self.last_id = alert['id']
+            self.hub.publish('alert', alert)
+        return len(alerts)
+
+
+# ─────────────────────────────────────────────
+#  TRAFFIC SAMPLER
+# ─────────────────────────────────────────────
+class TrafficSampler:
+    """
+    `flush(minutes)` receives complete per-minute aggregates of the TOTAL
+    series every FLUSH_EVERY ticks (e.g. database.save_live_traffic).
+    """
+
+    def __init__(self, hub=None, interval=SAMPLE_INTERVAL, history=SAMPLE_HISTORY,
+                 alerts=None, flush=None):
+        self.hub = hub
+        self.interval = interval
+        self.alerts = alerts
+        self.flush = flush
+        self.store = TimeSeriesStore(capacity=history)
+        self._last = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the sampler thread once; later calls are no-ops."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='traffic-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        next_at = time.monotonic()
+        for tick in itertools.count():
+            try:
+                self.sample()
+                if self.alerts and tick % ALERT_POLL_EVERY == 0:
+                    self.alerts.poll()
+                if self.flush and tick % FLUSH_EVERY == FLUSH_EVERY - 1:
+                    self.store.flush(self.flush)
+            except Exception as e:
+                print(f"[LIVE] Sampler error: {e}")
+            # Fixed cadence — drift from slow reads doesn't accumulate
+            next_at += self.interval
+            if self._stop.wait(max(0, next_at - time.monotonic())):
+                return
+
+    def sample(self):
+        """Read every NIC once into the store and publish cumulative counters + rates."""
+        now = time.time()
+        self.store.record(now, psutil.net_io_counters(pernic=True))
+        if self.store.latest() is None:
+            return None            # first reading — no rates yet
+
+        nics = {}
+        total = dict.fromkeys(COUNTERS, 0)
+        for name, series in self.store.nics.items():
+            if name == TOTAL or series.last_ts != now:
+                continue
+            row = dict(zip(COUNTERS, series.last))
+            latest = series.latest()
+            fresh = latest and latest['ts'] == now
+            for k in ('bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv'):
+                row[k + '_per_sec'] = latest[k + '_per_sec'] if fresh else 0
+            nics[name] = row
+            for k, v in row.items():
+                total[k] = total.get(k, 0) + v
+
+        sample = {'ts': now, 'interval': self.store.latest()['interval'], 'total': total, 'nics': nics}
+        self._last = sample
+        self._ready.set()
+        if self.hub:
+            self.hub.publish('traffic', sample)
+        return sample
+
+    def latest(self, wait=None):
+        """Most recent sample with a rate; waits up to `wait` seconds on a cold start."""
+        if wait:
+            self._ready.wait(wait)
+        return self._last
+
+    def stats(self, seconds=60, nic=TOTAL):
+        return self.store.stats(seconds, nic)
+
+    def history(self, seconds, nic=TOTAL, step=1):
+        return self.store.history(seconds, nic, step)
@@ -18,25 +18,36 @@ sys.path.insert(0, os.path.dirname(__file__))
 from database import (
     init_db, save_scan, save_alert,
     get_arp_history, get_known_devices,
-    get_port_changes, get_recent_alerts
+    get_port_changes, get_recent_alerts,
+    run_retention, observe_arp_table
 )
 
 OS = platform.system()
 SCAN_INTERVAL = 300   # seconds between scans (5 min)
-ARP_CHECK_INTERVAL = 30  # seconds between ARP checks (30 sec)
+ARP_CHECK_INTERVAL = 30  # seconds between ARP checks when polling (30 sec)
+ARP_IDLE_RECHECK = 300   # event mode: re-check a quiet table this often to keep bindings fresh
+ARP_ALERT_DEDUPE = 60    # seconds — the wire listener and table watcher report the same flip once
+INCREMENTAL_SLICES = 12  # ticks to sweep the whole subnet once (1 hour at 5 min)
+FULL_SCAN_EVERY = 48     # force a full sweep + port probe every N ticks (4 hours)
 
 # Import scanner classes from backend
-from garuda_backend import WiFiScanner, NetworkScanner, AttackPredictor, get_real_traffic, scan_device_ports, COMMON_PORTS
-import concurrent.futures
+from garuda_backend import WiFiScanner, NetworkScanner, get_real_traffic, scan_ports_bulk, scan_port_plan, COMMON_PORTS
+from predictor import AttackPredictor
+from rules import rules
+from incremental import IncrementalScanner
+from neighbors import neighbors
+from arp_listener import ArpListener
 
 wifi_sc = WiFiScanner()
 net_sc = NetworkScanner()
 predictor = AttackPredictor()
+incremental = IncrementalScanner(slices=INCREMENTAL_SLICES, full_every=FULL_SCAN_EVERY)
 
 # Track state between scans
 _last_arp_table = {}       # ip → mac
 _last_port_state = {}      # ip → set of ports
 _known_macs = set()        # MACs we've seen before
+_arp_alerted = {}          # (ip, mac, kind) → last alert time
 
 
 # ─────────────────────────────────────────────
@@ -82,6 +93,25 @@ $notify.Dispose()
 #  ARP SPOOF DETECTOR
 # ─────────────────────────────────────────────
 
+def raise_arp_alert(alert: dict):
+    """Save + notify one ARP_SPOOF alert, once per (ip, mac, kind) across both detectors."""
+    extra = alert.get('extra') or {}
+    key = (alert['ip'], alert['mac'], extra.get('kind', 'mac_change'))
+    now = time.time()
+    if now - _arp_alerted.get(key, 0) < ARP_ALERT_DEDUPE:
+        return
+    _arp_alerted[key] = now
+    print(f"[ARP ALERT] {alert['description']}")
+    save_alert(alert['type'], alert['severity'], alert['title'], alert['description'],
+               ip=alert['ip'], mac=alert['mac'], extra=extra)
+    notify(alert['title'], alert['description'],
+           urgency='critical' if alert['severity'] == 'CRITICAL' else 'normal')
+
+
+# Passive wire listener — sees flips the moment the packet arrives
+arp_listener = ArpListener(on_alert=raise_arp_alert, gateway=net_sc.get_gateway)
+
+
 def check_arp_spoofing():
     """
     Compare current ARP table with previous snapshot.
@@ -92,6 +122,12 @@ def check_arp_spoofing():
     current_arp = net_sc.get_arp_table()
     gateway_ip = net_sc.get_gateway()
 
+    # Persist binding changes only — a stable table costs no DB writes
+    try:
+        observe_arp_table(current_arp)
+    except Exception as e:
+        print(f"[ARP WATCHER] Binding store error: {e}")
+
     for ip, mac in current_arp.items():
         if ip in _last_arp_table:
             old_mac = _last_arp_table[ip]
@@ -102,10 +138,10 @@ def check_arp_spoofing():
                 title = f'⚠ ARP SPOOFING DETECTED — {"GATEWAY" if is_gateway else ip}'
                 desc = f'IP {ip} changed MAC from {old_mac} to {mac}. {"This is your GATEWAY — possible MITM attack!" if is_gateway else "Possible ARP cache poisoning."}'
 
-                print(f"[ARP ALERT] {desc}")
-                save_alert('ARP_SPOOF', severity, title, desc, ip=ip, mac=mac,
-                          extra={'old_mac': old_mac, 'new_mac': mac, 'is_gateway': is_gateway})
-                notify(title, desc, urgency='critical' if is_gateway else 'normal')
+                raise_arp_alert({'type': 'ARP_SPOOF', 'severity': severity, 'title': title,
+                                 'description': desc, 'ip': ip, 'mac': mac,
+                                 'extra': {'kind': 'mac_change', 'old_mac': old_mac, 'new_mac': mac,
+                                           'is_gateway': is_gateway, 'source': 'arp_table'}})
 
     _last_arp_table = current_arp
 
@@ -150,10 +186,6 @@ def check_port_changes(port_data: dict):
     """Alert if a device suddenly opened a risky port."""
     global _last_port_state
 
-    RISKY = {21: 'FTP', 23: 'Telnet', 135: 'RPC', 139: 'NetBIOS',
-             445: 'SMB', 3389: 'RDP', 5900: 'VNC', 1433: 'MSSQL',
-             3306: 'MySQL', 27017: 'MongoDB', 6379: 'Redis'}
-
     for ip, ports in port_data.items():
         current = set(ports)
 
@@ -164,7 +196,7 @@ def check_port_changes(port_data: dict):
 
         previous = _last_port_state[ip]
         new_ports = current - previous
-        risky_new = {p: RISKY[p] for p in new_ports if p in RISKY}
+        risky_new = rules.current.port_alerts(new_ports)   # port_alert rules, data/rules.json
 
         if risky_new:
             services = ', '.join(f'{name} ({port})' for port, name in risky_new.items())
@@ -199,30 +231,34 @@ def run_full_scan():
         traffic = get_real_traffic()
         local_ip = net_sc.get_local_ip()
         gateway_ip = net_sc.get_gateway()
-        scan_result = net_sc.get_connected_devices()
-        all_devices, total_found, net_size = scan_result if isinstance(scan_result, tuple) else (scan_result, len(scan_result), 'small')
-
-        print(f"[SCAN] Found {len(all_devices)} devices (total: {total_found}, network: {net_size})")
-
-        # Port scan (gateway + local + up to 8 others)
-        targets = [gateway_ip, local_ip] + \
-                  [d['ip'] for d in all_devices if d['ip'] not in (gateway_ip, local_ip)][:8]
-        port_data = {}
-        with concurrent.futures.ThreadPoolExecutor(max_workers=len(targets)) as ex:
-            fm = {ex.submit(scan_device_ports, ip): ip for ip in targets}
-            for future in concurrent.futures.as_completed(fm):
-                ip = fm[future]
-                try:
-                    ports = future.result()
-                    if ports:
-                        port_data[ip] = ports
-                except:
-                    pass
+
+        # Incremental tick per interface subnet: known hosts + one rotating slice
+        targets = net_sc.plan_targets()
+        gateways = {t['gateway'] for t in targets if t['gateway']} | {gateway_ip}
+        local_ips = {t['local_ip'] for t in targets if t['local_ip']} | {local_ip}
+        plans = {t['subnet']: incremental.plan(t['subnet'], always=(t['gateway'], t['local_ip'])) for t in targets}
+        all_devices, total_found, net_size, target_summaries = net_sc.scan_targets(
+            targets, ip_lists={subnet: p['sweep_ips'] for subnet, p in plans.items()})
+
+        print(f"[SCAN] Found {len(all_devices)} devices (total: {total_found}, network: {net_size}, "
+              f"{len(targets)} subnet{'s' if len(targets) != 1 else ''})")
+
+        # Port scan — full probe for new/changed hosts, known ports for steady ones
+        if plans:
+            port_plan, changes = incremental.port_targets_for(plans, all_devices, COMMON_PORTS)
+            for subnet, plan in plans.items():
+                print(f"[SCAN] {subnet} {plan['mode']} tick {plan['tick']}: swept {len(plan['sweep_ips'])} addresses")
+            print(f"[SCAN] {len(changes['new'])} new, {len(changes['mac_changed'])} MAC changes, "
+                  f"{len(changes['gone'])} gone")
+            port_data = scan_port_plan(port_plan)
+        else:
+            port_targets = [gateway_ip, local_ip] + [d['ip'] for d in all_devices]
+            port_data = scan_ports_bulk([ip for ip in dict.fromkeys(port_targets) if ip])
 
         devices = []
         for d in all_devices:
             ip = d['ip']
-            dtype = 'GATEWAY' if ip == gateway_ip else 'THIS_DEVICE' if ip == local_ip else 'NODE'
+            dtype = 'GATEWAY' if ip in gateways else 'THIS_DEVICE' if ip in local_ips else 'NODE'
             devices.append({
                 **d,
                 'type': dtype,
@@ -252,7 +288,8 @@ def run_full_scan():
             'local_ip': local_ip,
             'gateway': gateway_ip,
             'nodes_detected': len(devices),
-            'addresses_scanned': 254,
+            'addresses_scanned': sum(len(p['sweep_ips']) for p in plans.values()),
+            'targets': target_summaries,
             'devices': devices,
             'network_traffic': traffic,
             'connected_devices': all_devices,
@@ -265,6 +302,13 @@ def run_full_scan():
         scan_id = save_scan(scan_result)
         print(f"[SCAN] Saved as scan #{scan_id} — risk: {prediction['risk_score']}% ({prediction['risk_label']})")
 
+        # Roll up / expire old history so the DB stays bounded
+        try:
+            stats = run_retention()
+            print(f"[RETENTION] {stats}")
+        except Exception as e:
+            print(f"[RETENTION ERROR] {e}")
+
         # Run threat checks
         check_new_devices(all_devices)
         check_port_changes(port_data)
@@ -285,18 +329,26 @@ def run_full_scan():
 
 
 # ─────────────────────────────────────────────
-#  ARP WATCHER THREAD (runs every 30 sec)
+#  ARP WATCHER THREAD (netlink events, or every 30 sec)
 # ─────────────────────────────────────────────
 
 def arp_watcher_loop():
-    """Runs in background thread — checks ARP every 30 seconds."""
-    print("[ARP WATCHER] Started")
+    """
+    Runs in background thread. With netlink, wakes the moment an IP→MAC
+    binding changes (plus an idle re-check); otherwise polls every 30 seconds.
+    """
+    event_driven = OS == 'Linux' and neighbors.watch()
+    print(f"[ARP WATCHER] Started ({'netlink events' if event_driven else 'polling'})")
+    version = neighbors.version
     while True:
         try:
             check_arp_spoofing()
         except Exception as e:
             print(f"[ARP WATCHER ERROR] {e}")
-        time.sleep(ARP_CHECK_INTERVAL)
+        if event_driven:
+            version = neighbors.wait_change(version, ARP_IDLE_RECHECK)
+        else:
+            time.sleep(ARP_CHECK_INTERVAL)
 
 
 # ─────────────────────────────────────────────
@@ -308,7 +360,7 @@ def main():
     print("  GARUDA Background Monitor")
     print("=" * 55)
     print(f"  Scan interval:     {SCAN_INTERVAL // 60} minutes")
-    print(f"  ARP check interval: {ARP_CHECK_INTERVAL} seconds")
+    print(f"  ARP check interval: {ARP_CHECK_INTERVAL} seconds (instant with netlink)")
     print(f"  OS: {OS}")
     print("=" * 55)
 
@@ -323,6 +375,13 @@ def main():
     arp_thread = threading.Thread(target=arp_watcher_loop, daemon=True)
     arp_thread.start()
 
+    # Passive ARP capture (needs CAP_NET_RAW) seeded with the current table
+    arp_listener.detector.seed(net_sc.get_arp_table())
+    if arp_listener.start():
+        print("[ARP LISTENER] Capturing ARP on the wire")
+    else:
+        print("[ARP LISTENER] Not available — relying on the ARP table watcher")
+
     notify("GARUDA Monitor Started",
            f"Monitoring your network every {SCAN_INTERVAL // 60} minutes")
 
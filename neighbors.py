@@ -0,0 +1,148 @@
+"""
+GARUDA Neighbour Table
+Linux IPv4 neighbour (ARP) table without forking `arp -a`:
+  • read_proc_arp() parses /proc/net/arp in one pass
+  • NeighborTable keeps a live copy from rtnetlink RTM_NEWNEIGH /
+    RTM_DELNEIGH events, so reads are free and watchers can block until
+    an IP→MAC binding actually changes instead of polling
+Platforms without /proc/net/arp keep the `arp -a` path.
+"""
+
+import socket
+import struct
+import threading
+import time
+
+from netprobe import netlink, RTMGRP_NEIGH, RTM_NEWNEIGH, RTM_DELNEIGH
+
+PROC_ARP = '/proc/net/arp'
+RESYNC_SECONDS = 300      # full /proc re-read, in case netlink dropped events
+
+ATF_COM = 0x2             # /proc/net/arp flag: entry complete
+NDMSG = struct.Struct('=BBHiHBB')   # family, pad, pad, ifindex, state, flags, type
+RTATTR = struct.Struct('=HH')       # len, type
+NDA_DST, NDA_LLADDR = 1, 2
+NUD_INCOMPLETE, NUD_FAILED = 0x01, 0x20
+IGNORED_MACS = ('FF:FF:FF:FF:FF:FF', '00:00:00:00:00:00')
+
+
+def _usable(mac):
+    return mac not in IGNORED_MACS and not mac.startswith('01:00:5E')
+
+
+def read_proc_arp(path=PROC_ARP):
+    """{ip: MAC} for every complete entry in /proc/net/arp, or None if unreadable."""
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()[1:]
+    except OSError:
+        return None
+    table = {}
+    for line in lines:
+        # IP address  HW type  Flags  HW address  Mask  Device
+        fields = line.split()
+        if len(fields) >= 4 and int(fields[2], 16) & ATF_COM:
+            mac = fields[3].upper()
+            if _usable(mac):
+                table[fields[0]] = mac
+    return table
+
+
+def parse_neigh(payload):
+    """(ip, MAC or None, state) from an RTM_*NEIGH payload; None if not IPv4."""
+    if len(payload) < NDMSG.size:
+        return None
+    family, _, _, _, state, _, _ = NDMSG.unpack_from(payload)
+    if family != socket.AF_INET:
+        return None
+    ip = mac = None
+    offset = NDMSG.size
+    while offset + RTATTR.size <= len(payload):
+        length, kind = RTATTR.unpack_from(payload, offset)
+        if length < RTATTR.size:
+            break
+        value = payload[offset + RTATTR.size:offset + length]
+        if kind == NDA_DST and len(value) == 4:
+            ip = socket.inet_ntoa(value)
+        elif kind == NDA_LLADDR and len(value) == 6:
+            mac = ':'.join(f'{b:02X}' for b in value)
+        offset += (length + 3) & ~3
+    return (ip, mac, state) if ip else None
+
+
+class NeighborTable:
+    def __init__(self, path=PROC_ARP, monitor=netlink):
+        self.path = path
+        self.monitor = monitor
+        self._table = None
+        self._synced = 0
+        self._watching = None     # None = not tried yet
+        self._listeners = []
+        self._cond = threading.Condition()
+        self.version = 0          # bumped when a binding is added or changes MAC
+
+    def available(self):
+        return read_proc_arp(self.path) is not None
+
+    def watch(self):
+        """Follow the kernel table through netlink. Returns False if unavailable."""
+        if self._watching is None and self.monitor is not None:
+            # subscribe before the snapshot so nothing slips in between
+            self._watching = self.monitor.subscribe((RTM_NEWNEIGH, RTM_DELNEIGH), self._on_event,
+                                                    groups=RTMGRP_NEIGH)
+            self._resync()
+        return bool(self._watching)
+
+    def on_change(self, callback):
+        """callback(ip, old_mac, new_mac) for every added or re-bound entry."""
+        self._listeners.append(callback)
+
+    def _resync(self):
+        table = read_proc_arp(self.path)
+        if table is None:
+            return
+        with self._cond:
+            if self._table is not None and table != self._table:
+                self.version += 1
+                self._cond.notify_all()
+            self._table = table
+            self._synced = time.monotonic()
+
+    def _on_event(self, msg_type, payload):
+        parsed = parse_neigh(payload)
+        if not parsed:
+            return
+        ip, mac, state = parsed
+        with self._cond:
+            if self._table is None:
+                return
+            old = self._table.get(ip)
+            if msg_type == RTM_DELNEIGH or state & (NUD_INCOMPLETE | NUD_FAILED) or not mac or not _usable(mac):
+                self._table.pop(ip, None)
+                return
+            if old == mac:
+                return            # REACHABLE ↔ STALE churn — nothing to report
+            self._table[ip] = mac
+            self.version += 1
+            self._cond.notify_all()
+        for callback in self._listeners:
+            try:
+                callback(ip, old, mac)
+            except Exception as e:
+                print(f"[NEIGH] Listener error: {e}")
+
+    def table(self):
+        """Current {ip: MAC}; served from memory while netlink is live."""
+        if not self._watching or time.monotonic() - self._synced > RESYNC_SECONDS:
+            self._resync()
+        with self._cond:
+            return dict(self._table) if self._table is not None else None
+
+    def wait_change(self, version, timeout):
+        """Block until a binding changes after `version` or timeout. Returns the new version."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+neighbors = NeighborTable()
@@ -0,0 +1,242 @@
+"""
+GARUDA Environment Probes
+Local IP, gateway, network range and Wi-Fi details barely change while
+the backend runs, yet every scan and poll used to re-probe them (forking
+`ip route`, opening sockets). ProbeCache keeps each answer for a
+per-probe TTL and drops them all the moment rtnetlink reports a link,
+address or route change. On Linux the gateway comes straight from
+/proc/net/route instead of a subprocess.
+"""
+
+import os
+import time
+import select
+import socket
+import struct
+import threading
+
+PROBE_TTLS = {
+    'local_ip': 60,
+    'gateway': 60,
+    'network_range': 60,
+    'connected_network': 15,   # Wi-Fi signal / BSSID can drift
+}
+DEFAULT_TTL = 30
+
+# rtnetlink multicast groups and message types (linux/rtnetlink.h)
+RTMGRP_LINK = 0x1
+RTMGRP_NEIGH = 0x4
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+RTM_NEWLINK, RTM_DELLINK = 16, 17
+RTM_NEWADDR, RTM_DELADDR = 20, 21
+RTM_NEWROUTE, RTM_DELROUTE = 24, 25
+RTM_NEWNEIGH, RTM_DELNEIGH = 28, 29
+NLMSG_HDR = struct.Struct('=IHHII')     # len, type, flags, seq, pid
+
+INTERFACE_EVENTS = (RTM_NEWLINK, RTM_DELLINK, RTM_NEWADDR, RTM_DELADDR, RTM_NEWROUTE, RTM_DELROUTE)
+
+
+def read_gateways(path='/proc/net/route'):
+    """{iface: default gateway} from the kernel routing table, lowest metric per
+    interface, ordered best-first; {} if unreadable."""
+    best = {}
+    try:
+        with open(path) as f:
+            next(f)                               # header
+            for line in f:
+                fields = line.split()
+                # Iface Destination Gateway Flags RefCnt Use Metric ...
+                if len(fields) < 7 or fields[1] != '00000000':
+                    continue
+                flags = int(fields[3], 16)
+                if not flags & 0x2:               # RTF_GATEWAY
+                    continue
+                metric = int(fields[6])
+                if fields[0] not in best or metric < best[fields[0]][0]:
+                    best[fields[0]] = (metric, fields[2])
+    except (OSError, ValueError, StopIteration):
+        return {}
+    return {iface: socket.inet_ntoa(struct.pack('<I', int(gw, 16)))
+            for iface, (_, gw) in sorted(best.items(), key=lambda kv: kv[1][0])}
+
+
+def read_default_gateway(path='/proc/net/route'):
+    """Default IPv4 gateway from the kernel routing table, or None."""
+    return next(iter(read_gateways(path).values()), None)
+
+
+# ─────────────────────────────────────────────
+#  RTNETLINK LISTENER
+# ─────────────────────────────────────────────
+class NetlinkMonitor:
+    """
+    One NETLINK_ROUTE socket and one thread shared by every subscriber.
+    `subscribe(msg_types, callback)` registers callback(msg_type, payload)
+    for raw rtnetlink messages. Linux only — `start()` returns False
+    elsewhere (or without permission), and callers fall back to polling.
+    Subscribing to new groups reopens the socket; a self-pipe wakes the
+    reader so it moves to the new socket at once (closing a netlink
+    socket does not interrupt a blocked recv).
+    """
+
+    def __init__(self, groups=RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE):
+        self.groups = groups
+        self._handlers = []
+        self._sock = None
+        self._retired = []        # replaced sockets, closed by the reader
+        self._wake = None         # (read fd, write fd) self-pipe for the reader
+        self._thread = None
+        self._lock = threading.Lock()
+        self.events = 0
+
+    @property
+    def running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def subscribe(self, msg_types, callback, groups=0):
+        with self._lock:
+            self._handlers.append((frozenset(msg_types), callback))
+            if groups & ~self.groups:
+                if self._sock:
+                    # new socket with the extra groups; the thread picks it up
+                    self._reopen(self.groups | groups)
+                else:
+                    self.groups |= groups
+        return self.start()
+
+    def _reopen(self, groups):
+        try:
+            sock = self._open(groups)
+        except OSError as e:
+            # keep listening on the old socket; a later subscribe retries
+            print(f"[NETLINK] Reopen failed: {e}")
+            return
+        self._retired.append(self._sock)
+        self._sock = sock
+        self.groups = groups
+        os.write(self._wake[1], b'x')
+
+    def _open(self, groups):
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        try:
+            sock.bind((0, groups))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def start(self):
+        if not hasattr(socket, 'AF_NETLINK'):
+            return False
+        with self._lock:
+            if self.running:
+                return True
+            try:
+                self._sock = self._open(self.groups)
+            except OSError as e:
+                print(f"[NETLINK] Unavailable: {e}")
+                return False
+            if self._wake is None:
+                self._wake = os.pipe()
+            self._thread = threading.Thread(target=self._run, name='netlink', daemon=True)
+            self._thread.start()
+        return True
+
+    def _run(self):
+        sock = self._sock
+        while True:
+            if self._sock is not sock:
+                with self._lock:
+                    retired, self._retired = self._retired, []
+                    sock = self._sock
+                for old in retired:
+                    old.close()
+            try:
+                ready, _, _ = select.select([sock, self._wake[0]], [], [])
+                if self._wake[0] in ready:
+                    os.read(self._wake[0], 512)
+                if sock not in ready:
+                    continue
+                data = sock.recv(65536)
+            except OSError:
+                if self._sock is sock:
+                    time.sleep(1)
+                continue
+            offset = 0
+            while offset + NLMSG_HDR.size <= len(data):
+                length, msg_type, _, _, _ = NLMSG_HDR.unpack_from(data, offset)
+                if length < NLMSG_HDR.size:
+                    break
+                payload = data[offset + NLMSG_HDR.size:offset + length]
+                self.events += 1
+                for types, callback in list(self._handlers):
+                    if msg_type in types:
+                        try:
+                            callback(msg_type, payload)
+                        except Exception as e:
+                            print(f"[NETLINK] Handler error: {e}")
+                offset += (length + 3) & ~3
+
+
+netlink = NetlinkMonitor()
+
+
+# ─────────────────────────────────────────────
+#  PROBE CACHE
+# ─────────────────────────────────────────────
+class ProbeCache:
+    def __init__(self, ttls=None, monitor=netlink):
+        self.ttls = dict(PROBE_TTLS, **(ttls or {}))
+        self.monitor = monitor
+        self._values = {}        # name → (value, expires_at)
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._counters = {}      # name → [hits, misses]
+        self.invalidations = 0
+        self._watching = None
+
+    def _watch(self):
+        if self._watching is None and self.monitor is not None:
+            self._watching = self.monitor.subscribe(INTERFACE_EVENTS, lambda *_: self.invalidate())
+
+    def get(self, name, probe, ttl=None):
+        """Return the cached value of `name`, running `probe()` when missing or stale."""
+        self._watch()
+        now = time.monotonic()
+        entry = self._values.get(name)
+        counters = self._counters.setdefault(name, [0, 0])
+        if entry and entry[1] > now:
+            counters[0] += 1
+            return entry[0]
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            # another thread may have refreshed it while we waited
+            entry = self._values.get(name)
+            if entry and entry[1] > time.monotonic():
+                counters[0] += 1
+                return entry[0]
+            counters[1] += 1
+            value = probe()
+            self._values[name] = (value, time.monotonic() + (ttl or self.ttls.get(name, DEFAULT_TTL)))
+            return value
+
+    def invalidate(self, *names):
+        """Drop the named entries, or everything when no names are given."""
+        with self._lock:
+            for name in names or list(self._values):
+                self._values.pop(name, None)
+            self.invalidations += 1
+
+    def stats(self):
+        hits = sum(c[0] for c in self._counters.values())
+        misses = sum(c[1] for c in self._counters.values())
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0,
+            'invalidations': self.invalidations,
+            'invalidation_source': 'netlink' if self._watching else 'ttl',
+            'probes': {name: {'hits': c[0], 'misses': c[1]} for name, c in self._counters.items()},
+        }
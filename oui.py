@@ -0,0 +1,279 @@
+"""
+GARUDA Vendor Lookup
+MAC → vendor from the IEEE registries (MA-L /24, MA-M /28, MA-S /36),
+compiled into one compact sorted-array index:
+  • data/*.csv      IEEE registries (oui.csv, mam.csv, oui36.csv) as
+                    bundled offline copies — drop fresh downloads over
+                    them and the index rebuilds on next use;
+                    oui-seed.csv adds well-known prefixes the IEEE does
+                    not list (QEMU/KVM's locally administered 52:54:00)
+  • oui.idx         compiled index in the user cache dir
+                    ($GARUDA_CACHE_DIR, else $XDG_CACHE_HOME/garuda or
+                    ~/.cache/garuda), memory-mapped on first lookup
+Lookups bisect the /36, /28 then /24 arrays, so the most specific
+assignment wins. Locally administered MACs (phones' per-network random
+addresses, VMs, containers) are flagged instead of reported as unknown.
+
+Build by hand:  python oui.py build [csv ...] [-o path/to/oui.idx]
+Look up:        python oui.py lookup 3C:5A:B4:00:11:22
+"""
+
+import os
+import io
+import csv
+import sys
+import mmap
+import glob
+import bisect
+import struct
+import argparse
+import tempfile
+import threading
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+CACHE_DIR = os.environ.get('GARUDA_CACHE_DIR') or os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'garuda')
+INDEX_PATH = os.path.join(CACHE_DIR, 'oui.idx')
+
+# Registry → prefix width in bits
+REGISTRIES = {'MA-L': 24, 'MA-M': 28, 'MA-S': 36, 'IAB': 36}
+WIDTHS = (36, 28, 24)                  # lookup order: most specific first
+
+RANDOMIZED = 'Private (randomized MAC)'
+
+MAGIC = b'GOUI'
+VERSION = 1
+# magic, version, pad, n36, n28, n24, n_vendors, blob_len, pad → 32 bytes
+HEADER = struct.Struct('<4sHHIIIIII')
+
+
+def mac_to_int(mac):
+    """48-bit integer from 'AA:BB:CC:DD:EE:FF' / 'aa-bb-..' / 'aabb.ccdd.eeff'; None if malformed."""
+    digits = ''.join(ch for ch in mac if ch not in ':-. ')
+    if len(digits) != 12:
+        return None
+    try:
+        return int(digits, 16)
+    except ValueError:
+        return None
+
+
+def is_locally_administered(value):
+    return bool((value >> 40) & 0x02)
+
+
+def is_multicast(value):
+    return bool((value >> 40) & 0x01)
+
+
+# ─────────────────────────────────────────────
+#  COMPILER
+# ─────────────────────────────────────────────
+def parse_registry(paths):
+    """
+    Read IEEE registry CSVs (Registry,Assignment,Organization Name,...).
+    Returns {(bits, prefix): vendor}.
+    """
+    entries = {}
+    for path in paths:
+        with open(path, newline='', encoding='utf-8', errors='replace') as f:
+            for row in csv.DictReader(f):
+                bits = REGISTRIES.get((row.get('Registry') or '').strip())
+                assignment = (row.get('Assignment') or '').strip()
+                name = ' '.join((row.get('Organization Name') or '').split())
+                if not bits or not name or len(assignment) * 4 != bits:
+                    continue
+                try:
+                    entries[(bits, int(assignment, 16))] = name
+                except ValueError:
+                    continue
+    return entries
+
+
+def compile_index(entries):
+    """Serialise {(bits, prefix): vendor} into the on-disk index format."""
+    vendors, vendor_ids = [], {}
+    tables = {w: [] for w in WIDTHS}
+    for (bits, prefix), name in sorted(entries.items()):
+        vid = vendor_ids.get(name)
+        if vid is None:
+            vid = vendor_ids[name] = len(vendors)
+            vendors.append(name)
+        tables[bits].append((prefix, vid))
+
+    blob = io.BytesIO()
+    offsets = [0]
+    for name in vendors:
+        blob.write(name.encode('utf-8'))
+        offsets.append(blob.tell())
+    blob = blob.getvalue()
+
+    out = io.BytesIO()
+    out.write(HEADER.pack(MAGIC, VERSION, 0, len(tables[36]), len(tables[28]), len(tables[24]),
+                          len(vendors), len(blob), 0))
+    # the 64-bit /36 array first keeps every array naturally aligned
+    out.write(struct.pack(f'<{len(tables[36])}Q', *(p for p, _ in tables[36])))
+    for w in WIDTHS:
+        if w != 36:
+            out.write(struct.pack(f'<{len(tables[w])}I', *(p for p, _ in tables[w])))
+    for w in WIDTHS:
+        out.write(struct.pack(f'<{len(tables[w])}I', *(v for _, v in tables[w])))
+    out.write(struct.pack(f'<{len(offsets)}I', *offsets))
+    out.write(blob)
+    return out.getvalue()
+
+
+def build(sources=None, output=INDEX_PATH):
+    """Compile registry CSVs (default: every data/*.csv) into `output`. Returns entry count."""
+    sources = sources or sorted(glob.glob(os.path.join(DATA_DIR, '*.csv')))
+    entries = parse_registry(sources)
+    data = compile_index(entries)
+    directory = os.path.dirname(os.path.abspath(output))
+    os.makedirs(directory, exist_ok=True)
+    # unique temp name: the web process, scan workers and monitor may all rebuild at once
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.oui-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)                 # mkstemp creates 0600
+        os.replace(tmp, output)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return len(entries)
+
+
+# ─────────────────────────────────────────────
+#  INDEX
+# ─────────────────────────────────────────────
+class OuiIndex:
+    """Read-only view over a compiled index held in a bytes object or an mmap."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        magic, version, _, n36, n28, n24, n_vendors, blob_len, _ = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('not a GARUDA OUI index')
+        view = memoryview(buffer)
+        pos = HEADER.size
+        counts = {36: n36, 28: n28, 24: n24}
+        self.prefixes, self.vendor_ids = {}, {}
+        for w in WIDTHS:
+            size = 8 if w == 36 else 4
+            self.prefixes[w] = view[pos:pos + counts[w] * size].cast('Q' if w == 36 else 'I')
+            pos += counts[w] * size
+        for w in WIDTHS:
+            self.vendor_ids[w] = view[pos:pos + counts[w] * 4].cast('I')
+            pos += counts[w] * 4
+        self._offsets = view[pos:pos + (n_vendors + 1) * 4].cast('I')
+        pos += (n_vendors + 1) * 4
+        self._blob = view[pos:pos + blob_len]
+        self.counts = counts
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def vendor(self, vid):
+        return bytes(self._blob[self._offsets[vid]:self._offsets[vid + 1]]).decode('utf-8')
+
+    def find(self, value):
+        """(vendor, prefix bits) for a 48-bit MAC integer, or (None, 0)."""
+        for w in WIDTHS:
+            prefixes = self.prefixes[w]
+            key = value >> (48 - w)
+            i = bisect.bisect_left(prefixes, key)
+            if i < len(prefixes) and prefixes[i] == key:
+                return self.vendor(self.vendor_ids[w][i]), w
+        return None, 0
+
+
+class VendorLookup:
+    """
+    Lazily opens the cached oui.idx (rebuilding it first when the CSVs
+    in data/ are newer) and answers MAC → vendor. Thread-safe after load.
+    Falls back to the temp dir when the cache dir is not writable.
+    """
+
+    def __init__(self, index_path=INDEX_PATH, data_dir=DATA_DIR):
+        self.index_path = index_path
+        self.data_dir = data_dir
+        self._index = None
+        self._lock = threading.Lock()
+
+    def _sources(self):
+        return sorted(glob.glob(os.path.join(self.data_dir, '*.csv')))
+
+    def _load(self):
+        with self._lock:
+            if self._index is not None:
+                return self._index
+            sources = self._sources()
+            try:
+                stale = not os.path.exists(self.index_path) or any(
+                    os.path.getmtime(s) > os.path.getmtime(self.index_path) for s in sources)
+                if stale and sources:
+                    try:
+                        count = build(sources, self.index_path)
+                    except OSError:
+                        self.index_path = os.path.join(tempfile.gettempdir(), 'garuda-oui.idx')
+                        count = build(sources, self.index_path)
+                    print(f"[OUI] Compiled {count} registry entries → {self.index_path}")
+                with open(self.index_path, 'rb') as f:
+                    self._index = OuiIndex(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            except (OSError, ValueError) as e:
+                print(f"[OUI] Vendor index unavailable: {e}")
+                self._index = OuiIndex(compile_index({}))
+            return self._index
+
+    @property
+    def index(self):
+        return self._index or self._load()
+
+    def info(self, mac):
+        """{'vendor', 'prefix_bits', 'locally_administered', 'multicast'} for a MAC string."""
+        value = mac_to_int(mac or '')
+        if value is None:
+            return {'vendor': None, 'prefix_bits': 0, 'locally_administered': False, 'multicast': False}
+        vendor, bits = self.index.find(value)
+        return {
+            'vendor': vendor,
+            'prefix_bits': bits,
+            'locally_administered': is_locally_administered(value),
+            'multicast': is_multicast(value),
+        }
+
+    def vendor(self, mac):
+        """Vendor name, RANDOMIZED for unregistered locally administered MACs, else None."""
+        value = mac_to_int(mac or '')
+        if value is None:
+            return None
+        vendor, _ = self.index.find(value)
+        if vendor is None and is_locally_administered(value):
+            return RANDOMIZED
+        return vendor
+
+
+vendors = VendorLookup()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='GARUDA IEEE OUI index')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('build', help='compile registry CSVs into the index')
+    p.add_argument('sources', nargs='*', help='IEEE CSVs (default: data/*.csv)')
+    p.add_argument('-o', '--output', default=INDEX_PATH)
+    p = sub.add_parser('lookup', help='look up MAC addresses')
+    p.add_argument('macs', nargs='+')
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'build':
+        count = build(args.sources, args.output)
+        print(f"[OUI] {count} entries → {args.output} ({os.path.getsize(args.output):,} bytes)")
+    else:
+        for mac in args.macs:
+            print(mac, vendors.info(mac))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+GARUDA TCP Connect Scanner
+asyncio engine for many (ip, port) probes at once: one global cap on
+in-flight sockets, per-host timeouts adapted from measured RTT, and
+results streamed back as each probe finishes. The cap is per scanner
+and shared by every scan it runs at the same time, each on its own
+thread and event loop.
+"""
+
+import socket
+import asyncio
+import time
+import threading
+import collections
+
+DEFAULT_CONCURRENCY = 256   # max sockets in flight across all hosts
+INITIAL_TIMEOUT = 0.4       # before any RTT sample exists for a host
+MIN_TIMEOUT = 0.15
+MAX_TIMEOUT = 1.5
+
+OPEN, CLOSED, FILTERED = 'open', 'closed', 'filtered'
+
+
+# ─────────────────────────────────────────────
+#  PER-HOST RTT ESTIMATOR
+# ─────────────────────────────────────────────
+
+class HostTimer:
+    """RFC 6298-style smoothed RTT → connect timeout for one host."""
+
+    def __init__(self, initial=INITIAL_TIMEOUT, lo=MIN_TIMEOUT, hi=MAX_TIMEOUT):
+        self.srtt = None
+        self.rttvar = None
+        self.initial = initial
+        self.lo = lo
+        self.hi = hi
+
+    def sample(self, rtt):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    @property
+    def timeout(self):
+        if self.srtt is None:
+            return self.initial
+        return min(self.hi, max(self.lo, self.srtt + 4 * self.rttvar))
+
+
+# ─────────────────────────────────────────────
+#  SHARED SOCKET BUDGET
+# ─────────────────────────────────────────────
+
+class SocketBudget:
+    """
+    Counting semaphore awaitable from any event loop. A freed slot is
+    handed straight to the oldest waiter, whichever loop it runs on.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_use = 0
+        self._waiters = collections.deque()    # (loop, future)
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_use < self.limit:
+                self.in_use += 1
+                return
+            fut = loop.create_future()
+            self._waiters.append((loop, fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, fut))
+                    handed = False
+                except ValueError:
+                    handed = True
+            if handed:
+                # the slot was passed to us as we were cancelled — pass it on
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self.in_use -= 1
+                return
+            loop, fut = self._waiters.popleft()
+        try:
+            loop.call_soon_threadsafe(self._wake, fut)
+        except RuntimeError:
+            # that loop has closed; give the slot to the next waiter
+            self.release()
+
+    @staticmethod
+    def _wake(fut):
+        # a waiter cancelled meanwhile passes the slot on from acquire()
+        if not fut.done():
+            fut.set_result(None)
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+# ─────────────────────────────────────────────
+#  SCANNER
+# ─────────────────────────────────────────────
+
+class ConnectScanner:
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, initial_timeout=INITIAL_TIMEOUT,
+                 min_timeout=MIN_TIMEOUT, max_timeout=MAX_TIMEOUT):
+        self.concurrency = concurrency
+        self.budget = SocketBudget(concurrency)
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+
+    def _timer(self, timers, ip):
+        t = timers.get(ip)
+        if t is None:
+            t = timers[ip] = HostTimer(self.initial_timeout, self.min_timeout, self.max_timeout)
+        return t
+
+    async def _probe(self, loop, budget, timers, ip, port):
+        async with budget:
+            timeout = self._timer(timers, ip).timeout
+            sock = None
+            measured = False
+            start = time.monotonic()
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.setblocking(False)
+                await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), timeout)
+                state, measured = OPEN, True
+            except asyncio.TimeoutError:
+                state = FILTERED
+            except ConnectionRefusedError:
+                state, measured = CLOSED, True
+            except OSError:
+                state = FILTERED
+            except Exception:
+                # a malformed target (None, bad address) fails only its own probe
+                state = CLOSED
+            finally:
+                if sock is not None:
+                    sock.close()
+            rtt = time.monotonic() - start
+            # Open and refused both carry a real round trip; timeouts and
+            # failed targets don't
+            if measured:
+                timers[ip].sample(rtt)
+            return ip, port, state, rtt
+
+    async def stream(self, targets):
+        """Async generator yielding (ip, port, state, rtt) as probes complete."""
+        loop = asyncio.get_running_loop()
+        timers = {}
+        tasks = [asyncio.ensure_future(self._probe(loop, self.budget, timers, ip, port))
+                 for ip, port in targets]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield await fut
+        finally:
+            for t in tasks:
+                t.cancel()
+
+    async def scan_async(self, targets, on_result=None):
+        open_ports = {}
+        async for ip, port, state, rtt in self.stream(targets):
+            if state == OPEN:
+                open_ports.setdefault(ip, []).append(port)
+            if on_result:
+                on_result(ip, port, state, rtt)
+        return {ip: sorted(ports) for ip, ports in open_ports.items()}
+
+    def scan(self, targets, on_result=None):
+        """
+        Blocking entry point for threaded callers.
+        `targets` is an iterable of (ip, port). Returns {ip: [open ports]}.
+        """
+        return asyncio.run(self.scan_async(list(targets), on_result))
+
+    def scan_hosts(self, ips, ports, on_result=None):
+        # Port-major order so the first wave touches every host once and
+        # seeds its RTT estimate before the bulk of its probes go out
+        targets = [(ip, port) for port in ports for ip in ips]
+        return self.scan(targets, on_result)
@@ -0,0 +1,344 @@
+"""
+GARUDA Attack Predictor
+Weighted risk model over one scan (predict) or many (score_batch):
+  • six component scores in [0, 1] — encryption, unknown vendors,
+    ARP-only devices, open / risky ports, device density, traffic
+    errors — combined by WEIGHTS into a 0-100 risk score and a LABELS band
+  • score_batch() takes per-scan feature columns (database.get_scan_features)
+    and scores every scan in one NumPy pass — or a plain loop when NumPy
+    is not installed — with results identical to predict()
+  • weights and label thresholds can be overridden per call, so stored
+    history can be re-scored to see how a tuning change would have moved
+    the risk trend
+  • attack predictions come from the attack rules in data/rules.json
+  • predict() returns the counts it scored under 'inputs'; save_scan
+    stores them with the scan so re-scoring does not depend on device
+    or traffic rows that retention may have removed
+
+Re-score history:  python predictor.py rescore --since 2025-01-01 --weight encryption=0.35 --label HIGH=40
+"""
+
+import sys
+import time
+import argparse
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from rules import rules
+
+RISKY_PORTS = {21: 'FTP', 23: 'Telnet', 445: 'SMB', 3389: 'RDP', 5900: 'VNC', 135: 'RPC', 139: 'NetBIOS'}
+UNKNOWN_VENDORS = ('Unknown', 'Unknown Vendor')
+MAX_ATTACKS = 5            # predictions returned per scan
+
+
+def encryption_score(enc):
+    """Risk of the Wi-Fi encryption string (lower-cased)."""
+    if any(x in enc for x in ['open', 'none', 'wep']):
+        return 1.0
+    elif 'wpa3' in enc:
+        return 0.05
+    elif 'wpa2' in enc and 'enterprise' in enc:
+        return 0.12
+    elif 'wpa2' in enc:
+        return 0.45
+    elif 'wpa' in enc:
+        return 0.82
+    return 0.55
+
+
+def model_inputs(scan_data):
+    """
+    The per-scan counts predict() scores: device / vendor / detection
+    counts, open ports as {port: hosts} over every probed IP (gateway and
+    local address included) and the traffic error counters.
+    """
+    devices = scan_data.get('connected_devices', [])
+    traffic = scan_data.get('network_traffic', {})
+    ports = {}
+    for open_ports in scan_data.get('port_scan', {}).values():
+        for port in open_ports:
+            ports[str(port)] = ports.get(str(port), 0) + 1
+    return {
+        'devices': len(devices),
+        'unknown': sum(1 for d in devices if d.get('vendor', 'Unknown') in UNKNOWN_VENDORS),
+        'arp_only': sum(1 for d in devices if d.get('detection_method') == 'ARP_ONLY'),
+        'ports': ports,
+        'errin': traffic.get('errin', 0) or 0,
+        'dropin': traffic.get('dropin', 0) or 0,
+        'packets_recv': traffic.get('packets_recv_raw', 1),
+    }
+
+
+def input_counts(inputs, risky_ports=RISKY_PORTS):
+    """model_inputs() → the keyword counts of AttackPredictor._components."""
+    ports = inputs.get('ports', {})
+    return {
+        'devices': inputs['devices'], 'unknown': inputs['unknown'], 'arp_only': inputs['arp_only'],
+        'open_ports': sum(ports.values()),
+        'risky_open': sum(n for port, n in ports.items() if int(port) in risky_ports),
+        'errin': inputs['errin'], 'dropin': inputs['dropin'], 'packets_recv': inputs['packets_recv'],
+    }
+
+
+def _round1(values):
+    """round(v, 1) per element, bit-for-bit like Python's round(). np.round
+    rounds v*10, which can land on the other side of a near-tie — those
+    few elements are redone in Python."""
+    out = np.round(values, 1)
+    scaled = values * 10
+    for i in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6):
+        out[i] = round(float(values[i]), 1)
+    return out
+
+
+class AttackPredictor:
+    WEIGHTS = {
+        'encryption': 0.28,
+        'unknown_devices': 0.18,
+        'arp_anomalies': 0.15,
+        'open_ports': 0.15,
+        'device_density': 0.12,
+        'traffic_anomaly': 0.12,
+    }
+    # (label, minimum risk %, colour), most severe first
+    LABELS = (
+        ('CRITICAL', 70, '#ef4444'),
+        ('HIGH', 45, '#f97316'),
+        ('MEDIUM', 25, '#f59e0b'),
+        ('LOW', 0, '#10b981'),
+    )
+
+    def predict(self, scan_data):
+        enc = scan_data.get('connected_network', {}).get('encryption', '').lower()
+        devices = scan_data.get('connected_devices', [])
+        port_data = scan_data.get('port_scan', {})
+
+        inputs = model_inputs(scan_data)
+        scores = self._components(enc, **input_counts(inputs))
+
+        total_risk = sum(scores[k] * self.WEIGHTS[k] for k in scores)
+        risk_pct = round(total_risk * 100, 1)
+        label, color = self._label(risk_pct)
+
+        return {
+            'risk_score': risk_pct,
+            'risk_label': label,
+            'risk_color': color,
+            'component_scores': {k: round(v*100, 1) for k, v in scores.items()},
+            'attack_predictions': self._attacks(scores, enc, devices, port_data),
+            'scan_timestamp': datetime.now().isoformat(),
+            'inputs': inputs,
+        }
+
+    def _components(self, enc, devices, unknown, arp_only, open_ports, risky_open, errin, dropin, packets_recv):
+        """Component scores in WEIGHTS order, from one scan's counts."""
+        total = max(devices, 1)
+        pkts = max(packets_recv or 1, 1)
+        return {
+            'encryption': encryption_score(enc),
+            'unknown_devices': min(unknown / total, 1.0),
+            'arp_anomalies': min(arp_only / total * 1.3, 1.0),
+            'open_ports': min((open_ports / 10 + risky_open * 0.2), 1.0),
+            'device_density': min(total / 30, 1.0),
+            'traffic_anomaly': min((errin + dropin) / pkts * 100, 1.0),
+        }
+
+    def _label(self, risk_pct, labels=None):
+        labels = labels or self.LABELS
+        for label, floor, color in labels:
+            if risk_pct >= floor:
+                return label, color
+        return labels[-1][0], labels[-1][2]
+
+    def _attacks(self, scores, enc, devices, port_data):
+        # attack rules live in data/rules.json (see rules.py)
+        return rules.current.attacks(scores, enc, devices, port_data, limit=MAX_ATTACKS)
+
+    # ── batch ─────────────────────────────────────────────
+    def score_batch(self, features, weights=None, labels=None):
+        """
+        Score many scans at once. `features` are the columns of
+        database.get_scan_features(); `weights` overrides some or all of
+        WEIGHTS and `labels` replaces LABELS. Returns columns: scan_id,
+        timestamp, risk_score, risk_label and component_scores {name: [..]}.
+        """
+        weights = {**self.WEIGHTS, **(weights or {})}
+        labels = labels or self.LABELS
+        encs = [(e or '').lower() for e in features['encryption']]
+        if np is None:
+            return self._score_rows(features, encs, weights, labels)
+
+        # few distinct encryption strings per history — score each once
+        enc_scores = {e: encryption_score(e) for e in set(encs)}
+        col = {k: np.asarray(features[k], dtype=np.float64)
+               for k in ('devices', 'unknown', 'arp_only', 'open_ports', 'risky_open', 'errin', 'dropin',
+                         'packets_recv')}
+        total = np.maximum(col['devices'], 1)
+        scores = {
+            'encryption': np.array([enc_scores[e] for e in encs], dtype=np.float64),
+            'unknown_devices': np.minimum(col['unknown'] / total, 1.0),
+            'arp_anomalies': np.minimum(col['arp_only'] / total * 1.3, 1.0),
+            'open_ports': np.minimum(col['open_ports'] / 10 + col['risky_open'] * 0.2, 1.0),
+            'device_density': np.minimum(total / 30, 1.0),
+            'traffic_anomaly': np.minimum((col['errin'] + col['dropin']) / np.maximum(col['packets_recv'], 1) * 100,
+                                          1.0),
+        }
+        # same summation order as predict(), so the floats agree exactly
+        total_risk = np.zeros(len(encs))
+        for k in scores:
+            total_risk = total_risk + scores[k] * weights[k]
+        risk = _round1(total_risk * 100)
+
+        label = np.full(len(encs), labels[-1][0], dtype=object)
+        for name, floor, _ in reversed(labels):
+            label[risk >= floor] = name
+        return {
+            'scan_id': list(features['scan_id']),
+            'timestamp': list(features['timestamp']),
+            'risk_score': risk.tolist(),
+            'risk_label': label.tolist(),
+            'component_scores': {k: _round1(v * 100).tolist() for k, v in scores.items()},
+        }
+
+    def _score_rows(self, features, encs, weights, labels):
+        """score_batch() without NumPy — the scalar model, row by row."""
+        out = {'scan_id': list(features['scan_id']), 'timestamp': list(features['timestamp']),
+               'risk_score': [], 'risk_label': [], 'component_scores': {k: [] for k in self.WEIGHTS}}
+        for i, enc in enumerate(encs):
+            scores = self._components(enc, **{k: features[k][i] for k in (
+                'devices', 'unknown', 'arp_only', 'open_ports', 'risky_open', 'errin', 'dropin', 'packets_recv')})
+            risk_pct = round(sum(scores[k] * weights[k] for k in scores) * 100, 1)
+            out['risk_score'].append(risk_pct)
+            out['risk_label'].append(self._label(risk_pct, labels)[0])
+            for k, v in scores.items():
+                out['component_scores'][k].append(round(v * 100, 1))
+        return out
+
+
+def scan_from_features(features, i):
+    """A scan dict predict() scores exactly like row `i` of the feature columns."""
+    devices = [{'vendor': 'Unknown' if n < features['unknown'][i] else 'Bench',
+                'detection_method': 'ARP_ONLY' if n < features['arp_only'][i] else 'PING+ARP'}
+               for n in range(features['devices'][i])]
+    risky = list(RISKY_PORTS)
+    ports = [risky[n % len(risky)] for n in range(features['risky_open'][i])]
+    ports += [80] * (features['open_ports'][i] - features['risky_open'][i])
+    return {
+        'connected_network': {'encryption': features['encryption'][i]},
+        'connected_devices': devices,
+        'port_scan': {'0.0.0.0': ports} if ports else {},
+        'network_traffic': {'errin': features['errin'][i], 'dropin': features['dropin'][i],
+                            'packets_recv_raw': features['packets_recv'][i]},
+    }
+
+
+def rescore(features, weights=None, labels=None, predictor=None):
+    """
+    Re-score stored scans and compare with the scores they were saved with.
+    Returns {'count', 'weights', 'labels', 'mean_delta', 'transitions':
+    {'OLD→NEW': n}, 'scans': columns incl. stored_score / stored_label}.
+    """
+    predictor = predictor or AttackPredictor()
+    scored = predictor.score_batch(features, weights, labels)
+    stored, stored_label = features['risk_score'], features['risk_label']
+    transitions = {}
+    for old, new in zip(stored_label, scored['risk_label']):
+        if old != new:
+            key = f'{old}→{new}'
+            transitions[key] = transitions.get(key, 0) + 1
+    deltas = [new - (old or 0) for old, new in zip(stored, scored['risk_score'])]
+    return {
+        'count': len(deltas),
+        'weights': {**predictor.WEIGHTS, **(weights or {})},
+        'labels': [list(l) for l in (labels or predictor.LABELS)],
+        'mean_delta': round(sum(deltas) / len(deltas), 2) if deltas else 0.0,
+        'transitions': transitions,
+        'scans': {**scored, 'stored_score': list(stored), 'stored_label': list(stored_label)},
+    }
+
+
+def parse_labels(overrides, base=None):
+    """['HIGH=40', ...] → LABELS with those floors moved, re-sorted most severe first."""
+    floors = {name: floor for name, floor, _ in (base or AttackPredictor.LABELS)}
+    for item in overrides or ():
+        name, _, value = item.partition('=')
+        if name.upper() not in floors:
+            raise ValueError(f'unknown label {name!r}')
+        floors[name.upper()] = float(value)
+    colors = {name: color for name, _, color in (base or AttackPredictor.LABELS)}
+    return tuple(sorted(((n, f, colors[n]) for n, f in floors.items()), key=lambda l: -l[1]))
+
+
+def parse_weights(overrides):
+    """['encryption=0.3', ...] → {'encryption': 0.3}"""
+    weights = {}
+    for item in overrides or ():
+        name, _, value = item.partition('=')
+        if name not in AttackPredictor.WEIGHTS:
+            raise ValueError(f'unknown weight {name!r}')
+        weights[name] = float(value)
+    return weights
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='GARUDA risk model')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('rescore', help='re-score stored scans with changed weights / thresholds')
+    p.add_argument('--since', help='ISO timestamp (default: all history)')
+    p.add_argument('--until')
+    p.add_argument('--limit', type=int, help='latest N scans only')
+    p.add_argument('--weight', action='append', metavar='NAME=VALUE', help=', '.join(AttackPredictor.WEIGHTS))
+    p.add_argument('--label', action='append', metavar='LABEL=FLOOR', help='e.g. HIGH=40')
+    p.add_argument('--db', help='database file (default: garuda.db)')
+    p.add_argument('--top', type=int, default=10, help='show the N scans that moved most')
+    p.add_argument('--check', action='store_true', help='verify every score against predict()')
+    args = parser.parse_args(argv)
+
+    import database
+    if args.db:
+        database.DB_PATH = args.db
+    try:
+        weights, labels = parse_weights(args.weight), parse_labels(args.label)
+    except ValueError as e:
+        parser.error(str(e))
+
+    t = time.perf_counter()
+    features = database.get_scan_features(args.since, args.until, args.limit, risky_ports=RISKY_PORTS)
+    loaded = time.perf_counter() - t
+    t = time.perf_counter()
+    result = rescore(features, weights, labels)
+    scored = time.perf_counter() - t
+    print(f"[RISK] {result['count']} scans — load {loaded * 1000:.1f} ms, score {scored * 1000:.1f} ms "
+          f"({'numpy' if np is not None else 'pure Python'})")
+    print(f"[RISK] weights {result['weights']}")
+    print(f"[RISK] mean change {result['mean_delta']:+.2f} pts; label changes: "
+          f"{', '.join(f'{k} ×{v}' for k, v in sorted(result['transitions'].items())) or 'none'}")
+
+    scans = result['scans']
+    moved = sorted(range(result['count']), key=lambda i: -abs(scans['risk_score'][i] - (scans['stored_score'][i] or 0)))
+    for i in moved[:args.top]:
+        print(f"  #{scans['scan_id'][i]:<7} {scans['timestamp'][i][:19]}  {scans['stored_score'][i]!s:>5} "
+              f"{scans['stored_label'][i]:<8} → {scans['risk_score'][i]:>5} {scans['risk_label'][i]}")
+
+    if args.check:
+        model = AttackPredictor()
+        model.WEIGHTS = result['weights']
+        model.LABELS = labels
+        bad = 0
+        for i in range(result['count']):
+            expect = model.predict(scan_from_features(features, i))
+            got = {k: v[i] for k, v in scans['component_scores'].items()}
+            if (expect['risk_score'], expect['risk_label'], expect['component_scores']) != \
+                    (scans['risk_score'][i], scans['risk_label'][i], got):
+                bad += 1
+        print(f"[RISK] check against predict(): {result['count'] - bad} match, {bad} differ")
+        return 1 if bad else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+GARUDA Hostname Resolver
+Reverse DNS for scan results without the serial gethostbyaddr() stall:
+  • lookups run concurrently on a bounded pool, one in flight per IP
+  • a whole batch waits on a single deadline; stragglers keep running
+    and land in the cache for the next scan
+  • LRU + TTL cache holding negative answers too (no PTR → retry later,
+    not every scan)
+  • answers persist in known_devices.hostname ('' = no PTR) so a
+    restart starts warm — stragglers too, from the completion callback,
+    keyed by MAC so hosts in their first scan are stored as well
+"""
+
+import time
+import socket
+import threading
+import collections
+import concurrent.futures
+
+RESOLVER_WORKERS = 32
+BATCH_DEADLINE = 1.5       # seconds a scan waits for names, total
+POSITIVE_TTL = 6 * 3600
+NEGATIVE_TTL = 15 * 60
+CACHE_SIZE = 4096
+
+NOT_FOUND = ''             # cached / persisted marker for "no PTR record"
+
+
+def lookup(ip):
+    """One reverse lookup — hostname, or NOT_FOUND when there is no PTR."""
+    try:
+        return socket.gethostbyaddr(ip)[0]
+    except (socket.herror, socket.gaierror, UnicodeError):
+        return NOT_FOUND
+
+
+class HostnameResolver:
+    """
+    `loader()` → [(ip, hostname, checked_epoch)] seeds the cache once;
+    `saver({ip: hostname}, {ip: mac})` persists fresh answers (NOT_FOUND
+    included). Answers landing while a batch waits are saved together when
+    it returns; later ones are saved by the callback that delivers them.
+    """
+
+    def __init__(self, workers=RESOLVER_WORKERS, deadline=BATCH_DEADLINE, positive_ttl=POSITIVE_TTL,
+                 negative_ttl=NEGATIVE_TTL, size=CACHE_SIZE, loader=None, saver=None, lookup=lookup):
+        self.deadline = deadline
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.size = size
+        self.loader = loader
+        self.saver = saver
+        self.lookup = lookup
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rdns')
+        self._cache = collections.OrderedDict()   # ip → (hostname, expires_at)
+        self._inflight = {}                        # ip → Future
+        self._macs = {}                            # ip → MAC, for pending lookups
+        self._unsaved = {}                         # ip → (hostname, mac), answered but not persisted
+        self._waiting = 0                          # resolve_many calls inside their deadline
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.stats = collections.Counter()
+
+    # ── cache ─────────────────────────────────────────────
+    def _ttl(self, name):
+        return self.positive_ttl if name else self.negative_ttl
+
+    def _put(self, ip, name, checked=None):
+        expires = (checked or time.time()) + self._ttl(name)
+        with self._lock:
+            self._cache[ip] = (name, expires)
+            self._cache.move_to_end(ip)
+            while len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+
+    def _get(self, ip, now):
+        with self._lock:
+            entry = self._cache.get(ip)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._cache[ip]
+                return None
+            self._cache.move_to_end(ip)
+            return entry
+
+    def _load(self):
+        if self._loaded or self.loader is None:
+            return
+        self._loaded = True
+        try:
+            now = time.time()
+            for ip, name, checked in self.loader():
+                if ip and checked and checked + self._ttl(name) > now:
+                    self._put(ip, name, checked)
+        except Exception as e:
+            print(f"[RDNS] Could not load cached hostnames: {e}")
+
+    def invalidate(self):
+        """Another process persisted answers — re-read `loader()` on the next batch."""
+        self._loaded = False
+
+    # ── lookups ───────────────────────────────────────────
+    def _submit(self, ip):
+        with self._lock:
+            future = self._inflight.get(ip)
+            if future is not None:
+                return future
+            future = self._pool.submit(self.lookup, ip)
+            self._inflight[ip] = future
+        # outside the lock: a lookup that already finished runs the callback
+        # right here, and _done takes the lock itself
+        future.add_done_callback(lambda f, ip=ip: self._done(ip, f))
+        return future
+
+    def _done(self, ip, future):
+        failed = future.exception() is not None
+        name = NOT_FOUND if failed else future.result()
+        self._put(ip, name)
+        with self._lock:
+            self._inflight.pop(ip, None)
+            mac = self._macs.pop(ip, None)
+            if not failed:
+                self._unsaved[ip] = (name, mac)
+            late = self._waiting == 0
+        if late:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, {}
+        if not unsaved or self.saver is None:
+            return
+        names = {ip: name for ip, (name, _) in unsaved.items()}
+        macs = {ip: mac for ip, (_, mac) in unsaved.items() if mac}
+        try:
+            self.saver(names, macs)
+            self.stats['saved'] += len(names)
+        except Exception as e:
+            print(f"[RDNS] Could not persist hostnames: {e}")
+
+    def resolve_many(self, ips, deadline=None, macs=None):
+        """
+        {ip: hostname or None} for every ip, waiting at most `deadline`
+        seconds in total. IPs still pending at the deadline map to None;
+        their answers are persisted when they land. `macs` {ip: mac} tells
+        the saver which device each answer belongs to.
+        """
+        self._load()
+        now = time.time()
+        macs = macs or {}
+        names, pending = {}, {}
+        with self._lock:
+            self._waiting += 1
+        try:
+            for ip in dict.fromkeys(ips):
+                entry = self._get(ip, now)
+                if entry is not None:
+                    self.stats['hits'] += 1
+                    names[ip] = entry[0] or None
+                    continue
+                self.stats['misses'] += 1
+                if macs.get(ip):
+                    with self._lock:
+                        self._macs[ip] = macs[ip]
+                pending[ip] = self._submit(ip)
+
+            if pending:
+                done, not_done = concurrent.futures.wait(
+                    pending.values(), timeout=self.deadline if deadline is None else deadline)
+                self.stats['timeouts'] += len(not_done)
+                for ip, future in pending.items():
+                    ok = future in done and not future.exception()
+                    names[ip] = (future.result() if ok else None) or None
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        self._flush()
+        return names
+
+    def resolve(self, ip, deadline=None):
+        return self.resolve_many([ip], deadline)[ip]
@@ -0,0 +1,326 @@
+"""
+GARUDA Rule Engine
+Security assessments, attack predictions and risky-port alerts as
+declarative rules in data/rules.json instead of if/elif chains:
+  • a rule has a kind (security, attack, port_alert — or a list of them)
+    and conditions that must all hold: open `ports`, `encryption`
+    substrings (any / all / none) and component `score` thresholds (>)
+  • rules are compiled once into indexes — port → rules, encryption
+    substring → rules, per-component thresholds sorted for bisect — so a
+    scan only visits the rules its own ports, encryption string and
+    scores can match, however many rules are loaded
+  • security rules are ordered, the first match wins; attack rules all
+    fire and are ranked by probability, ties in file order
+  • the file is re-read when its mtime changes (checked at most every
+    RELOAD_CHECK seconds); a broken edit is reported and the last good
+    rule set stays active
+
+Check a rules file:  python rules.py check [data/rules.json]
+"""
+
+import os
+import sys
+import json
+import time
+import bisect
+import argparse
+import threading
+import collections
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+RULES_PATH = os.path.join(DATA_DIR, 'rules.json')
+
+KINDS = ('security', 'attack', 'port_alert')
+CONDITIONS = ('ports', 'encryption', 'score')
+RULE_FIELDS = ('id', 'kind', 'assessment', 'service', 'type', 'probability', 'severity', 'description') + CONDITIONS
+RELOAD_CHECK = 2.0         # seconds between mtime checks
+
+# Used only while no rule set has loaded
+FALLBACK_ASSESSMENT = {'threat_level': 'UNKNOWN', 'mitm_risk': 'UNKNOWN',
+                       'vulnerability': 'Unknown encryption',
+                       'description': 'Rules unavailable — cannot assess encryption.',
+                       'recommendation': 'Check data/rules.json.',
+                       'exploit_risk': 'N/A'}
+
+
+class _Template(dict):
+    def __missing__(self, key):
+        return '{' + key + '}'
+
+
+class Rule:
+    """One compiled rule; `position` is its place in the file."""
+
+    __slots__ = ('id', 'kinds', 'position', 'ports', 'any', 'all', 'none', 'score', 'fields')
+
+    def __init__(self, spec, position, defaults=None):
+        unknown = set(spec) - set(RULE_FIELDS)
+        rule_id = spec.get('id') or f'#{position}'
+        if unknown:
+            raise ValueError(f"rule {rule_id}: unknown field(s) {', '.join(sorted(unknown))}")
+        kinds = spec.get('kind')
+        kinds = (kinds,) if isinstance(kinds, str) else tuple(kinds or ())
+        if not kinds or any(k not in KINDS for k in kinds):
+            raise ValueError(f"rule {rule_id}: kind must be one or more of {', '.join(KINDS)}")
+        enc = spec.get('encryption') or {}
+        if set(enc) - {'any', 'all', 'none'}:
+            raise ValueError(f"rule {rule_id}: encryption takes any / all / none")
+
+        self.id = rule_id
+        self.kinds = kinds
+        self.position = position
+        self.ports = frozenset(int(p) for p in spec.get('ports') or ())
+        self.any = tuple(t.lower() for t in enc.get('any') or ())
+        self.all = tuple(t.lower() for t in enc.get('all') or ())
+        self.none = tuple(t.lower() for t in enc.get('none') or ())
+        self.score = {k: float(v) for k, v in (spec.get('score') or {}).items()}
+        fields = {}
+        for kind in kinds:
+            fields.update((defaults or {}).get(kind) or {})
+        fields.update({k: v for k, v in spec.items() if k not in ('id', 'kind') + CONDITIONS})
+        self.fields = fields
+
+        if 'security' in kinds and not isinstance(fields.get('assessment'), dict):
+            raise ValueError(f"rule {rule_id}: security rules need an assessment")
+        if 'port_alert' in kinds and not self.ports:
+            raise ValueError(f"rule {rule_id}: port_alert rules need ports")
+        if 'attack' in kinds:
+            missing = [k for k in ('type', 'probability', 'severity', 'description') if k not in fields]
+            if missing:
+                raise ValueError(f"rule {rule_id}: attack rules need {', '.join(missing)}")
+            prob = fields['probability']
+            if isinstance(prob, dict) and (prob.get('score') is None or 'scale' not in prob):
+                raise ValueError(f"rule {rule_id}: probability takes a number or {{score, scale}}")
+
+    def matches(self, enc, ports, scores):
+        """Every condition holds. `ports` is the set of ports open on any device."""
+        if self.ports and self.ports.isdisjoint(ports):
+            return False
+        if self.any and not any(t in enc for t in self.any):
+            return False
+        if any(t not in enc for t in self.all) or any(t in enc for t in self.none):
+            return False
+        return all(scores.get(k, 0.0) > v for k, v in self.score.items())
+
+
+class RuleSet:
+    """
+    Rules of one file, compiled. Each rule is indexed under a single
+    condition — its ports, else its encryption tokens (the longest 'all'
+    one), else its first score threshold; rules with neither are checked
+    on every scan. Candidates from the indexes are then matched in full.
+    """
+
+    def __init__(self, specs=(), defaults=None, version=None, source=None):
+        self.version = version
+        self.source = source
+        self.rules = [Rule(spec, i, defaults) for i, spec in enumerate(specs)]
+        seen = collections.Counter(r.id for r in self.rules)
+        dupes = [rule_id for rule_id, n in seen.items() if n > 1]
+        if dupes:
+            raise ValueError(f"duplicate rule id(s): {', '.join(dupes)}")
+        self._index = {kind: self._compile([r for r in self.rules if kind in r.kinds]) for kind in KINDS}
+
+    @staticmethod
+    def _compile(rules):
+        by_port, by_token, by_score, always = {}, {}, {}, []
+        for r in rules:
+            if r.ports:
+                for p in r.ports:
+                    by_port.setdefault(p, []).append(r)
+            elif r.any or r.all:
+                for t in r.any or (max(r.all, key=len),):
+                    by_token.setdefault(t, []).append(r)
+            elif r.score:
+                name, threshold = next(iter(r.score.items()))
+                by_score.setdefault(name, []).append((threshold, r.position, r))
+            else:
+                always.append(r)
+        for entries in by_score.values():
+            entries.sort(key=lambda e: (e[0], e[1]))
+        return {
+            'port': by_port,
+            'token': by_token,
+            # token lengths to slide over the encryption string
+            'lengths': sorted({len(t) for t in by_token}),
+            'score': {name: ([e[0] for e in entries], [e[2] for e in entries]) for name, entries in by_score.items()},
+            'always': always,
+        }
+
+    def __len__(self):
+        return len(self.rules)
+
+    def candidates(self, kind, enc='', ports=(), scores=None):
+        """Rules of `kind` that can match, in file order — not yet fully checked."""
+        index = self._index[kind]
+        found = {r.position: r for r in index['always']}
+        by_port = index['port']
+        if by_port:
+            for p in ports:
+                for r in by_port.get(p, ()):
+                    found[r.position] = r
+        by_token = index['token']
+        if by_token:
+            for size in index['lengths']:
+                for i in range(len(enc) - size + 1):
+                    for r in by_token.get(enc[i:i + size], ()):
+                        found[r.position] = r
+        for name, (thresholds, rules) in index['score'].items():
+            # thresholds are sorted, so every rule below the cut is exceeded
+            for r in rules[:bisect.bisect_left(thresholds, (scores or {}).get(name, 0.0))]:
+                found[r.position] = r
+        return [found[pos] for pos in sorted(found)]
+
+    def match(self, kind, enc='', ports=(), scores=None):
+        ports = ports if isinstance(ports, (set, frozenset)) else set(ports)
+        scores = scores or {}
+        return [r for r in self.candidates(kind, enc, ports, scores) if r.matches(enc, ports, scores)]
+
+    # ── consumers ─────────────────────────────────────────
+    def assess(self, encryption):
+        """Security assessment of a Wi-Fi encryption string — the first matching rule's."""
+        hits = self.match('security', (encryption or '').lower())
+        return dict(hits[0].fields['assessment']) if hits else dict(FALLBACK_ASSESSMENT)
+
+    def attacks(self, scores, enc, devices, port_data, limit=None):
+        """Predicted attacks for one scan, most probable first."""
+        hosts = {}
+        for ip, open_ports in port_data.items():
+            for p in open_ports:
+                hosts.setdefault(p, set()).add(ip)
+        attacks = []
+        for r in self.match('attack', enc, hosts, scores):
+            f = r.fields
+            ips = set().union(*(hosts[p] for p in r.ports if p in hosts)) if r.ports else set()
+            values = _Template(service=f.get('service', ''), hosts=len(ips), devices=len(devices),
+                               unknown=round(scores.get('unknown_devices', 0.0) * len(devices)))
+            prob = f['probability']
+            if isinstance(prob, dict):
+                prob = round(scores.get(prob['score'], 0.0) * prob['scale'], 1)
+            attacks.append({
+                'type': f['type'].format_map(values),
+                'probability': float(prob),
+                'severity': f['severity'],
+                'description': f['description'].format_map(values),
+                'rule': r.id,
+            })
+        attacks.sort(key=lambda x: x['probability'], reverse=True)
+        return attacks[:limit] if limit else attacks
+
+    def port_alerts(self, ports):
+        """{port: service} for the given ports that a port_alert rule flags."""
+        ports = set(ports)
+        flagged = {}
+        for r in self.match('port_alert', ports=ports):
+            for p in sorted(r.ports & ports):
+                flagged.setdefault(p, r.fields.get('service') or r.id)
+        return flagged
+
+    def summary(self):
+        return {
+            'version': self.version,
+            'source': self.source,
+            'rules': len(self.rules),
+            'by_kind': {kind: sum(1 for r in self.rules if kind in r.kinds) for kind in KINDS},
+        }
+
+
+def load_rules(path=RULES_PATH):
+    """Parse and compile a rules file. Raises ValueError / OSError."""
+    with open(path, encoding='utf-8') as f:
+        try:
+            doc = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{os.path.basename(path)}: {e}") from None
+    if not isinstance(doc, dict) or not isinstance(doc.get('rules'), list):
+        raise ValueError(f"{os.path.basename(path)}: expected {{\"rules\": [...]}}")
+    return RuleSet(doc['rules'], doc.get('defaults'), doc.get('version'), path)
+
+
+class RuleEngine:
+    """
+    The active RuleSet for a rules file, swapped in whole when the file
+    changes. Readers take `current` and use it lock-free.
+    """
+
+    def __init__(self, path=RULES_PATH, check_every=RELOAD_CHECK):
+        self.path = path
+        self.check_every = check_every
+        self._rules = None
+        self._stamp = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.loaded_at = None
+        self.error = None
+        self.stats = collections.Counter()
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def reload(self, force=False):
+        """Recompile if the file changed (or always with `force`). Returns the active RuleSet."""
+        with self._lock:
+            stamp = self._file_stamp()
+            self._checked = time.monotonic()
+            if not force and self._rules is not None and stamp == self._stamp:
+                return self._rules
+            self._stamp = stamp
+            try:
+                rules = load_rules(self.path)
+            except (OSError, ValueError, TypeError) as e:
+                self.error = str(e)
+                self.stats['errors'] += 1
+                print(f"[RULES] Keeping {'previous' if self._rules is not None else 'no'} rules — {e}")
+                if self._rules is None:
+                    self._rules = RuleSet()
+                return self._rules
+            self._rules = rules
+            self.error = None
+            self.loaded_at = time.time()
+            self.stats['loads'] += 1
+            print(f"[RULES] Loaded {len(rules)} rules from {self.path}")
+            return rules
+
+    @property
+    def current(self):
+        rules = self._rules
+        if rules is None or time.monotonic() - self._checked >= self.check_every:
+            return self.reload()
+        return rules
+
+    def summary(self):
+        return {
+            **self.current.summary(),
+            'loaded_at': self.loaded_at,
+            'error': self.error,
+            'loads': self.stats['loads'],
+            'errors': self.stats['errors'],
+        }
+
+
+rules = RuleEngine()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='GARUDA rule engine')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('check', help='validate and compile a rules file')
+    p.add_argument('path', nargs='?', default=RULES_PATH)
+    args = parser.parse_args(argv)
+
+    try:
+        ruleset = load_rules(args.path)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"[RULES] {e}")
+        return 1
+    info = ruleset.summary()
+    print(f"[RULES] {info['rules']} rules OK — " + ', '.join(f'{k}: {n}' for k, n in info['by_kind'].items()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+GARUDA Scan Jobs
+Runs full scans off the request thread on a small bounded pool.
+Each job publishes per-phase progress that clients can poll or stream,
+and a second request for the same subnet joins the job already running.
+"""
+
+import time
+import uuid
+import threading
+import concurrent.futures
+
+MAX_CONCURRENT_SCANS = 2   # worker threads — each scan is already heavily parallel
+JOB_TTL = 600              # seconds a finished job stays queryable
+SNAPSHOT_DEVICES = 100     # devices carried per snapshot; the full list pages from /api/devices
+
+QUEUED, RUNNING, DONE, ERROR = 'queued', 'running', 'done', 'error'
+
+
+class ScanJob:
+    def __init__(self, key, params, listener=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.params = params
+        self.status = QUEUED
+        self.phase = 'queued'
+        self.progress = {}          # phase counters: hosts_total, hosts_alive, ports_probed...
+        self.devices = []           # partial device list as it becomes known
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.version = 0            # bumped on every change; streams wait on it
+        self.listener = listener    # listener(job) after every change, e.g. the live feed
+        self._cond = threading.Condition()
+
+    # ── updates (called from the worker) ─────────────────
+    def update(self, phase=None, devices=None, **counters):
+        with self._cond:
+            if phase:
+                self.phase = phase
+            if devices is not None:
+                self.devices = devices
+            self.progress.update(counters)
+            self.version += 1
+            self._cond.notify_all()
+        self._notify()
+
+    def _finish(self, status, result=None, error=None):
+        with self._cond:
+            self.status = status
+            self.phase = status
+            self.result = result
+            self.error = error
+            self.finished = time.time()
+            self.version += 1
+            self._cond.notify_all()
+        self._notify()
+
+    def _notify(self):
+        if self.listener:
+            try:
+                self.listener(self)
+            except Exception as e:
+                print(f"[JOBS] Listener error: {e}")
+
+    # ── reads ─────────────────────────────────────────────
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    def snapshot(self, include_result=True, include_devices=True):
+        with self._cond:
+            snap = {
+                'job_id': self.id,
+                'key': self.key,
+                'status': self.status,
+                'phase': self.phase,
+                'progress': dict(self.progress),
+                'devices_found': len(self.devices),
+                'created': self.created,
+                'started': self.started,
+                'finished': self.finished,
+                'elapsed': round((self.finished or time.time()) - (self.started or self.created), 2),
+            }
+            if include_devices:
+                snap['devices'] = self.devices[:SNAPSHOT_DEVICES]
+            if self.error:
+                snap['error'] = self.error
+            if include_result and self.status == DONE:
+                snap['result'] = self.result
+            return snap
+
+    def wait_change(self, version, timeout):
+        """Block until version moves past `version` or timeout. Returns new version."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version or not self.active, timeout)
+            return self.version
+
+    def wait(self, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: not self.active, timeout)
+        return not self.active
+
+
+class ScanJobManager:
+    """
+    `runner(job, **params)` does the actual scan, reporting through
+    job.update(...), and returns the result dict. `listener(job)` is
+    called after every change to any job.
+    """
+
+    def __init__(self, runner, max_workers=MAX_CONCURRENT_SCANS, ttl=JOB_TTL, listener=None):
+        self.runner = runner
+        self.listener = listener
+        self.ttl = ttl
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                           thread_name_prefix='scan-job')
+        self._jobs = {}
+        self._by_key = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, **params):
+        """Start a job for `key`, or join the active one. Returns (job, joined)."""
+        with self._lock:
+            self._prune()
+            existing = self._by_key.get(key)
+            if existing and existing.active:
+                return existing, True
+            job = ScanJob(key, params, self.listener)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+        self._pool.submit(self._run, job)
+        return job, False
+
+    def _run(self, job):
+        job.started = time.time()
+        job.status = RUNNING
+        job.update(phase='starting')
+        try:
+            result = self.runner(job, **job.params)
+            job._finish(DONE, result=result)
+        except Exception as e:
+            print(f"[JOBS] Scan job {job.id} failed: {e}")
+            job._finish(ERROR, error=str(e))
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return [j.snapshot(include_result=False) for j in self._jobs.values()]
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id, job in list(self._jobs.items()):
+            if not job.active and job.finished < cutoff:
+                del self._jobs[job_id]
+                if self._by_key.get(job.key) is job:
+                    del self._by_key[job.key]
+
+    def stream(self, job, interval=0.25, heartbeat=15):
+        """
+        Yield progress snapshots as they change (coalesced to at most one
+        per `interval`), ending with the final snapshot.
+        """
+        version = -1
+        last_sent = 0
+        while True:
+            new_version = job.wait_change(version, heartbeat)
+            if new_version == version and job.active:
+                yield None           # heartbeat — keeps proxies from closing the stream
+                continue
+            wait = interval - (time.time() - last_sent)
+            if wait > 0 and job.active:
+                time.sleep(wait)
+            version = job.version
+            last_sent = time.time()
+            yield job.snapshot(include_result=not job.active)
+            if not job.active:
+                return
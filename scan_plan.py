@@ -0,0 +1,142 @@
+"""
+GARUDA Scan Planner
+Turns the host's interfaces (or an explicit CIDR list) into sweep targets:
+  • every up, non-loopback IPv4 address on a real NIC or VLAN subinterface
+    becomes one target — bridges/veths from container runtimes are skipped
+  • subnets wider than MIN_PREFIX are narrowed to the /MIN_PREFIX around
+    our own address, so a stray /16 cannot turn a scan into 65k probes
+  • each interface has a send-rate budget (IFACE_RATE_LIMIT) shared by
+    the subnets on it; sweeps on different interfaces run in parallel
+MergedProgress folds the per-target progress of those parallel sweeps
+into the single progress view a scan job exposes.
+"""
+
+import ipaddress
+import socket
+import threading
+
+MIN_PREFIX = 20            # widest subnet swept in full (4094 hosts)
+IFACE_RATE_LIMIT = 4000    # echo requests/s per interface, split across its subnets
+MAX_PARALLEL = 4           # targets swept at once
+IGNORED_IFACES = ('lo', 'docker', 'br-', 'veth', 'virbr', 'vmnet', 'vboxnet', 'cni', 'flannel')
+
+
+def _up(iface, if_stats):
+    st = (if_stats or {}).get(iface)
+    return st is None or getattr(st, 'isup', True)
+
+
+def interface_targets(addrs, if_stats=None, gateways=None, ignore=IGNORED_IFACES):
+    """
+    One target per usable IPv4 address. `addrs` / `if_stats` are
+    psutil.net_if_addrs() / net_if_stats(); `gateways` is {iface: gateway}.
+    """
+    targets = []
+    for iface, addr_list in addrs.items():
+        if iface.startswith(tuple(ignore)) or not _up(iface, if_stats):
+            continue
+        for addr in addr_list:
+            if addr.family != socket.AF_INET or not addr.netmask:
+                continue
+            interface = ipaddress.IPv4Interface(f"{addr.address}/{addr.netmask}")
+            if interface.ip.is_loopback or interface.ip.is_link_local or interface.network.prefixlen >= 31:
+                continue
+            network = interface.network
+            narrowed = network.prefixlen < MIN_PREFIX
+            if narrowed:
+                network = ipaddress.IPv4Interface(f"{addr.address}/{MIN_PREFIX}").network
+            gateway = (gateways or {}).get(iface)
+            targets.append({
+                'iface': iface,
+                'subnet': str(network),
+                'local_ip': addr.address,
+                'gateway': gateway if gateway and ipaddress.IPv4Address(gateway) in network else None,
+                'narrowed': narrowed,
+            })
+    return targets
+
+
+def plan_targets(addrs, if_stats=None, gateways=None, cidrs=None, primary_ip=None, rate_limits=None,
+                 ignore=IGNORED_IFACES):
+    """
+    Sweep targets for one scan, the primary (the interface holding
+    `primary_ip`) first. With `cidrs`, exactly those subnets are swept,
+    labelled with the interface they sit on when there is one.
+    """
+    local = interface_targets(addrs, if_stats, gateways, ignore=())
+    if cidrs:
+        targets = []
+        for cidr in cidrs:
+            network = ipaddress.IPv4Network(cidr, strict=False)
+            on = next((t for t in local if network.overlaps(ipaddress.IPv4Network(t['subnet']))), None)
+            targets.append({
+                'iface': on['iface'] if on else None,
+                'subnet': str(network),
+                'local_ip': on['local_ip'] if on else None,
+                'gateway': on['gateway'] if on and on['gateway'] and
+                           ipaddress.IPv4Address(on['gateway']) in network else None,
+                'narrowed': False,
+            })
+    else:
+        targets = [t for t in local if not t['iface'].startswith(tuple(ignore))]
+        targets.sort(key=lambda t: t['local_ip'] != primary_ip)
+
+    seen, unique = set(), []
+    for t in targets:
+        if t['subnet'] not in seen:
+            seen.add(t['subnet'])
+            unique.append(t)
+
+    per_iface = {}
+    for t in unique:
+        per_iface[t['iface']] = per_iface.get(t['iface'], 0) + 1
+    for t in unique:
+        budget = (rate_limits or {}).get(t['iface'], IFACE_RATE_LIMIT)
+        t['rate_limit'] = budget / per_iface[t['iface']]
+    return unique
+
+
+class MergedProgress:
+    """
+    Per-target progress callbacks folded into one `report`: numeric
+    counters are summed across targets, other values (e.g. sweep stats)
+    are keyed by subnet, partial device lists are concatenated in target
+    order, and the phase is the least advanced target's.
+    """
+
+    PHASES = ('sweep', 'arp', 'names', 'devices')
+
+    def __init__(self, report, subnets):
+        self.report = report
+        self._counters = {s: {} for s in subnets}
+        self._phases = {s: None for s in subnets}
+        self._devices = {s: [] for s in subnets}
+        self._lock = threading.Lock()
+
+    def target(self, subnet):
+        def progress(phase=None, devices=None, **counters):
+            self._update(subnet, phase, devices, counters)
+        return progress
+
+    def _update(self, subnet, phase, devices, counters):
+        with self._lock:
+            self._counters[subnet].update(counters)
+            if phase:
+                self._phases[subnet] = phase
+            merged_devices = None
+            if devices is not None:
+                self._devices[subnet] = list(devices)
+                merged_devices = [d for s in self._devices for d in self._devices[s]]
+            merged = {}
+            for s, values in self._counters.items():
+                for key, value in values.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        merged[key] = merged.get(key, 0) + value
+                    else:
+                        merged.setdefault(key, {})[s] = value
+            known = [p for p in self._phases.values() if p in self.PHASES]
+            slowest = min(known, key=self.PHASES.index) if known else None
+        if merged_devices is None:
+            self.report(slowest, **merged)
+        else:
+            self.report(slowest, devices=merged_devices, **merged)
@@ -0,0 +1,272 @@
+"""
+GARUDA Adaptive Scan Profiles
+Sweep tuning measured per subnet instead of picked from a size table:
+  • canary echoes to the gateway and early responders run alongside the
+    sweep; their RTT sets the reply timeout (srtt + 4·rttvar) and their
+    loss drives the send rate AIMD-style — ×SLOW_START per answered
+    canary up to where loss last backed it off to, +RATE_STEP above it,
+    ×BACKOFF on a lost one or ENOBUFS
+  • measured loss decides retries: hosts that answered last run are
+    always re-probed once, a lossy subnet gets whole retry rounds
+  • the final rate, RTT, loss and responder set persist per subnet, so
+    the next scan starts where this one converged
+"""
+
+import time
+import threading
+
+DEFAULT_RATE = 1000        # echo requests/s for a subnet never scanned before
+MIN_RATE = 100
+MAX_RATE = 8000
+RATE_STEP = 100            # additive increase per answered canary
+SLOW_START = 1.25          # multiplicative increase below the learned ceiling
+BACKOFF = 0.5              # multiplicative decrease on loss / ENOBUFS
+
+DEFAULT_TIMEOUT = 0.4      # until an RTT has been measured
+MIN_TIMEOUT = 0.15
+MAX_TIMEOUT = 2.0
+
+CANARY_INTERVAL = 0.05     # seconds between canary probes
+CANARY_POOL = 8            # gateway + early responders probed in rotation
+CANARY_STRIKES = 2         # misses before a never-answering canary is dropped
+
+LOSSY = 0.05               # above this, every silent host gets retried
+MAX_RETRIES = 2
+PROFILE_RESPONDERS = 2048  # responders remembered per subnet for retries
+LOSS_ALPHA = 0.3           # weight of this run's loss in the learned average
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+class SubnetProfile:
+    """What GARUDA has learned about sweeping one subnet."""
+
+    def __init__(self, subnet, rate=DEFAULT_RATE, ceiling=MAX_RATE, srtt=None, rttvar=None, loss=0.0, runs=0,
+                 responders=()):
+        self.subnet = subnet
+        self.rate = rate
+        self.ceiling = ceiling      # rate loss last backed off to
+        self.srtt = srtt
+        self.rttvar = rttvar
+        self.loss = loss
+        self.runs = runs
+        self.responders = list(responders)
+
+    @property
+    def timeout(self):
+        if self.srtt is None:
+            return DEFAULT_TIMEOUT
+        return _clamp(self.srtt + 4 * self.rttvar + 0.05, MIN_TIMEOUT, MAX_TIMEOUT)
+
+    @property
+    def retries(self):
+        return MAX_RETRIES if self.loss >= LOSSY else 1
+
+    @property
+    def arp_wait(self):
+        """Settle time for late ARP replies once the sweep is done."""
+        return _clamp(self.timeout / 2, 0.1, 1.5)
+
+    def to_dict(self):
+        return {
+            'rate': round(self.rate),
+            'ceiling': round(self.ceiling),
+            'srtt': self.srtt,
+            'rttvar': self.rttvar,
+            'loss': round(self.loss, 4),
+            'runs': self.runs,
+            'responders': self.responders,
+        }
+
+    @classmethod
+    def from_dict(cls, subnet, data):
+        return cls(subnet, **{k: data[k] for k in ('rate', 'ceiling', 'srtt', 'rttvar', 'loss', 'runs', 'responders')
+                              if k in data})
+
+    def summary(self):
+        return {
+            'subnet': self.subnet,
+            'rate': round(self.rate),
+            'timeout_ms': round(self.timeout * 1000),
+            'rtt_ms': round(self.srtt * 1000, 2) if self.srtt is not None else None,
+            'loss': round(self.loss, 4),
+            'retries': self.retries,
+            'runs': self.runs,
+        }
+
+
+class SweepController:
+    """
+    Live AIMD state for one sweep, seeded from a SubnetProfile.
+    ICMPSweeper asks it for `rate`, `timeout` and due canaries, and
+    reports replies, canary results and congestion back.
+    """
+
+    def __init__(self, profile, canaries=(), max_rate=MAX_RATE):
+        self.profile = profile
+        self.max_rate = max(MIN_RATE, min(max_rate or MAX_RATE, MAX_RATE))   # per-interface cap
+        self.rate = _clamp(profile.rate, MIN_RATE, self.max_rate)
+        self.ceiling = profile.ceiling
+        self.srtt = profile.srtt
+        self.rttvar = profile.rttvar
+        self._pool = [ip for ip in dict.fromkeys(canaries) if ip][:CANARY_POOL]
+        # canaries that answered last run are known to speak ICMP
+        self._confirmed = set(self._pool) & set(profile.responders)
+        self._strikes = {}
+        self._turn = 0
+        self._next_canary = 0.0
+        self._last_backoff = 0.0
+        self.canaries_sent = 0
+        self.canaries_lost = 0
+        self.backoffs = 0
+
+    # ── timing ────────────────────────────────────────────
+    @property
+    def timeout(self):
+        if self.srtt is None:
+            return self.profile.timeout
+        return _clamp(self.srtt + 4 * self.rttvar + 0.05, MIN_TIMEOUT, MAX_TIMEOUT)
+
+    def _observe_rtt(self, rtt):
+        # RFC 6298 smoothing
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def _backoff(self, now):
+        # at most one decrease per timeout — a burst of losses is one congestion event
+        if now - self._last_backoff >= self.timeout:
+            self.rate = max(MIN_RATE, self.rate * BACKOFF)
+            self.ceiling = self.rate
+            self._last_backoff = now
+            self.backoffs += 1
+
+    # ── sweeper callbacks ─────────────────────────────────
+    def canary_due(self, now):
+        """Target for the next canary probe, or None if none is due."""
+        if not self._pool or now < self._next_canary:
+            return None
+        self._next_canary = now + CANARY_INTERVAL
+        self._turn = (self._turn + 1) % len(self._pool)
+        self.canaries_sent += 1
+        return self._pool[self._turn]
+
+    @property
+    def canary_timeout(self):
+        return max(self.timeout, 3 * (self.srtt or DEFAULT_TIMEOUT))
+
+    def on_canary(self, ip, rtt, now=None):
+        """rtt None = the canary went unanswered."""
+        if rtt is not None:
+            self._confirmed.add(ip)
+            self._observe_rtt(rtt)
+            grown = self.rate * SLOW_START if self.rate < self.ceiling else self.rate + RATE_STEP
+            self.rate = min(self.max_rate, grown)
+        elif ip in self._confirmed:
+            self.canaries_lost += 1
+            self._backoff(time.monotonic() if now is None else now)
+        else:
+            # never answered — filtered, not lossy; stop asking it
+            self.canaries_sent -= 1
+            self._strikes[ip] = self._strikes.get(ip, 0) + 1
+            if self._strikes[ip] >= CANARY_STRIKES and ip in self._pool:
+                self._pool.remove(ip)
+
+    def on_reply(self, ip, rtt):
+        self._observe_rtt(rtt)
+        if len(self._pool) < CANARY_POOL and ip not in self._pool:
+            self._pool.append(ip)
+            self._confirmed.add(ip)
+
+    def on_congestion(self, now=None):
+        self._backoff(time.monotonic() if now is None else now)
+
+    # ── retries ───────────────────────────────────────────
+    @property
+    def loss(self):
+        return self.canaries_lost / self.canaries_sent if self.canaries_sent else 0.0
+
+    @property
+    def retries(self):
+        return MAX_RETRIES if max(self.loss, self.profile.loss) >= LOSSY else 1
+
+    def retry_targets(self, ips, alive):
+        """Silent hosts worth another echo: all of them on a lossy subnet, else last run's responders."""
+        if max(self.loss, self.profile.loss) >= LOSSY:
+            return [ip for ip in ips if ip not in alive]
+        expected = set(self.profile.responders)
+        return [ip for ip in ips if ip in expected and ip not in alive]
+
+    # ── learning ──────────────────────────────────────────
+    def finish(self, alive, swept=None):
+        """Fold this sweep into the profile and return it. `swept` = the
+        addresses probed, when that was only part of the subnet."""
+        p = self.profile
+        # start the next run at the last rate known to be loss-free
+        p.rate = min(self.rate, self.ceiling)
+        p.ceiling = self.ceiling
+        if self.srtt is not None:
+            p.srtt, p.rttvar = self.srtt, self.rttvar
+        if self.canaries_sent:
+            p.loss = self.loss if not p.runs else (1 - LOSS_ALPHA) * p.loss + LOSS_ALPHA * self.loss
+        swept = set(swept) if swept is not None else None
+        kept = [ip for ip in p.responders if swept is not None and ip not in swept]
+        p.responders = sorted(set(kept) | set(alive),
+                              key=lambda ip: tuple(map(int, ip.split('.'))))[:PROFILE_RESPONDERS]
+        p.runs += 1
+        return p
+
+    def stats(self):
+        return {
+            'rate': round(self.rate),
+            'timeout_ms': round(self.timeout * 1000),
+            'rtt_ms': round(self.srtt * 1000, 2) if self.srtt is not None else None,
+            'canaries': self.canaries_sent,
+            'canary_loss': round(self.loss, 4),
+            'backoffs': self.backoffs,
+        }
+
+
+class ProfileStore:
+    """
+    Subnet → SubnetProfile, cached in memory. `loader(subnet)` → dict or
+    None and `saver(subnet, dict)` persist them (see database.py).
+    """
+
+    def __init__(self, loader=None, saver=None):
+        self.loader = loader
+        self.saver = saver
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def get(self, subnet):
+        with self._lock:
+            profile = self._profiles.get(subnet)
+        if profile is not None:
+            return profile
+        data = None
+        if self.loader:
+            try:
+                data = self.loader(subnet)
+            except Exception as e:
+                print(f"[PROFILE] Could not load profile for {subnet}: {e}")
+        profile = SubnetProfile.from_dict(subnet, data) if data else SubnetProfile(subnet)
+        with self._lock:
+            return self._profiles.setdefault(subnet, profile)
+
+    def save(self, profile):
+        with self._lock:
+            self._profiles[profile.subnet] = profile
+        if self.saver:
+            try:
+                self.saver(profile.subnet, profile.to_dict())
+            except Exception as e:
+                print(f"[PROFILE] Could not persist profile for {profile.subnet}: {e}")
+
+    def summaries(self):
+        with self._lock:
+            return [p.summary() for p in self._profiles.values()]
@@ -0,0 +1,406 @@
+"""
+GARUDA Scan Worker Processes
+Runs scans in separate worker processes so sweeps, port probes, ARP
+parsing and result building never hold the web process's GIL:
+  • a supervisor keeps WORKERS spawned processes, each on its own pipe;
+    a scan job thread hands its parameters to an idle worker and blocks
+    until the result comes back — the web process only relays progress
+  • progress is coalesced in the worker (phase changes and device lists
+    at once, counters at most every PROGRESS_INTERVAL) and results come
+    back pickled in one message
+  • a job key sticks to the worker that last ran it, so per-process state
+    — incremental slice rotation, probe cache, subnet profiles — stays warm
+  • workers send a heartbeat every HEARTBEAT seconds; one that dies or
+    goes quiet for HEARTBEAT_TIMEOUT, or overruns SCAN_TIMEOUT, is
+    killed and replaced, and its job fails with the reason
+The target is named 'module:function' and resolved inside the worker;
+it is called as target(progress=callback, **params).
+"""
+
+import os
+import sys
+import time
+import signal
+import atexit
+import importlib
+import threading
+import collections
+import multiprocessing
+
+WORKERS = 2                # processes; one scan each at a time
+HEARTBEAT = 2.0            # seconds between worker heartbeats
+HEARTBEAT_TIMEOUT = 15.0   # silence after which a worker counts as hung
+SCAN_TIMEOUT = 900         # seconds one scan may run before its worker is killed
+PROGRESS_INTERVAL = 0.1    # worker-side coalescing of counter-only progress
+START_TIMEOUT = 60         # seconds a new worker may take to import the target
+MAX_FAILED_STARTS = 3      # workers dying before 'ready' in a row → give up, scan in-process
+
+
+class WorkerUnavailable(RuntimeError):
+    """No worker process could be started — run the scan in-process instead."""
+
+
+class WorkerCrashed(RuntimeError):
+    pass
+
+
+def _resolve(spec):
+    module_name, _, name = spec.partition(':')
+    main = sys.modules.get('__mp_main__')
+    main_file = getattr(main, '__file__', None) or ''
+    if os.path.splitext(os.path.basename(main_file))[0] == module_name:
+        # spawn already imported the parent's script as __mp_main__ — reuse
+        # it rather than running its module-level setup a second time
+        sys.modules.setdefault(module_name, main)
+        module = main
+    else:
+        module = importlib.import_module(module_name)
+    return getattr(module, name)
+
+
+# ─────────────────────────────────────────────
+#  WORKER PROCESS
+# ─────────────────────────────────────────────
+class _Progress:
+    """progress(phase=None, devices=None, **counters) → coalesced messages to the supervisor."""
+
+    def __init__(self, send, interval=PROGRESS_INTERVAL):
+        self.send = send
+        self.interval = interval
+        self._counters = {}
+        self._sent = 0.0
+
+    def __call__(self, phase=None, devices=None, **counters):
+        self._counters.update(counters)
+        now = time.monotonic()
+        if phase or devices is not None or now - self._sent >= self.interval:
+            self.send(('progress', phase, devices, self._counters))
+            self._counters = {}
+            self._sent = now
+
+    def flush(self):
+        if self._counters:
+            self.send(('progress', None, None, self._counters))
+            self._counters = {}
+
+
+def _worker_main(conn, target, status, heartbeat):
+    # Ctrl-C is the supervisor's to handle; it stops workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    send_lock = threading.Lock()
+
+    def send(msg):
+        with send_lock:
+            conn.send(msg)
+
+    run = _resolve(target)
+    info = _resolve(status) if status else None
+
+    def state():
+        try:
+            return info() if info else None
+        except Exception as e:
+            return {'error': str(e)}
+
+    def beat():
+        while True:
+            time.sleep(heartbeat)
+            try:
+                send(('beat', state()))
+            except (OSError, ValueError):
+                return      # supervisor gone
+
+    threading.Thread(target=beat, name='scan-worker-beat', daemon=True).start()
+    send(('ready', os.getpid()))
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        if msg[0] == 'stop':
+            return
+        progress = _Progress(send)
+        try:
+            result = run(progress=progress, **msg[1])
+            progress.flush()
+            send(('done', result))
+        except Exception as e:
+            send(('error', f'{type(e).__name__}: {e}'))
+
+
+# ─────────────────────────────────────────────
+#  SUPERVISOR
+# ─────────────────────────────────────────────
+class _Worker:
+    """Supervisor-side handle on one worker process."""
+
+    def __init__(self, ctx, index, target, status, heartbeat):
+        self.index = index
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, target, status, heartbeat),
+                                   name=f'garuda-scan-{index}', daemon=True)
+        self.process.start()
+        child.close()
+        self.started = time.time()
+        self.last_seen = time.monotonic()
+        self.ready = False
+        self.busy = None        # job key while a scan runs
+        self.key = None         # key of the last scan, for affinity
+        self.scans = 0
+        self.info = None
+
+    @property
+    def alive(self):
+        return self.process.is_alive()
+
+    def _handle(self, msg):
+        """Book-keeping for messages outside a scan's own results."""
+        self.last_seen = time.monotonic()
+        if msg[0] == 'ready':
+            self.ready = True
+        elif msg[0] == 'beat':
+            self.info = msg[1]
+
+    def drain(self):
+        """Consume queued heartbeats of an idle worker. False once it is unusable."""
+        try:
+            while self.conn.poll(0):
+                self._handle(self.conn.recv())
+        except (EOFError, OSError):
+            return False
+        return self.alive
+
+    def run(self, params, report, timeout=SCAN_TIMEOUT, heartbeat_timeout=HEARTBEAT_TIMEOUT):
+        # a fresh worker is still importing the target; it reads the job once ready
+        deadline = time.monotonic() + timeout
+        try:
+            self.conn.send(('scan', params))
+        except (OSError, ValueError):
+            raise WorkerCrashed(self._exit_reason()) from None
+        while True:
+            if time.monotonic() > deadline:
+                self.kill()
+                raise WorkerCrashed(f'scan exceeded {timeout}s')
+            try:
+                if not self.conn.poll(1.0):
+                    if not self.alive:
+                        raise WorkerCrashed(self._exit_reason())
+                    limit = heartbeat_timeout if self.ready else START_TIMEOUT
+                    if time.monotonic() - self.last_seen > limit:
+                        self.kill()
+                        raise WorkerCrashed(f'no heartbeat for {limit:.0f}s')
+                    continue
+                msg = self.conn.recv()
+            except (EOFError, OSError):
+                raise WorkerCrashed(self._exit_reason()) from None
+            kind = msg[0]
+            if kind == 'progress':
+                self.last_seen = time.monotonic()
+                _, phase, devices, counters = msg
+                report(phase, devices=devices, **counters)
+            elif kind == 'done':
+                self.last_seen = time.monotonic()
+                return msg[1]
+            elif kind == 'error':
+                self.last_seen = time.monotonic()
+                raise RuntimeError(msg[1])
+            else:
+                self._handle(msg)
+
+    def _exit_reason(self):
+        self.process.join(1)
+        code = self.process.exitcode
+        if code is not None and code < 0:
+            try:
+                return f'worker died ({signal.Signals(-code).name})'
+            except ValueError:
+                pass
+        return f'worker died (exit code {code})'
+
+    def stop(self, timeout=2.0):
+        try:
+            self.conn.send(('stop',))
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(2)
+
+    def status(self):
+        return {
+            'worker': self.index,
+            'pid': self.process.pid,
+            'alive': self.alive,
+            'ready': self.ready,
+            'busy': self.busy,
+            'scans': self.scans,
+            'uptime': round(time.time() - self.started, 1),
+            'last_seen': round(time.monotonic() - self.last_seen, 1),
+            'info': self.info,
+        }
+
+
+class ScanWorkerPool:
+    """
+    Supervisor for the scan worker processes. `run(report, key, **params)`
+    blocks the calling (job) thread until a worker returns the result;
+    `report` receives the worker's progress as (phase, devices=, **counters).
+    Workers are spawned on first use and checked every HEARTBEAT seconds.
+    """
+
+    def __init__(self, target, workers=WORKERS, status=None, heartbeat=HEARTBEAT,
+                 heartbeat_timeout=HEARTBEAT_TIMEOUT, scan_timeout=SCAN_TIMEOUT):
+        self.target = target
+        self.status_target = status
+        self.size = max(1, workers)
+        self.heartbeat = heartbeat
+        self.heartbeat_timeout = heartbeat_timeout
+        self.scan_timeout = scan_timeout
+        # spawn, not fork: the web process is threaded and holds sockets
+        self._ctx = multiprocessing.get_context('spawn')
+        self._workers = []
+        self._spawned = 0
+        self._failed_starts = 0
+        self._cond = threading.Condition()
+        self._monitor = None
+        self._closed = False
+        self.stats = collections.Counter()
+
+    # ── lifecycle ─────────────────────────────────────────
+    def _spawn(self):
+        self._spawned += 1
+        try:
+            worker = _Worker(self._ctx, self._spawned, self.target, self.status_target, self.heartbeat)
+        except (OSError, RuntimeError) as e:
+            raise WorkerUnavailable(f'could not start scan worker: {e}') from e
+        print(f"[WORKERS] Started scan worker {worker.index} (pid {worker.process.pid})")
+        return worker
+
+    def start(self):
+        with self._cond:
+            if self._closed:
+                raise WorkerUnavailable('scan worker pool is shut down')
+            if self._monitor is not None:
+                return
+            while len(self._workers) < self.size:
+                self._workers.append(self._spawn())
+            self._monitor = threading.Thread(target=self._watch, name='scan-worker-monitor', daemon=True)
+            self._monitor.start()
+        atexit.register(self.shutdown)
+
+    def _replace(self, worker, reason):
+        """Swap a dead / hung worker for a fresh one. Caller holds _cond."""
+        worker.kill()
+        worker.conn.close()
+        i = self._workers.index(worker)
+        self._failed_starts = 0 if worker.ready else self._failed_starts + 1
+        if self._failed_starts >= MAX_FAILED_STARTS:
+            print(f"[WORKERS] Scan worker {worker.index} failed to start ({reason}) — not restarting")
+            del self._workers[i]
+        else:
+            print(f"[WORKERS] Restarting scan worker {worker.index}: {reason}")
+            self.stats['restarts'] += 1
+            try:
+                self._workers[i] = self._spawn()
+            except WorkerUnavailable as e:
+                print(f"[WORKERS] {e}")
+                del self._workers[i]
+        self._cond.notify_all()
+
+    @property
+    def _gave_up(self):
+        return self._failed_starts >= MAX_FAILED_STARTS
+
+    def _watch(self):
+        """Health check of idle workers; busy ones are checked by the scan waiting on them."""
+        while not self._closed:
+            time.sleep(self.heartbeat)
+            with self._cond:
+                for worker in list(self._workers):
+                    if worker.busy is not None:
+                        continue
+                    limit = self.heartbeat_timeout if worker.ready else START_TIMEOUT
+                    if not worker.drain():
+                        self._replace(worker, worker._exit_reason())
+                    elif time.monotonic() - worker.last_seen > limit:
+                        self._replace(worker, f'no heartbeat for {limit:.0f}s')
+                if len(self._workers) < self.size and not self._closed and not self._gave_up:
+                    try:
+                        self._workers.append(self._spawn())
+                        self._cond.notify_all()
+                    except WorkerUnavailable as e:
+                        print(f"[WORKERS] {e}")
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            workers, self._workers = self._workers, []
+            self._cond.notify_all()
+        for worker in workers:
+            worker.stop()
+
+    # ── scans ─────────────────────────────────────────────
+    def _checkout(self, key):
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise WorkerUnavailable('scan worker pool is shut down')
+                if not self._workers:
+                    raise WorkerUnavailable('no scan workers running')
+                for w in [w for w in self._workers if w.busy is None]:
+                    if not w.drain():
+                        self._replace(w, w._exit_reason())
+                if not self._workers:
+                    raise WorkerUnavailable('no scan workers running')
+                idle = [w for w in self._workers if w.busy is None]
+                if idle:
+                    worker = next((w for w in idle if w.key == key), None)
+                    if worker is None:
+                        # an unclaimed worker first, so other keys keep their warm one
+                        worker = min(idle, key=lambda w: w.key is not None)
+                    worker.busy = key
+                    return worker
+                self._cond.wait()
+
+    def run(self, report, key=None, **params):
+        self.start()
+        worker = self._checkout(key)
+        self.stats['scans'] += 1
+        try:
+            result = worker.run(params, report, self.scan_timeout, self.heartbeat_timeout)
+            worker.key = key
+            return result
+        except WorkerCrashed as e:
+            self.stats['crashes'] += 1
+            with self._cond:
+                if worker in self._workers:
+                    self._replace(worker, str(e))
+            if not worker.ready:
+                # it never got as far as reading the job
+                raise WorkerUnavailable(f'scan worker could not start: {e}') from None
+            raise RuntimeError(f'scan worker failed: {e}') from None
+        finally:
+            with self._cond:
+                worker.busy = None
+                worker.scans += 1
+                self._cond.notify_all()
+
+    def health(self):
+        with self._cond:
+            workers = [w.status() for w in self._workers]
+        return {
+            'workers': workers,
+            'size': self.size,
+            'running': sum(1 for w in workers if w['alive']),
+            'busy': sum(1 for w in workers if w['busy'] is not None),
+            'scans': self.stats['scans'],
+            'crashes': self.stats['crashes'],
+            'restarts': self.stats['restarts'],
+            'gave_up': self._gave_up,
+        }
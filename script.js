@@ -55,35 +55,64 @@ function initiateScan() {
     progressSection.classList.add('active');
     resultsSection.classList.remove('active');
 
-    let progress = 0;
-    const statusMessages = [
-        '◈ INITIALIZING QUANTUM PROTOCOLS...',
-        '◈ ESTABLISHING SECURE HANDSHAKE...',
-        '◈ DEPLOYING NETWORK PROBES...',
-        '◈ ANALYZING PACKET SIGNATURES...',
-        '◈ SCANNING NETWORK TRAFFIC...',
-        '◈ DETECTING CONNECTED DEVICES...',
-        '◈ COMPILING SECURITY REPORT...',
-        '◈ FINALIZING THREAT ASSESSMENT...'
-    ];
-
-    const scanInterval = setInterval(() => {
-        progress += 12.5;
-        if (progress > 100) progress = 100;
+    const statusMessages = {
+        queued: '◈ WAITING FOR SCAN WORKER...',
+        starting: '◈ INITIALIZING QUANTUM PROTOCOLS...',
+        network: '◈ ESTABLISHING SECURE HANDSHAKE...',
+        sweep: '◈ DEPLOYING NETWORK PROBES...',
+        arp: '◈ DETECTING CONNECTED DEVICES...',
+        devices: '◈ DETECTING CONNECTED DEVICES...',
+        ports: '◈ SCANNING OPEN PORTS...',
+        prediction: '◈ COMPILING SECURITY REPORT...',
+        saving: '◈ FINALIZING THREAT ASSESSMENT...',
+        done: '◈ SCAN COMPLETE'
+    };
+    const phaseBase = { queued: 0, starting: 2, network: 4, sweep: 8, arp: 40, devices: 48, ports: 50, prediction: 92, saving: 96, done: 100 };
 
+    // Start a background scan job, then poll its real progress
+    const showProgress = (snap) => {
+        const p = snap.progress || {};
+        let progress = phaseBase[snap.phase] || 0;
+        if (snap.phase === 'ports' && p.ports_total) {
+            progress += 42 * Math.min(1, (p.ports_probed || 0) / p.ports_total);
+        }
         progressBar.style.width = progress + '%';
         progressText.textContent = Math.round(progress) + '%';
+        statusDisplay.textContent = statusMessages[snap.phase] || statusMessages.starting;
+    };
 
-        const statusIndex = Math.floor((progress / 100) * statusMessages.length);
-        if (statusIndex < statusMessages.length) {
-            statusDisplay.textContent = statusMessages[statusIndex];
-        }
+    const poll = (jobId) => {
+        fetch(`${API_BASE}/api/scan/jobs/${jobId}`, { mode: 'cors' })
+            .then(response => response.json())
+            .then(snap => {
+                showProgress(snap);
+                if (snap.status === 'done') {
+                    updateUI(snap.result);
+                    showResults();
+                } else if (snap.status === 'error' || !snap.status) {
+                    throw new Error(snap.error || snap.message);
+                } else {
+                    setTimeout(() => poll(jobId), 500);
+                }
+            })
+            .catch(error => {
+                // the job may still be running server-side — report, don't start another scan
+                console.error('Scan job error:', error);
+                showError(`The scan job did not complete.\n\nError: ${error.message}`, 'SCAN FAILED', false);
+                scanBtn.disabled = false;
+                btnText.textContent = '◈ RESCAN NETWORK ◈';
+            });
+    };
 
-        if (progress >= 100) {
-            clearInterval(scanInterval);
-            fetchNetworkData();
-        }
-    }, 400);
+    fetch(`${API_BASE}/api/scan/jobs`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        mode: 'cors',
+        body: '{}'
+    })
+    .then(response => response.json())
+    .then(job => job.job_id ? poll(job.job_id) : fetchNetworkData())
+    .catch(() => fetchNetworkData());
 }
 
 function fetchNetworkData() {
@@ -415,7 +444,7 @@ function updateThreatAlerts(assessment) {
     `;
 }
 
-function showError(message) {
+function showError(message, title = 'BACKEND CONNECTION FAILED', showFix = true) {
     const statusDisplay = document.getElementById('statusDisplay');
     if (statusDisplay) {
         statusDisplay.textContent = `⚠ ERROR: ${message}`;
@@ -445,12 +474,12 @@ function showError(message) {
     
     alertDiv.innerHTML = `
         <div style="font-size: 18px; font-weight: 700; margin-bottom: 10px;">
-            ⚠ BACKEND CONNECTION FAILED
+            ⚠ ${title}
         </div>
         <div style="font-size: 14px; line-height: 1.6;">
             ${message.replace('\n\n', '<br><br>')}
         </div>
-        <div style="margin-top: 15px; padding-top: 15px; border-top: 1px solid rgba(255,255,255,0.3); font-size: 12px;">
+        <div style="display: ${showFix ? 'block' : 'none'}; margin-top: 15px; padding-top: 15px; border-top: 1px solid rgba(255,255,255,0.3); font-size: 12px;">
             <strong>To fix this:</strong><br>
             1. Open terminal/command prompt<br>
             2. Run: <code style="background: rgba(0,0,0,0.3); padding: 2px 5px; border-radius: 3px;">python garuda_backend.py</code><br>
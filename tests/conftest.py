@@ -0,0 +1,46 @@
+import os
+import socket
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from netprobe import NLMSG_HDR
+
+
+def nlmsg(msg_type, payload=b'\0' * 4):
+    return NLMSG_HDR.pack(NLMSG_HDR.size + len(payload), msg_type, 0, 0, 0) + payload
+
+
+class FakeKernel:
+    """Stands in for NETLINK_ROUTE: each open() is a datagram socketpair bound to `groups`."""
+
+    def __init__(self):
+        self.opened = []          # (groups, kernel end, monitor end)
+
+    def open(self, groups):
+        kernel, sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.opened.append((groups, kernel, sock))
+        return sock
+
+    def send(self, group, msg_type, payload=b'\0' * 4):
+        """Deliver to every still-open socket subscribed to `group`, like a multicast."""
+        for groups, kernel, sock in self.opened:
+            if groups & group and sock.fileno() != -1:
+                kernel.send(nlmsg(msg_type, payload))
+
+
+@pytest.fixture
+def fake_kernel():
+    return FakeKernel()
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """database module pointed at a fresh, fully migrated file. The pool,
+    ARP binding store and dashboard cache all reload when DB_PATH moves."""
+    import database
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'garuda.db'))
+    database.init_db()
+    return database
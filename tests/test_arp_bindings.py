@@ -0,0 +1,93 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import ArpBindingStore
+
+IP = '192.168.1.50'
+M1, M2, M3 = '02:00:00:00:00:01', '02:00:00:00:00:02', '02:00:00:00:00:03'
+BASE = datetime.now() - timedelta(minutes=10)
+
+
+def at(minutes):
+    return (BASE + timedelta(minutes=minutes)).isoformat()
+
+
+def observe(db, store, table, minutes):
+    with db.session() as conn:
+        return store.observe(conn, table, at(minutes))
+
+
+def intervals(db, ip=IP):
+    with db.session() as conn:
+        return [dict(r) for r in conn.execute(
+            "SELECT id, mac, first_seen, last_seen, ended FROM arp_intervals WHERE ip=? ORDER BY id", (ip,))]
+
+
+def assert_no_overlap(rows):
+    assert sum(r['ended'] is None for r in rows) <= 1
+    for a, b in zip(rows, rows[1:]):
+        assert a['ended'] is not None and a['ended'] <= b['first_seen']
+        assert a['last_seen'] <= a['ended']
+
+
+def test_unchanged_table_writes_nothing(db):
+    store = ArpBindingStore()
+    assert observe(db, store, {IP: M1}, 0) == 1
+    assert observe(db, store, {IP: M1}, 1) == 0
+    assert store.current(IP) == M1
+
+
+def test_mac_change_closes_and_opens(db):
+    store = ArpBindingStore()
+    observe(db, store, {IP: M1}, 0)
+    observe(db, store, {IP: M2}, 2)
+    rows = intervals(db)
+    assert [(r['mac'], r['ended']) for r in rows] == [(M1, at(2)), (M2, None)]
+    assert_no_overlap(rows)
+
+
+def test_stale_store_does_not_rewrite_closed_interval(db):
+    # e.g. the monitor and the web process, each with its own in-memory copy
+    web, monitor = ArpBindingStore(), ArpBindingStore()
+    observe(db, web, {IP: M1}, 0)
+    observe(db, monitor, {IP: M1}, 1)
+    observe(db, web, {IP: M2}, 2)               # web closes A and opens B
+    observe(db, monitor, {IP: M2}, 5)           # monitor still holds A as current
+    rows = intervals(db)
+    assert [(r['mac'], r['first_seen'], r['ended']) for r in rows] == [(M1, at(0), at(2)), (M2, at(2), None)]
+    assert_no_overlap(rows)
+    assert monitor.current(IP) == M2
+    # the stale store adopted B instead of opening a duplicate
+    observe(db, monitor, {IP: M3}, 6)
+    observe(db, web, {IP: M3}, 7)
+    rows = intervals(db)
+    assert [r['mac'] for r in rows] == [M1, M2, M3]
+    assert_no_overlap(rows)
+
+
+def test_stale_checkpoint_does_not_extend_closed_interval(db, monkeypatch):
+    import database
+    web, monitor = ArpBindingStore(), ArpBindingStore()
+    observe(db, web, {IP: M1}, 0)
+    observe(db, monitor, {IP: M1}, 0)
+    observe(db, web, {IP: M2}, 2)
+    # force a last_seen checkpoint on the monitor's stale copy of A
+    monkeypatch.setattr(database, 'ARP_CHECKPOINT_MINUTES', -60)
+    observe(db, monitor, {IP: M1}, 9)
+    rows = intervals(db)
+    assert rows[0]['mac'] == M1 and rows[0]['last_seen'] <= rows[0]['ended'] == at(2)
+
+
+def test_last_seen_never_moves_backwards(db):
+    web, monitor = ArpBindingStore(), ArpBindingStore()
+    observe(db, web, {IP: M1}, 0)
+    observe(db, monitor, {IP: M1}, 0)
+    with db.session() as conn:
+        conn.execute("UPDATE arp_intervals SET last_seen=? WHERE ip=?", (at(8), IP))
+    observe(db, monitor, {IP: M2}, 9)           # monitor's copy says last_seen = 0
+    rows = intervals(db)
+    assert rows[0]['last_seen'] == at(8) and rows[0]['ended'] == at(9)
+    assert_no_overlap(rows)
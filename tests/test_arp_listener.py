@@ -0,0 +1,161 @@
+import os
+import struct
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import arp_listener
+from arp_listener import (ArpListener, build_arp, parse_frame, read_pcap, write_pcap, ARP_REPLY,
+                          ARP_REQUEST, ALERT_COOLDOWN, BINDING_STALE, GARP_FLOOD_PPS, LINKTYPE_LINUX_SLL)
+
+GATEWAY = '192.168.1.1'
+GW_MAC = 'AA:AA:AA:AA:AA:01'
+EVIL = 'EE:EE:EE:EE:EE:66'
+HOST_MAC = 'BB:BB:BB:BB:BB:10'
+T0 = 1_700_000_000.0
+
+
+def reply(ts, mac, ip, target_ip='192.168.1.50'):
+    return ts, build_arp(ARP_REPLY, mac, ip, target_ip, dst='CC:CC:CC:CC:CC:50')
+
+
+def garp(ts, mac, ip):
+    return ts, build_arp(ARP_REQUEST, mac, ip, ip)
+
+
+@pytest.fixture
+def replay(tmp_path):
+    def run(packets, gateway=GATEWAY):
+        path = tmp_path / 'capture.pcap'
+        write_pcap(str(path), packets)
+        return ArpListener(gateway=gateway).replay(str(path))
+    return run
+
+
+def kinds(alerts):
+    return [a['extra']['kind'] for a in alerts]
+
+
+def test_pcap_round_trip(tmp_path):
+    path = str(tmp_path / 'rt.pcap')
+    frames = [reply(T0 + 0.25, GW_MAC, GATEWAY), garp(T0 + 1.5, HOST_MAC, '192.168.1.10')]
+    write_pcap(path, frames)
+    read = list(read_pcap(path))
+    assert [frame for _, frame, _ in read] == [frame for _, frame in frames]
+    assert [round(ts, 6) for ts, _, _ in read] == [T0 + 0.25, T0 + 1.5]
+
+
+def test_read_pcap_rejects_other_files(tmp_path):
+    path = tmp_path / 'not.pcap'
+    path.write_bytes(b'\0' * 24)
+    with pytest.raises(ValueError):
+        list(read_pcap(str(path)))
+
+
+def test_parse_frame_handles_vlan_and_linux_sll():
+    frame = build_arp(ARP_REPLY, GW_MAC, GATEWAY, '192.168.1.50', target_mac=HOST_MAC)
+    expected = (ARP_REPLY, GW_MAC, GATEWAY, HOST_MAC, '192.168.1.50')
+    assert parse_frame(frame) == expected
+    tagged = frame[:12] + struct.pack('!HH', 0x8100, 42) + frame[12:]
+    assert parse_frame(tagged) == expected
+    sll = b'\0' * 14 + frame[12:]
+    assert parse_frame(sll, LINKTYPE_LINUX_SLL) == expected
+    ipv4 = frame[:12] + struct.pack('!H', 0x0800) + frame[14:]
+    assert parse_frame(ipv4) is None
+    assert parse_frame(frame[:20]) is None
+
+
+def test_steady_bindings_raise_nothing(replay):
+    packets = [reply(T0 + i, GW_MAC, GATEWAY) for i in range(10)]
+    packets += [reply(T0 + i, HOST_MAC, '192.168.1.10') for i in range(10)]
+    alerts, stats = replay(sorted(packets))
+    assert alerts == []
+    assert stats['new'] == 2 and stats['conflicts'] == 0
+
+
+def test_gateway_mac_change_is_critical(replay):
+    alerts, stats = replay([reply(T0, GW_MAC, GATEWAY), reply(T0 + 5, EVIL, GATEWAY)])
+    assert kinds(alerts) == ['mac_change']
+    alert = alerts[0]
+    assert alert['severity'] == 'CRITICAL' and alert['ip'] == GATEWAY and alert['mac'] == EVIL
+    assert alert['extra']['old_mac'] == GW_MAC and alert['extra']['is_gateway'] is True
+    assert stats['conflicts'] == 1
+
+
+def test_host_mac_change_is_high(replay):
+    alerts, _ = replay([reply(T0, HOST_MAC, '192.168.1.10'), reply(T0 + 5, EVIL, '192.168.1.10')])
+    assert [(a['extra']['kind'], a['severity']) for a in alerts] == [('mac_change', 'HIGH')]
+
+
+def test_change_after_stale_binding_is_a_rebind(replay):
+    alerts, stats = replay([reply(T0, HOST_MAC, '192.168.1.10'),
+                            reply(T0 + BINDING_STALE + 1, EVIL, '192.168.1.10')])
+    assert alerts == []
+    assert stats['rebinds'] == 1 and stats['conflicts'] == 0
+
+
+def test_mac_change_cooldown(replay):
+    # changes spaced so no three fall inside FLAP_WINDOW
+    packets = [reply(T0, GW_MAC, GATEWAY),
+               reply(T0 + 1, EVIL, GATEWAY),                  # alert
+               reply(T0 + 20, GW_MAC, GATEWAY),               # inside the cooldown — suppressed
+               reply(T0 + 90, EVIL, GATEWAY)]                 # cooldown over — alert again
+    alerts, stats = replay(packets)
+    assert ALERT_COOLDOWN < 89
+    assert kinds(alerts) == ['mac_change', 'mac_change']
+    assert [a['extra']['detected_at'] for a in alerts] == [T0 + 1, T0 + 90]
+    assert stats['conflicts'] == 3 and stats['suppressed'] == 1
+
+
+def test_flapping_binding(replay):
+    packets = [reply(T0, GW_MAC, GATEWAY),
+               reply(T0 + 1, EVIL, GATEWAY),
+               reply(T0 + 2, GW_MAC, GATEWAY),
+               reply(T0 + 3, EVIL, GATEWAY),
+               reply(T0 + 4, GW_MAC, GATEWAY)]
+    alerts, stats = replay(packets)
+    # the first change alerts and the third flaps; the rest fall in their cooldowns
+    assert kinds(alerts) == ['mac_change', 'flapping']
+    assert alerts[1]['severity'] == 'CRITICAL' and alerts[1]['mac'] == EVIL
+    assert stats['conflicts'] == 4 and stats['suppressed'] == 4
+
+
+def test_slow_changes_do_not_flap(replay):
+    packets = [reply(T0, GW_MAC, GATEWAY)]
+    packets += [reply(T0 + i * 40, EVIL if i % 2 else GW_MAC, GATEWAY) for i in range(1, 5)]
+    alerts, _ = replay(packets)
+    assert 'flapping' not in kinds(alerts)
+
+
+def test_garp_flood_and_cooldown(replay):
+    ip = '192.168.1.66'
+    packets = [garp(T0 + i / 100, EVIL, ip) for i in range(GARP_FLOOD_PPS * 2)]         # 40 in one second
+    packets += [garp(T0 + 10 + i / 100, EVIL, ip) for i in range(GARP_FLOOD_PPS)]       # in cooldown
+    later = T0 + ALERT_COOLDOWN + 5
+    packets += [garp(later + i / 100, EVIL, ip) for i in range(GARP_FLOOD_PPS)]         # cooldown over
+    alerts, stats = replay(packets)
+    assert kinds(alerts) == ['garp_flood', 'garp_flood']
+    assert alerts[0]['mac'] == EVIL and alerts[0]['ip'] == ip
+    assert stats['suppressed'] == 1
+
+
+def test_garp_below_rate_is_quiet(replay):
+    # one gratuitous ARP per 100 ms never reaches GARP_FLOOD_PPS in any second
+    alerts, stats = replay([garp(T0 + i / 10, HOST_MAC, '192.168.1.10') for i in range(50)])
+    assert alerts == [] and stats['garp'] > 0
+
+
+def test_probes_claim_nothing(replay):
+    alerts, stats = replay([reply(T0, HOST_MAC, '192.168.1.10'),
+                            (T0 + 1, build_arp(ARP_REQUEST, EVIL, '0.0.0.0', '192.168.1.10'))])
+    assert alerts == [] and stats['probes'] == 1
+
+
+def test_replay_cli(tmp_path, capsys):
+    path = str(tmp_path / 'spoof.pcap')
+    write_pcap(path, [reply(T0, GW_MAC, GATEWAY), reply(T0 + 1, EVIL, GATEWAY)])
+    assert arp_listener.main(['--replay', path, '--gateway', GATEWAY]) == 0
+    out = capsys.readouterr().out
+    assert '[CRITICAL]' in out and 'GATEWAY' in out
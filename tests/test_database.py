@@ -0,0 +1,357 @@
+import os
+import shutil
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DB = os.path.join(ROOT, 'garuda.db')     # shipped pre-migration database (user_version 0)
+BASELINE_TABLES = ('scans', 'devices', 'known_devices', 'alerts', 'traffic', 'arp_snapshots', 'port_history')
+
+
+def ago(**delta):
+    return (datetime.now() - timedelta(**delta)).isoformat()
+
+
+def scan_result(n=3, traffic=None, risk=40):
+    devices = [{'ip': f'192.168.1.{i + 10}', 'mac': f'02:00:00:00:00:{i:02X}', 'vendor': 'Acme',
+                'status': 'ACTIVE', 'detection_method': 'PING+ARP', 'type': 'NODE'} for i in range(n)]
+    return {
+        'gateway': '192.168.1.1',
+        'local_ip': '192.168.1.2',
+        'scan_duration': '1.5s',
+        'connected_network': {'ssid': 'home', 'encryption': 'WPA2'},
+        'connected_devices': devices,
+        'port_scan': {d['ip']: [22] for d in devices},
+        'network_traffic': traffic or {},
+        'security_summary': {'total_devices': n, 'active_devices': n, 'threat_level': 'LOW'},
+        'attack_prediction': {'risk_score': risk, 'risk_label': 'MEDIUM'},
+    }
+
+
+def count(db, table, where='1', params=()):
+    with db.session() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params).fetchone()[0]
+
+
+# ── migrations ─────────────────────────────────
+
+@pytest.fixture
+def baseline(tmp_path, monkeypatch):
+    path = tmp_path / 'garuda.db'
+    shutil.copy(BASELINE_DB, path)
+    monkeypatch.setattr(database, 'DB_PATH', str(path))
+    return path
+
+
+def table_counts(path):
+    conn = sqlite3.connect(str(path))
+    try:
+        return {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in BASELINE_TABLES}
+    finally:
+        conn.close()
+
+
+def columns(conn, table):
+    return {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def test_baseline_db_migrates_to_latest_keeping_rows(baseline):
+    conn = sqlite3.connect(str(baseline))
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+    conn.close()
+    before = table_counts(baseline)
+    assert before['scans'] and before['devices'] and before['known_devices']
+
+    database.init_db()
+    assert table_counts(baseline) == before
+    conn = database.get_conn()
+    try:
+        assert database.schema_version(conn) == database.MIGRATIONS[-1][0] == len(database.MIGRATIONS)
+        assert {'targets', 'model_inputs'} <= columns(conn, 'scans')
+        assert {'interface', 'subnet'} <= columns(conn, 'devices')
+        assert 'hostname_checked' in columns(conn, 'known_devices')
+        assert 'ended' in columns(conn, 'arp_intervals')
+        assert 'source' in columns(conn, 'traffic_1m')
+        indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        assert {'idx_scans_timestamp', 'idx_devices_scan', 'idx_arp_intervals_open', 'idx_known_last_ip'} <= indexes
+        # v8 seeds the dashboard counters from the rows already there
+        state = conn.execute("SELECT known_devices, unacked_alerts FROM dashboard_state").fetchone()
+        unacked = conn.execute("SELECT COUNT(*) FROM alerts WHERE acknowledged=0").fetchone()[0]
+        assert tuple(state) == (before['known_devices'], unacked)
+        assert {r['name'] for r in conn.execute("SELECT name FROM change_counters")} == \
+            {'scans', 'alerts', 'known_devices'}
+        # a second pass is a no-op
+        assert database.migrate(conn) == len(database.MIGRATIONS)
+    finally:
+        conn.close()
+
+
+def test_migrated_baseline_takes_new_scans(baseline):
+    database.init_db()
+    scans = table_counts(baseline)['scans']
+    versions = database.get_change_versions('scans', 'known_devices')
+    scan_id = database.save_scan(scan_result())
+    assert table_counts(baseline)['scans'] == scans + 1
+    assert database.get_change_versions('scans', 'known_devices')['scans'] == versions['scans'] + 1
+    assert database.get_dashboard_summary()['latest_scan']['id'] == scan_id
+    assert database.audit_query_plans(threshold=0) == []
+
+
+def test_failed_migration_rolls_back(db, monkeypatch):
+    monkeypatch.setattr(database, 'MIGRATIONS', database.MIGRATIONS + [
+        (len(database.MIGRATIONS) + 1, 'broken', ["CREATE TABLE half_done (a)", "NOT SQL"]),
+    ])
+    conn = database.get_conn()
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            database.migrate(conn)
+        assert database.schema_version(conn) == len(database.MIGRATIONS) - 1
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name='half_done'").fetchone() is None
+    finally:
+        conn.close()
+
+
+# ── save_scan ──────────────────────────────────
+
+def test_save_scan_writes_in_chunks(db, monkeypatch):
+    monkeypatch.setattr(database, 'SAVE_CHUNK', 7)
+    sizes = []
+    chunks = database._chunks
+
+    def recording(rows, size=None):
+        for chunk in chunks(rows, size):
+            sizes.append(len(chunk))
+            yield chunk
+    monkeypatch.setattr(database, '_chunks', recording)
+
+    stats = {}
+    traffic = {'bytes_sent_raw': 10, 'bytes_recv_raw': 20, 'packets_sent_raw': 1, 'packets_recv_raw': 2}
+    scan_id = db.save_scan(scan_result(20, traffic), stats=stats)
+    # devices, known_devices, traffic, port_history
+    assert sizes == [7, 7, 6, 7, 7, 6, 1, 7, 7, 6]
+    assert {k: v['rows'] for k, v in stats.items()} == {
+        'scans': 1, 'devices': 20, 'known_devices': 20, 'traffic': 1, 'port_history': 20, 'arp_intervals': 20}
+    assert count(db, 'devices', 'scan_id=?', (scan_id,)) == 20
+    assert count(db, 'known_devices') == 20 and count(db, 'port_history') == 20
+
+
+def test_second_scan_upserts_known_devices_and_writes_no_arp_rows(db):
+    db.save_scan(scan_result(5))
+    stats = {}
+    db.save_scan(scan_result(5), stats=stats)
+    assert stats['arp_intervals']['rows'] == 0
+    assert count(db, 'known_devices') == 5
+    assert {d['times_seen'] for d in db.get_known_devices()} == {2}
+
+
+# ── retention / rollups ────────────────────────
+
+TRAFFIC_COLUMNS = ('timestamp', 'bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv')
+
+
+def insert_traffic(db, rows):
+    with db.session() as conn:
+        conn.executemany(f"""
+            INSERT INTO traffic ({', '.join(TRAFFIC_COLUMNS)}) VALUES (?,?,?,?,?)
+        """, rows)
+
+
+def tier(db, table):
+    with db.session() as conn:
+        return {r['bucket']: dict(r) for r in conn.execute(f"SELECT * FROM {table} ORDER BY bucket")}
+
+
+def test_rollup_folds_deltas_into_every_tier(db):
+    base = datetime.now().replace(second=0, microsecond=0) - timedelta(hours=50)
+    at = lambda s: (base + timedelta(seconds=s)).isoformat()
+    insert_traffic(db, [(at(10), 0, 1000, 0, 10),     # baseline sample
+                        (at(70), 0, 1600, 0, 16),     # +600 in the next minute
+                        (at(130), 0, 400, 0, 4),      # counter reset → counts from zero
+                        (at(160), 0, 900, 0, 9)])     # +500, same minute
+
+    stats = db.run_retention()
+    assert stats['traffic_rolled_up'] == 4
+    minutes = tier(db, 'traffic_1m')
+    assert [(m['bytes_recv'], m['samples']) for m in minutes.values()] == [(600, 1), (900, 2)]
+    hour, day = tier(db, 'traffic_1h'), tier(db, 'traffic_1d')
+    assert sum(h['bytes_recv'] for h in hour.values()) == sum(d['bytes_recv'] for d in day.values()) == 1500
+    # raw rows past the raw window go, except the watermark row later deltas start from
+    assert stats['traffic_expired'] == 3 and count(db, 'traffic') == 1
+
+    # running again consumes nothing and counts nothing twice
+    assert db.run_retention()['traffic_rolled_up'] == 0
+    assert tier(db, 'traffic_1m') == minutes
+    insert_traffic(db, [(at(250), 0, 1000, 0, 10)])
+    db.run_retention()
+    assert sum(m['bytes_recv'] for m in tier(db, 'traffic_1m').values()) == 1600
+
+
+def test_live_minutes_win_over_scan_deltas(db):
+    minute = (datetime.now() - timedelta(minutes=5)).isoformat()[:16]
+    agg = dict.fromkeys(database.TRAFFIC_COUNTERS + ('max_sent_rate', 'max_recv_rate', 'samples'), 0)
+    db.save_live_traffic({minute: {**agg, 'bytes_recv': 5000, 'samples': 60}})
+    insert_traffic(db, [(minute + ':01', 0, 100, 0, 0), (minute + ':30', 0, 300, 0, 0)])
+    db.run_retention()
+    assert tier(db, 'traffic_1m')[minute]['bytes_recv'] == 5000
+
+
+def test_expired_tier_buckets_are_dropped(db):
+    old = ago(days=10)[:16]
+    with db.session() as conn:
+        conn.execute("INSERT INTO traffic_1m (bucket, bytes_recv) VALUES (?, 1)", (old,))
+    assert db.run_retention()['traffic_1m_expired'] == 1
+
+
+def test_arp_snapshots_compact_into_intervals(db):
+    ip = '192.168.1.40'
+    with db.session() as conn:
+        conn.executemany("INSERT INTO arp_snapshots (timestamp, ip, mac) VALUES (?,?,?)", [
+            (ago(hours=30), ip, 'M1'),
+            (ago(hours=29, minutes=50), ip, 'M1'),      # within the gap — same interval
+            (ago(hours=28), ip, 'M1'),                  # 110 min of silence — new interval
+            (ago(hours=27), ip, 'M2'),                  # new MAC — new interval
+            (ago(hours=1), ip, 'M2'),                   # inside the raw window — kept
+        ])
+        conn.execute("""
+            INSERT INTO arp_intervals (ip, mac, first_seen, last_seen, ended) VALUES (?,?,?,?,?)
+        """, ('192.168.1.99', 'OLD', ago(days=400), ago(days=400), ago(days=400)))
+    stats = db.run_retention()
+    assert stats['arp_compacted'] == 4 and stats['arp_intervals_expired'] == 1
+    assert count(db, 'arp_snapshots') == 1
+    rows = db.get_arp_history(ip, hours=48)
+    assert [r['mac'] for r in sorted(rows, key=lambda r: r['timestamp'])] == ['M1', 'M1', 'M2', 'M2']
+
+
+def test_port_history_keeps_only_changes(db):
+    ip = '192.168.1.50'
+    with db.session() as conn:
+        conn.executemany("INSERT INTO port_history (timestamp, ip, ports) VALUES (?,?,?)", [
+            (ago(days=10), ip, '[22]'),
+            (ago(days=9), ip, '[22]'),          # unchanged — dropped
+            (ago(days=8, hours=12), ip, '[80, 22]'),
+            (ago(days=8), ip, '[22]'),
+            (ago(days=1), ip, '[22]'),          # inside the raw window — kept
+        ])
+    assert db.run_retention()['ports_compacted'] == 1
+    assert count(db, 'port_history') == 4
+
+
+# ── ARP spoof analysis ─────────────────────────
+
+def test_analyze_arp_spoofing(db):
+    with db.session() as conn:
+        conn.executemany("""
+            INSERT INTO arp_intervals (ip, mac, first_seen, last_seen, ended) VALUES (?,?,?,?,?)
+        """, [
+            ('10.0.0.1', 'M1', ago(hours=5), ago(hours=2), ago(hours=2)),     # gateway rebound
+            ('10.0.0.1', 'M2', ago(hours=2), ago(minutes=1), None),
+            ('10.0.0.2', 'M3', ago(hours=5), ago(minutes=1), None),           # steady
+            ('10.0.0.3', 'M4', ago(hours=5), ago(minutes=1), None),           # table disagrees
+            ('10.0.0.5', 'M8', ago(hours=60), ago(hours=50), ago(hours=50)),  # outside the window
+            ('10.0.0.5', 'M9', ago(hours=50), ago(minutes=1), None),
+        ])
+        conn.executemany("INSERT INTO arp_snapshots (timestamp, ip, mac) VALUES (?,?,?)", [
+            (ago(hours=3), '10.0.0.4', 'M6'), (ago(hours=1), '10.0.0.4', 'M7'),   # legacy rows
+        ])
+    result = db.analyze_arp_spoofing({'10.0.0.1': 'M2', '10.0.0.2': 'M3', '10.0.0.3': 'M5',
+                                      '10.0.0.4': 'M7', '10.0.0.5': 'M9'})
+    assert set(result) == {'10.0.0.1', '10.0.0.3', '10.0.0.4'}
+    assert result['10.0.0.1']['macs'] == ['M1', 'M2']
+    assert [c['mac'] for c in result['10.0.0.1']['changes']] == ['M1', 'M2']
+    assert result['10.0.0.1']['changes'][0]['ended'] is not None
+    assert result['10.0.0.3']['current_mac'] == 'M5' and result['10.0.0.3']['macs'] == ['M4', 'M5']
+    assert [(c['mac'], c['ended']) for c in result['10.0.0.3']['changes']] == [('M4', None)]
+    assert result['10.0.0.4']['macs'] == ['M6', 'M7']
+    assert db.analyze_arp_spoofing({}) == {}
+
+
+# ── dashboard cache ────────────────────────────
+
+DASHBOARD_KEYS = ('latest_scan', 'scans_last_24h', 'total_known_devices', 'unacked_alerts', 'recent_alerts')
+
+
+def assert_matches_tables(db, summary):
+    fresh = db.query_dashboard_summary()
+    assert {k: summary[k] for k in DASHBOARD_KEYS} == {k: fresh[k] for k in DASHBOARD_KEYS}
+    assert summary['risk_trend'] == fresh['risk_trend']
+
+
+def test_dashboard_write_through_keeps_etag_honest(db):
+    summary, etag = db.get_dashboard_snapshot()
+    assert db.get_dashboard_snapshot()[1] == etag
+    rebuilds = db.dashboard.stats['rebuilds']
+
+    db.save_scan(scan_result(2))
+    summary, after_scan = db.get_dashboard_snapshot()
+    assert after_scan != etag and summary['scans_last_24h'] == 1 and summary['total_known_devices'] == 2
+    assert_matches_tables(db, summary)
+
+    db.save_alert('NEW_DEVICE', 'HIGH', 'New device', ip='192.168.1.10')
+    summary, after_alert = db.get_dashboard_snapshot()
+    assert after_alert not in (etag, after_scan) and summary['unacked_alerts'] == 1
+    assert_matches_tables(db, summary)
+
+    db.acknowledge_alert(summary['recent_alerts'][0]['id'])
+    summary, after_ack = db.get_dashboard_snapshot()
+    assert after_ack != after_alert and summary['unacked_alerts'] == 0
+    assert summary['recent_alerts'][0]['acknowledged'] == 1
+    assert_matches_tables(db, summary)
+    # every change above was patched in place
+    assert db.dashboard.stats['rebuilds'] == rebuilds
+
+
+def test_dashboard_sees_other_processes_writes(db, monkeypatch):
+    _, etag = db.get_dashboard_snapshot()
+    # e.g. monitor.py or a scan worker, on its own connection
+    other = sqlite3.connect(db.DB_PATH)
+    other.execute("INSERT INTO alerts (timestamp, type, severity, title) VALUES (?,?,?,?)",
+                  (datetime.now().isoformat(), 'ARP_SPOOF', 'CRITICAL', 'Gateway MAC changed'))
+    other.commit()
+    other.close()
+    assert db.get_dashboard_snapshot()[1] == etag        # inside DASHBOARD_RECHECK
+    db.invalidate_caches()
+    summary, fresh = db.get_dashboard_snapshot()
+    assert fresh != etag and summary['unacked_alerts'] == 1
+    assert_matches_tables(db, summary)
+
+    # a write-through after someone else's write rebuilds instead of patching
+    db.save_alert('PORT_CHANGE', 'LOW', 'Port opened')
+    summary, _ = db.get_dashboard_snapshot()
+    assert summary['unacked_alerts'] == 2
+    assert_matches_tables(db, summary)
+
+
+def test_etags_do_not_survive_a_restart(db):
+    _, etag = db.get_dashboard_snapshot()
+    assert database.DashboardCache().snapshot()[1] != etag
+
+
+def test_change_versions_move_with_their_tables(db):
+    before = db.get_change_versions('scans', 'alerts', 'known_devices')
+    db.save_scan(scan_result(1))
+    db.save_alert('NEW_DEVICE', 'HIGH', 'New device')
+    db.save_hostnames({'192.168.1.10': 'nas.lan'})
+    after = db.get_change_versions('scans', 'alerts', 'known_devices')
+    assert after['scans'] == before['scans'] + 1
+    assert after['alerts'] == before['alerts'] + 1
+    assert after['known_devices'] == before['known_devices'] + 2     # new MAC + hostname
+
+
+def test_invalidate_reloads_arp_bindings_written_elsewhere(db):
+    ip = '192.168.1.60'
+    db.observe_arp_table({ip: '02:00:00:00:00:01'})
+    other = database.ArpBindingStore()          # a scan worker's copy
+    with db.session() as conn:
+        other.observe(conn, {ip: '02:00:00:00:00:02'})
+    assert db.arp_bindings.current(ip) == '02:00:00:00:00:01'
+    db.invalidate_caches()
+    assert db.observe_arp_table({}) == 0
+    assert db.arp_bindings.current(ip) == '02:00:00:00:00:02'
+    assert db.get_arp_history(ip)[0]['mac'] == '02:00:00:00:00:02'
@@ -0,0 +1,205 @@
+import ipaddress
+import os
+import socket
+import struct
+import sys
+from collections import deque
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from icmp_sweep import (ICMPSweeper, build_echo, checksum, parse_reply, ICMP_ECHO_REPLY,
+                        ICMP_ECHO_REQUEST)
+
+
+def ip_header(src='10.0.0.2', dst='10.0.0.1', ihl=5):
+    options = b'\0' * ((ihl - 5) * 4)
+    return struct.pack('!BBHHHBBH4s4s', 0x40 | ihl, 0, 0, 0, 0, 64, 1, 0,
+                       socket.inet_aton(src), socket.inet_aton(dst)) + options
+
+
+def echo_reply(ident, seq, with_ip_header=False):
+    header = struct.pack('!BBHHH', ICMP_ECHO_REPLY, 0, 0, ident, seq)
+    icmp = struct.pack('!BBHHH', ICMP_ECHO_REPLY, 0, checksum(header + b'GARUDA'), ident, seq) + b'GARUDA'
+    return (ip_header() if with_ip_header else b'') + icmp
+
+
+class FakeICMPSocket:
+    """
+    Non-blocking ICMP socket stand-in. `responder(ident, seq, ip)` returns
+    [(ident, seq, from_ip), ...] replies for each echo sent; a socketpair
+    provides the fd select() waits on.
+    """
+
+    def __init__(self, responder, mode='raw', port=4242):
+        self.responder = responder
+        self.has_ip_header = mode == 'raw'
+        self.port = port
+        self.sent = []            # (ident, seq, ip)
+        self.replies = deque()
+        self._r, self._w = socket.socketpair()
+
+    def fileno(self):
+        return self._r.fileno()
+
+    def sendto(self, packet, addr):
+        icmp_type, _, _, ident, seq = struct.unpack('!BBHHH', packet[:8])
+        assert icmp_type == ICMP_ECHO_REQUEST and checksum(packet) == 0
+        self.sent.append((ident, seq, addr[0]))
+        for reply in self.responder(ident, seq, addr[0]):
+            self.replies.append(reply)
+            self._w.send(b'x')
+
+    def recvfrom(self, size):
+        if not self.replies:
+            raise BlockingIOError
+        self._r.recv(1)
+        ident, seq, src = self.replies.popleft()
+        return echo_reply(ident, seq, self.has_ip_header), (src, 0)
+
+    def bind(self, addr):
+        pass
+
+    def getsockname(self):
+        return ('0.0.0.0', self.port)
+
+    def setblocking(self, flag):
+        pass
+
+    def setsockopt(self, *args):
+        pass
+
+    def close(self):
+        self._r.close()
+        self._w.close()
+
+
+def echo_back(ident, seq, ip):
+    return [(ident, seq, ip)]
+
+
+def sweep_with(sock, ips, mode='raw', timeout=0.2):
+    sweeper = ICMPSweeper(rate=10000, timeout=timeout)
+    try:
+        return sweeper._sweep_socket(sock, mode, ips, timeout, sweeper.rate, None)
+    finally:
+        sock.close()
+
+
+# ── packet helpers ─────────────────────────────
+
+def test_checksum_verifies_to_zero():
+    packet = build_echo(0x1234, 7)
+    assert checksum(packet) == 0
+    assert checksum(build_echo(0xFFFF, 0xFFFF, b'odd')) == 0      # odd-length payload is padded
+
+
+def test_build_echo_parse_round_trip_without_ip_header():
+    packet = build_echo(0xBEEF, 513)
+    assert parse_reply(packet, has_ip_header=False) == (ICMP_ECHO_REQUEST, 0xBEEF, 513)
+
+
+@pytest.mark.parametrize('ihl', [5, 6])
+def test_parse_reply_skips_ip_header_including_options(ihl):
+    packet = ip_header(ihl=ihl) + echo_reply(0xBEEF, 513)
+    assert parse_reply(packet, has_ip_header=True) == (ICMP_ECHO_REPLY, 0xBEEF, 513)
+
+
+def test_parse_reply_rejects_truncated_packets():
+    assert parse_reply(b'', has_ip_header=True) is None
+    assert parse_reply(ip_header() + b'\0' * 7, has_ip_header=True) is None
+    assert parse_reply(b'\0' * 7, has_ip_header=False) is None
+
+
+# ── reply matching ─────────────────────────────
+
+@pytest.mark.parametrize('mode', ['raw', 'dgram'])
+def test_sweep_matches_replies_to_targets(mode):
+    ips = ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+    sock = FakeICMPSocket(lambda ident, seq, ip: [] if ip == '10.0.0.2' else echo_back(ident, seq, ip), mode)
+    alive = sweep_with(sock, ips, mode)
+    assert set(alive) == {'10.0.0.1', '10.0.0.3'}
+    assert all(rtt >= 0 for rtt in alive.values())
+    if mode == 'dgram':
+        # ping sockets use the bound port as the identifier
+        assert {ident for ident, _, _ in sock.sent} == {4242}
+
+
+def test_reply_with_foreign_ident_is_ignored():
+    sock = FakeICMPSocket(lambda ident, seq, ip: [(ident ^ 1, seq, ip)])
+    assert sweep_with(sock, ['10.0.0.1']) == {}
+
+
+def test_reply_with_right_seq_from_wrong_host_is_ignored():
+    def responder(ident, seq, ip):
+        if ip == '10.0.0.1':
+            # an impostor answers first with the right ident/seq, then the real host
+            return [(ident, seq, '10.0.0.99'), (ident, seq, ip)]
+        return [(ident, seq, '10.0.0.1')]           # 10.0.0.2's seq answered by .1
+    sock = FakeICMPSocket(responder)
+    alive = sweep_with(sock, ['10.0.0.1', '10.0.0.2'])
+    assert set(alive) == {'10.0.0.1'}
+
+
+def test_sequence_numbers_wrap_at_16_bits():
+    sweeper = ICMPSweeper(rate=10000)
+    sock = FakeICMPSocket(echo_back)
+    alive = {}
+    ips = ['10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.4']
+    try:
+        next_seq = sweeper._round(sock, 'raw', 77, 0xFFFE, ips, alive, 0.2, sweeper.rate, None, None)
+    finally:
+        sock.close()
+    assert [seq for _, seq, _ in sock.sent] == [0xFFFE, 0xFFFF, 0, 1]
+    assert next_seq == 0x10002
+    assert set(alive) == set(ips)
+
+
+def test_on_reply_called_per_live_host():
+    seen = []
+    sweeper = ICMPSweeper(rate=10000, timeout=0.2)
+    sock = FakeICMPSocket(echo_back)
+    try:
+        sweeper._sweep_socket(sock, 'raw', ['10.0.0.1', '10.0.0.2'], 0.2, sweeper.rate,
+                              lambda ip, rtt: seen.append(ip))
+    finally:
+        sock.close()
+    assert sorted(seen) == ['10.0.0.1', '10.0.0.2']
+
+
+# ── subprocess fallback ────────────────────────
+
+def test_sweep_subprocess_uses_fallback():
+    calls = []
+
+    def fallback(ip, timeout):
+        calls.append((ip, timeout))
+        if ip == '10.0.0.3':
+            raise OSError('ping missing')
+        return ip == '10.0.0.1'
+
+    seen = []
+    sweeper = ICMPSweeper(fallback=fallback, fallback_workers=4)
+    alive = sweeper._sweep_subprocess(['10.0.0.1', '10.0.0.2', '10.0.0.3'], 0.7,
+                                      lambda ip, rtt: seen.append(ip))
+    assert set(alive) == {'10.0.0.1'} and seen == ['10.0.0.1']
+    assert sorted(calls) == [('10.0.0.1', 0.7), ('10.0.0.2', 0.7), ('10.0.0.3', 0.7)]
+
+
+def test_sweep_without_icmp_socket_falls_back(monkeypatch):
+    sweeper = ICMPSweeper(fallback=lambda ip, timeout: True)
+    monkeypatch.setattr(sweeper, 'open_socket', lambda: (None, 'subprocess'))
+    assert set(sweeper.sweep(['10.0.0.1', '10.0.0.2'])) == {'10.0.0.1', '10.0.0.2'}
+    assert sweeper.mode == 'subprocess'
+
+
+# ── loopback ───────────────────────────────────
+
+def test_loopback_sweep():
+    sweeper = ICMPSweeper(rate=1000, timeout=1.0)
+    if sweeper.mode == 'subprocess':
+        pytest.skip('neither a raw nor a DGRAM ICMP socket can be opened here')
+    ips = [str(ip) for ip in ipaddress.ip_network('127.0.0.0/29').hosts()]
+    alive = sweeper.sweep(ips)
+    assert set(alive) == set(ips)
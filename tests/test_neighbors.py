@@ -0,0 +1,131 @@
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from neighbors import (NeighborTable, parse_neigh, read_proc_arp, NDMSG, RTATTR, NDA_DST, NDA_LLADDR,
+                       NUD_FAILED)
+from netprobe import (NetlinkMonitor, ProbeCache, RTMGRP_LINK, RTMGRP_NEIGH, RTM_NEWLINK,
+                      RTM_NEWNEIGH, RTM_DELNEIGH)
+
+NUD_REACHABLE, NUD_STALE = 0x02, 0x04
+
+PROC_HEADER = 'IP address       HW type     Flags       HW address            Mask     Device\n'
+
+
+def rtattr(kind, value):
+    attr = RTATTR.pack(RTATTR.size + len(value), kind) + value
+    return attr + b'\0' * (-len(attr) % 4)
+
+
+def neigh(ip, mac=None, state=NUD_REACHABLE, family=socket.AF_INET):
+    payload = NDMSG.pack(family, 0, 0, 2, state, 0, 1)
+    payload += rtattr(NDA_DST, socket.inet_aton(ip))
+    if mac:
+        payload += rtattr(NDA_LLADDR, bytes.fromhex(mac.replace(':', '')))
+    return payload
+
+
+@pytest.fixture
+def proc_arp(tmp_path):
+    path = tmp_path / 'arp'
+    path.write_text(PROC_HEADER +
+                    '192.168.1.1      0x1         0x2         aa:bb:cc:00:00:01     *        eth0\n'
+                    '192.168.1.7      0x1         0x0         00:00:00:00:00:00     *        eth0\n'
+                    '192.168.1.9      0x1         0x2         ff:ff:ff:ff:ff:ff     *        eth0\n')
+    return str(path)
+
+
+@pytest.fixture
+def table(proc_arp):
+    neighbors = NeighborTable(path=proc_arp, monitor=None)
+    neighbors._resync()
+    neighbors._watching = True    # as if netlink were live: table() serves memory
+    return neighbors
+
+
+def test_read_proc_arp_keeps_complete_unicast_entries(proc_arp, tmp_path):
+    assert read_proc_arp(proc_arp) == {'192.168.1.1': 'AA:BB:CC:00:00:01'}
+    assert read_proc_arp(str(tmp_path / 'missing')) is None
+
+
+def test_parse_neigh():
+    assert parse_neigh(neigh('10.0.0.5', 'de:ad:be:ef:00:01')) == ('10.0.0.5', 'DE:AD:BE:EF:00:01', NUD_REACHABLE)
+    assert parse_neigh(neigh('10.0.0.5', state=NUD_FAILED)) == ('10.0.0.5', None, NUD_FAILED)
+    assert parse_neigh(neigh('10.0.0.5', 'de:ad:be:ef:00:01', family=socket.AF_INET6)) is None
+    assert parse_neigh(b'\0' * 4) is None
+
+
+def test_new_binding_bumps_version_and_notifies(table):
+    changes = []
+    table.on_change(lambda *change: changes.append(change))
+    table._on_event(RTM_NEWNEIGH, neigh('192.168.1.20', '02:00:00:00:00:20'))
+    assert table.version == 1
+    assert table.table()['192.168.1.20'] == '02:00:00:00:00:20'
+    assert changes == [('192.168.1.20', None, '02:00:00:00:00:20')]
+
+
+def test_rebinding_reports_old_and_new_mac(table):
+    changes = []
+    table.on_change(lambda *change: changes.append(change))
+    table._on_event(RTM_NEWNEIGH, neigh('192.168.1.1', '66:66:66:66:66:66'))
+    assert changes == [('192.168.1.1', 'AA:BB:CC:00:00:01', '66:66:66:66:66:66')]
+    assert table.version == 1
+
+
+def test_state_churn_and_removals_do_not_bump_version(table):
+    table._on_event(RTM_NEWNEIGH, neigh('192.168.1.1', 'aa:bb:cc:00:00:01', state=NUD_STALE))
+    assert table.version == 0
+    table._on_event(RTM_NEWNEIGH, neigh('192.168.1.1', state=NUD_FAILED))
+    assert '192.168.1.1' not in table.table()
+    table._on_event(RTM_NEWNEIGH, neigh('192.168.1.30', 'ff:ff:ff:ff:ff:ff'))
+    table._on_event(RTM_DELNEIGH, neigh('192.168.1.30', '02:00:00:00:00:30'))
+    assert table.table() == {}
+    assert table.version == 0
+
+
+def test_events_before_first_snapshot_are_ignored(proc_arp):
+    neighbors = NeighborTable(path=proc_arp, monitor=None)
+    neighbors._on_event(RTM_NEWNEIGH, neigh('192.168.1.20', '02:00:00:00:00:20'))
+    assert neighbors.version == 0
+
+
+def test_wait_change_wakes_on_event(table):
+    threading.Timer(0.05, table._on_event,
+                    (RTM_NEWNEIGH, neigh('192.168.1.20', '02:00:00:00:00:20'))).start()
+    start = time.monotonic()
+    assert table.wait_change(0, timeout=5) == 1
+    assert time.monotonic() - start < 2
+
+
+def test_wait_change_times_out(table):
+    start = time.monotonic()
+    assert table.wait_change(0, timeout=0.1) == 0
+    assert time.monotonic() - start >= 0.1
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_NETLINK'), reason='netlink is Linux only')
+def test_watch_after_probe_cache_receives_neighbour_events(proc_arp, fake_kernel):
+    # startup order in monitor.py and the backend: probes subscribe first
+    monitor = NetlinkMonitor(groups=RTMGRP_LINK)
+    monitor._open = fake_kernel.open
+    probes = ProbeCache(monitor=monitor)
+    probes.get('local_ip', lambda: '192.168.1.2')
+    time.sleep(0.2)
+
+    neighbors = NeighborTable(path=proc_arp, monitor=monitor)
+    assert neighbors.watch()
+    fake_kernel.send(RTMGRP_NEIGH, RTM_NEWNEIGH, neigh('192.168.1.20', '02:00:00:00:00:20'))
+    assert neighbors.wait_change(0, timeout=2) == 1
+    assert neighbors.table()['192.168.1.20'] == '02:00:00:00:00:20'
+
+    fake_kernel.send(RTMGRP_LINK, RTM_NEWLINK)
+    deadline = time.monotonic() + 2
+    while probes.invalidations == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert probes.invalidations == 1
@@ -0,0 +1,70 @@
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import netprobe
+from netprobe import NetlinkMonitor, RTMGRP_LINK, RTMGRP_NEIGH, RTM_NEWLINK, RTM_NEWNEIGH
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_NETLINK'), reason='netlink is Linux only')
+
+
+@pytest.fixture
+def monitor(fake_kernel):
+    monitor = NetlinkMonitor(groups=RTMGRP_LINK)
+    monitor._open = fake_kernel.open
+    return monitor
+
+
+def test_second_subscribe_receives_new_group_without_other_traffic(monitor, fake_kernel):
+    links, neighs = threading.Event(), threading.Event()
+    assert monitor.subscribe((RTM_NEWLINK,), lambda *_: links.set())
+    fake_kernel.send(RTMGRP_LINK, RTM_NEWLINK)
+    assert links.wait(2)
+
+    time.sleep(0.2)           # let the reader park on the first socket again
+    assert monitor.subscribe((RTM_NEWNEIGH,), lambda *_: neighs.set(), groups=RTMGRP_NEIGH)
+    assert monitor.groups & RTMGRP_NEIGH
+    fake_kernel.send(RTMGRP_NEIGH, RTM_NEWNEIGH)
+    assert neighs.wait(2), 'neighbour event not delivered until unrelated traffic arrived'
+
+
+def test_reopen_closes_replaced_sockets(monitor, fake_kernel):
+    monitor.subscribe((RTM_NEWLINK,), lambda *_: None)
+    got = threading.Event()
+    monitor.subscribe((RTM_NEWNEIGH,), lambda *_: None, groups=RTMGRP_NEIGH)
+    monitor.subscribe((RTM_NEWNEIGH,), lambda *_: got.set(), groups=0x100)
+    fake_kernel.send(0x100, RTM_NEWNEIGH)
+    assert got.wait(2)
+    assert [s.fileno() == -1 for _, _, s in fake_kernel.opened] == [True, True, False]
+
+
+def test_failed_reopen_keeps_previous_socket(monitor, fake_kernel):
+    got = threading.Event()
+    monitor.subscribe((RTM_NEWLINK,), lambda *_: got.set())
+    first = monitor._sock
+
+    def refuse(groups):
+        raise OSError(1, 'denied')
+    monitor._open = refuse
+    assert monitor.subscribe((RTM_NEWNEIGH,), lambda *_: None, groups=RTMGRP_NEIGH)
+    assert monitor._sock is first and monitor.groups == RTMGRP_LINK
+    fake_kernel.send(RTMGRP_LINK, RTM_NEWLINK)
+    assert got.wait(2)
+
+
+def test_read_default_gateway(tmp_path):
+    route = tmp_path / 'route'
+    route.write_text(
+        'Iface\tDestination\tGateway\tFlags\tRefCnt\tUse\tMetric\tMask\n'
+        'wlan0\t00000000\t0101A8C0\t0003\t0\t0\t600\t00000000\n'
+        'eth0\t00000000\t0100000A\t0003\t0\t0\t100\t00000000\n'
+        'eth0\t0000A8C0\t00000000\t0001\t0\t0\t100\t00FFFFFF\n')
+    assert netprobe.read_gateways(str(route)) == {'eth0': '10.0.0.1', 'wlan0': '192.168.1.1'}
+    assert netprobe.read_default_gateway(str(route)) == '10.0.0.1'
+    assert netprobe.read_default_gateway(str(tmp_path / 'missing')) is None
@@ -0,0 +1,122 @@
+import csv
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import oui
+from oui import VendorLookup, build, mac_to_int, RANDOMIZED
+
+
+def write_registry(path, rows):
+    with open(path, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['Registry', 'Assignment', 'Organization Name', 'Organization Address'])
+        for registry, assignment, name in rows:
+            w.writerow([registry, assignment, name, 'Somewhere'])
+    return str(path)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    data = tmp_path / 'data'
+    data.mkdir()
+    # IEEE carves MA-M and MA-S blocks out of MA-L prefixes it holds itself
+    write_registry(data / 'oui.csv', [('MA-L', '70B3D5', 'IEEE Registration Authority'),
+                                      ('MA-L', '3C5AB4', 'Google, Inc.'),
+                                      ('MA-L', '525400', 'Registered Local Prefix')])
+    write_registry(data / 'mam.csv', [('MA-M', '70B3D51', 'Block Twenty-Eight Ltd')])
+    write_registry(data / 'oui36.csv', [('MA-S', '70B3D5123', 'Block Thirty-Six GmbH'),
+                                        ('IAB', '70B3D5F00', 'Old IAB Holder')])
+    return data
+
+
+@pytest.fixture
+def lookup(registry, tmp_path):
+    return VendorLookup(index_path=str(tmp_path / 'cache' / 'oui.idx'), data_dir=str(registry))
+
+
+def test_mac_to_int_formats():
+    value = 0x3C5AB4001122
+    assert mac_to_int('3C:5A:B4:00:11:22') == value
+    assert mac_to_int('3c-5a-b4-00-11-22') == value
+    assert mac_to_int('3c5a.b400.1122') == value
+    assert mac_to_int('3C:5A:B4:00:11') is None
+    assert mac_to_int('zz:5A:B4:00:11:22') is None
+
+
+def test_most_specific_assignment_wins(lookup):
+    assert lookup.info('70:B3:D5:12:34:56') == {'vendor': 'Block Thirty-Six GmbH', 'prefix_bits': 36,
+                                                'locally_administered': False, 'multicast': False}
+    assert lookup.info('70:B3:D5:1F:FF:FF')['vendor'] == 'Block Twenty-Eight Ltd'      # /28, not the /36
+    assert lookup.info('70:B3:D5:F0:0A:BC')['prefix_bits'] == 36                       # IAB is /36 too
+    assert lookup.info('70:B3:D5:20:00:00') == {'vendor': 'IEEE Registration Authority', 'prefix_bits': 24,
+                                                'locally_administered': False, 'multicast': False}
+    assert lookup.vendor('3C:5A:B4:00:11:22') == 'Google, Inc.'
+
+
+def test_unknown_global_mac_is_none(lookup):
+    assert lookup.vendor('00:11:22:33:44:55') is None
+    assert lookup.vendor('') is None and lookup.vendor(None) is None
+
+
+def test_randomized_fallback_only_for_unregistered_local_macs(lookup):
+    assert lookup.vendor('DA:A1:19:00:00:01') == RANDOMIZED          # phone per-network MAC
+    info = lookup.info('DA:A1:19:00:00:01')
+    assert info['vendor'] is None and info['locally_administered']
+    # a locally administered prefix that is registered keeps its vendor
+    assert lookup.vendor('52:54:00:12:34:56') == 'Registered Local Prefix'
+    assert lookup.info('01:00:5E:00:00:01')['multicast']
+
+
+def test_index_lives_outside_the_source_tree(lookup, registry, tmp_path):
+    lookup.vendor('3C:5A:B4:00:11:22')
+    assert os.path.exists(tmp_path / 'cache' / 'oui.idx')
+    assert sorted(os.listdir(registry)) == ['mam.csv', 'oui.csv', 'oui36.csv']
+
+
+def test_newer_csv_triggers_rebuild(lookup, registry, tmp_path):
+    assert lookup.vendor('00:11:22:33:44:55') is None
+    path = write_registry(registry / 'extra.csv', [('MA-L', '001122', 'Late Arrival Co.')])
+    index = tmp_path / 'cache' / 'oui.idx'
+    mtime = os.path.getmtime(index)
+    os.utime(path, (mtime + 10, mtime + 10))
+    fresh = VendorLookup(index_path=str(index), data_dir=str(registry))
+    assert fresh.vendor('00:11:22:33:44:55') == 'Late Arrival Co.'
+
+
+def test_concurrent_builds_do_not_clobber_each_other(registry, tmp_path):
+    output = str(tmp_path / 'shared' / 'oui.idx')
+    sources = sorted(str(p) for p in registry.iterdir())
+    errors = []
+
+    def run():
+        try:
+            for _ in range(20):
+                build(sources, output)
+        except Exception as e:            # pragma: no cover — reported below
+            errors.append(e)
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert os.listdir(tmp_path / 'shared') == ['oui.idx']
+    assert VendorLookup(index_path=output, data_dir=str(tmp_path / 'none')).vendor('70:B3:D5:12:34:56') == \
+        'Block Thirty-Six GmbH'
+
+
+def test_bundled_registries_cover_all_three_widths(tmp_path):
+    lookup = VendorLookup(index_path=str(tmp_path / 'oui.idx'), data_dir=oui.DATA_DIR)
+    index = lookup.index
+    assert len(index.prefixes[24]) > 30000
+    assert len(index.prefixes[28]) > 5000
+    assert len(index.prefixes[36]) > 10000
+    assert lookup.info('3C:5A:B4:00:11:22')['prefix_bits'] == 24
+    assert lookup.info('00:55:DA:12:34:56')['prefix_bits'] == 28
+    assert lookup.info('00:1B:C5:00:00:01')['prefix_bits'] == 36
+    assert lookup.vendor('52:54:00:12:34:56') == 'QEMU/KVM'
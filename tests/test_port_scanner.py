@@ -0,0 +1,117 @@
+import asyncio
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from port_scanner import (ConnectScanner, HostTimer, SocketBudget, CLOSED, FILTERED, INITIAL_TIMEOUT, MAX_TIMEOUT,
+                          MIN_TIMEOUT, OPEN)
+
+
+@pytest.fixture
+def listener():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(64)
+    yield sock.getsockname()[1]
+    sock.close()
+
+
+@pytest.fixture
+def closed_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_host_timer():
+    timer = HostTimer()
+    assert timer.timeout == INITIAL_TIMEOUT
+    timer.sample(0.001)
+    assert timer.timeout == MIN_TIMEOUT
+    for _ in range(20):
+        timer.sample(5.0)
+    assert timer.timeout == MAX_TIMEOUT
+
+
+def test_loopback_scan(listener, closed_port):
+    results = []
+    scanner = ConnectScanner(concurrency=4)
+    open_ports = scanner.scan_hosts(['127.0.0.1'], [listener, closed_port],
+                                    on_result=lambda *r: results.append(r))
+    assert open_ports == {'127.0.0.1': [listener]}
+    assert {port: state for _, port, state, _ in results} == {listener: OPEN, closed_port: CLOSED}
+    assert scanner.budget.in_use == 0
+
+
+def test_bad_targets_fail_alone(listener):
+    results = {}
+    scanner = ConnectScanner(concurrency=4, initial_timeout=0.2)
+    open_ports = scanner.scan([('127.0.0.1', listener), (None, 80), ('127.0.0.1', 70000)],
+                              on_result=lambda ip, port, state, rtt: results.setdefault((ip, port), state))
+    assert open_ports == {'127.0.0.1': [listener]}
+    assert results[(None, 80)] == CLOSED and results[('127.0.0.1', 70000)] in (CLOSED, FILTERED)
+
+
+def test_concurrency_cap_holds_across_scans(closed_port):
+    scanner = ConnectScanner(concurrency=3)
+    peak = [0]
+
+    def on_result(*_):
+        peak[0] = max(peak[0], scanner.budget.in_use)
+    targets = [('127.0.0.1', closed_port)] * 40
+    threads = [threading.Thread(target=scanner.scan, args=(targets, on_result)) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert 0 < peak[0] <= 3
+    assert scanner.budget.in_use == 0 and not scanner.budget._waiters
+
+
+def test_budget_hands_slots_across_event_loops():
+    budget = SocketBudget(1)
+    held = threading.Event()
+    released = threading.Event()
+    order = []
+
+    async def hold():
+        async with budget:
+            order.append('first')
+            held.set()
+            await asyncio.sleep(0.1)
+        released.set()
+
+    async def wait_turn():
+        async with budget:
+            order.append('second')
+
+    first = threading.Thread(target=asyncio.run, args=(hold(),))
+    first.start()
+    assert held.wait(2)
+    asyncio.run(wait_turn())        # a different loop, parked until the slot is handed over
+    first.join(2)
+    assert order == ['first', 'second'] and released.is_set()
+    assert budget.in_use == 0
+
+
+def test_cancelled_waiter_passes_its_slot_on():
+    async def main():
+        budget = SocketBudget(1)
+        await budget.acquire()
+        waiter = asyncio.ensure_future(budget.acquire())
+        await asyncio.sleep(0)
+        budget.release()            # handed to the waiter...
+        waiter.cancel()             # ...which is cancelled before it runs
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert budget.in_use == 0
+        await asyncio.wait_for(budget.acquire(), 1)
+        assert budget.in_use == 1
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import predictor
+from predictor import AttackPredictor, RISKY_PORTS, model_inputs, rescore, scan_from_features
+
+
+def make_scan(n, encryption='WPA2-PSK', errin=0, gateway_ports=(), traffic=True):
+    devices = [{'ip': f'192.168.1.{10 + i}', 'mac': f'02:00:00:00:{n:02X}:{i:02X}',
+                'vendor': 'Unknown' if i % 3 == 0 else 'Apple, Inc.',
+                'detection_method': 'ARP_ONLY' if i % 4 == 0 else 'PING+ARP', 'status': 'ACTIVE'}
+               for i in range(n)]
+    port_scan = {d['ip']: [22, 445] if i % 2 else [80] for i, d in enumerate(devices)}
+    if gateway_ports:
+        # the gateway and local address are probed but not listed as devices
+        port_scan['192.168.1.1'] = list(gateway_ports)
+    scan = {'connected_network': {'ssid': 'lab', 'encryption': encryption},
+            'connected_devices': devices, 'port_scan': port_scan,
+            'gateway': '192.168.1.1', 'local_ip': '192.168.1.2', 'scan_duration': '1.0s'}
+    if traffic:
+        scan['network_traffic'] = {'bytes_sent_raw': 1000 * n, 'bytes_recv_raw': 2000 * n,
+                                   'packets_sent_raw': 10 * n, 'packets_recv_raw': 500,
+                                   'errin': errin, 'errout': 0, 'dropin': 1, 'dropout': 0}
+    return scan
+
+
+SCANS = [
+    make_scan(4, 'Open', errin=3, gateway_ports=(23, 80)),
+    make_scan(9, 'WPA2-PSK', errin=0, gateway_ports=(3389,)),
+    make_scan(1, 'WPA3-SAE', errin=7),
+    make_scan(0, 'WEP', traffic=False),
+    make_scan(31, 'WPA2-Enterprise', errin=2, gateway_ports=(21, 23, 445)),
+]
+
+
+def expected(scan, model=None):
+    p = (model or AttackPredictor()).predict(scan)
+    return p['risk_score'], p['risk_label'], p['component_scores']
+
+
+def scored(result, i):
+    s = result['scans']
+    return s['risk_score'][i], s['risk_label'][i], {k: v[i] for k, v in s['component_scores'].items()}
+
+
+def test_model_inputs_count_every_probed_ip():
+    inputs = model_inputs(SCANS[0])
+    assert inputs['devices'] == 4 and inputs['unknown'] == 2 and inputs['arp_only'] == 1
+    assert inputs['ports'] == {'80': 3, '22': 2, '445': 2, '23': 1}
+    assert (inputs['errin'], inputs['dropin'], inputs['packets_recv']) == (3, 1, 500)
+    assert AttackPredictor().predict(SCANS[0])['inputs'] == inputs
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_score_batch_matches_predict(monkeypatch, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(predictor, 'np', None)
+    elif predictor.np is None:
+        pytest.skip('numpy not installed')
+    model = AttackPredictor()
+    features = {name: [] for name in ('scan_id', 'timestamp', 'encryption', 'risk_score', 'risk_label')}
+    for i, scan in enumerate(SCANS):
+        for name, value in (('scan_id', i), ('timestamp', ''), ('risk_score', 0), ('risk_label', 'LOW'),
+                            ('encryption', scan['connected_network']['encryption'])):
+            features[name].append(value)
+        for name, value in predictor.input_counts(model_inputs(scan)).items():
+            features.setdefault(name, []).append(value)
+    result = rescore(features, predictor=model)
+    for i, scan in enumerate(SCANS):
+        assert scored(result, i) == expected(scan)
+        assert expected(scan_from_features(features, i)) == expected(scan)
+
+
+def test_rescore_matches_predict_after_retention(db):
+    model = AttackPredictor()
+    for scan in SCANS:
+        db.save_scan({**scan, 'attack_prediction': model.predict(scan)})
+    with db.session() as conn:
+        # age every scan and its traffic sample past traffic_raw_hours
+        rows = conn.execute("SELECT id, timestamp FROM scans ORDER BY id").fetchall()
+        for n, row in enumerate(rows):
+            old = f'2020-01-0{n + 1}T00:00:00'
+            conn.execute("UPDATE scans SET timestamp=? WHERE id=?", (old, row['id']))
+            conn.execute("UPDATE traffic SET timestamp=? WHERE timestamp=?", (old, row['timestamp']))
+            conn.execute("UPDATE devices SET timestamp=? WHERE scan_id=?", (old, row['id']))
+        before = conn.execute("SELECT COUNT(*) FROM traffic").fetchone()[0]
+    stats = db.run_retention()
+    with db.session() as conn:
+        after = conn.execute("SELECT COUNT(*) FROM traffic").fetchone()[0]
+    assert stats['traffic_expired'] == before - after > 0
+
+    features = db.get_scan_features(risky_ports=RISKY_PORTS)
+    result = rescore(features, predictor=model)
+    assert result['count'] == len(SCANS)
+    assert result['mean_delta'] == 0 and result['transitions'] == {}
+    for i, scan in enumerate(SCANS):
+        assert scored(result, i) == expected(scan)
+
+
+def test_rescore_with_changed_weights_matches_predict(db):
+    model = AttackPredictor()
+    for scan in SCANS:
+        db.save_scan({**scan, 'attack_prediction': model.predict(scan)})
+    weights = {'encryption': 0.5, 'open_ports': 0.3}
+    labels = predictor.parse_labels(['HIGH=30'])
+    result = rescore(db.get_scan_features(risky_ports=RISKY_PORTS), weights, labels, model)
+    tuned = AttackPredictor()
+    tuned.WEIGHTS = {**AttackPredictor.WEIGHTS, **weights}
+    tuned.LABELS = labels
+    for i, scan in enumerate(SCANS):
+        assert scored(result, i) == expected(scan, tuned)
+
+
+def test_scans_saved_before_model_inputs_fall_back_to_devices(db):
+    scan = SCANS[1]
+    db.save_scan({**scan, 'attack_prediction': {k: v for k, v in AttackPredictor().predict(scan).items()
+                                                if k != 'inputs'}})
+    features = db.get_scan_features(risky_ports=RISKY_PORTS)
+    assert features['devices'] == [9]
+    # the legacy path only sees device rows, not the gateway's ports
+    assert features['open_ports'] == [sum(len(p) for ip, p in scan['port_scan'].items() if ip != '192.168.1.1')]
+    assert features['errin'] == [0] and features['packets_recv'] == [500]
@@ -0,0 +1,93 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resolver import HostnameResolver
+
+
+def _resolve_in_thread(resolver, ips, timeout=10):
+    out = {}
+    t = threading.Thread(target=lambda: out.update(names=resolver.resolve_many(ips)), daemon=True)
+    t.start()
+    t.join(timeout)
+    assert not t.is_alive(), 'resolve_many deadlocked'
+    return out['names']
+
+
+def test_instant_lookup_does_not_deadlock():
+    # lookups that finish before add_done_callback run the callback inline
+    resolver = HostnameResolver(lookup=lambda ip: 'h')
+    ips = [f'10.0.{i // 250}.{i % 250 + 1}' for i in range(500)]
+    names = _resolve_in_thread(resolver, ips)
+    assert names == {ip: 'h' for ip in ips}
+    assert _resolve_in_thread(resolver, ips) == names
+    assert resolver.stats['hits'] == len(ips)
+
+
+def test_failed_lookup_maps_to_none():
+    def lookup(ip):
+        raise OSError('no PTR')
+    resolver = HostnameResolver(lookup=lookup)
+    assert _resolve_in_thread(resolver, ['10.0.0.1']) == {'10.0.0.1': None}
+
+
+def test_answers_after_the_deadline_are_persisted():
+    release = threading.Event()
+    saved = []
+
+    def lookup(ip):
+        if ip == '10.0.0.2':
+            release.wait(5)
+        return 'host-' + ip.rsplit('.', 1)[1]
+    resolver = HostnameResolver(lookup=lookup, deadline=0.1, saver=lambda names, macs: saved.append((names, macs)))
+    names = resolver.resolve_many(['10.0.0.1', '10.0.0.2'], macs={'10.0.0.1': 'M1', '10.0.0.2': 'M2'})
+    assert names == {'10.0.0.1': 'host-1', '10.0.0.2': None}
+    assert saved == [({'10.0.0.1': 'host-1'}, {'10.0.0.1': 'M1'})]
+    release.set()
+    deadline = time.monotonic() + 2
+    while len(saved) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert saved[1] == ({'10.0.0.2': 'host-2'}, {'10.0.0.2': 'M2'})
+    assert resolver.resolve('10.0.0.2') == 'host-2'
+
+
+def test_failed_lookups_are_not_persisted():
+    saved = []
+
+    def lookup(ip):
+        raise OSError('resolver down')
+    resolver = HostnameResolver(lookup=lookup, saver=lambda names, macs: saved.append(names))
+    resolver.resolve_many(['10.0.0.1'])
+    assert saved == []
+
+
+def test_first_scan_hosts_are_stored_and_reloaded(db):
+    db.save_hostnames({'192.168.1.20': 'printer.lan', '192.168.1.21': ''},
+                      {'192.168.1.20': '02:00:00:00:00:20', '192.168.1.21': '02:00:00:00:00:21'})
+    loaded = {ip: name for ip, name, _ in db.load_hostnames()}
+    assert loaded == {'192.168.1.20': 'printer.lan', '192.168.1.21': ''}
+
+    # the scan that follows counts the sighting once and keeps the name
+    db.save_scan({'connected_devices': [{'ip': '192.168.1.20', 'mac': '02:00:00:00:00:20', 'vendor': 'Acme'}]})
+    device = {d['mac']: d for d in db.get_known_devices()}['02:00:00:00:00:20']
+    assert device['hostname'] == 'printer.lan' and device['times_seen'] == 1 and device['vendor'] == 'Acme'
+
+
+def test_hostnames_without_mac_update_by_last_ip(db):
+    db.save_scan({'connected_devices': [{'ip': '192.168.1.30', 'mac': '02:00:00:00:00:30'}]})
+    db.save_hostnames({'192.168.1.30': 'nas.lan', '192.168.1.31': 'ghost.lan'})
+    assert {ip: name for ip, name, _ in db.load_hostnames()} == {'192.168.1.30': 'nas.lan'}
+
+
+def test_invalidate_reloads_answers_saved_elsewhere():
+    stored = []
+    resolver = HostnameResolver(lookup=lambda ip: 'looked-up', loader=lambda: list(stored))
+    resolver._load()
+    # a scan worker persisted an answer after this process loaded
+    stored.append(('10.0.0.7', 'nas.lan', time.time()))
+    resolver.invalidate()
+    assert resolver.resolve('10.0.0.7') == 'nas.lan'
+    assert resolver.stats['hits'] == 1
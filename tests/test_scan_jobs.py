@@ -0,0 +1,101 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scan_jobs import ScanJobManager, DONE, ERROR, RUNNING
+
+
+class Runner:
+    """Scan stand-in: reports one phase, then blocks until released."""
+
+    def __init__(self, fail=None):
+        self.release = threading.Event()
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, job, **params):
+        self.calls.append(params)
+        job.update(phase='sweep', hosts_total=254, hosts_alive=0)
+        job.update(devices=[{'ip': '10.0.0.1'}], hosts_alive=1)
+        assert self.release.wait(5)
+        if self.fail:
+            raise RuntimeError(self.fail)
+        return {'status': 'success', 'params': params}
+
+
+@pytest.fixture
+def runner():
+    runner = Runner()
+    yield runner
+    runner.release.set()
+
+
+def test_same_key_joins_the_running_job(runner):
+    jobs = ScanJobManager(runner)
+    job, joined = jobs.submit('10.0.0.0/24:full', mode='full')
+    again, joined_again = jobs.submit('10.0.0.0/24:full', mode='full')
+    other, joined_other = jobs.submit('10.0.1.0/24:full', mode='full')
+    assert not joined and joined_again and again is job
+    assert not joined_other and other is not job
+    runner.release.set()
+    assert job.wait(5) and other.wait(5)
+    assert len(runner.calls) == 2
+    # a finished job is not joined — the next request scans again
+    fresh, joined = jobs.submit('10.0.0.0/24:full', mode='full')
+    assert not joined and fresh is not job
+    assert fresh.wait(5)
+
+
+def test_progress_and_result(runner):
+    seen = []
+    jobs = ScanJobManager(runner, listener=lambda job: seen.append((job.status, job.phase)))
+    job, _ = jobs.submit('k', mode='incremental', cidrs=None)
+    job.wait_change(0, timeout=5)
+    while job.progress.get('hosts_alive') != 1:
+        job.wait_change(job.version, timeout=5)
+    snap = job.snapshot()
+    assert snap['status'] == RUNNING and snap['phase'] == 'sweep'
+    assert snap['progress'] == {'hosts_total': 254, 'hosts_alive': 1}
+    assert snap['devices_found'] == 1 and 'result' not in snap
+    runner.release.set()
+    assert job.wait(5)
+    snap = job.snapshot()
+    assert snap['status'] == DONE and snap['result']['params'] == {'mode': 'incremental', 'cidrs': None}
+    assert seen[0] == (RUNNING, 'starting') and seen[-1] == (DONE, DONE)
+    assert [j['job_id'] for j in jobs.list()] == [job.id]
+    assert jobs.get(job.id) is job and jobs.get('nope') is None
+
+
+def test_failed_scan_reports_its_error():
+    runner = Runner(fail='no interface to scan')
+    runner.release.set()
+    jobs = ScanJobManager(runner)
+    job, _ = jobs.submit('k')
+    assert job.wait(5)
+    snap = job.snapshot()
+    assert snap['status'] == ERROR and snap['phase'] == ERROR
+    assert snap['error'] == 'no interface to scan' and 'result' not in snap
+    # the failed job does not block a retry
+    assert jobs.submit('k')[1] is False
+
+
+def test_stream_ends_with_the_final_snapshot(runner):
+    jobs = ScanJobManager(runner)
+    job, _ = jobs.submit('k')
+    threading.Timer(0.2, runner.release.set).start()
+    snaps = [s for s in jobs.stream(job, interval=0.01, heartbeat=0.05) if s is not None]
+    assert snaps[-1]['status'] == DONE and snaps[-1]['result']['status'] == 'success'
+    assert all('result' not in s for s in snaps[:-1])
+
+
+def test_finished_jobs_expire(runner):
+    runner.release.set()
+    jobs = ScanJobManager(runner, ttl=0)
+    job, _ = jobs.submit('k')
+    assert job.wait(5)
+    jobs.submit('other')
+    assert jobs.get(job.id) is None
@@ -0,0 +1,147 @@
+import os
+import socket
+import sys
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from incremental import IncrementalScanner
+from scan_plan import MergedProgress, interface_targets, plan_targets, IFACE_RATE_LIMIT, MIN_PREFIX
+
+# psutil.net_if_addrs() / net_if_stats() shapes
+Addr = namedtuple('Addr', 'family address netmask')
+Stats = namedtuple('Stats', 'isup')
+
+
+def v4(address, netmask):
+    return Addr(socket.AF_INET, address, netmask)
+
+
+ADDRS = {
+    'lo': [v4('127.0.0.1', '255.0.0.0')],
+    'eth0': [v4('192.168.1.2', '255.255.255.0'), Addr(socket.AF_INET6, 'fe80::1', None)],
+    'wlan0': [v4('10.20.30.40', '255.255.0.0')],
+    'eth0.20': [v4('172.16.20.5', '255.255.255.0')],
+    'docker0': [v4('172.17.0.1', '255.255.0.0')],
+    'eth1': [v4('192.168.9.2', '255.255.255.0')],
+    'ptp0': [v4('100.64.0.1', '255.255.255.254')],
+}
+GATEWAYS = {'eth0': '192.168.1.1', 'wlan0': '10.99.0.1'}
+
+
+# ── scan_plan ──────────────────────────────────
+
+def test_interface_targets():
+    targets = {t['iface']: t for t in interface_targets(ADDRS, {'eth1': Stats(False)}, GATEWAYS)}
+    # loopback, container bridges, down links and point-to-point /31s are skipped
+    assert sorted(targets) == ['eth0', 'eth0.20', 'wlan0']
+    assert targets['eth0'] == {'iface': 'eth0', 'subnet': '192.168.1.0/24', 'local_ip': '192.168.1.2',
+                               'gateway': '192.168.1.1', 'narrowed': False}
+    # a /16 is narrowed to the /MIN_PREFIX around our address; a gateway outside it is dropped
+    assert targets['wlan0']['subnet'] == f'10.20.16.0/{MIN_PREFIX}' and targets['wlan0']['narrowed']
+    assert targets['wlan0']['gateway'] is None
+
+
+def test_plan_targets_primary_first_with_split_rate():
+    addrs = {**ADDRS, 'eth0': ADDRS['eth0'] + [v4('192.168.2.2', '255.255.255.0')]}
+    targets = plan_targets(addrs, gateways=GATEWAYS, primary_ip='10.20.30.40')
+    assert [t['subnet'] for t in targets][0] == '10.20.16.0/20'
+    rates = {t['subnet']: t['rate_limit'] for t in targets}
+    assert rates['192.168.1.0/24'] == rates['192.168.2.0/24'] == IFACE_RATE_LIMIT / 2
+    assert rates['10.20.16.0/20'] == IFACE_RATE_LIMIT
+    limited = plan_targets(addrs, rate_limits={'wlan0': 500}, primary_ip='10.20.30.40')
+    assert limited[0]['rate_limit'] == 500
+
+
+def test_plan_targets_for_explicit_cidrs():
+    targets = plan_targets(ADDRS, gateways=GATEWAYS,
+                           cidrs=['192.168.1.77/24', '192.168.1.0/24', '10.5.0.0/24', '172.17.0.0/24'])
+    assert [(t['subnet'], t['iface'], t['gateway']) for t in targets] == [
+        ('192.168.1.0/24', 'eth0', '192.168.1.1'),      # duplicates collapse
+        ('10.5.0.0/24', None, None),                    # routed, not on any NIC
+        ('172.17.0.0/24', 'docker0', None),             # asked for explicitly, so not ignored
+    ]
+
+
+def test_merged_progress():
+    reports = []
+    merged = MergedProgress(lambda phase, **kw: reports.append((phase, kw)), ['10.0.0.0/24', '10.0.1.0/24'])
+    a, b = merged.target('10.0.0.0/24'), merged.target('10.0.1.0/24')
+    a('sweep', hosts_total=254, sweep={'rate': 1000})
+    b('arp', hosts_total=254, hosts_alive=3)
+    assert reports[-1] == ('sweep', {'hosts_total': 508, 'hosts_alive': 3, 'sweep': {'10.0.0.0/24': {'rate': 1000}}})
+    b(devices=[{'ip': '10.0.1.5'}])
+    a('devices', devices=[{'ip': '10.0.0.9'}])
+    phase, kw = reports[-1]
+    assert phase == 'arp'                              # the least advanced target
+    assert [d['ip'] for d in kw['devices']] == ['10.0.0.9', '10.0.1.5']
+
+
+# ── incremental ────────────────────────────────
+
+SUBNET = '10.0.0.0/27'      # 30 hosts
+
+
+def prior(*entries):
+    return {ip: {'mac': mac, 'open_ports': ports, 'timestamp': 't'} for ip, mac, ports in entries}
+
+
+def test_first_tick_without_history_is_full():
+    plan = IncrementalScanner(slices=4, state_loader=dict).plan(SUBNET)
+    assert plan['mode'] == 'full' and len(plan['sweep_ips']) == 30
+
+
+def test_slices_rotate_over_the_whole_subnet():
+    state = prior(('10.0.0.5', 'M5', [22]), ('192.168.1.5', 'MX', []))     # other subnets are ignored
+    scanner = IncrementalScanner(slices=4, state_loader=lambda: state)
+    covered = set()
+    for tick in range(4):
+        plan = scanner.plan(SUBNET, always=('10.0.0.1', None))
+        assert plan['mode'] == 'incremental' and plan['slice'] == tick
+        assert {'10.0.0.1', '10.0.0.5'} <= set(plan['sweep_ips'])
+        assert set(plan['prior']) == {'10.0.0.5'}
+        assert len(plan['slice_ips']) in (7, 8)
+        covered |= plan['slice_ips']
+    assert len(covered) == 30
+    assert scanner.plan(SUBNET)['slice'] == 0
+
+
+def test_full_every_forces_a_full_sweep():
+    scanner = IncrementalScanner(slices=4, full_every=3, state_loader=lambda: prior(('10.0.0.5', 'M5', [])))
+    assert [scanner.plan(SUBNET)['mode'] for _ in range(4)] == ['full', 'incremental', 'incremental', 'full']
+
+
+def test_port_targets():
+    state = prior(('10.0.0.2', 'M2', [22, 80]), ('10.0.0.3', 'M3', [443]), ('10.0.0.4', 'M4', [22]),
+                  ('10.0.0.6', 'M6', []))
+    scanner = IncrementalScanner(slices=30, state_loader=lambda: state)
+    plan = scanner.plan(SUBNET)        # slice 0 = 10.0.0.1 only
+    plan['sweep_ips'] = sorted(set(plan['sweep_ips']) | {'10.0.0.6'})
+    devices = [{'ip': '10.0.0.1', 'mac': 'M1'},              # in the slice
+               {'ip': '10.0.0.2', 'mac': 'M2'},              # steady
+               {'ip': '10.0.0.3', 'mac': 'EVIL'},            # MAC changed
+               {'ip': '10.0.0.4', 'mac': 'Unknown'},         # no ARP answer — not a change
+               {'ip': '10.0.0.9', 'mac': 'M9'}]              # new
+    targets, changes = scanner.port_targets(plan, devices, [22, 80, 443])
+    assert targets == {'10.0.0.1': [22, 80, 443], '10.0.0.2': [22, 80], '10.0.0.3': [22, 80, 443],
+                       '10.0.0.4': [22], '10.0.0.9': [22, 80, 443]}
+    assert changes == {'new': ['10.0.0.1', '10.0.0.9'], 'mac_changed': ['10.0.0.3'], 'gone': ['10.0.0.6']}
+
+
+def test_port_targets_for_matches_devices_to_their_subnet():
+    state = prior(('10.0.0.2', 'M2', [22]), ('10.0.1.2', 'N2', [80]))
+    scanner = IncrementalScanner(slices=30, state_loader=lambda: state)
+    plans = {s: scanner.plan(s) for s in ('10.0.0.0/27', '10.0.1.0/27')}
+    devices = [{'ip': '10.0.0.2', 'mac': 'M2', 'subnet': '10.0.0.0/27'},
+               {'ip': '10.0.1.2', 'mac': 'N2', 'subnet': '10.0.1.0/27'},
+               {'ip': '10.0.1.7', 'mac': 'N7', 'subnet': '10.0.1.0/27'}]
+    targets, changes = scanner.port_targets_for(plans, devices, [22, 80])
+    assert targets == {'10.0.0.2': [22], '10.0.1.2': [80], '10.0.1.7': [22, 80]}
+    assert changes['new'] == ['10.0.1.7']
+
+
+def test_incremental_reads_prior_state_from_recent_scans(db):
+    db.save_scan({'connected_devices': [{'ip': '10.0.0.5', 'mac': 'M5'}], 'port_scan': {'10.0.0.5': [22]}})
+    plan = IncrementalScanner(slices=4).plan(SUBNET)
+    assert plan['mode'] == 'incremental'
+    assert plan['prior']['10.0.0.5']['open_ports'] == [22]
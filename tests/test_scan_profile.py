@@ -0,0 +1,139 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scan_profile import (ProfileStore, SubnetProfile, SweepController, BACKOFF, CANARY_INTERVAL, DEFAULT_RATE,
+                          DEFAULT_TIMEOUT, LOSS_ALPHA, MAX_RETRIES, MAX_TIMEOUT, MIN_RATE, MIN_TIMEOUT,
+                          RATE_STEP, SLOW_START)
+
+SUBNET = '192.168.1.0/24'
+GW = '192.168.1.1'
+
+
+def controller(rate=DEFAULT_RATE, ceiling=8000, responders=(GW,), loss=0.0, **kw):
+    profile = SubnetProfile(SUBNET, rate=rate, ceiling=ceiling, responders=responders, loss=loss)
+    return SweepController(profile, canaries=[GW], **kw)
+
+
+# ── AIMD ───────────────────────────────────────
+
+def test_slow_start_below_the_ceiling_then_additive():
+    c = controller(rate=1000, ceiling=1500)
+    c.on_canary(GW, 0.002)
+    assert c.rate == 1000 * SLOW_START
+    c.on_canary(GW, 0.002)
+    assert c.rate == 1000 * SLOW_START ** 2          # 1562.5 — now past the ceiling
+    c.on_canary(GW, 0.002)
+    assert c.rate == 1000 * SLOW_START ** 2 + RATE_STEP
+
+
+def test_loss_halves_once_per_timeout():
+    c = controller(rate=4000)
+    c.on_canary(GW, None, now=100.0)
+    assert c.rate == 4000 * BACKOFF and c.ceiling == c.rate and c.backoffs == 1
+    c.on_canary(GW, None, now=100.0 + c.timeout / 2)     # same congestion event
+    assert c.rate == 2000 and c.backoffs == 1
+    c.on_congestion(now=100.0 + c.timeout * 2)            # ENOBUFS later on
+    assert c.rate == 1000 and c.backoffs == 2
+    assert c.canaries_lost == 2
+
+
+def test_rate_stays_within_bounds():
+    c = controller(rate=150, max_rate=1200)
+    for i in range(5):
+        c.on_congestion(now=i * 10.0)
+    assert c.rate == MIN_RATE
+    for _ in range(100):
+        c.on_canary(GW, 0.001)
+    assert c.rate == 1200                  # the interface's share, not MAX_RATE
+
+
+def test_canary_that_never_answers_is_dropped_not_counted_as_loss():
+    profile = SubnetProfile(SUBNET, responders=())
+    c = SweepController(profile, canaries=['192.168.1.254'])
+    assert c.canary_due(0.0) == '192.168.1.254'
+    assert c.canary_due(CANARY_INTERVAL / 2) is None
+    c.on_canary('192.168.1.254', None, now=1.0)
+    assert c.canary_due(1.0) == '192.168.1.254'
+    c.on_canary('192.168.1.254', None, now=2.0)
+    assert c.canary_due(10.0) is None and c.backoffs == 0
+    assert c.canaries_sent == 0 and c.loss == 0.0
+
+
+def test_early_responders_join_the_canary_pool():
+    c = SweepController(SubnetProfile(SUBNET), canaries=[])
+    assert c.canary_due(0.0) is None
+    c.on_reply('192.168.1.20', 0.003)
+    assert c.canary_due(1.0) == '192.168.1.20'
+    c.on_canary('192.168.1.20', None, now=5.0)          # answered before → a real loss
+    assert c.backoffs == 1
+
+
+# ── timeouts / retries ─────────────────────────
+
+def test_timeout_follows_smoothed_rtt():
+    c = controller()
+    assert c.timeout == DEFAULT_TIMEOUT
+    c.on_reply('192.168.1.5', 0.010)
+    assert c.srtt == 0.010 and c.rttvar == 0.005
+    assert c.timeout == MIN_TIMEOUT                      # 0.010 + 4·0.005 + 0.05 < the floor
+    c.on_reply('192.168.1.5', 0.500)
+    assert c.srtt == pytest.approx(0.875 * 0.010 + 0.125 * 0.5)
+    for _ in range(20):
+        c.on_reply('192.168.1.5', 3.0)
+    assert c.timeout == MAX_TIMEOUT
+
+
+def test_retry_targets():
+    ips = ['192.168.1.1', '192.168.1.2', '192.168.1.3']
+    steady = controller(responders=('192.168.1.1', '192.168.1.2'))
+    assert steady.retries == 1
+    assert steady.retry_targets(ips, alive={'192.168.1.1': 0.01}) == ['192.168.1.2']
+    lossy = controller(loss=0.2)
+    assert lossy.retries == MAX_RETRIES
+    assert lossy.retry_targets(ips, alive={'192.168.1.1': 0.01}) == ['192.168.1.2', '192.168.1.3']
+
+
+# ── learning ───────────────────────────────────
+
+def test_finish_folds_the_sweep_into_the_profile():
+    c = controller(rate=1000, responders=(GW, '192.168.1.9', '192.168.1.200'), loss=0.1)
+    c.profile.runs = 3
+    for now, rtt in ((0.0, 0.004), (1.0, None)):
+        assert c.canary_due(now) == GW
+        c.on_canary(GW, rtt, now=now)
+    p = c.finish({GW: 0.004, '192.168.1.7': 0.01}, swept=[GW, '192.168.1.7', '192.168.1.9'])
+    assert p.rate == min(c.rate, c.ceiling) and p.runs == 4
+    assert p.loss == pytest.approx((1 - LOSS_ALPHA) * 0.1 + LOSS_ALPHA * 0.5)
+    # .9 was swept and silent → forgotten; .200 was not swept this time → kept
+    assert p.responders == [GW, '192.168.1.7', '192.168.1.200']
+
+
+def test_profile_store_round_trip():
+    saved = {}
+    store = ProfileStore(loader=saved.get, saver=saved.__setitem__)
+    profile = store.get(SUBNET)
+    assert profile.runs == 0 and profile.rate == DEFAULT_RATE
+    c = SweepController(profile, canaries=[GW])
+    c.on_canary(GW, 0.02)
+    store.save(c.finish({GW: 0.02}))
+    fresh = ProfileStore(loader=saved.get).get(SUBNET)
+    assert fresh.to_dict() == profile.to_dict()
+    assert fresh.timeout == profile.timeout and fresh.summary()['runs'] == 1
+
+
+def test_profile_store_survives_a_broken_loader():
+    def loader(subnet):
+        raise OSError('database is locked')
+    assert ProfileStore(loader=loader).get(SUBNET).runs == 0
+
+
+def test_scan_profiles_persist_in_the_database(db):
+    profile = SubnetProfile(SUBNET, rate=2500, srtt=0.01, rttvar=0.002, loss=0.01, runs=2, responders=[GW])
+    db.save_scan_profile(SUBNET, profile.to_dict())
+    loaded = ProfileStore(loader=db.load_scan_profile).get(SUBNET)
+    assert loaded.to_dict() == profile.to_dict()
+    assert db.load_scan_profile('10.0.0.0/24') is None
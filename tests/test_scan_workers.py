@@ -0,0 +1,171 @@
+import os
+import signal
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scan_workers
+from scan_workers import ScanWorkerPool, WorkerUnavailable
+
+# Targets below run inside spawned workers, which import this module by name
+HERE = os.path.splitext(os.path.basename(__file__))[0]
+
+
+def echo_scan(progress, **params):
+    progress(phase='sweep', hosts_total=4)
+    progress(hosts_alive=1)
+    progress(phase='devices', devices=[{'ip': '10.0.0.1'}])
+    return {'pid': os.getpid(), 'params': params}
+
+
+def failing_scan(progress, **params):
+    raise ValueError('no interface to scan')
+
+
+def dying_scan(progress, **params):
+    os._exit(3)
+
+
+def frozen_scan(progress, **params):
+    # stops heartbeats as well as the scan, like a wedged process
+    os.kill(os.getpid(), signal.SIGSTOP)
+
+
+def slow_scan(progress, **params):
+    time.sleep(30)
+
+
+def worker_state():
+    return {'pid': os.getpid()}
+
+
+def make_pool(target, **kw):
+    kw.setdefault('heartbeat', 0.2)
+    kw.setdefault('heartbeat_timeout', 1.0)
+    kw.setdefault('scan_timeout', 20)
+    return ScanWorkerPool(f'{HERE}:{target}', **kw)
+
+
+@pytest.fixture
+def pools():
+    created = []
+
+    def make(target, **kw):
+        pool = make_pool(target, **kw)
+        created.append(pool)
+        return pool
+    yield make
+    for pool in created:
+        pool.shutdown()
+
+
+def collect():
+    events = []
+
+    def report(phase=None, devices=None, **counters):
+        events.append((phase, devices, counters))
+    return events, report
+
+
+def test_scan_runs_in_a_worker_and_relays_progress(pools):
+    pool = pools('echo_scan', workers=1, status=f'{HERE}:worker_state')
+    events, report = collect()
+    result = pool.run(report, key='a', mode='full', cidrs=['10.0.0.0/30'])
+    assert result['params'] == {'mode': 'full', 'cidrs': ['10.0.0.0/30']}
+    assert result['pid'] != os.getpid()
+    phases = [phase for phase, _, _ in events if phase]
+    assert phases == ['sweep', 'devices']
+    assert events[-1][1] == [{'ip': '10.0.0.1'}]
+    counters = {}
+    for _, _, c in events:
+        counters.update(c)
+    assert counters == {'hosts_total': 4, 'hosts_alive': 1}
+
+    deadline = time.monotonic() + 5
+    while pool.health()['workers'][0]['info'] is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    health = pool.health()
+    assert health['running'] == 1 and health['busy'] == 0 and health['scans'] == 1
+    assert health['workers'][0]['info'] == {'pid': result['pid']}
+
+
+def test_job_key_sticks_to_its_worker(pools):
+    pool = pools('echo_scan', workers=2)
+    _, report = collect()
+    a = pool.run(report, key='a')['pid']
+    b = pool.run(report, key='b')['pid']
+    assert a != b
+    assert pool.run(report, key='a')['pid'] == a
+    assert pool.run(report, key='b')['pid'] == b
+
+
+def test_scan_error_keeps_the_worker(pools):
+    pool = pools('failing_scan', workers=1)
+    _, report = collect()
+    with pytest.raises(RuntimeError, match='ValueError: no interface to scan'):
+        pool.run(report)
+    pid = pool.health()['workers'][0]['pid']
+    with pytest.raises(RuntimeError):
+        pool.run(report)
+    assert pool.health()['workers'][0]['pid'] == pid
+    assert pool.stats['crashes'] == 0 and pool.stats['restarts'] == 0
+
+
+def test_dead_worker_is_replaced(pools):
+    pool = pools('dying_scan', workers=1)
+    _, report = collect()
+    pool.start()
+    first = pool.health()['workers'][0]['pid']
+    with pytest.raises(RuntimeError, match=r'worker died \(exit code 3\)'):
+        pool.run(report)
+    assert pool.stats['crashes'] == 1 and pool.stats['restarts'] == 1
+    worker = pool.health()['workers'][0]
+    assert worker['pid'] != first and worker['alive']
+
+
+def test_silent_worker_is_killed_and_replaced(pools):
+    pool = pools('frozen_scan', workers=1, heartbeat_timeout=1.0)
+    _, report = collect()
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match='no heartbeat'):
+        pool.run(report)
+    assert time.monotonic() - start < 10
+    assert pool.stats['restarts'] == 1
+    assert pool.health()['workers'][0]['alive']
+
+
+def test_overrunning_scan_is_killed(pools):
+    pool = pools('slow_scan', workers=1, scan_timeout=2)
+    _, report = collect()
+    with pytest.raises(RuntimeError, match='scan exceeded 2s'):
+        pool.run(report)
+    assert pool.stats['restarts'] == 1
+
+
+def test_workers_that_cannot_start_raise_worker_unavailable(pools, monkeypatch):
+    # the caller catches WorkerUnavailable and scans in-process instead
+    monkeypatch.setattr(scan_workers, 'START_TIMEOUT', 10)
+    pool = ScanWorkerPool('no_such_module:scan', workers=1, heartbeat=0.2)
+    try:
+        _, report = collect()
+        for _ in range(scan_workers.MAX_FAILED_STARTS):
+            with pytest.raises(WorkerUnavailable):
+                pool.run(report)
+        health = pool.health()
+        assert health['gave_up'] and health['workers'] == []
+        start = time.monotonic()
+        with pytest.raises(WorkerUnavailable, match='no scan workers running'):
+            pool.run(report)
+        assert time.monotonic() - start < 1
+    finally:
+        pool.shutdown()
+
+
+def test_shut_down_pool_is_unavailable(pools):
+    pool = pools('echo_scan', workers=1)
+    pool.shutdown()
+    with pytest.raises(WorkerUnavailable):
+        pool.run(collect()[1])
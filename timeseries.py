@@ -0,0 +1,259 @@
+"""
+GARUDA Time-Series Store
+Fixed-memory ring buffers of per-NIC interface counters at 1s resolution.
+Every NIC owns `capacity` slots in flat typed arrays (no per-sample
+objects), so the footprint is fixed when the NIC is first seen. Rates and
+percentiles are derived from the stored deltas on demand, and complete
+minutes are downsampled and flushed to the database traffic tiers.
+"""
+
+import math
+import threading
+from array import array
+from datetime import datetime
+
+DEFAULT_CAPACITY = 3600   # slots per NIC — one hour at 1s
+TOTAL = '*'               # pseudo-NIC holding the sum over all interfaces
+
+COUNTERS = ('bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv',
+            'errin', 'errout', 'dropin', 'dropout')
+# Byte deltas can pass 4 GiB on a fast link after a stall; the rest fit in 32 bits
+TYPECODES = {'bytes_sent': 'Q', 'bytes_recv': 'Q'}
+LIMITS = {'Q': 2 ** 64 - 1, 'I': 2 ** 32 - 1}
+
+
+def _minute(ts):
+    """Bucket key in the local ISO format the database tiers use."""
+    return datetime.fromtimestamp(ts).isoformat()[:16]
+
+
+class NicSeries:
+    """One interface: a ring of (timestamp, interval, counter deltas)."""
+
+    __slots__ = ('capacity', 'count', 'ts', 'dt', 'cols', 'last', 'last_ts', 'first_ts')
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.count = 0                          # samples ever appended
+        self.ts = array('d', [0.0]) * capacity
+        self.dt = array('f', [0.0]) * capacity
+        self.cols = {c: array(TYPECODES.get(c, 'I'), [0]) * capacity for c in COUNTERS}
+        self.last = None                        # last cumulative counters seen
+        self.last_ts = None
+        self.first_ts = None
+
+    @property
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.ts, self.dt, *self.cols.values()))
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    # ── writes ────────────────────────────────────────────
+    def append(self, ts, counters):
+        """
+        Record cumulative counters (tuple in COUNTERS order). Returns the
+        deltas stored for this tick, or None for the first reading.
+        A counter that went backwards was reset and counts from zero.
+        """
+        prev, prev_ts = self.last, self.last_ts
+        self.last, self.last_ts = counters, ts
+        if prev is None or ts <= prev_ts:
+            return None
+        deltas = tuple(c - p if c >= p else c for c, p in zip(counters, prev))
+        self.append_deltas(ts, ts - prev_ts, deltas)
+        return deltas
+
+    def append_deltas(self, ts, dt, deltas):
+        i = self.count % self.capacity
+        self.ts[i] = ts
+        self.dt[i] = dt
+        for c, d in zip(COUNTERS, deltas):
+            col = self.cols[c]
+            col[i] = min(d, LIMITS[col.typecode])
+        if self.first_ts is None:
+            self.first_ts = ts - dt
+        self.count += 1
+
+    # ── reads ─────────────────────────────────────────────
+    def _slot(self, k):
+        """Physical slot of the k-th oldest retained sample."""
+        return (self.count - len(self) + k) % self.capacity
+
+    def _start(self, since):
+        """Logical index of the first retained sample with ts >= since."""
+        n = len(self)
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts[self._slot(mid)] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def slots(self, since=None):
+        start = self._start(since) if since is not None else 0
+        return [self._slot(k) for k in range(start, len(self))]
+
+    @property
+    def span(self):
+        """Seconds of history currently held."""
+        if not self.count:
+            return 0
+        oldest = self._slot(0)
+        return self.ts[self._slot(len(self) - 1)] - self.ts[oldest] + self.dt[oldest]
+
+    def rates(self, counter, since=None):
+        col, dt = self.cols[counter], self.dt
+        return [col[i] / dt[i] for i in self.slots(since) if dt[i] > 0]
+
+    def latest(self):
+        if not self.count:
+            return None
+        i = self._slot(len(self) - 1)
+        row = {'ts': self.ts[i], 'interval': round(self.dt[i], 3)}
+        for c in COUNTERS:
+            row[c] = self.cols[c][i]
+        for c in ('bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv'):
+            row[c + '_per_sec'] = round(row[c] / self.dt[i]) if self.dt[i] > 0 else 0
+        return row
+
+    def buckets(self, since=None, width=60):
+        """
+        Downsample to `width`-second buckets: counter sums, peak byte
+        rates and sample counts, keyed by bucket start timestamp.
+        """
+        out = {}
+        for i in self.slots(since):
+            start = self.ts[i] - self.ts[i] % width
+            agg = out.get(start)
+            if agg is None:
+                agg = out[start] = dict.fromkeys(COUNTERS + ('max_sent_rate', 'max_recv_rate', 'samples'), 0)
+            for c in COUNTERS:
+                agg[c] += self.cols[c][i]
+            dt = self.dt[i]
+            if dt > 0:
+                agg['max_sent_rate'] = max(agg['max_sent_rate'], self.cols['bytes_sent'][i] / dt)
+                agg['max_recv_rate'] = max(agg['max_recv_rate'], self.cols['bytes_recv'][i] / dt)
+            agg['samples'] += 1
+        return out
+
+
+def percentiles(values, ps=(50, 95, 99)):
+    """Nearest-rank percentiles of an unsorted list."""
+    if not values:
+        return {f'p{p}': 0 for p in ps}
+    ordered = sorted(values)
+    n = len(ordered)
+    return {f'p{p}': round(ordered[min(n - 1, max(0, math.ceil(p / 100 * n) - 1))], 1) for p in ps}
+
+
+class TimeSeriesStore:
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.nics = {}
+        self._flushed = None       # last minute key written to the database
+        self._lock = threading.Lock()
+
+    def _series(self, nic):
+        s = self.nics.get(nic)
+        if s is None:
+            s = self.nics[nic] = NicSeries(self.capacity)
+        return s
+
+    def record(self, ts, counters):
+        """
+        counters: nic → object/dict carrying the COUNTERS fields
+        (e.g. psutil.net_io_counters(pernic=True)). Also maintains the
+        TOTAL series from the per-NIC deltas.
+        """
+        with self._lock:
+            total, dt = [0] * len(COUNTERS), None
+            for nic, c in counters.items():
+                values = tuple(c[k] if isinstance(c, dict) else getattr(c, k) for k in COUNTERS)
+                series = self._series(nic)
+                prev_ts = series.last_ts
+                deltas = series.append(ts, values)
+                if deltas:
+                    dt = ts - prev_ts if dt is None else dt
+                    for k, d in enumerate(deltas):
+                        total[k] += d
+            if dt:
+                self._series(TOTAL).append_deltas(ts, dt, total)
+
+    # ── queries ───────────────────────────────────────────
+    def latest(self, nic=TOTAL):
+        series = self.nics.get(nic)
+        return series.latest() if series else None
+
+    def span(self, nic=TOTAL):
+        series = self.nics.get(nic)
+        return series.span if series else 0
+
+    def stats(self, seconds=60, nic=TOTAL, now=None, ps=(50, 95, 99)):
+        """Byte-rate summary over the last `seconds`: current, mean, max and percentiles."""
+        series = self.nics.get(nic)
+        if not series or not series.count:
+            return None
+        with self._lock:
+            latest = series.latest()
+            since = (now or latest['ts']) - seconds
+            out = {'window': seconds}
+            for c in ('bytes_sent', 'bytes_recv'):
+                rates = series.rates(c, since)
+                out[c + '_per_sec'] = {
+                    'current': latest[c + '_per_sec'],
+                    'mean': round(sum(rates) / len(rates), 1) if rates else 0,
+                    'max': round(max(rates), 1) if rates else 0,
+                    **percentiles(rates, ps),
+                }
+            out['samples'] = len(series.slots(since))
+            return out
+
+    def history(self, seconds, nic=TOTAL, step=1, now=None):
+        """Rows of deltas over the last `seconds`, `step` seconds per row."""
+        series = self.nics.get(nic)
+        if not series or not series.count:
+            return []
+        with self._lock:
+            latest_ts = series.ts[series._slot(len(series) - 1)]
+            buckets = series.buckets((now or latest_ts) - seconds, width=max(1, int(step)))
+        rows = []
+        for start, agg in sorted(buckets.items()):
+            rows.append({'timestamp': datetime.fromtimestamp(start).isoformat(), **agg})
+        return rows
+
+    @property
+    def nbytes(self):
+        return sum(s.nbytes for s in self.nics.values())
+
+    # ── persistence ───────────────────────────────────────
+    def flush(self, writer, now=None):
+        """
+        Hand every complete, not yet flushed minute of the TOTAL series to
+        `writer({minute_key: agg})`. Minutes only partly observed (the one
+        the store started in, the one still running) are never written.
+        Returns the number of minutes flushed.
+        """
+        series = self.nics.get(TOTAL)
+        if not series or not series.count:
+            return 0
+        with self._lock:
+            current = _minute(now or series.ts[series._slot(len(series) - 1)])
+            first_full = series.first_ts - series.first_ts % 60
+            if first_full < series.first_ts:
+                first_full += 60
+            since = first_full
+            if self._flushed:
+                since = max(since, datetime.fromisoformat(self._flushed).timestamp() + 60)
+            minutes = {}
+            for start, agg in series.buckets(since).items():
+                key = _minute(start)
+                if key < current:
+                    minutes[key] = agg
+        if not minutes:
+            return 0
+        writer(minutes)
+        self._flushed = max(minutes)
+        return len(minutes)
@@ -0,0 +1,173 @@
+"""
+GARUDA Wire Format
+How API payloads are encoded for HTTP:
+  • JSON through orjson when it is installed, the stdlib encoder with
+    compact separators otherwise
+  • list endpoints can answer columnar JSON (?format=columnar: every
+    column name once, then one array per column) or MessagePack
+    (?format=msgpack or Accept: application/msgpack, when installed)
+  • bodies over MIN_COMPRESS bytes are compressed per Accept-Encoding —
+    brotli when installed, gzip otherwise
+  • encoded bodies are kept per strong ETag, so a resource that has not
+    changed is neither queried nor encoded again, whoever asks for it
+ETags come from the caller (DB change counters + request shape); this
+module only folds in the representation (format and content-coding).
+"""
+
+import gzip
+import json
+import hashlib
+import threading
+import collections
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MIN_COMPRESS = 1024        # bytes; smaller bodies go out as-is
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5         # dynamic content: most of q11's ratio at a fraction of the cost
+BODY_CACHE = 64            # encoded bodies kept, by ETag
+
+MIMETYPES = {
+    'json': 'application/json',
+    'columnar': 'application/json',
+    'msgpack': 'application/msgpack',
+}
+
+
+def _default(obj):
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.hex()
+    return str(obj)
+
+
+def dumps(payload):
+    """Compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=_default).encode('utf-8')
+
+
+def columnar(rows):
+    """[{...}, ...] → {'count', 'columns': {name: [values]}}; keys missing from a row are null."""
+    names = list(dict.fromkeys(k for row in rows for k in row))
+    return {'count': len(rows), 'columns': {name: [row.get(name) for row in rows] for name in names}}
+
+
+def encode(payload, fmt='json'):
+    """(body bytes, mimetype) for `payload` in `fmt`. Non-list payloads are never columnar."""
+    if fmt == 'msgpack' and msgpack is not None:
+        return msgpack.packb(payload, default=_default, use_bin_type=True), MIMETYPES['msgpack']
+    if fmt == 'columnar' and isinstance(payload, list):
+        payload = columnar(payload)
+    return dumps(payload), MIMETYPES['json']
+
+
+def compress(body, coding):
+    if coding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if coding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+# ─────────────────────────────────────────────
+#  NEGOTIATION
+# ─────────────────────────────────────────────
+def _qvalues(header):
+    """'gzip, br;q=0.9, *;q=0' → {'gzip': 1.0, 'br': 0.9, '*': 0.0}"""
+    values = {}
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        values[name] = q
+    return values
+
+
+def negotiate_coding(accept_encoding):
+    """'br', 'gzip' or None (identity) for an Accept-Encoding header."""
+    q = _qvalues(accept_encoding)
+    offered = [c for c in (('br', 'gzip') if brotli is not None else ('gzip',))
+               if q.get(c, q.get('*', 0.0)) > 0]
+    # highest q wins; on a tie brotli, listed first, is kept
+    return max(offered, key=lambda c: q.get(c, q.get('*', 0.0)), default=None)
+
+
+def negotiate_format(requested=None, accept=None, rows=False):
+    """'json', 'columnar' or 'msgpack'. Columnar only applies to list endpoints (`rows`)."""
+    requested = (requested or '').lower()
+    if requested == 'msgpack' or (not requested and 'msgpack' in (accept or '')):
+        return 'msgpack' if msgpack is not None else 'json'
+    if requested == 'columnar' and rows:
+        return 'columnar'
+    return 'json'
+
+
+def make_etag(*parts):
+    """Strong validator for a resource version — a digest of the parts."""
+    return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=10).hexdigest()
+
+
+# ─────────────────────────────────────────────
+#  ENCODED BODY CACHE
+# ─────────────────────────────────────────────
+class BodyCache:
+    """
+    LRU of encoded bodies keyed by (etag, format, coding). An ETag
+    names one version of one resource, so a hit is always current.
+    """
+
+    def __init__(self, size=BODY_CACHE):
+        self.size = size
+        self._bodies = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = collections.Counter()
+
+    def render(self, load, fmt='json', coding=None, etag=None):
+        """
+        (body, mimetype, coding) — `load()` builds the payload only on a miss.
+        `coding` is dropped for bodies under MIN_COMPRESS.
+        """
+        key = (etag, fmt, coding)
+        if etag is not None:
+            with self._lock:
+                hit = self._bodies.get(key)
+                if hit is not None:
+                    self._bodies.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return hit
+        self.stats['misses'] += 1
+        body, mimetype = encode(load(), fmt)
+        if coding and len(body) >= MIN_COMPRESS:
+            body = compress(body, coding)
+        else:
+            coding = None
+        entry = (body, mimetype, coding)
+        if etag is not None:
+            with self._lock:
+                self._bodies[key] = entry
+                while len(self._bodies) > self.size:
+                    self._bodies.popitem(last=False)
+        return entry